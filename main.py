@@ -380,7 +380,7 @@ def main():
         from src.database.db_startup_repair import ensure_database_integrity
         from src.database.db_repair import repair_database
         
-        logger.info("Running comprehensive database integrity check...")
+        logger.info("Verifying database integrity...")
         repair_result = ensure_database_integrity(db_path)
         
         if repair_result:
@@ -424,6 +424,7 @@ def main():
     # Initialize database manager
     db_manager = DatabaseManager(db_path)
     db_manager.initialize_database()
+    app_refs["db_manager"] = db_manager
     
     # Ensure thumbnail directory exists and fix paths for imported databases
     thumbnail_path = config_manager.get("thumbnails", "path")
@@ -824,7 +825,7 @@ def cleanup_resources():
         if db_manager:
             print("Closing primary database connection...")
             try:
-                db_manager.disconnect()
+                db_manager.close()
             except Exception as e:
                 print(f"Error closing primary database: {e}")
         
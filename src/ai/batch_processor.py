@@ -143,6 +143,9 @@ class BatchProcessor:
                     except Exception as e:
                         logger.error(f"Error in progress callback: {e}")
         
+        # The descriptions are buffered; make them visible before reporting completion
+        self.db_manager.flush_writes()
+        
         # Log completion
         if results["cancelled"]:
             logger.info(f"Batch processing cancelled. Processed: {results['processed']}, Failed: {results['failed']}, Skipped: {results['skipped']}")
@@ -279,6 +282,9 @@ class BatchProcessor:
                     except Exception as e:
                         logger.error(f"Error in progress callback: {e}")
         
+        # The descriptions are buffered; make them visible before reporting completion
+        self.db_manager.flush_writes()
+        
         # Log completion
         if results["cancelled"]:
             logger.info(f"Batch processing cancelled. Processed: {results['processed']}, Failed: {results['failed']}")
@@ -329,7 +335,8 @@ class BatchProcessor:
         """
         if description:
             try:
-                self.db_manager.update_image_description(image_id, ai_description=description)
+                # Buffered, so results are committed in batches instead of one write each
+                self.db_manager.queue_image_description(image_id, ai_description=description)
                 return True
             except Exception as e:
                 logger.error(f"Error updating image description: {e}")
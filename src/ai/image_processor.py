@@ -418,7 +418,7 @@ class AIImageProcessor:
                     
                     # Update the database if we have a description and db_manager
                     if description and self.db_manager:
-                        self.db_manager.update_image_description(image_id, ai_description=description)
+                        self.db_manager.queue_image_description(image_id, ai_description=description)
                     
                     # Mark the task as done
                     self.queue.task_done()
@@ -508,8 +508,8 @@ class AIImageProcessor:
                 description = self.generate_description(image_path)
                 
                 if description:
-                    # Update the database
-                    self.db_manager.update_image_description(image_id, ai_description=description)
+                    # Update the database; buffered and committed with the other results
+                    self.db_manager.queue_image_description(image_id, ai_description=description)
                     results["processed"] += 1
                 else:
                     results["failed"] += 1
@@ -523,6 +523,9 @@ class AIImageProcessor:
                     except Exception as e:
                         logger.error(f"Error in progress callback: {e}")
         
+        # Make the buffered descriptions visible before reporting completion
+        self.db_manager.flush_writes()
+        
         # Final update
         if progress_callback:
             try:
@@ -137,6 +137,9 @@ class ConfigManager:
             "database": {
                 "path": db_path  # Use the correctly determined path
             },
+            "scanner": {
+                "hash_algorithm": "sampled"  # sampled, blake2b or md5
+            },
             "monitor": {
                 "watch_folders": False,
                 "scan_interval_minutes": 30
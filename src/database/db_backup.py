@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Database backup service for StarImageBrowse
+Copies the live database without stopping the scanner or the UI: stepped
+online backups with progress, compacted exports with VACUUM INTO, and
+incremental backups that rewrite only the pages changed since the last run.
+"""
+
+import os
+import time
+import struct
+import sqlite3
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.database.db_wal import BUSY_TIMEOUT_MS
+
+logger = logging.getLogger("StarImageBrowse.database.db_backup")
+
+# Pages copied per step of an online backup; progress is reported after each
+BACKUP_PAGES_PER_STEP = 1024
+
+# Writes by other connections restart a stepped backup; after this many
+# restarts the rest is copied in a single step
+MAX_BACKUP_RESTARTS = 3
+
+# Attempts at a stable snapshot for an incremental backup before falling back
+# to a full online backup
+SNAPSHOT_ATTEMPTS = 3
+
+# Page digests stored next to an incremental backup: a header with the page
+# size and count, then one digest per page
+MANIFEST_HEADER = struct.Struct("<II")
+DIGEST_SIZE = 16
+
+VACUUM_INTO_SUPPORTED = sqlite3.sqlite_version_info >= (3, 27, 0)
+
+
+def _manifest_path(backup_path):
+    """Return the path of the page digest manifest for a backup."""
+    return f"{backup_path}.pages"
+
+
+def _page_digest(page):
+    """Hash one database page."""
+    return hashlib.blake2b(page, digest_size=DIGEST_SIZE).digest()
+
+
+def _remove_file(path):
+    """Delete a file if it exists."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _read_manifest(backup_path, page_size):
+    """Read the page digests of a backup.
+
+    Args:
+        backup_path (str): Path of the backup file
+        page_size (int): Page size of the source database
+
+    Returns:
+        list: One digest per backup page, or None if the manifest is missing,
+            was written for another page size or does not match the file
+    """
+    try:
+        with open(_manifest_path(backup_path), "rb") as f:
+            data = f.read()
+        stored_page_size, page_count = MANIFEST_HEADER.unpack_from(data)
+        if stored_page_size != page_size or os.path.getsize(backup_path) != page_size * page_count:
+            return None
+        offset = MANIFEST_HEADER.size
+        if len(data) != offset + page_count * DIGEST_SIZE:
+            return None
+        return [data[offset + i * DIGEST_SIZE:offset + (i + 1) * DIGEST_SIZE] for i in range(page_count)]
+    except (OSError, struct.error):
+        return None
+
+
+def _write_manifest(backup_path, page_size, digests):
+    """Write the page digests of a backup atomically."""
+    path = _manifest_path(backup_path)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(MANIFEST_HEADER.pack(page_size, len(digests)))
+        f.write(b"".join(digests))
+    os.replace(f"{path}.tmp", path)
+
+
+def _build_manifest(backup_path):
+    """Hash every page of an existing backup and store the manifest.
+
+    Args:
+        backup_path (str): Path of the backup file
+    """
+    conn = sqlite3.connect(backup_path)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+    digests = []
+    with open(backup_path, "rb") as f:
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            digests.append(_page_digest(page))
+    _write_manifest(backup_path, page_size, digests)
+
+
+def online_backup(db_path, dest_path, pages_per_step=BACKUP_PAGES_PER_STEP, progress_callback=None):
+    """Copy the database with the SQLite online backup API.
+
+    The copy is written to a temporary file and moved into place when
+    complete, so an interrupted backup never replaces a good one.
+
+    Args:
+        db_path (str): Path to the database file
+        dest_path (str): Destination path
+        pages_per_step (int): Pages copied per step, -1 for a single step
+        progress_callback (callable, optional): Called as (copied, total) pages
+
+    Returns:
+        bool: True if the copy was written
+    """
+    temp_path = f"{dest_path}.tmp"
+    source = None
+    target = None
+    restarts = [0]
+    last_remaining = [None]
+
+    def on_progress(status, remaining, total):
+        if last_remaining[0] is not None and remaining > last_remaining[0]:
+            restarts[0] += 1
+        last_remaining[0] = remaining
+        if progress_callback:
+            progress_callback(total - remaining, total)
+
+    try:
+        started = time.time()
+        source = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        target = sqlite3.connect(temp_path)
+
+        # Each step holds a read transaction only briefly, but a write from any
+        # other connection restarts the copy; under constant writes finish in
+        # one step, whose read snapshot does not block writers in WAL mode
+        while True:
+            try:
+                steps = pages_per_step if restarts[0] < MAX_BACKUP_RESTARTS else -1
+                source.backup(target, pages=steps, progress=on_progress)
+                break
+            except sqlite3.OperationalError as e:
+                if "busy" not in str(e).lower() and "locked" not in str(e).lower():
+                    raise
+                restarts[0] += 1
+
+        target.close()
+        target = None
+        os.replace(temp_path, dest_path)
+        logger.info(f"Copied {db_path} to {dest_path} in {time.time() - started:.2f}s "
+                    f"({restarts[0]} restarts)")
+        return True
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Failed to back up {db_path} to {dest_path}: {e}")
+        return False
+    finally:
+        if target:
+            target.close()
+        if source:
+            source.close()
+        _remove_file(temp_path)
+
+
+def vacuum_into(db_path, dest_path):
+    """Write a compacted copy of the database with VACUUM INTO.
+
+    The copy has no free pages and its tables are stored contiguously, so it
+    is usually smaller than the live file. Older SQLite versions fall back to
+    an online backup.
+
+    Args:
+        db_path (str): Path to the database file
+        dest_path (str): Destination path
+
+    Returns:
+        bool: True if the copy was written
+    """
+    if not VACUUM_INTO_SUPPORTED:
+        logger.info("VACUUM INTO is not supported by this SQLite version, using an online backup")
+        return online_backup(db_path, dest_path)
+
+    temp_path = f"{dest_path}.tmp"
+    conn = None
+    try:
+        started = time.time()
+        _remove_file(temp_path)
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        conn.execute("VACUUM INTO ?", (temp_path,))
+        conn.close()
+        conn = None
+        os.replace(temp_path, dest_path)
+        logger.info(f"Wrote compacted copy of {db_path} to {dest_path} in {time.time() - started:.2f}s")
+        return True
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Failed to write compacted copy of {db_path}: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+        _remove_file(temp_path)
+
+
+def _begin_stable_snapshot(db_path):
+    """Open a read transaction whose snapshot is exactly the main database file.
+
+    After a truncating checkpoint the WAL is empty, and a reader that starts
+    then reads only the main file. While it stays open, no checkpoint may
+    copy newer pages into that file, so it can be read directly. Writers keep
+    appending to the WAL meanwhile.
+
+    Args:
+        db_path (str): Path to the database file
+
+    Returns:
+        sqlite3.Connection: Connection holding the snapshot, or None if
+            writers kept the WAL busy
+    """
+    for _ in range(SNAPSHOT_ATTEMPTS):
+        reader = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        checker = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        try:
+            journal_mode = reader.execute("PRAGMA journal_mode").fetchone()[0]
+            if journal_mode.lower() == "wal":
+                checker.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+
+            reader.execute("BEGIN")
+            reader.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+            # An empty WAL now means the snapshot taken above cannot include
+            # WAL frames; outside WAL mode the shared lock keeps writers out
+            if journal_mode.lower() != "wal" or checker.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()[1] == 0:
+                return reader
+
+            reader.execute("ROLLBACK")
+        except sqlite3.Error as e:
+            logger.debug(f"Could not take a stable snapshot: {e}")
+        finally:
+            checker.close()
+        reader.close()
+        time.sleep(0.1)
+    return None
+
+
+def incremental_backup(db_path, backup_path=None, progress_callback=None):
+    """Bring a backup up to date, rewriting only the pages that changed.
+
+    Every source page is hashed and compared with the digests stored next to
+    the backup by the previous run; only differing pages are written. The
+    first backup, or one whose manifest is missing or stale, is written in
+    full to a temporary file. If no stable snapshot can be taken because
+    writers keep the WAL busy, a full online backup is made instead.
+
+    An interrupted incremental update leaves the backup inconsistent. Its
+    manifest is removed first, so the next run rewrites it in full.
+
+    Args:
+        db_path (str): Path to the database file
+        backup_path (str, optional): Destination, defaults to <db_path>.backup
+        progress_callback (callable, optional): Called as (pages done, total)
+
+    Returns:
+        bool: True if the backup is up to date
+    """
+    backup_path = backup_path or f"{db_path}.backup"
+    started = time.time()
+
+    reader = _begin_stable_snapshot(db_path)
+    if reader is None:
+        logger.info("Database is busy, making a full online backup instead of an incremental one")
+        if not online_backup(db_path, backup_path, progress_callback=progress_callback):
+            return False
+        try:
+            _build_manifest(backup_path)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not record backup pages, the next backup will be a full copy: {e}")
+            _remove_file(_manifest_path(backup_path))
+        return True
+
+    temp_path = f"{backup_path}.tmp"
+    try:
+        page_size = reader.execute("PRAGMA page_size").fetchone()[0]
+        page_count = reader.execute("PRAGMA page_count").fetchone()[0]
+
+        old_digests = _read_manifest(backup_path, page_size)
+        in_place = old_digests is not None
+        _remove_file(_manifest_path(backup_path))
+
+        digests = []
+        changed = 0
+        with open(db_path, "rb") as source, open(backup_path if in_place else temp_path, "r+b" if in_place else "wb") as target:
+            for page_number in range(page_count):
+                page = source.read(page_size)
+                if len(page) != page_size:
+                    raise OSError(f"Database file ended at page {page_number} of {page_count}")
+                digest = _page_digest(page)
+                digests.append(digest)
+
+                if not in_place or page_number >= len(old_digests) or old_digests[page_number] != digest:
+                    target.seek(page_number * page_size)
+                    target.write(page)
+                    changed += 1
+
+                if progress_callback and page_number % BACKUP_PAGES_PER_STEP == 0:
+                    progress_callback(page_number, page_count)
+
+            target.truncate(page_count * page_size)
+            target.flush()
+            os.fsync(target.fileno())
+
+        if not in_place:
+            os.replace(temp_path, backup_path)
+        _write_manifest(backup_path, page_size, digests)
+
+        if progress_callback:
+            progress_callback(page_count, page_count)
+        logger.info(f"Backed up {db_path}: {changed} of {page_count} pages written "
+                    f"in {time.time() - started:.2f}s")
+        return True
+
+    except (sqlite3.Error, OSError) as e:
+        logger.error(f"Failed to back up {db_path}: {e}")
+        return False
+    finally:
+        try:
+            reader.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+        reader.close()
+        _remove_file(temp_path)
+
+
+class BackupService:
+    """Runs backups of one database on a background thread, one at a time."""
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, db_path):
+        """Get the backup service for a database file, creating it on first use.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+
+        Returns:
+            BackupService: Service shared by everyone using that file
+        """
+        key = os.path.abspath(db_path)
+        with cls._lock:
+            service = cls._instances.get(key)
+            if service is None:
+                service = cls(db_path)
+                cls._instances[key] = service
+            return service
+
+    def __init__(self, db_path):
+        """Initialize the service.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DatabaseBackup")
+        self.pending = None
+
+    def export(self, dest_path, compact=False, progress_callback=None):
+        """Copy the database to another file in the background.
+
+        Args:
+            dest_path (str): Destination path
+            compact (bool): Write a compacted copy with VACUUM INTO; no
+                progress is reported while it runs
+            progress_callback (callable, optional): Called as (copied, total) pages
+                from the backup thread
+
+        Returns:
+            concurrent.futures.Future: Resolves to True if the copy was written
+        """
+        if compact:
+            return self.executor.submit(vacuum_into, self.db_path, dest_path)
+        return self.executor.submit(online_backup, self.db_path, dest_path,
+                                    BACKUP_PAGES_PER_STEP, progress_callback)
+
+    def backup(self, backup_path=None, progress_callback=None):
+        """Update the incremental backup in the background.
+
+        A backup that is still queued is not queued twice.
+
+        Args:
+            backup_path (str, optional): Destination, defaults to <db_path>.backup
+            progress_callback (callable, optional): Called as (pages done, total)
+
+        Returns:
+            concurrent.futures.Future: Resolves to True if the backup is up to date
+        """
+        with self._lock:
+            if self.pending is not None and not self.pending.running() and not self.pending.done():
+                return self.pending
+            self.pending = self.executor.submit(incremental_backup, self.db_path, backup_path, progress_callback)
+            return self.pending
+
+    def shutdown(self, wait=True):
+        """Stop the backup thread.
+
+        Args:
+            wait (bool): Wait for the running backup to finish
+        """
+        self.executor.shutdown(wait=wait)
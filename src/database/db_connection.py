@@ -191,12 +191,15 @@ class ConnectionPool:
             db_path (str): Path to the SQLite database file
         """
         self.db_path = db_path
-        self.pool = []
-        self.in_use = {}
+        self.in_use = {}  # thread ident -> leased connections
         self.lock = threading.Lock()
         self.max_connections = 5
         self.idle_timeout = 60  # seconds
         
+        # Imported here to avoid circular imports
+        from src.database.db_pool import ReaderPool
+        self.reader_pool = ReaderPool.for_path(db_path)
+        
         # Ensure the database directory exists
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
@@ -235,38 +238,23 @@ class ConnectionPool:
         
     def _cleanup_idle_connections(self):
         """Clean up idle connections."""
-        with self.lock:
-            idle_connections = [conn for conn in self.pool if conn.is_idle(self.idle_timeout)]
-            for conn in idle_connections:
-                conn.disconnect()
-                self.pool.remove(conn)
+        self.reader_pool.prune_dead_threads()
             
     def get_connection(self):
         """Get a connection from the pool.
         
+        Connections come from the per-thread reader pool, which opens a new
+        connection instead of failing when all idle ones are leased.
+        
         Returns:
-            DatabaseConnection: A database connection
+            DatabaseConnection: A database connection, or None if the database
+                cannot be opened
         """
-        with self.lock:
-            # Check if there's an available connection in the pool
-            if self.pool:
-                conn = self.pool.pop(0)
-                if conn.connect():  # Ensure the connection is still valid
-                    thread_id = threading.get_ident()
-                    self.in_use[thread_id] = conn
-                    return conn
-                
-            # Create a new connection if we haven't reached the maximum
-            if len(self.in_use) < self.max_connections:
-                conn = DatabaseConnection(self.db_path)
-                if conn.connect():
-                    thread_id = threading.get_ident()
-                    self.in_use[thread_id] = conn
-                    return conn
-                    
-            # Wait for a connection to become available
-            logger.warning("Connection pool exhausted, waiting for a connection to become available")
-            return None
+        conn = self.reader_pool.get_connection()
+        if conn is not None:
+            with self.lock:
+                self.in_use.setdefault(threading.get_ident(), []).append(conn)
+        return conn
             
     def release_connection(self, conn):
         """Release a connection back to the pool.
@@ -278,25 +266,19 @@ class ConnectionPool:
             return
             
         with self.lock:
-            thread_id = threading.get_ident()
-            if thread_id in self.in_use:
-                del self.in_use[thread_id]
-                
-            # Only add the connection back to the pool if it's still valid
-            if conn.conn is not None:
-                self.pool.append(conn)
+            leased = self.in_use.get(threading.get_ident(), [])
+            if conn in leased:
+                leased.remove(conn)
+                if not leased:
+                    del self.in_use[threading.get_ident()]
+                    
+        conn.disconnect()
                 
     def close_all_connections(self):
         """Close all connections in the pool."""
         with self.lock:
-            # Close all connections in the pool
-            for conn in self.pool:
-                conn.disconnect()
-            self.pool = []
-            
-            # Close all in-use connections
-            for thread_id, conn in self.in_use.items():
-                conn.disconnect()
+            # Close all idle connections; leased ones close when released
+            self.reader_pool.close_all()
             self.in_use = {}
             
     def get_stats(self):
@@ -307,7 +289,7 @@ class ConnectionPool:
         """
         with self.lock:
             return {
-                "pool_size": len(self.pool),
-                "in_use": len(self.in_use),
+                "pool_size": self.reader_pool.get_stats()["idle_connections"],
+                "in_use": sum(len(leased) for leased in self.in_use.values()),
                 "max_connections": self.max_connections
             }
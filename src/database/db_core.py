@@ -14,6 +14,14 @@ import threading
 from datetime import datetime
 from pathlib import Path
 
+from src.database.db_directories import ensure_directories
+from src.database.db_health import copy_for_recovery, forget_verification, start_background_backup, verify_database
+from src.database.db_merge import copy_database
+from src.database.db_migrations import create_schema, migrate
+from src.database.db_querystats import StatementTimer, query_stats
+from src.database.db_statement_cache import STATEMENT_CACHE_SIZE, canonical_sql
+from src.database.db_wal import checkpoint_database, enable_wal, remove_wal_files
+
 logger = logging.getLogger("StarImageBrowse.database.db_core")
 
 class DatabaseConnection:
@@ -29,6 +37,7 @@ class DatabaseConnection:
         self.conn = None
         self.cursor = None
         self.in_transaction = False
+        self.timer = None
         
     def connect(self):
         """Establish a connection to the database."""
@@ -36,7 +45,7 @@ class DatabaseConnection:
             return True
             
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
             self.conn.row_factory = sqlite3.Row  # Return rows as dictionaries
             self.cursor = self.conn.cursor()
             return True
@@ -44,8 +53,15 @@ class DatabaseConnection:
             logger.error(f"Error connecting to database: {e}")
             return False
             
+    def finish_statement(self):
+        """Record the timing of the last statement if its results were not used up."""
+        if self.timer is not None:
+            self.timer.finish()
+            self.timer = None
+            
     def disconnect(self):
         """Close the database connection."""
+        self.finish_statement()
         if self.conn is not None:
             try:
                 if self.in_transaction:
@@ -106,18 +122,26 @@ class DatabaseConnection:
             params (tuple, optional): Parameters for the query
             
         Returns:
-            cursor: Database cursor for fetching results
+            cursor: Database cursor for fetching results; while query statistics
+                are enabled, a StatementTimer wrapping it
         """
         if self.conn is None:
             if not self.connect():
                 return None
                 
+        self.finish_statement()
+        # Equivalent queries share one prepared statement in sqlite3's cache
+        query = canonical_sql(query)
         try:
+            started = time.perf_counter()
             if params is None:
                 self.cursor.execute(query)
             else:
                 self.cursor.execute(query, params)
-            return self.cursor
+            if not query_stats.enabled:
+                return self.cursor
+            self.timer = StatementTimer(self.conn, self.cursor, query, params, time.perf_counter() - started)
+            return self.timer
         except sqlite3.Error as e:
             error_msg = str(e).lower()
             
@@ -144,8 +168,13 @@ class DatabaseConnection:
             if not self.connect():
                 return False
                 
+        self.finish_statement()
+        query = canonical_sql(query)
         try:
+            started = time.perf_counter()
             self.cursor.executemany(query, params_list)
+            if query_stats.enabled:
+                StatementTimer(self.conn, self.cursor, query, None, time.perf_counter() - started).finish()
             return True
         except sqlite3.Error as e:
             logger.error(f"Error executing query with multiple parameters: {e}")
@@ -168,6 +197,14 @@ class Database:
         # Initialize the database if it doesn't exist
         self._initialize_if_needed()
         
+        # Reads use per-thread pooled connections, writes go through the
+        # single writer thread. Both are shared by every Database on this file.
+        # Imported here to avoid circular imports (both build on DatabaseConnection)
+        from src.database.db_pool import ReaderPool
+        from src.database.db_writer import DatabaseWriter
+        self.reader_pool = ReaderPool.for_path(db_path)
+        self.writer = DatabaseWriter.for_path(db_path)
+        
         logger.info(f"Database initialized at: {db_path}")
         
     def _initialize_if_needed(self):
@@ -191,50 +228,36 @@ class Database:
         else:
             # Check and repair the database if needed
             self._check_and_repair()
-            
+
+            # Apply any schema migrations this database has not run yet
+            conn = DatabaseConnection(self.db_path)
+            try:
+                if conn.connect():
+                    enable_wal(conn.conn)
+                    migrate(conn.conn)
+                    # Rows copied in by an optimize or rebuild lack their directory
+                    ensure_directories(conn.conn)
+            except sqlite3.Error as e:
+                logger.error(f"Error upgrading database schema: {e}")
+            finally:
+                conn.disconnect()
+
     def _check_and_repair(self):
-        """Check if the database is corrupted and repair it if needed."""
-        logger.info(f"Checking database integrity: {self.db_path}")
+        """Check if the database is corrupted and repair it if needed.
         
-        # Create backup of current database
-        backup_path = f"{self.db_path}.backup"
-        try:
-            shutil.copy2(self.db_path, backup_path)
-            logger.info(f"Created backup at {backup_path}")
-        except Exception as e:
-            logger.error(f"Failed to create backup: {e}")
-            # Continue anyway, we'll try to repair
-        
-        # Try to open the database and check integrity
-        conn = DatabaseConnection(self.db_path)
-        try:
-            if not conn.connect():
-                raise Exception("Failed to connect to database")
-            
-            # Run integrity check
-            cursor = conn.execute("PRAGMA integrity_check")
-            if not cursor:
-                raise Exception("Failed to run integrity check")
-                
-            result = cursor.fetchone()
-            
-            if result and result[0] == "ok":
-                logger.info("Database integrity check passed")
-                conn.disconnect()
-                return True
-            else:
-                logger.warning(f"Database integrity check failed: {result[0] if result else 'Unknown error'}")
-                conn.disconnect()
-                
-                # Database is corrupted, rebuild it
-                return self._rebuild_database(backup_path)
-                
-        except sqlite3.Error as e:
-            logger.error(f"Error checking database integrity: {e}")
-            conn.disconnect()
+        Runs a quick check after a clean shutdown and a full integrity check
+        after a crash or on schedule; see db_health.verify_database().
+        """
+        if verify_database(self.db_path):
+            # Refresh the backup without holding up startup
+            start_background_backup(self.db_path)
+            return True
             
-            # Database is likely corrupted, rebuild it
-            return self._rebuild_database(backup_path)
+        # Database is corrupted, rebuild it from a copy of what is left
+        salvage_path = copy_for_recovery(self.db_path)
+        rebuilt = self._rebuild_database(salvage_path or f"{self.db_path}.backup")
+        forget_verification(self.db_path)
+        return rebuilt
             
     def _rebuild_database(self, backup_path):
         """Rebuild the database from scratch or from a backup.
@@ -251,6 +274,7 @@ class Database:
             # Remove the corrupted database
             if os.path.exists(self.db_path):
                 os.remove(self.db_path)
+                remove_wal_files(self.db_path)
                 logger.info("Removed corrupted database")
             
             # Create a new database
@@ -287,134 +311,7 @@ class Database:
         Args:
             conn (DatabaseConnection): Database connection
         """
-        # Create folders table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS folders (
-                folder_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                path TEXT UNIQUE NOT NULL,
-                enabled INTEGER DEFAULT 1,
-                last_scan_time TIMESTAMP
-            )
-        ''')
-        
-        # Create images table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS images (
-                image_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                folder_id INTEGER,
-                filename TEXT NOT NULL,
-                full_path TEXT UNIQUE NOT NULL,
-                file_size INTEGER,
-                file_hash TEXT,
-                creation_date TIMESTAMP,
-                last_modified_date TIMESTAMP,
-                thumbnail_path TEXT,
-                ai_description TEXT,
-                user_description TEXT,
-                last_scanned TIMESTAMP,
-                format TEXT,
-                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (folder_id) REFERENCES folders (folder_id)
-            )
-        ''')
-        
-        # Create index on full_path for faster lookups
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_full_path ON images (full_path)
-        ''')
-        
-        # Create index for searching descriptions
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_ai_description ON images (ai_description)
-        ''')
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_user_description ON images (user_description)
-        ''')
-        
-        # Create performance indexes
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_folder_id ON images (folder_id)
-        ''')
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_last_modified ON images (last_modified_date DESC)
-        ''')
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_search_modified ON images (ai_description, last_modified_date DESC)
-        ''')
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_search_modified_user ON images (user_description, last_modified_date DESC)
-        ''')
-        
-        # Create Catalogs table (new feature)
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS catalogs (
-                catalog_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create Image-Catalog mapping table (new feature)
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS image_catalog_mapping (
-                mapping_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                image_id INTEGER NOT NULL,
-                catalog_id INTEGER NOT NULL,
-                added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (image_id) REFERENCES images (image_id) ON DELETE CASCADE,
-                FOREIGN KEY (catalog_id) REFERENCES catalogs (catalog_id) ON DELETE CASCADE,
-                UNIQUE(image_id, catalog_id)
-            )
-        ''')
-        
-        # Create indexes for the catalog tables
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_catalog_mapping_image_id ON image_catalog_mapping (image_id)
-        ''')
-        conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_catalog_mapping_catalog_id ON image_catalog_mapping (catalog_id)
-        ''')
-        
-        # Create virtual table for full-text search
-        conn.execute('''
-            CREATE VIRTUAL TABLE IF NOT EXISTS image_fts USING fts5(
-                image_id UNINDEXED,
-                ai_description,
-                user_description,
-                content='images',
-                content_rowid='image_id'
-            )
-        ''')
-        
-        # Create triggers to keep FTS table in sync with the images table
-        # Trigger for INSERT
-        conn.execute('''
-            CREATE TRIGGER IF NOT EXISTS images_ai_insert AFTER INSERT ON images BEGIN
-                INSERT INTO image_fts(image_id, ai_description, user_description)
-                VALUES (new.image_id, new.ai_description, new.user_description);
-            END
-        ''')
-        
-        # Trigger for UPDATE
-        conn.execute('''
-            CREATE TRIGGER IF NOT EXISTS images_ai_update AFTER UPDATE ON images BEGIN
-                UPDATE image_fts SET 
-                    ai_description = new.ai_description,
-                    user_description = new.user_description
-                WHERE image_id = new.image_id;
-            END
-        ''')
-        
-        # Trigger for DELETE
-        conn.execute('''
-            CREATE TRIGGER IF NOT EXISTS images_ai_delete AFTER DELETE ON images BEGIN
-                DELETE FROM image_fts WHERE image_id = old.image_id;
-            END
-        ''')
-        
-        # Commit the changes
-        conn.commit()
+        create_schema(conn.conn)
         
     def _recover_data(self, backup_path, conn):
         """Try to recover data from a backup database.
@@ -430,91 +327,9 @@ class Database:
         logger.info(f"Attempting to recover data from backup: {backup_path}")
         
         try:
-            # Connect to backup database
-            backup_conn = sqlite3.connect(backup_path)
-            backup_conn.row_factory = sqlite3.Row
-            backup_cursor = backup_conn.cursor()
-            
-            # Recover folders
-            try:
-                backup_cursor.execute("SELECT * FROM folders")
-                folders = backup_cursor.fetchall()
-                
-                for folder in folders:
-                    folder_dict = dict(folder)
-                    conn.execute(
-                        "INSERT INTO folders (folder_id, path, enabled, last_scan_time) VALUES (?, ?, ?, ?)",
-                        (
-                            folder_dict['folder_id'],
-                            folder_dict['path'],
-                            folder_dict['enabled'],
-                            folder_dict['last_scan_time']
-                        )
-                    )
-                
-                logger.info(f"Recovered {len(folders)} folders")
-            except Exception as e:
-                logger.warning(f"Error recovering folders: {e}")
-            
-            # Recover images in batches
-            try:
-                batch_size = 500
-                offset = 0
-                total_recovered = 0
-                
-                while True:
-                    backup_cursor.execute(f"SELECT * FROM images LIMIT {batch_size} OFFSET {offset}")
-                    images = backup_cursor.fetchall()
-                    
-                    if not images:
-                        break
-                    
-                    for image in images:
-                        image_dict = dict(image)
-                        try:
-                            conn.execute(
-                                """INSERT INTO images (
-                                    image_id, folder_id, filename, full_path, file_size, file_hash,
-                                    creation_date, last_modified_date, thumbnail_path,
-                                    ai_description, user_description, last_scanned
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                                (
-                                    image_dict['image_id'],
-                                    image_dict['folder_id'],
-                                    image_dict['filename'],
-                                    image_dict['full_path'],
-                                    image_dict['file_size'],
-                                    image_dict['file_hash'],
-                                    image_dict['creation_date'],
-                                    image_dict['last_modified_date'],
-                                    image_dict['thumbnail_path'],
-                                    image_dict['ai_description'],
-                                    image_dict['user_description'],
-                                    image_dict['last_scanned']
-                                )
-                            )
-                            total_recovered += 1
-                        except sqlite3.Error as e:
-                            # Skip this image if there's an error
-                            logger.warning(f"Error recovering image {image_dict.get('image_id')}: {e}")
-                    
-                    offset += batch_size
-                    conn.commit()  # Commit each batch
-                
-                logger.info(f"Recovered {total_recovered} images")
-                
-                # Populate FTS table
-                conn.execute('''
-                    INSERT INTO image_fts(image_id, ai_description, user_description)
-                    SELECT image_id, ai_description, user_description FROM images
-                    WHERE image_id NOT IN (SELECT image_id FROM image_fts)
-                ''')
-                
-            except Exception as e:
-                logger.warning(f"Error recovering images: {e}")
-            
-            backup_conn.close()
-            conn.commit()
+            # Copies every table in one transaction and rebuilds the FTS index once
+            stats = copy_database(conn.conn, backup_path)
+            logger.info(f"Recovered {stats['folders']} folders and {stats['images']} images")
             
         except Exception as e:
             logger.error(f"Error recovering data from backup: {e}")
@@ -530,8 +345,11 @@ class Database:
             # Set synchronous mode to NORMAL for better performance with good reliability
             conn.execute("PRAGMA synchronous=NORMAL")
             
-            # Set journal mode to DELETE for better compatibility
-            conn.execute("PRAGMA journal_mode=DELETE")
+            # Write-ahead logging lets readers work while a write is in progress.
+            # The journal mode cannot change inside a transaction.
+            if conn.conn.in_transaction:
+                conn.conn.commit()
+            enable_wal(conn.conn)
             
             # Set temp store to MEMORY for better performance
             conn.execute("PRAGMA temp_store=MEMORY")
@@ -549,15 +367,34 @@ class Database:
             raise
             
     def get_connection(self):
-        """Get a new database connection.
+        """Get a database connection for the calling thread.
+        
+        The connection comes from the per-thread pool; disconnect() returns it
+        to the pool instead of closing it. On the writer thread the writer's
+        own connection is returned.
         
         Returns:
-            DatabaseConnection: A new database connection
+            DatabaseConnection: A database connection, or None on failure
         """
-        conn = DatabaseConnection(self.db_path)
-        if conn.connect():
-            return conn
-        return None
+        if self.writer.is_writer_thread():
+            # Operations running on the writer thread join its transaction
+            return self.writer.get_connection()
+        return self.reader_pool.get_connection()
+        
+    def submit_write(self, operation, *args, **kwargs):
+        """Queue a write operation on the writer thread.
+        
+        Args:
+            operation (callable): Called as operation(conn, *args, **kwargs) with a
+                connection whose transactions are committed by the writer
+            *args: Positional arguments for the operation
+            **kwargs: Keyword arguments for the operation
+            
+        Returns:
+            concurrent.futures.Future: Resolves to the operation's return value
+                once it has been committed
+        """
+        return self.writer.submit(operation, *args, **kwargs)
         
     def close_all_connections(self):
         """Force close all database connections.
@@ -571,6 +408,10 @@ class Database:
         logger.info("Forcing close of all database connections...")
         
         try:
+            # Let queued writes finish, then close the writer and pooled connections
+            self.writer.reset_connection()
+            self.reader_pool.close_all()
+            
             # Create a temporary connection to release locks
             temp_conn = None
             try:
@@ -700,12 +541,15 @@ class Database:
             optimized_conn.disconnect()
             
             # Create a backup of the current database
+            self.close_all_connections()
+            checkpoint_database(self.db_path)
             backup_path = f"{self.db_path}.backup"
             shutil.copy2(self.db_path, backup_path)
             logger.info(f"Created backup at {backup_path}")
             
             # Replace the current database with the optimized one
             os.remove(self.db_path)
+            remove_wal_files(self.db_path)
             shutil.copy2(optimized_db_path, self.db_path)
             os.remove(optimized_db_path)
             
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Maintained image counters for StarImageBrowse
+Keeps the number of images in the library, in every folder and in every
+catalog in a small table updated by triggers, so the panels can show counts
+without running COUNT(*) over the images table.
+"""
+
+import sqlite3
+import logging
+
+logger = logging.getLogger("StarImageBrowse.database.db_counters")
+
+# Counter scopes; the library counter uses scope_id 0
+LIBRARY_SCOPE = "library"
+FOLDER_SCOPE = "folder"
+CATALOG_SCOPE = "catalog"
+
+COUNTERS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS counters (
+    scope TEXT NOT NULL,
+    scope_id INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, scope_id)
+) WITHOUT ROWID"""
+
+
+def _increment_sql(scope, scope_id_sql, condition="1"):
+    """Build the statement that adds one to a counter, creating it if needed.
+
+    The SELECT form with a WHERE clause is needed so SQLite can tell the
+    upsert's ON CONFLICT apart from a join constraint.
+    """
+    return (f"INSERT INTO counters (scope, scope_id, count) SELECT '{scope}', {scope_id_sql}, 1 WHERE {condition}\n"
+            f"        ON CONFLICT (scope, scope_id) DO UPDATE SET count = count + 1;")
+
+
+def _decrement_sql(scope, scope_id_sql):
+    """Build the statement that subtracts one from a counter."""
+    return f"UPDATE counters SET count = count - 1 WHERE scope = '{scope}' AND scope_id = {scope_id_sql};"
+
+
+# Triggers on images. Folder counters skip images without a folder.
+IMAGE_COUNTER_TRIGGERS_SQL = {
+    "images_count_insert": f"""CREATE TRIGGER images_count_insert AFTER INSERT ON images BEGIN
+    {_increment_sql(LIBRARY_SCOPE, "0")}
+    {_increment_sql(FOLDER_SCOPE, "new.folder_id", "new.folder_id IS NOT NULL")}
+END""",
+    "images_count_delete": f"""CREATE TRIGGER images_count_delete AFTER DELETE ON images BEGIN
+    {_decrement_sql(LIBRARY_SCOPE, "0")}
+    {_decrement_sql(FOLDER_SCOPE, "old.folder_id")}
+END""",
+    "images_count_move": f"""CREATE TRIGGER images_count_move AFTER UPDATE OF folder_id ON images
+WHEN old.folder_id IS NOT new.folder_id
+BEGIN
+    {_decrement_sql(FOLDER_SCOPE, "old.folder_id")}
+    {_increment_sql(FOLDER_SCOPE, "new.folder_id", "new.folder_id IS NOT NULL")}
+END""",
+    "folders_count_delete": f"""CREATE TRIGGER folders_count_delete AFTER DELETE ON folders BEGIN
+    DELETE FROM counters WHERE scope = '{FOLDER_SCOPE}' AND scope_id = old.folder_id;
+END""",
+}
+
+# Triggers on the catalog tables, created only where those tables exist
+CATALOG_COUNTER_TRIGGERS_SQL = {
+    "catalog_mapping_count_insert": f"""CREATE TRIGGER catalog_mapping_count_insert AFTER INSERT ON image_catalog_mapping BEGIN
+    {_increment_sql(CATALOG_SCOPE, "new.catalog_id")}
+END""",
+    "catalog_mapping_count_delete": f"""CREATE TRIGGER catalog_mapping_count_delete AFTER DELETE ON image_catalog_mapping BEGIN
+    {_decrement_sql(CATALOG_SCOPE, "old.catalog_id")}
+END""",
+    "catalog_mapping_count_move": f"""CREATE TRIGGER catalog_mapping_count_move AFTER UPDATE OF catalog_id ON image_catalog_mapping
+WHEN old.catalog_id IS NOT new.catalog_id
+BEGIN
+    {_decrement_sql(CATALOG_SCOPE, "old.catalog_id")}
+    {_increment_sql(CATALOG_SCOPE, "new.catalog_id")}
+END""",
+    "catalogs_count_delete": f"""CREATE TRIGGER catalogs_count_delete AFTER DELETE ON catalogs BEGIN
+    DELETE FROM counters WHERE scope = '{CATALOG_SCOPE}' AND scope_id = old.catalog_id;
+END""",
+}
+
+
+def _normalize_sql(sql):
+    """Collapse whitespace so stored and expected DDL can be compared."""
+    return " ".join((sql or "").split())
+
+
+def _expected_schema(conn):
+    """Return the counter table and triggers that should exist in this database.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        dict: Object name -> CREATE statement
+    """
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    expected = {"counters": COUNTERS_TABLE_SQL}
+    expected.update(IMAGE_COUNTER_TRIGGERS_SQL)
+    if "image_catalog_mapping" in tables and "catalogs" in tables:
+        expected.update(CATALOG_COUNTER_TRIGGERS_SQL)
+    return expected
+
+
+def are_counters_current(conn):
+    """Check whether the counters table and its triggers match the canonical definition.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if the counters are being maintained
+    """
+    expected = _expected_schema(conn)
+
+    placeholders = ", ".join("?" for _ in expected)
+    rows = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE name IN ({placeholders})",
+        tuple(expected)
+    ).fetchall()
+    existing = {row[0]: row[1] for row in rows}
+
+    # SQLite stores the table DDL without IF NOT EXISTS
+    expected["counters"] = COUNTERS_TABLE_SQL.replace(" IF NOT EXISTS", "")
+    return all(
+        _normalize_sql(existing.get(name)) == _normalize_sql(sql)
+        for name, sql in expected.items()
+    )
+
+
+def create_counters_schema(conn):
+    """Create the counters table and (re)create its triggers.
+
+    The counts are not filled in; call rebuild_counters() for existing data.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+    """
+    conn.execute(COUNTERS_TABLE_SQL)
+    for name, trigger_sql in _expected_schema(conn).items():
+        if name == "counters":
+            continue
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(trigger_sql)
+
+
+def rebuild_counters(conn):
+    """Recount every counter from the images and catalog tables.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+    """
+    conn.execute("DELETE FROM counters")
+    conn.execute(
+        "INSERT INTO counters (scope, scope_id, count) SELECT ?, 0, COUNT(*) FROM images",
+        (LIBRARY_SCOPE,)
+    )
+    conn.execute(
+        """INSERT INTO counters (scope, scope_id, count)
+           SELECT ?, folder_id, COUNT(*) FROM images
+           WHERE folder_id IS NOT NULL GROUP BY folder_id""",
+        (FOLDER_SCOPE,)
+    )
+    if "catalog_mapping_count_insert" in _expected_schema(conn):
+        conn.execute(
+            """INSERT INTO counters (scope, scope_id, count)
+               SELECT ?, catalog_id, COUNT(*) FROM image_catalog_mapping GROUP BY catalog_id""",
+            (CATALOG_SCOPE,)
+        )
+
+
+def ensure_counters(conn):
+    """Make sure the counters exist and are maintained, recounting them if not.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if the counters are usable, False otherwise
+    """
+    try:
+        if are_counters_current(conn):
+            return True
+
+        logger.info("Image counters are missing or outdated, recounting")
+        create_counters_schema(conn)
+        rebuild_counters(conn)
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"Error ensuring image counters: {e}")
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            pass
+        return False
+
+
+def read_counts(conn):
+    """Read every counter in one query.
+
+    Args:
+        conn: Database connection (sqlite3.Connection or DatabaseConnection)
+
+    Returns:
+        dict: {"library": int, "folders": {folder_id: int}, "catalogs": {catalog_id: int}}
+    """
+    counts = {"library": 0, "folders": {}, "catalogs": {}}
+    for scope, scope_id, count in conn.execute("SELECT scope, scope_id, count FROM counters").fetchall():
+        if scope == LIBRARY_SCOPE:
+            counts["library"] = count
+        elif scope == FOLDER_SCOPE:
+            counts["folders"][scope_id] = count
+        elif scope == CATALOG_SCOPE:
+            counts["catalogs"][scope_id] = count
+    return counts
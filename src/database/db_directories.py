@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Directory hierarchy for StarImageBrowse
+Records the subdirectories of every monitored folder in a directories table
+and their ancestor/descendant pairs in a closure table. Each image points at
+the directory it is in, so listing, counting or searching a directory and
+everything below it is an indexed join on the closure table instead of a
+LIKE 'prefix%' scan over full_path.
+
+Images keep the folder_id of the monitored folder they were found under;
+directory_id adds where inside that folder they are.
+"""
+
+import os
+import sqlite3
+import logging
+
+logger = logging.getLogger("StarImageBrowse.database.db_directories")
+
+DIRECTORIES_TABLE_SQL = """CREATE TABLE IF NOT EXISTS directories (
+    directory_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    folder_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    FOREIGN KEY (folder_id) REFERENCES folders (folder_id),
+    FOREIGN KEY (parent_id) REFERENCES directories (directory_id),
+    UNIQUE(folder_id, path)
+)"""
+
+# One row for every directory and each of its ancestors, including itself at
+# depth 0, so a subtree is the rows with that directory as ancestor.
+DIRECTORY_CLOSURE_TABLE_SQL = """CREATE TABLE IF NOT EXISTS directory_closure (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+) WITHOUT ROWID"""
+
+DIRECTORY_INDEXES_SQL = {
+    "idx_directories_parent": """CREATE INDEX IF NOT EXISTS idx_directories_parent
+    ON directories (parent_id, name)""",
+    "idx_directory_closure_descendant": """CREATE INDEX IF NOT EXISTS idx_directory_closure_descendant
+    ON directory_closure (descendant_id)""",
+    # Covers the grid columns, so a directory page or count reads the index alone
+    "idx_images_directory_grid": """CREATE INDEX IF NOT EXISTS idx_images_directory_grid
+    ON images (directory_id, last_modified_date DESC, image_id DESC,
+               folder_id, filename, full_path, thumbnail_path, width, height)""",
+}
+
+# Foreign keys are not enforced, so the directories of a removed folder are
+# deleted by a trigger; both ends of a closure row are in the same folder.
+DIRECTORY_TRIGGERS_SQL = {
+    "folders_directories_delete": """CREATE TRIGGER IF NOT EXISTS folders_directories_delete AFTER DELETE ON folders BEGIN
+    DELETE FROM directory_closure WHERE descendant_id IN
+        (SELECT directory_id FROM directories WHERE folder_id = old.folder_id);
+    DELETE FROM directories WHERE folder_id = old.folder_id;
+END""",
+}
+
+# Condition restricting images aliased as i to the subtree of one directory
+SUBTREE_CONDITION_SQL = "{alias}.directory_id IN (SELECT descendant_id FROM directory_closure WHERE ancestor_id = ?)"
+
+
+def subtree_condition(alias="i"):
+    """Build the WHERE condition selecting the images below a directory.
+
+    Args:
+        alias (str): Alias of the images table in the query
+
+    Returns:
+        str: Condition with one parameter, the directory_id
+    """
+    return SUBTREE_CONDITION_SQL.format(alias=alias)
+
+
+def create_directories_schema(conn):
+    """Create the directory tables, the images.directory_id column and their indexes.
+
+    Images are not assigned to directories; call assign_directories() for
+    existing data.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+    """
+    conn.execute(DIRECTORIES_TABLE_SQL)
+    conn.execute(DIRECTORY_CLOSURE_TABLE_SQL)
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+    if "directory_id" not in columns:
+        logger.info("Adding directory_id column to images table")
+        conn.execute("ALTER TABLE images ADD COLUMN directory_id INTEGER")
+
+    for index_sql in DIRECTORY_INDEXES_SQL.values():
+        conn.execute(index_sql)
+    for trigger_sql in DIRECTORY_TRIGGERS_SQL.values():
+        conn.execute(trigger_sql)
+
+
+def _relative_parts(root, directory):
+    """Split a directory into the names leading to it from a folder root.
+
+    Args:
+        root (str): Normalized folder path
+        directory (str): Normalized directory path
+
+    Returns:
+        list: Directory names below root; empty for the root itself or a
+            directory outside it
+    """
+    try:
+        relative = os.path.relpath(os.path.normcase(directory), os.path.normcase(root))
+    except ValueError:
+        # Different drives on Windows
+        return []
+
+    if relative == os.curdir or relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return []
+
+    # normcase keeps the length, so the original spelling can be sliced out
+    return [part for part in directory[len(root):].split(os.sep) if part]
+
+
+def _insert_directory(conn, folder_id, parent_id, path, name):
+    """Add one directory and its closure rows.
+
+    Args:
+        conn (sqlite3.Connection): Database connection, in a transaction
+        folder_id (int): Monitored folder the directory belongs to
+        parent_id (int): Parent directory, None for the folder root
+        path (str): Directory path
+        name (str): Directory name shown in the tree
+
+    Returns:
+        int: The new directory_id
+    """
+    directory_id = conn.execute(
+        "INSERT INTO directories (folder_id, parent_id, path, name) VALUES (?, ?, ?, ?)",
+        (folder_id, parent_id, path, name)
+    ).lastrowid
+
+    # The new directory is below every ancestor of its parent, one level deeper
+    conn.execute(
+        """INSERT INTO directory_closure (ancestor_id, descendant_id, depth)
+           SELECT ancestor_id, ?, depth + 1 FROM directory_closure WHERE descendant_id = ?
+           UNION ALL SELECT ?, ?, 0""",
+        (directory_id, parent_id, directory_id, directory_id)
+    )
+    return directory_id
+
+
+def resolve_directory(conn, folder_id, root_path, file_path, cache=None):
+    """Find the directory of a file below a monitored folder, creating it if needed.
+
+    Missing intermediate directories are created as well. Files outside the
+    folder are placed in its root directory.
+
+    Args:
+        conn (sqlite3.Connection): Database connection, in a transaction
+        folder_id (int): Monitored folder the file was found under
+        root_path (str): Path of that folder
+        file_path (str): Path of the file
+        cache (dict, optional): (folder_id, path) -> directory_id mapping
+            reused across calls in the same transaction
+
+    Returns:
+        int: directory_id of the directory containing the file
+    """
+    if cache is None:
+        cache = {}
+
+    root = os.path.normpath(root_path)
+    directory = os.path.normpath(os.path.dirname(file_path))
+    parts = _relative_parts(root, directory)
+
+    parent_id = None
+    path = root
+    for depth in range(len(parts) + 1):
+        if depth:
+            path = os.path.join(path, parts[depth - 1])
+
+        directory_id = cache.get((folder_id, path))
+        if directory_id is None:
+            row = conn.execute(
+                "SELECT directory_id FROM directories WHERE folder_id = ? AND path = ?",
+                (folder_id, path)
+            ).fetchone()
+            if row:
+                directory_id = row[0]
+            else:
+                name = parts[depth - 1] if depth else (os.path.basename(root) or root)
+                directory_id = _insert_directory(conn, folder_id, parent_id, path, name)
+            cache[(folder_id, path)] = directory_id
+
+        parent_id = directory_id
+
+    return parent_id
+
+
+def get_folder_paths(conn, folder_ids):
+    """Read the paths of monitored folders.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        folder_ids (iterable): Folder IDs to look up
+
+    Returns:
+        dict: folder_id -> path for the folders that exist
+    """
+    folder_ids = list(folder_ids)
+    if not folder_ids:
+        return {}
+
+    placeholders = ", ".join("?" for _ in folder_ids)
+    rows = conn.execute(
+        f"SELECT folder_id, path FROM folders WHERE folder_id IN ({placeholders})",
+        folder_ids
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def assign_directories(conn, folder_id=None):
+    """Place the images without a directory in the directory hierarchy.
+
+    Args:
+        conn (sqlite3.Connection): Database connection; the caller commits
+        folder_id (int, optional): Only assign the images of this folder
+
+    Returns:
+        int: Number of images assigned
+    """
+    query = "SELECT image_id, folder_id, full_path FROM images WHERE directory_id IS NULL AND folder_id IS NOT NULL"
+    params = ()
+    if folder_id is not None:
+        query += " AND folder_id = ?"
+        params = (folder_id,)
+
+    rows = conn.execute(query, params).fetchall()
+    if not rows:
+        return 0
+
+    folder_paths = get_folder_paths(conn, {row[1] for row in rows})
+    cache = {}
+    updates = [
+        (resolve_directory(conn, row[1], folder_paths[row[1]], row[2], cache), row[0])
+        for row in rows
+        if row[1] in folder_paths
+    ]
+    conn.executemany("UPDATE images SET directory_id = ? WHERE image_id = ?", updates)
+
+    logger.info(f"Assigned {len(updates)} images to {len(set(cache.values()))} directories")
+    return len(updates)
+
+
+def ensure_directories(conn):
+    """Assign any images added without a directory, such as by a database rebuild.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if every image has its directory, False otherwise
+    """
+    try:
+        # Served by the directory index, so this is cheap when nothing is missing
+        missing = conn.execute(
+            "SELECT 1 FROM images WHERE directory_id IS NULL AND folder_id IS NOT NULL LIMIT 1"
+        ).fetchone()
+        if not missing:
+            return True
+
+        assign_directories(conn)
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"Error assigning image directories: {e}")
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            pass
+        return False
@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Full-text search index for StarImageBrowse
+Maintains the FTS5 index over image descriptions and filenames and translates
+user search text into FTS5 MATCH expressions ranked with bm25(). A second,
+trigram-tokenized index answers substring searches for file name fragments.
+"""
+
+import re
+import sqlite3
+import logging
+
+logger = logging.getLogger("StarImageBrowse.database.db_fts")
+
+# Canonical FTS5 table. It is an external content table over `images`, so the
+# indexed text is not stored twice. The image_id column is kept (unindexed) for
+# older queries that join on f.image_id.
+FTS_TABLE_SQL = """CREATE VIRTUAL TABLE image_fts USING fts5(
+    image_id UNINDEXED,
+    ai_description,
+    user_description,
+    filename,
+    content='images',
+    content_rowid='image_id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)"""
+
+# External content tables must be told the old values when a row goes away,
+# which is what the special 'delete' command does. The update trigger only
+# fires when an indexed column actually changes, so dimension or path updates
+# and re-scans that rewrite the same values are free.
+FTS_TRIGGERS_SQL = {
+    "images_ai_insert": """CREATE TRIGGER images_ai_insert AFTER INSERT ON images BEGIN
+    INSERT INTO image_fts(rowid, image_id, ai_description, user_description, filename)
+    VALUES (new.image_id, new.image_id, new.ai_description, new.user_description, new.filename);
+END""",
+    "images_ai_update": """CREATE TRIGGER images_ai_update AFTER UPDATE OF ai_description, user_description, filename ON images
+WHEN old.ai_description IS NOT new.ai_description
+    OR old.user_description IS NOT new.user_description
+    OR old.filename IS NOT new.filename
+BEGIN
+    INSERT INTO image_fts(image_fts, rowid, image_id, ai_description, user_description, filename)
+    VALUES ('delete', old.image_id, old.image_id, old.ai_description, old.user_description, old.filename);
+    INSERT INTO image_fts(rowid, image_id, ai_description, user_description, filename)
+    VALUES (new.image_id, new.image_id, new.ai_description, new.user_description, new.filename);
+END""",
+    "images_ai_delete": """CREATE TRIGGER images_ai_delete AFTER DELETE ON images BEGIN
+    INSERT INTO image_fts(image_fts, rowid, image_id, ai_description, user_description, filename)
+    VALUES ('delete', old.image_id, old.image_id, old.ai_description, old.user_description, old.filename);
+END""",
+}
+
+# bm25() weights in column order: image_id, ai_description, user_description, filename.
+# User descriptions are written by hand, so a hit there counts for more.
+BM25_WEIGHTS = (0.0, 1.0, 2.0, 1.5)
+BM25_RANK_SQL = "bm25(image_fts, {})".format(", ".join(str(w) for w in BM25_WEIGHTS))
+
+_OPERATORS = ("AND", "OR", "NOT")
+
+_QUERY_TOKEN_RE = re.compile(
+    r'(?P<neg_phrase>-)?"(?P<phrase>[^"]*)"?'
+    r'|(?P<paren>[()])'
+    r'|(?P<neg_word>-)?(?P<word>[^\s"()]+)'
+)
+
+
+# Trigram index for substring search. Word tokens cannot answer infix queries
+# such as "0042" in "IMG_000421.jpg"; this table indexes every three-character
+# sequence so LIKE '%...%' on its columns is answered from the index. With
+# detail='none' only row ids are stored, which keeps it small, and FTS5 checks
+# each candidate row against the pattern itself.
+TRIGRAM_TABLE_SQL = """CREATE VIRTUAL TABLE image_trigram USING fts5(
+    ai_description,
+    user_description,
+    filename,
+    content='images',
+    content_rowid='image_id',
+    tokenize='trigram',
+    detail='none'
+)"""
+
+TRIGRAM_TRIGGERS_SQL = {
+    "images_trigram_insert": """CREATE TRIGGER images_trigram_insert AFTER INSERT ON images BEGIN
+    INSERT INTO image_trigram(rowid, ai_description, user_description, filename)
+    VALUES (new.image_id, new.ai_description, new.user_description, new.filename);
+END""",
+    "images_trigram_update": """CREATE TRIGGER images_trigram_update AFTER UPDATE OF ai_description, user_description, filename ON images
+WHEN old.ai_description IS NOT new.ai_description
+    OR old.user_description IS NOT new.user_description
+    OR old.filename IS NOT new.filename
+BEGIN
+    INSERT INTO image_trigram(image_trigram, rowid, ai_description, user_description, filename)
+    VALUES ('delete', old.image_id, old.ai_description, old.user_description, old.filename);
+    INSERT INTO image_trigram(rowid, ai_description, user_description, filename)
+    VALUES (new.image_id, new.ai_description, new.user_description, new.filename);
+END""",
+    "images_trigram_delete": """CREATE TRIGGER images_trigram_delete AFTER DELETE ON images BEGIN
+    INSERT INTO image_trigram(image_trigram, rowid, ai_description, user_description, filename)
+    VALUES ('delete', old.image_id, old.ai_description, old.user_description, old.filename);
+END""",
+}
+
+# The trigram tokenizer was added in SQLite 3.34
+TRIGRAM_SUPPORTED = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+# Shorter fragments have no trigram to look up
+MIN_SUBSTRING_LENGTH = 3
+
+# Columns searched for substrings, by default all indexed ones
+TRIGRAM_COLUMNS = ("ai_description", "user_description", "filename")
+
+
+def _normalize_sql(sql):
+    """Collapse whitespace so stored and expected DDL can be compared."""
+    return " ".join((sql or "").split())
+
+
+def _is_index_current(conn, table_name, table_sql, triggers):
+    """Check whether an FTS table and its triggers match their canonical definition.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        table_name (str): Name of the FTS table
+        table_sql (str): Canonical CREATE VIRTUAL TABLE statement
+        triggers (dict): Trigger name -> canonical CREATE TRIGGER statement
+
+    Returns:
+        bool: True if no rebuild is needed
+    """
+    expected = {table_name: table_sql}
+    expected.update(triggers)
+
+    placeholders = ", ".join("?" for _ in expected)
+    rows = conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE name IN ({placeholders})",
+        tuple(expected)
+    ).fetchall()
+    existing = {row[0]: row[1] for row in rows}
+
+    return all(
+        _normalize_sql(existing.get(name)) == _normalize_sql(sql)
+        for name, sql in expected.items()
+    )
+
+
+def _is_trigram_index_current(conn):
+    """Check the trigram index; where SQLite lacks the tokenizer there is nothing to check."""
+    if not TRIGRAM_SUPPORTED:
+        return True
+    return _is_index_current(conn, "image_trigram", TRIGRAM_TABLE_SQL, TRIGRAM_TRIGGERS_SQL)
+
+
+def is_fts_index_current(conn):
+    """Check whether the FTS tables and their triggers match the canonical definition.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if no rebuild is needed
+    """
+    return (
+        _is_index_current(conn, "image_fts", FTS_TABLE_SQL, FTS_TRIGGERS_SQL)
+        and _is_trigram_index_current(conn)
+    )
+
+
+def has_trigram_index(conn):
+    """Check whether the database has the trigram index for substring search.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if substring queries can use image_trigram
+    """
+    if not TRIGRAM_SUPPORTED:
+        return False
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'image_trigram'"
+    ).fetchone()
+    return row is not None
+
+
+def _create_index(conn, table_name, table_sql, triggers):
+    """Drop an FTS table and its triggers and create the canonical ones."""
+    for trigger_name in triggers:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+
+    conn.execute(table_sql)
+    for trigger_sql in triggers.values():
+        conn.execute(trigger_sql)
+
+
+def _create_trigram_schema(conn):
+    """Create the trigram table and triggers.
+
+    Returns:
+        bool: True if created, False if this SQLite cannot build it
+    """
+    if not TRIGRAM_SUPPORTED:
+        return False
+    try:
+        _create_index(conn, "image_trigram", TRIGRAM_TABLE_SQL, TRIGRAM_TRIGGERS_SQL)
+        return True
+    except sqlite3.OperationalError as e:
+        # FTS5 builds without the trigram tokenizer; substring search falls back to LIKE
+        logger.warning(f"Trigram index not available: {e}")
+        return False
+
+
+def create_fts_schema(conn):
+    """Drop any outdated FTS tables and triggers and create the canonical ones.
+
+    The indexes are left empty; call rebuild_fts_index() to populate them.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+    """
+    _create_index(conn, "image_fts", FTS_TABLE_SQL, FTS_TRIGGERS_SQL)
+    _create_trigram_schema(conn)
+
+
+def rebuild_fts_index(conn, trigram=True, commit=True):
+    """Repopulate the FTS indexes from the images table.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        trigram (bool): Also rebuild the trigram index if the database has one
+        commit (bool): Commit when done; pass False inside a larger transaction
+    """
+    conn.execute("INSERT INTO image_fts(image_fts) VALUES('rebuild')")
+    if trigram and has_trigram_index(conn):
+        conn.execute("INSERT INTO image_trigram(image_trigram) VALUES('rebuild')")
+    if commit:
+        conn.commit()
+
+
+def ensure_fts_index(conn):
+    """Make sure the canonical FTS indexes exist, rebuilding any whose schema is outdated.
+
+    Databases created by earlier versions carry one of several FTS layouts
+    (without filenames, contentless, or with triggers that corrupt external
+    content indexes on update), and no trigram index. Outdated parts are
+    replaced once and re-indexed.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if the index is usable, False otherwise
+    """
+    try:
+        if not _is_index_current(conn, "image_fts", FTS_TABLE_SQL, FTS_TRIGGERS_SQL):
+            logger.info("Full-text search index is missing or outdated, rebuilding it")
+            _create_index(conn, "image_fts", FTS_TABLE_SQL, FTS_TRIGGERS_SQL)
+            rebuild_fts_index(conn, trigram=False)
+            logger.info("Full-text search index rebuilt")
+
+        if not _is_trigram_index_current(conn):
+            logger.info("Substring search index is missing or outdated, building it")
+            if _create_trigram_schema(conn):
+                conn.execute("INSERT INTO image_trigram(image_trigram) VALUES('rebuild')")
+                logger.info("Substring search index built")
+            conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"Error ensuring full-text search index: {e}")
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            pass
+        return False
+
+
+def is_substring_fragment(term):
+    """Decide whether a search term should be matched as a substring.
+
+    Terms with digits or punctuation ("IMG_20", "_00042", "0042") are usually
+    pieces of file names, which word tokens cannot match in the middle.
+    Plain words are left to the word index, where they are ranked.
+
+    Args:
+        term (str): One search term
+
+    Returns:
+        bool: True if the trigram index should answer the term
+    """
+    return (
+        len(term) >= MIN_SUBSTRING_LENGTH
+        and any(ch.isalnum() for ch in term)
+        and not term.isalpha()
+    )
+
+
+def split_substring_terms(text):
+    """Split plain search text into substring fragments and the remaining words.
+
+    Text using query syntax (quotes, parentheses, operators, -term or term*)
+    is returned unchanged for the word index.
+
+    Args:
+        text (str): Search text as typed by the user
+
+    Returns:
+        tuple: (fragments, remaining_text)
+    """
+    terms = (text or "").split()
+    uses_syntax = any(
+        term in _OPERATORS or term.startswith("-") or term.endswith("*")
+        or any(ch in term for ch in '"()')
+        for term in terms
+    )
+    if uses_syntax:
+        return [], text
+
+    fragments = [term for term in terms if is_substring_fragment(term)]
+    remaining = " ".join(term for term in terms if not is_substring_fragment(term))
+    return fragments, remaining
+
+
+def substring_condition(fragment, alias="i", columns=TRIGRAM_COLUMNS):
+    """Build a WHERE condition matching images containing a fragment, via image_trigram.
+
+    Each column is looked up separately so every LIKE is answered from the
+    index. LIKE is case-insensitive for ASCII; since _ and % are wildcards
+    there, fragments containing them are also checked with instr().
+
+    Args:
+        fragment (str): Text to find, at least MIN_SUBSTRING_LENGTH characters
+        alias (str): Alias of the images table in the query
+        columns (tuple): Columns to search
+
+    Returns:
+        tuple: (sql, values)
+    """
+    pattern = f"%{fragment}%"
+    lookups = " UNION ".join(
+        f"SELECT rowid FROM image_trigram WHERE {column} LIKE ?" for column in columns
+    )
+    sql = f"{alias}.image_id IN ({lookups})"
+    values = [pattern] * len(columns)
+
+    if "_" in fragment or "%" in fragment:
+        checks = " OR ".join(f"instr(lower({alias}.{column}), ?) > 0" for column in columns)
+        sql = f"({sql} AND ({checks}))"
+        values += [fragment.lower()] * len(columns)
+
+    return sql, values
+
+
+def _quote(text):
+    """Quote text as an FTS5 string, which the tokenizer then splits into a phrase."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _has_searchable_chars(text):
+    """Return True if the tokenizer would produce at least one token from text."""
+    return any(ch.isalnum() for ch in text)
+
+
+def _clean_tokens(tokens):
+    """Remove operators and parentheses that would make the expression invalid.
+
+    Args:
+        tokens (list): Expression tokens (operands, operators and parentheses)
+
+    Returns:
+        list: Tokens forming a valid FTS5 expression
+    """
+    changed = True
+    while changed:
+        changed = False
+        cleaned = []
+        for token in tokens:
+            previous = cleaned[-1] if cleaned else None
+            if token in _OPERATORS:
+                if previous is None or previous == "(":
+                    changed = True
+                    continue
+                if previous in _OPERATORS:
+                    # "a OR NOT b" -> keep the operator that was typed last
+                    cleaned[-1] = token
+                    changed = True
+                    continue
+            elif token == ")":
+                if previous == "(":
+                    cleaned.pop()
+                    changed = True
+                    continue
+                if previous in _OPERATORS:
+                    cleaned.pop()
+                    changed = True
+            cleaned.append(token)
+        while cleaned and cleaned[-1] in _OPERATORS:
+            cleaned.pop()
+            changed = True
+        tokens = cleaned
+    return tokens
+
+
+def build_match_expression(text, prefix_terms=True):
+    """Translate user search text into an FTS5 MATCH expression.
+
+    Supported syntax:
+        red car          both terms (implicit AND)
+        "red car"        exact phrase
+        car*             prefix match (bare terms are prefix matched by default)
+        red OR blue      boolean operators AND, OR, NOT (upper case)
+        (red OR blue) car grouping
+        -night           exclude a term or "phrase"
+
+    Every operand is quoted before it reaches FTS5, so punctuation in user
+    input (e.g. "IMG_2034.png") cannot produce a syntax error.
+
+    Args:
+        text (str): Search text as typed by the user
+        prefix_terms (bool): Prefix match bare terms so partial words find results
+
+    Returns:
+        tuple: (match, exclude) - FTS5 expression for rows that must match and
+            expression for rows that must not match; either may be None
+    """
+    if not text or not text.strip():
+        return None, None
+
+    tokens = []
+    excluded = []
+    depth = 0
+    balanced = True
+
+    for m in _QUERY_TOKEN_RE.finditer(text):
+        if m.group("paren"):
+            if m.group("paren") == "(":
+                depth += 1
+            else:
+                depth -= 1
+                balanced = balanced and depth >= 0
+            tokens.append(m.group("paren"))
+            continue
+
+        if m.group("phrase") is not None:
+            phrase = m.group("phrase").strip()
+            if not _has_searchable_chars(phrase):
+                continue
+            operand = _quote(phrase)
+            negated = bool(m.group("neg_phrase"))
+        else:
+            word = m.group("word")
+            if word in _OPERATORS and not m.group("neg_word"):
+                tokens.append(word)
+                continue
+            explicit_prefix = word.endswith("*")
+            word = word.rstrip("*")
+            if not _has_searchable_chars(word):
+                continue
+            operand = _quote(word)
+            if explicit_prefix or prefix_terms:
+                operand += "*"
+            negated = bool(m.group("neg_word"))
+
+        if negated:
+            excluded.append(operand)
+        else:
+            tokens.append(operand)
+
+    if depth != 0 or not balanced:
+        tokens = [t for t in tokens if t not in ("(", ")")]
+
+    tokens = _clean_tokens(tokens)
+
+    # Join operands that follow each other without an operator with an
+    # explicit AND so the expression reads unambiguously in logs.
+    parts = []
+    for token in tokens:
+        if parts:
+            previous = parts[-1]
+            needs_and = (
+                previous not in _OPERATORS and previous != "("
+                and token not in _OPERATORS and token != ")"
+            )
+            if needs_and:
+                parts.append("AND")
+        parts.append(token)
+
+    match = " ".join(parts) or None
+    exclude = " OR ".join(excluded) or None
+
+    if match and exclude:
+        return f"({match}) NOT ({exclude})", None
+    return match, exclude
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Startup integrity verification for StarImageBrowse
+Chooses between a quick check and a full integrity check based on how the
+previous session ended, and keeps an incremental backup fresh in the
+background.
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import logging
+import threading
+
+from src.database.db_wal import checkpoint_database
+from src.database.db_backup import BackupService, incremental_backup
+
+logger = logging.getLogger("StarImageBrowse.database.db_health")
+
+# Full integrity check at least this often, even after clean shutdowns
+FULL_CHECK_INTERVAL_DAYS = 7
+
+# Refresh the background backup when it is older than this
+BACKUP_INTERVAL_HOURS = 24
+
+# Paths verified in this process; later Database objects skip the check
+_verified_paths = set()
+_verified_lock = threading.Lock()
+
+
+def _state_path(db_path):
+    """Return the path of the session state file for a database."""
+    return f"{db_path}.state"
+
+
+def _read_state(db_path):
+    """Read the session state file.
+
+    Args:
+        db_path (str): Path to the database file
+
+    Returns:
+        dict: Stored state, or None if there is none or it cannot be read
+    """
+    try:
+        with open(_state_path(db_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(db_path, state):
+    """Write the session state file atomically.
+
+    Args:
+        db_path (str): Path to the database file
+        state (dict): State to store
+    """
+    path = _state_path(db_path)
+    try:
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        logger.warning(f"Could not write database state file {path}: {e}")
+
+
+def needs_full_check(db_path):
+    """Decide whether the database needs a full integrity check.
+
+    A full check is needed after an unclean exit (the previous session never
+    recorded its shutdown), when no state has been recorded yet, or when the
+    last full check is older than FULL_CHECK_INTERVAL_DAYS.
+
+    Args:
+        db_path (str): Path to the database file
+
+    Returns:
+        tuple: (needed, reason)
+    """
+    state = _read_state(db_path)
+    if state is None:
+        return True, "no record of a previous session"
+
+    if not state.get("clean_shutdown", False):
+        return True, "previous session did not shut down cleanly"
+
+    last_full_check = state.get("last_full_check", 0)
+    if time.time() - last_full_check > FULL_CHECK_INTERVAL_DAYS * 86400:
+        return True, "scheduled full check"
+
+    return False, "previous session shut down cleanly"
+
+
+def run_integrity_check(db_path, full=False):
+    """Run PRAGMA quick_check or PRAGMA integrity_check.
+
+    quick_check skips verifying that index contents match their tables,
+    which makes it several times faster than integrity_check on large files.
+
+    Args:
+        db_path (str): Path to the database file
+        full (bool): Run the full integrity_check
+
+    Returns:
+        tuple: (ok, message)
+    """
+    pragma = "integrity_check" if full else "quick_check"
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute(f"PRAGMA {pragma}").fetchall()
+        if rows and rows[0][0] == "ok":
+            return True, "ok"
+        message = "; ".join(str(row[0]) for row in rows[:10]) if rows else "Unknown error"
+        return False, message
+    except sqlite3.Error as e:
+        return False, str(e)
+    finally:
+        if conn:
+            conn.close()
+
+
+def verify_database(db_path, force_full=False):
+    """Verify a database at startup, choosing the check tier automatically.
+
+    Only the first call for a path in this process runs a check; later calls
+    return True right away. After a passing check the session is marked as
+    running, so a crash before mark_clean_shutdown() triggers a full check on
+    the next launch.
+
+    Args:
+        db_path (str): Path to the database file
+        force_full (bool): Always run the full integrity check
+
+    Returns:
+        bool: True if the database passed, False if it looks corrupted
+    """
+    key = os.path.abspath(db_path)
+    with _verified_lock:
+        if key in _verified_paths:
+            return True
+
+        full, reason = needs_full_check(db_path)
+        full = full or force_full
+        logger.info(f"Running {'full integrity' if full else 'quick'} check on {db_path} ({reason})")
+
+        started = time.time()
+        ok, message = run_integrity_check(db_path, full=full)
+        if not ok:
+            logger.warning(f"Database integrity check failed: {message}")
+            return False
+
+        logger.info(f"Database integrity check passed in {time.time() - started:.2f}s")
+        _verified_paths.add(key)
+
+        state = _read_state(db_path) or {}
+        if full:
+            state["last_full_check"] = time.time()
+        state["clean_shutdown"] = False
+        _write_state(db_path, state)
+        return True
+
+
+def copy_for_recovery(db_path):
+    """Copy a database that failed verification so its rows can be salvaged.
+
+    The copy goes to <db_path>.salvage, leaving the last good backup alone.
+
+    Args:
+        db_path (str): Path to the database file
+
+    Returns:
+        str: Path of the copy, or None if it could not be made
+    """
+    salvage_path = f"{db_path}.salvage"
+    try:
+        checkpoint_database(db_path)
+        shutil.copy2(db_path, salvage_path)
+        logger.info(f"Copied damaged database to {salvage_path}")
+        return salvage_path
+    except Exception as e:
+        logger.error(f"Failed to copy damaged database: {e}")
+        return None
+
+
+def forget_verification(db_path):
+    """Make the next verify_database() call check the database again.
+
+    Used after the database file has been rebuilt or replaced.
+
+    Args:
+        db_path (str): Path to the database file
+    """
+    with _verified_lock:
+        _verified_paths.discard(os.path.abspath(db_path))
+
+
+def mark_clean_shutdown(db_path):
+    """Record that the application closed the database cleanly.
+
+    Call after all writes have finished; the next launch then only runs a
+    quick check.
+
+    Args:
+        db_path (str): Path to the database file
+    """
+    state = _read_state(db_path) or {}
+    state["clean_shutdown"] = True
+    _write_state(db_path, state)
+    logger.info("Recorded clean database shutdown")
+
+
+def backup_database(db_path, backup_path=None):
+    """Bring the backup of a database up to date.
+
+    Only the pages that changed since the previous backup are written; see
+    db_backup.incremental_backup().
+
+    Args:
+        db_path (str): Path to the database file
+        backup_path (str, optional): Destination, defaults to <db_path>.backup
+
+    Returns:
+        bool: True if the backup is up to date
+    """
+    return incremental_backup(db_path, backup_path)
+
+
+def backup_is_stale(db_path, backup_path=None):
+    """Check whether the backup is missing or older than BACKUP_INTERVAL_HOURS.
+
+    Args:
+        db_path (str): Path to the database file
+        backup_path (str, optional): Backup path, defaults to <db_path>.backup
+
+    Returns:
+        bool: True if a new backup should be made
+    """
+    backup_path = backup_path or f"{db_path}.backup"
+    try:
+        age = time.time() - os.path.getmtime(backup_path)
+    except OSError:
+        return True
+    return age > BACKUP_INTERVAL_HOURS * 3600
+
+
+def start_background_backup(db_path, backup_path=None, force=False):
+    """Refresh the backup on the backup thread if it is stale.
+
+    Args:
+        db_path (str): Path to the database file
+        backup_path (str, optional): Destination, defaults to <db_path>.backup
+        force (bool): Back up even if the current backup is recent
+
+    Returns:
+        concurrent.futures.Future: The queued backup, or None if none was needed
+    """
+    if not force and not backup_is_stale(db_path, backup_path):
+        return None
+    return BackupService.for_path(db_path).backup(backup_path)
@@ -0,0 +1,636 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Index advisor for StarImageBrowse
+Checks the statements the application actually ran, as recorded by the query
+statistics, against the database's indexes. EXPLAIN QUERY PLAN shows which
+statements scan whole tables or sort in temporary B-trees; candidate indexes
+for them are tried on an empty in-memory copy of the schema that carries the
+real sqlite_stat1 statistics, so the planner judges them as it would on the
+real database without building them there. Indexes no recorded statement
+uses, and indexes made redundant by another index, are flagged for removal.
+"""
+
+import re
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger("StarImageBrowse.database.db_index_advisor")
+
+# Columns in a proposed index, covering columns are left out beyond this
+MAX_INDEX_COLUMNS = 6
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_PLAN_ACCESS_RE = re.compile(r"^(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS (\w+))?(.*)$")
+_PLAN_INDEX_RE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_COLUMN_REF_RE = re.compile(
+    r"(?:\b(\w+)\.)?\b(\w+)\b"
+    r"(\s*(?:==|=|<=|>=|<>|!=|<|>)|\s+(?:NOT\s+)?(?:IN|IS\s+NOT|IS|BETWEEN|LIKE|GLOB)\b)?",
+    re.IGNORECASE
+)
+_ORDER_TERM_RE = re.compile(r"^(?:(\w+)\.)?(\w+)(?:\s+COLLATE\s+\w+)?(?:\s+(ASC|DESC))?$", re.IGNORECASE)
+_UPDATE_SET_RE = re.compile(r"\bSET\b.*?(?=\bWHERE\b|$)", re.IGNORECASE | re.DOTALL)
+_LIMIT_RE = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+_TABLE_REF_RE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+
+# Words that can follow a table name in FROM and are not an alias
+_NOT_ALIASES = {
+    "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL", "ON", "USING",
+    "ORDER", "GROUP", "HAVING", "LIMIT", "OFFSET", "SET", "UNION", "EXCEPT", "INTERSECT",
+    "INDEXED", "NOT", "WINDOW", "VALUES", "SELECT", "DEFAULT",
+}
+
+
+def _explain(conn, query, params):
+    """Run EXPLAIN QUERY PLAN and return the plan details, or None if it fails."""
+    try:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ())]
+    except sqlite3.Error as e:
+        logger.debug(f"Could not explain {query[:80]}: {e}")
+        return None
+
+
+def _table_aliases(query, tables):
+    """Map the names tables have in a statement to the tables.
+
+    Query plans name a table by its alias, so "SCAN i" has to be traced back
+    to "FROM images i".
+    """
+    aliases = {table: table for table in tables}
+    for table, alias in _TABLE_REF_RE.findall(_STRING_LITERAL_RE.sub("?", query)):
+        if table in tables and alias and alias.upper() not in _NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+
+def _plan_issues(details, aliases, limited=False):
+    """Find the table scans, temporary B-trees and indexes in a query plan.
+
+    A scan through an index still reads the whole table, unless the index
+    supplies the order and a LIMIT ends the scan early.
+
+    Args:
+        details (list): Plan detail lines
+        aliases (dict): Names of the real tables in the statement -> table
+        limited (bool): Whether the statement has a LIMIT
+
+    Returns:
+        dict: full_scans as (table, alias) pairs, temp_btrees as detail
+            lines, and indexes, the set of index names used
+    """
+    issues = {"full_scans": [], "temp_btrees": [], "indexes": set()}
+    for detail in details:
+        if detail.startswith("USE TEMP B-TREE"):
+            issues["temp_btrees"].append(detail)
+            continue
+
+        match = _PLAN_ACCESS_RE.match(detail)
+        if not match:
+            continue
+        operation, name, alias, rest = match.groups()
+        index = _PLAN_INDEX_RE.search(rest)
+        if index:
+            issues["indexes"].add(index.group(1))
+        table = aliases.get(name)
+        if table is None:
+            continue
+        alias = alias or name
+        # SQLite building an automatic index for one query is a missing index too
+        if "AUTOMATIC" in rest or (operation == "SCAN" and not (index and limited) and "VIRTUAL TABLE" not in rest):
+            issues["full_scans"].append((table, alias))
+    return issues
+
+
+def _issue_count(issues, table=None):
+    """Count the scans of a table, or of any table, plus the temporary B-trees."""
+    scans = [scan for scan in issues["full_scans"] if table is None or scan[0] == table]
+    return len(scans) + len(issues["temp_btrees"])
+
+
+def _split_top_level(text):
+    """Split a clause on the commas outside parentheses."""
+    parts, depth, start = [], 0, 0
+    for position, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:position].strip())
+            start = position + 1
+    parts.append(text[start:].strip())
+    return parts
+
+
+def _order_by_columns(text, qualifiers, columns):
+    """Return the ORDER BY of a statement as (column, descending) pairs.
+
+    Returns None if there is no ORDER BY or if it sorts on anything other than
+    plain columns of the table, as an index cannot provide that order.
+    """
+    position = text.upper().rfind("ORDER BY")
+    if position < 0:
+        return None
+    clause = re.split(r"\b(?:LIMIT|OFFSET)\b|\)", text[position + len("ORDER BY"):], flags=re.IGNORECASE)[0]
+
+    order = []
+    for term in _split_top_level(clause):
+        match = _ORDER_TERM_RE.match(term)
+        if not match:
+            return None
+        qualifier, column, direction = match.groups()
+        if column.lower() not in columns or (qualifier and qualifier.lower() not in qualifiers):
+            return None
+        order.append((columns[column.lower()], (direction or "").upper() == "DESC"))
+    return order
+
+
+def _column_usage(query, table, alias, columns):
+    """Work out how a statement uses the columns of one table.
+
+    This is a pattern match on the SQL text rather than a parser; it only has
+    to be good enough to suggest candidates, which are then checked with the
+    query planner.
+
+    Args:
+        query (str): SQL statement
+        table (str): Table name
+        alias (str): Name the table has in the statement
+        columns (dict): Lower-case column name -> column name
+
+    Returns:
+        dict: equality and range columns, order as (column, descending)
+            pairs, referenced columns, and star, True if the statement
+            selects all columns
+    """
+    text = _STRING_LITERAL_RE.sub("?", query)
+    text = _UPDATE_SET_RE.sub(" ", text) if text.lstrip().upper().startswith("UPDATE") else text
+    qualifiers = {table.lower(), alias.lower()}
+
+    usage = {"equality": [], "range": [], "order": None, "referenced": [], "star": False}
+    for match in _COLUMN_REF_RE.finditer(text):
+        qualifier, name, operator = match.groups()
+        if name.lower() not in columns or (qualifier and qualifier.lower() not in qualifiers):
+            continue
+        column = columns[name.lower()]
+        operator = " ".join((operator or "").upper().split())
+        if operator in ("=", "==", "IN", "IS"):
+            kind = "equality"
+        elif operator in ("<", ">", "<=", ">=", "BETWEEN"):
+            kind = "range"
+        else:
+            kind = "referenced"
+        if column not in usage[kind]:
+            usage[kind].append(column)
+
+    usage["order"] = _order_by_columns(text, qualifiers, columns)
+    usage["star"] = bool(re.search(
+        rf"(?:SELECT|,)\s*(?:(?:{re.escape(table)}|{re.escape(alias)})\.)?\*", text, re.IGNORECASE
+    ))
+    return usage
+
+
+def _candidate_columns(usage, rowid_column):
+    """Build the key of a candidate index from the column usage of a statement.
+
+    Equality columns come first, then the ORDER BY columns so the index
+    provides the order, or else the first range column. The remaining
+    columns the statement reads are appended so the index covers it, when
+    they fit.
+
+    Returns:
+        list: (column, descending) pairs, empty if no index can help
+    """
+    key = [(column, False) for column in usage["equality"] if column != rowid_column]
+    keyed = {column for column, _ in key}
+    if usage["order"]:
+        key += [(column, descending) for column, descending in usage["order"] if column not in keyed]
+    elif usage["range"]:
+        key += [(column, False) for column in usage["range"][:1] if column not in keyed]
+    if not key:
+        return []
+
+    if not usage["star"]:
+        keyed = {column for column, _ in key}
+        cover = [
+            column for column in usage["range"][1:] + usage["referenced"]
+            if column not in keyed and column != rowid_column
+        ]
+        cover = list(dict.fromkeys(cover))
+        if len(key) + len(cover) <= MAX_INDEX_COLUMNS:
+            key += [(column, False) for column in cover]
+    return key
+
+
+def _index_sql(name, table, key):
+    """Build the CREATE INDEX statement for a key."""
+    columns = ", ".join(f"{column}{' DESC' if descending else ''}" for column, descending in key)
+    return f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+
+
+def _index_name(table, key):
+    """Name a proposed index after its table and columns."""
+    return "idx_" + "_".join([table] + [column for column, _ in key])
+
+
+class _SchemaInfo:
+    """Tables, columns and indexes of a database, read once per analysis."""
+
+    def __init__(self, conn):
+        self.tables = {}  # table -> {lower-case column: column}
+        self.rowid_columns = {}  # table -> INTEGER PRIMARY KEY column
+        self.foreign_keys = {}  # table -> set of child key columns
+        self.indexes = {}  # index -> dict(table, key, unique, partial, sql)
+        self.virtual_tables = set()
+
+        rows = conn.execute(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for row_type, name, _, sql in rows:
+            if row_type == "table" and sql and sql.upper().startswith("CREATE VIRTUAL TABLE"):
+                self.virtual_tables.add(name)
+
+        for row_type, name, _, sql in rows:
+            if row_type != "table" or name in self.virtual_tables or self.is_shadow_table(name):
+                continue
+            columns = conn.execute(f"PRAGMA table_info({name})").fetchall()
+            self.tables[name] = {column[1].lower(): column[1] for column in columns}
+            primary_key = [column for column in columns if column[5]]
+            if len(primary_key) == 1 and (primary_key[0][2] or "").upper() == "INTEGER":
+                self.rowid_columns[name] = primary_key[0][1]
+            self.foreign_keys[name] = {row[3] for row in conn.execute(f"PRAGMA foreign_key_list({name})")}
+
+        for table in self.tables:
+            for index_row in conn.execute(f"PRAGMA index_list({table})").fetchall():
+                index_name, unique, partial = index_row[1], index_row[2], index_row[4]
+                key = [
+                    (column[2], bool(column[3]), column[4])
+                    for column in conn.execute(f"PRAGMA index_xinfo({index_name})")
+                    if column[5]
+                ]
+                sql = conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name,)
+                ).fetchone()
+                self.indexes[index_name] = {
+                    "table": table,
+                    "key": key,
+                    "unique": bool(unique),
+                    "partial": bool(partial),
+                    "sql": sql[0] if sql else None,
+                }
+
+    def is_shadow_table(self, name):
+        """Check whether a table stores the data of a virtual table."""
+        return any(name.startswith(f"{virtual_table}_") for virtual_table in self.virtual_tables)
+
+
+class _ShadowDatabase:
+    """Empty in-memory copy of a schema with the statistics of the original.
+
+    The query planner bases its choices on the schema and sqlite_stat1, not
+    on the data, so plans here match the real database while indexes cost
+    nothing to create.
+    """
+
+    def __init__(self, conn, schema):
+        self.source = conn
+        self.conn = sqlite3.connect(":memory:")
+        self.row_counts = {}
+
+        rows = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        order = {"table": 0, "index": 1, "view": 2}
+        for row_type, name, sql in sorted(rows, key=lambda row: order.get(row[0], 3)):
+            if row_type not in order or schema.is_shadow_table(name):
+                continue
+            try:
+                self.conn.execute(sql)
+            except sqlite3.Error as e:
+                logger.debug(f"Could not copy {row_type} {name} to the advisor schema: {e}")
+
+        self.has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        ).fetchone() is not None
+        # ANALYZE on the empty copy creates sqlite_stat1 for the real rows to go into
+        self.conn.execute("ANALYZE")
+        self.conn.execute("DELETE FROM sqlite_stat1")
+        if self.has_stats:
+            stats = [tuple(row) for row in conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1")]
+            self.conn.executemany("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (?, ?, ?)", stats)
+            for table, _, stat in stats:
+                self.row_counts.setdefault(table, int(stat.split()[0]))
+        self._reload_stats()
+
+    def _reload_stats(self):
+        """Make the planner read sqlite_stat1 again."""
+        self.conn.execute("ANALYZE sqlite_master")
+
+    def row_count(self, table):
+        """Rows in a table, from sqlite_stat1 or counted."""
+        if table not in self.row_counts:
+            self.row_counts[table] = self.source.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return self.row_counts[table]
+
+    def _index_stat(self, table, key, selective_columns):
+        """Estimate the sqlite_stat1 entry of an index the way ANALYZE writes it.
+
+        Distinct counts are measured for the leading columns that select rows;
+        the columns after them are taken to be close to unique.
+        """
+        rows = self.row_count(table)
+        stat = [str(rows)]
+        for position in range(1, len(key) + 1):
+            if position <= selective_columns:
+                columns = ", ".join(column for column, _ in key[:position])
+                distinct = self.source.execute(
+                    f"SELECT COUNT(*) FROM (SELECT DISTINCT {columns} FROM {table})"
+                ).fetchone()[0]
+                stat.append(str(max(1, -(-rows // max(1, distinct)))))
+            else:
+                stat.append("1")
+        return " ".join(stat)
+
+    def add_index(self, name, table, key, selective_columns):
+        """Create a candidate index and give it statistics."""
+        self.conn.execute(_index_sql(name, table, key))
+        if self.has_stats:
+            stat = self._index_stat(table, key, selective_columns)
+            self.conn.execute("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (?, ?, ?)", (table, name, stat))
+        self._reload_stats()
+
+    def drop_index(self, name):
+        """Remove a candidate index again."""
+        self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+        self.conn.execute("DELETE FROM sqlite_stat1 WHERE idx = ?", (name,))
+        self._reload_stats()
+
+    def close(self):
+        """Close the in-memory database."""
+        self.conn.close()
+
+
+def _redundant_indexes(schema):
+    """Find indexes another index or the table's rowid order already provides.
+
+    An index whose key is a prefix of another index on the same table serves
+    the same lookups and sorts, and an index leading with the INTEGER PRIMARY
+    KEY repeats the order the table is stored in.
+
+    Returns:
+        list: Dictionaries with name, table, columns and covered_by
+    """
+    redundant = []
+    for name, index in schema.indexes.items():
+        if index["unique"] or index["partial"] or not index["sql"]:
+            continue
+        key = index["key"]
+        if key and key[0][0] == schema.rowid_columns.get(index["table"]):
+            redundant.append({
+                "name": name,
+                "table": index["table"],
+                "columns": [column for column, _, _ in key],
+                "covered_by": "rowid",
+            })
+            continue
+        for other_name, other in schema.indexes.items():
+            if other_name == name or other["table"] != index["table"] or other["partial"]:
+                continue
+            if other["key"][:len(key)] != key:
+                continue
+            # Of two identical plain indexes only one is flagged
+            if len(other["key"]) == len(key) and not other["unique"] and other_name > name:
+                continue
+            redundant.append({
+                "name": name,
+                "table": index["table"],
+                "columns": [column for column, _, _ in key],
+                "covered_by": other_name,
+            })
+            break
+    return redundant
+
+
+def advise_indexes(conn, workload):
+    """Check a workload against the indexes of a database.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database
+        workload (list): Statements as returned by QueryStats.get_workload()
+
+    Returns:
+        dict: has_stats, whether ANALYZE has been run; analyzed, the number
+            of statements explained; findings, the statements that scan
+            tables or sort, with their plans; proposals, indexes that remove
+            those steps, with their CREATE statement and the statements they
+            help; unused, indexes no statement used; and redundant, indexes
+            another index already provides
+    """
+    started = time.time()
+    schema = _SchemaInfo(conn)
+    tables = set(schema.tables)
+    shadow = _ShadowDatabase(conn, schema)
+
+    advice = {
+        "has_stats": shadow.has_stats,
+        "analyzed": 0,
+        "findings": [],
+        "proposals": [],
+        "unused": [],
+        "redundant": _redundant_indexes(schema),
+    }
+    proposals = {}  # index name -> proposal
+    used_indexes = set()
+
+    try:
+        for statement in workload:
+            details = _explain(conn, statement["query"], statement["params"])
+            if details is None:
+                continue
+            advice["analyzed"] += 1
+            aliases = _table_aliases(statement["query"], tables)
+            issues = _plan_issues(details, aliases, bool(_LIMIT_RE.search(statement["query"])))
+            used_indexes |= issues["indexes"]
+            if not issues["full_scans"] and not issues["temp_btrees"]:
+                continue
+
+            advice["findings"].append({
+                "sql": statement["sql"],
+                "count": statement["count"],
+                "total_ms": statement["total_ms"],
+                "full_scans": sorted({table for table, _ in issues["full_scans"]}),
+                "temp_btrees": issues["temp_btrees"],
+                "plan": "\n".join(details),
+            })
+
+            for table, alias in dict.fromkeys(issues["full_scans"] or _sorted_tables(details, aliases)):
+                _propose_for_table(shadow, schema, statement, table, alias, proposals)
+    finally:
+        shadow.close()
+
+    advice["proposals"] = sorted(proposals.values(), key=lambda proposal: proposal["total_ms"], reverse=True)
+
+    if advice["analyzed"]:
+        for name, index in schema.indexes.items():
+            if name in used_indexes or index["unique"] or not index["sql"]:
+                continue
+            key = index["key"]
+            # Indexes on foreign key columns keep deletes of the parent rows fast
+            if key and key[0][0] in schema.foreign_keys.get(index["table"], ()):
+                continue
+            advice["unused"].append({
+                "name": name,
+                "table": index["table"],
+                "columns": [column for column, _, _ in key],
+            })
+
+    logger.info(
+        f"Index advisor checked {advice['analyzed']} statements in {time.time() - started:.2f}s: "
+        f"{len(advice['proposals'])} proposed, {len(advice['unused'])} unused, "
+        f"{len(advice['redundant'])} redundant"
+    )
+    return advice
+
+
+def _sorted_tables(details, aliases):
+    """Find the table an index could sort, for plans whose only issue is a sort.
+
+    That is the outermost table the plan reads, as only its index order can
+    carry through to the result.
+    """
+    for detail in details:
+        match = _PLAN_ACCESS_RE.match(detail)
+        if match and match.group(2) in aliases:
+            return [(aliases[match.group(2)], match.group(3) or match.group(2))]
+    return []
+
+
+def _propose_for_table(shadow, schema, statement, table, alias, proposals):
+    """Find an index on one table that removes a statement's scan or sort.
+
+    Indexes already proposed for earlier statements are tried first; a new
+    candidate is kept only if the planner uses it and the plan improves.
+    """
+    query, params = statement["query"], statement["params"]
+    limited = bool(_LIMIT_RE.search(query))
+    aliases = _table_aliases(query, schema.tables)
+    before = _explain(shadow.conn, query, params)
+    if before is None:
+        return
+    before_issues = _plan_issues(before, aliases, limited)
+    if _issue_count(before_issues, table) == 0:
+        # An earlier proposal already fixes it
+        for name in before_issues["indexes"] & proposals.keys():
+            _add_statement(proposals[name], statement)
+        return
+
+    usage = _column_usage(query, table, alias, schema.tables[table])
+    key = _candidate_columns(usage, schema.rowid_columns.get(table))
+    if not key:
+        return
+    for index in schema.indexes.values():
+        if index["table"] == table and [(column, desc) for column, desc, _ in index["key"][:len(key)]] == key:
+            # An index with this key exists and the planner still prefers the scan
+            return
+
+    name = _index_name(table, key)
+    if name in proposals:
+        return
+    selective_columns = len([column for column, _ in key if column in usage["equality"]]) + 1
+    shadow.add_index(name, table, key, selective_columns)
+    after = _explain(shadow.conn, query, params)
+    after_issues = _plan_issues(after or [], aliases, limited)
+    if after is None or name not in after_issues["indexes"] or \
+            _issue_count(after_issues, table) >= _issue_count(before_issues, table):
+        shadow.drop_index(name)
+        return
+
+    proposals[name] = {
+        "name": name,
+        "table": table,
+        "columns": [column for column, _ in key],
+        "sql": _index_sql(name, table, key),
+        "statements": [],
+        "total_ms": 0.0,
+    }
+    _add_statement(proposals[name], statement)
+
+
+def _add_statement(proposal, statement):
+    """Record that a proposed index helps a statement."""
+    if statement["sql"] not in proposal["statements"]:
+        proposal["statements"].append(statement["sql"])
+        proposal["total_ms"] += statement["total_ms"]
+
+
+def format_advice(advice):
+    """Format the advisor's findings as text.
+
+    Args:
+        advice (dict): Result of advise_indexes()
+
+    Returns:
+        str: Human-readable report
+    """
+    lines = [f"Index advice for {advice['analyzed']} recorded statements:", ""]
+    if not advice["has_stats"]:
+        lines += ["No sqlite_stat1 statistics; run ANALYZE for accurate advice.", ""]
+
+    lines.append("Statements scanning tables or sorting:")
+    if not advice["findings"]:
+        lines.append("    None.")
+    for finding in advice["findings"]:
+        problems = [f"full scan of {table}" for table in finding["full_scans"]] + finding["temp_btrees"]
+        lines.append(f"{finding['total_ms']:10.1f} ms total  {finding['count']:7d}x  {'; '.join(problems)}")
+        lines.append(f"    {finding['sql']}")
+
+    lines += ["", "Proposed indexes:"]
+    if not advice["proposals"]:
+        lines.append("    None.")
+    for proposal in advice["proposals"]:
+        lines.append(f"    {proposal['sql']};")
+        lines.append(f"        helps {len(proposal['statements'])} statements, {proposal['total_ms']:.1f} ms recorded")
+
+    lines += ["", "Unused indexes (candidates for DROP INDEX):"]
+    if not advice["unused"]:
+        lines.append("    None.")
+    for index in advice["unused"]:
+        lines.append(f"    {index['name']} ON {index['table']} ({', '.join(index['columns'])})")
+
+    lines += ["", "Redundant indexes:"]
+    if not advice["redundant"]:
+        lines.append("    None.")
+    for index in advice["redundant"]:
+        covered_by = "the rowid" if index["covered_by"] == "rowid" else index["covered_by"]
+        lines.append(f"    {index['name']} ON {index['table']} ({', '.join(index['columns'])}), covered by {covered_by}")
+
+    return "\n".join(lines)
+
+
+def apply_advice(conn, advice, drop_unused=False):
+    """Create the proposed indexes and refresh the statistics.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database, not in a transaction
+        advice (dict): Result of advise_indexes()
+        drop_unused (bool): Also drop the unused and redundant indexes
+
+    Returns:
+        dict: Names of the indexes created and dropped
+    """
+    result = {"created": [], "dropped": []}
+    for proposal in advice["proposals"]:
+        conn.execute(proposal["sql"])
+        result["created"].append(proposal["name"])
+    if drop_unused:
+        for index in advice["unused"] + advice["redundant"]:
+            if index["name"] not in result["dropped"]:
+                conn.execute(f"DROP INDEX IF EXISTS {index['name']}")
+                result["dropped"].append(index["name"])
+    conn.commit()
+    if result["created"] or result["dropped"]:
+        conn.execute("ANALYZE")
+        conn.commit()
+    logger.info(f"Applied index advice: created {result['created']}, dropped {result['dropped']}")
+    return result
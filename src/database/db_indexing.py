@@ -2,11 +2,13 @@
 # -*- coding: utf-8 -*-
 """
 Database indexing optimization for StarImageBrowse
-Enhances query performance through strategic index creation.
+Creates the indexes the index advisor finds the recorded queries need.
 """
 
 import logging
 from .db_core import DatabaseConnection
+from .db_index_advisor import advise_indexes, apply_advice
+from .db_querystats import query_stats
 
 logger = logging.getLogger("StarImageBrowse.database.db_indexing")
 
@@ -21,8 +23,16 @@ class DatabaseIndexOptimizer:
         """
         self.db_path = db_path
         
-    def create_optimized_indexes(self):
-        """Create optimized indexes for the database.
+    def create_optimized_indexes(self, drop_unused=False):
+        """Create the indexes the index advisor proposes for the recorded queries.
+        
+        Instead of a fixed list, the statements the application has run are
+        checked with EXPLAIN QUERY PLAN and only indexes that remove a table
+        scan or a sort from them are created.
+        
+        Args:
+            drop_unused (bool): Also drop the indexes no recorded statement
+                uses and those another index already provides
         
         Returns:
             bool: True if successful, False otherwise
@@ -34,49 +44,15 @@ class DatabaseIndexOptimizer:
             if not conn.connect():
                 raise Exception("Failed to connect to database")
                 
-            # Begin transaction
-            if not conn.begin_transaction():
-                raise Exception("Failed to begin transaction")
-                
-            # Create composite indexes for common query patterns
-            logger.info("Creating composite indexes for common query patterns...")
-            operations = [
-                # Folder-based queries with date filtering
-                "CREATE INDEX IF NOT EXISTS idx_images_folder_date ON images(folder_id, last_modified_date)",
-                
-                # Optimize search and sort operations
-                "CREATE INDEX IF NOT EXISTS idx_images_search ON images(ai_description, user_description)",
-                
-                # Optimize filtering for images without descriptions
-                "CREATE INDEX IF NOT EXISTS idx_images_no_desc ON images(folder_id) WHERE ai_description IS NULL OR ai_description = ''",
-                
-                # Optimize path-based lookups
-                "CREATE INDEX IF NOT EXISTS idx_images_path ON images(full_path)",
-                
-                # Optimize thumbnail fetching
-                "CREATE INDEX IF NOT EXISTS idx_images_thumbnail ON images(thumbnail_path)",
-                
-                # Optimize for the virtual FTS table if it exists
-                "CREATE INDEX IF NOT EXISTS idx_images_image_id ON images(image_id)"
-            ]
-            
-            # Execute each index creation statement
-            for operation in operations:
-                try:
-                    conn.execute(operation)
-                    logger.debug(f"Executed: {operation}")
-                except Exception as e:
-                    logger.warning(f"Error executing {operation}: {e}")
-            
-            # Commit the transaction
-            if not conn.commit():
-                raise Exception("Failed to commit transaction")
-                
-            logger.info("Optimized indexes created successfully")
-            
-            # Analyze the database to update statistics
+            # The advisor needs current statistics to judge candidates
             conn.execute("ANALYZE")
+            conn.commit()
+            
+            advice = advise_indexes(conn.conn, query_stats.get_workload())
+            result = apply_advice(conn.conn, advice, drop_unused)
             
+            logger.info(f"Optimized indexes created successfully: {len(result['created'])} created, "
+                        f"{len(result['dropped'])} dropped")
             return True
             
         except Exception as e:
@@ -88,10 +64,11 @@ class DatabaseIndexOptimizer:
             conn.disconnect()
             
     def check_index_usage(self):
-        """Check the usage of indexes in the database.
+        """Check which indexes the recorded queries use.
         
         Returns:
-            dict: Index usage statistics
+            dict: Index usage statistics with the indexes, and the unused
+                and redundant ones as reported by the index advisor
         """
         logger.info("Checking index usage...")
         conn = DatabaseConnection(self.db_path)
@@ -100,22 +77,17 @@ class DatabaseIndexOptimizer:
             if not conn.connect():
                 raise Exception("Failed to connect to database")
                 
-            # Get list of indexes
-            cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='index'")
+            cursor = conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type='index'")
             if not cursor:
                 raise Exception("Failed to get index list")
                 
-            indexes = [row['name'] for row in cursor.fetchall()]
-            
-            # Get index usage statistics
-            stats = {"indexes": []}
-            for index in indexes:
-                stats["indexes"].append({
-                    "name": index,
-                    "table": index.split("_")[1] if "_" in index else "unknown"
-                })
-                
-            return stats
+            indexes = [{"name": row['name'], "table": row['tbl_name']} for row in cursor.fetchall()]
+            advice = advise_indexes(conn.conn, query_stats.get_workload())
+            return {
+                "indexes": indexes,
+                "unused": advice["unused"],
+                "redundant": advice["redundant"],
+            }
             
         except Exception as e:
             logger.error(f"Error checking index usage: {e}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Bulk image ingest for StarImageBrowse
+Buffers scanned images and writes them with DatabaseOperations.add_images_bulk,
+so large imports pay the transaction overhead once per batch instead of per file.
+"""
+
+import time
+import logging
+
+logger = logging.getLogger("StarImageBrowse.database.db_ingest")
+
+# Images written per add_images_bulk() call
+DEFAULT_BATCH_SIZE = 1000
+
+# Batches allowed to wait for the writer before add() blocks
+MAX_PENDING_BATCHES = 4
+
+# Seconds the first buffered image waits for a batch to fill, so a slow or
+# streaming scan shows its first images without waiting for a full batch
+DEFAULT_MAX_DELAY = 1.0
+
+
+class ImageIngestSink:
+    """Buffers image records and writes them in batches.
+
+    Batches are queued on the database writer without waiting, so the caller
+    keeps scanning while earlier batches are committed. Use as a context
+    manager or call close() to write the remaining images.
+    """
+
+    def __init__(self, db_manager, batch_size=DEFAULT_BATCH_SIZE, max_delay=DEFAULT_MAX_DELAY):
+        """Initialize the sink.
+
+        Args:
+            db_manager: Database manager instance
+            batch_size (int): Images written per batch
+            max_delay (float): Seconds after which a partial batch is written
+                by the next add()
+        """
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.buffer = []
+        self.buffer_started = 0
+        self.pending = []
+        self.added = {}  # full_path -> image_id
+        self.failed = []  # full paths that could not be written
+
+    def add(self, image):
+        """Queue an image for writing.
+
+        Args:
+            image (dict): Image record as accepted by add_images_bulk()
+        """
+        if not self.buffer:
+            self.buffer_started = time.monotonic()
+        self.buffer.append(image)
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.buffer_started >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        """Hand the buffered images to the database writer."""
+        if self.buffer:
+            batch, self.buffer = self.buffer, []
+            self.pending.append((batch, self.db_manager.add_images_bulk(batch, wait=False)))
+
+        # Collect finished batches, and wait for the oldest if too many are queued
+        while self.pending and (self.pending[0][1].done() or len(self.pending) > MAX_PENDING_BATCHES):
+            self._collect(*self.pending.pop(0))
+
+    def _collect(self, batch, future):
+        """Record the outcome of a written batch.
+
+        Args:
+            batch (list): Image records of the batch
+            future (concurrent.futures.Future): Future returned by add_images_bulk()
+        """
+        try:
+            image_ids = future.result()
+        except Exception as e:
+            logger.error(f"Error writing batch of {len(batch)} images: {e}")
+            image_ids = None
+
+        if image_ids is None:
+            image_ids = [None] * len(batch)
+
+        for image, image_id in zip(batch, image_ids):
+            if image_id:
+                self.added[image["full_path"]] = image_id
+            else:
+                self.failed.append(image["full_path"])
+
+    def close(self):
+        """Write the remaining images and wait for all batches.
+
+        Returns:
+            dict: Mapping of full_path to image_id for every image written
+        """
+        self.flush()
+        while self.pending:
+            self._collect(*self.pending.pop(0))
+
+        if self.failed:
+            logger.warning(f"Failed to add {len(self.failed)} images to the database")
+        return self.added
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -12,7 +12,13 @@ import sqlite3
 from datetime import datetime
 from pathlib import Path
 
+from src.database.db_backup import BackupService
+from src.database.db_health import mark_clean_shutdown
+from src.database.db_index_advisor import advise_indexes, format_advice
+from src.database.db_merge import merge_database
 from src.database.db_operations import DatabaseOperations
+from src.database.db_querystats import query_stats
+from src.database.db_wal import checkpoint_database
 
 logger = logging.getLogger("StarImageBrowse.database")
 
@@ -71,6 +77,27 @@ class DatabaseManager:
                 self.conn = None
                 self.cursor = None
     
+    def close(self):
+        """Finish pending writes, close pooled connections and record a clean shutdown.
+        
+        Call once when the application exits. The next launch then only needs
+        a quick integrity check.
+        """
+        self.disconnect()
+        db = self.db_ops.db
+        try:
+            # Buffered updates go through the writer, so they are flushed first
+            self.db_ops.write_buffer.close()
+            db.writer.stop()
+            if db.writer.get_stats()["running"]:
+                logger.warning("Database writer did not finish, not recording a clean shutdown")
+                return
+            db.reader_pool.close_all()
+            checkpoint_database(self.db_path)
+            mark_clean_shutdown(self.db_path)
+        except Exception as e:
+            logger.error(f"Error closing database: {e}")
+    
     def initialize_database(self):
         """Initialize the database schema if it doesn't exist.
         
@@ -115,7 +142,7 @@ class DatabaseManager:
         """
         return self.db_ops.remove_folder(folder_id)
     
-    def add_image(self, folder_id, filename, full_path, file_size, file_hash=None, thumbnail_path=None, ai_description=None, image_format=None):
+    def add_image(self, folder_id, filename, full_path, file_size, file_hash=None, thumbnail_path=None, ai_description=None, image_format=None, wait=True):
         """Add an image to the database.
         
         Args:
@@ -127,13 +154,28 @@ class DatabaseManager:
             thumbnail_path (str, optional): Path to the thumbnail image
             ai_description (str, optional): AI-generated description of the image
             image_format (str, optional): Format of the image (JPEG, PNG, etc.)
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
             
         Returns:
             int: The image_id if successful, None otherwise
         """
-        return self.db_ops.add_image(folder_id, filename, full_path, file_size, file_hash, thumbnail_path, ai_description, image_format)
+        return self.db_ops.add_image(folder_id, filename, full_path, file_size, file_hash, thumbnail_path, ai_description, image_format, wait=wait)
+    
+    def add_images_bulk(self, images, wait=True):
+        """Add or update many images in one transaction.
+        
+        Args:
+            images (list): Image dictionaries with the add_image() arguments as keys
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
+            
+        Returns:
+            list: The image_id for each input image, or None if the batch failed
+        """
+        return self.db_ops.add_images_bulk(images, wait=wait)
     
-    def update_image_description(self, image_id, ai_description=None, user_description=None, retry_count=0):
+    def update_image_description(self, image_id, ai_description=None, user_description=None, retry_count=0, wait=True):
         """Update the AI or user description for an image.
         
         Args:
@@ -141,13 +183,67 @@ class DatabaseManager:
             ai_description (str, optional): AI-generated description to update
             user_description (str, optional): User-provided description to update
             retry_count (int, optional): Number of retries attempted (internal use)
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
             
         Returns:
             bool: True if successful, False otherwise
         """
         # The retry_count parameter is kept for backwards compatibility
         # but is not used in the new system as it handles retries internally
-        return self.db_ops.update_image_description(image_id, ai_description, user_description)
+        return self.db_ops.update_image_description(image_id, ai_description, user_description, wait=wait)
+    
+    def queue_image_description(self, image_id, ai_description=None, user_description=None):
+        """Buffer a description update to be written together with others.
+        
+        Args:
+            image_id (int): ID of the image to update
+            ai_description (str, optional): AI-generated description to update
+            user_description (str, optional): User-provided description to update
+            
+        Returns:
+            concurrent.futures.Future: Resolves once the update is committed,
+                or None if no description was given
+        """
+        return self.db_ops.queue_image_description(image_id, ai_description, user_description)
+    
+    def queue_image_dimensions(self, image_id, width, height):
+        """Buffer a dimensions update to be written together with others.
+        
+        Args:
+            image_id (int): ID of the image to update
+            width (int): Width of the image in pixels
+            height (int): Height of the image in pixels
+            
+        Returns:
+            concurrent.futures.Future: Resolves once the update is committed,
+                or None if the dimensions are invalid
+        """
+        return self.db_ops.queue_image_dimensions(image_id, width, height)
+    
+    def queue_image_path(self, image_id, new_filename, new_full_path):
+        """Buffer a filename and path update to be written together with others.
+        
+        Args:
+            image_id (int): ID of the image to update
+            new_filename (str): New filename for the image
+            new_full_path (str): New full path for the image
+            
+        Returns:
+            concurrent.futures.Future: Resolves once the update is committed
+        """
+        return self.db_ops.queue_image_path(image_id, new_filename, new_full_path)
+    
+    def flush_writes(self, wait=True):
+        """Write the buffered description, dimension and path updates now.
+        
+        Args:
+            wait (bool, optional): Wait until they are committed
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self.db_ops.flush_writes(wait=wait)
     
     def search_images(self, query, limit=100, offset=0):
         """Search for images based on their descriptions.
@@ -176,6 +272,20 @@ class DatabaseManager:
         """
         return self.db_ops.search_images_in_folder(folder_id, query, limit, offset)
     
+    def search_images_in_directory(self, directory_id, query, limit=100, offset=0):
+        """Search for images based on their descriptions within a directory and its subdirectories.
+        
+        Args:
+            directory_id (int): ID of the directory to search within
+            query (str): Search query to match against descriptions
+            limit (int, optional): Maximum number of results to return
+            offset (int, optional): Offset for pagination
+            
+        Returns:
+            list: List of image dictionaries matching the search criteria in the directory tree
+        """
+        return self.db_ops.search_images_in_directory(directory_id, query, limit, offset)
+    
     def get_images_by_date_range(self, from_date, to_date, limit=1000000, offset=0):
         """Get images within a specific date range.
         
@@ -202,6 +312,33 @@ class DatabaseManager:
         """
         return self.db_ops.get_all_images(limit, offset)
     
+    def iter_images(self, filter=None, batch_size=1000, columns=("image_id", "full_path")):
+        """Stream images in image_id order without loading the library into memory.
+        
+        Args:
+            filter (dict, optional): Any of folder_id, catalog_id and image_ids
+            batch_size (int, optional): Rows fetched per query
+            columns (tuple, optional): Columns of the images table to return
+            
+        Returns:
+            generator: ImageRow namedtuples with the requested columns
+        """
+        return self.db_ops.iter_images(filter, batch_size, columns)
+    
+    def get_all_images_page(self, page_token=None, page_size=200, grid=False):
+        """Get one page of images from all enabled folders.
+        
+        Args:
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows, without the descriptions
+            
+        Returns:
+            tuple: (images, next_token) where next_token is None on the last page
+        """
+        return self.db_ops.get_all_images_page(page_token, page_size, grid)
+    
     def get_image_count(self):
         """Get the total number of images in the database.
         
@@ -210,6 +347,14 @@ class DatabaseManager:
         """
         return self.db_ops.get_image_count()
         
+    def get_image_counts(self):
+        """Get the library, folder and catalog image counts in one query.
+        
+        Returns:
+            dict: {"library": int, "folders": {folder_id: int}, "catalogs": {catalog_id: int}}
+        """
+        return self.db_ops.get_image_counts()
+    
     def get_image_count_for_folder(self, folder_id):
         """Get the number of images in a specific folder.
         
@@ -243,18 +388,96 @@ class DatabaseManager:
         """
         return self.db_ops.get_image_count_for_catalog(catalog_id)
     
-    def get_images_for_folder(self, folder_id, limit=100, offset=0):
+    def get_images_for_folder(self, folder_id, limit=100, offset=0, grid=False):
         """Get images for a specific folder.
         
         Args:
             folder_id (int): ID of the folder to get images for
             limit (int, optional): Maximum number of results to return
             offset (int, optional): Offset for pagination
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows, without the descriptions
             
         Returns:
             list: List of image dictionaries in the folder
         """
-        return self.db_ops.get_images_for_folder(folder_id, limit, offset)
+        return self.db_ops.get_images_for_folder(folder_id, limit, offset, grid)
+    
+    def get_images_for_folder_page(self, folder_id, page_token=None, page_size=200, grid=False):
+        """Get one page of images for a specific folder.
+        
+        Args:
+            folder_id (int): ID of the folder to get images for
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows, without the descriptions
+            
+        Returns:
+            tuple: (images, next_token) where next_token is None on the last page
+        """
+        return self.db_ops.get_images_for_folder_page(folder_id, page_token, page_size, grid)
+    
+    def get_directory(self, directory_id):
+        """Get a directory of the folder hierarchy by its ID.
+        
+        Args:
+            directory_id (int): ID of the directory to get
+            
+        Returns:
+            dict: Directory data or None if not found
+        """
+        return self.db_ops.get_directory(directory_id)
+    
+    def get_subdirectories(self, folder_id, directory_id=None):
+        """Get the subdirectories of a directory with the number of images below each.
+        
+        Args:
+            folder_id (int): ID of the monitored folder
+            directory_id (int, optional): ID of the parent directory; None for
+                the top level directories of the folder
+            
+        Returns:
+            list: Directory dictionaries with image_count and has_children
+        """
+        return self.db_ops.get_subdirectories(folder_id, directory_id)
+    
+    def get_images_for_directory_page(self, directory_id, page_token=None, page_size=200, grid=False):
+        """Get one page of images in a directory and its subdirectories.
+        
+        Args:
+            directory_id (int): ID of the directory to get images for
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows, without the descriptions
+            
+        Returns:
+            tuple: (images, next_token) where next_token is None on the last page
+        """
+        return self.db_ops.get_images_for_directory_page(directory_id, page_token, page_size, grid)
+    
+    def get_image_count_for_directory(self, directory_id):
+        """Get the number of images in a directory and its subdirectories.
+        
+        Args:
+            directory_id (int): ID of the directory to count images for
+            
+        Returns:
+            int: Number of images in the directory tree
+        """
+        return self.db_ops.get_image_count_for_directory(directory_id)
+    
+    def get_image_descriptions(self, image_ids):
+        """Get the descriptions of images loaded from a grid listing.
+        
+        Args:
+            image_ids (list): IDs of the images
+            
+        Returns:
+            dict: image_id -> {'ai_description': str, 'user_description': str}
+        """
+        return self.db_ops.get_image_descriptions(image_ids)
     
     def optimize_for_large_collections(self):
         """Optimize the database for large image collections.
@@ -267,6 +490,109 @@ class DatabaseManager:
         """
         return self.db_ops.optimize_database()
     
+    def get_query_stats(self, limit=None, order_by="total_ms"):
+        """Get timing statistics for the statements run so far, per normalized SQL.
+        
+        Args:
+            limit (int, optional): Return only this many statements
+            order_by (str, optional): Key to sort by, highest first
+                (total_ms, avg_ms, p95_ms, max_ms, count or rows)
+            
+        Returns:
+            list: Dictionaries with sql, count, total_ms, avg_ms, p95_ms, max_ms, rows and avg_rows
+        """
+        return query_stats.get_stats(limit, order_by)
+    
+    def get_slow_queries(self):
+        """Get the slow query log with the query plan of each statement.
+        
+        Returns:
+            list: Dictionaries with sql, query, elapsed_ms, rows, plan and timestamp, newest first
+        """
+        return query_stats.get_slow_queries()
+    
+    def get_query_report(self, limit=20):
+        """Get the busiest statements and the slow query log as text.
+        
+        Args:
+            limit (int, optional): Number of statements to list
+            
+        Returns:
+            str: Human-readable report
+        """
+        return query_stats.format_report(limit)
+    
+    def reset_query_stats(self):
+        """Clear the query statistics and the slow query log."""
+        query_stats.reset()
+    
+    def get_index_advice(self):
+        """Check the statements run so far against the database's indexes.
+        
+        Returns:
+            dict: Findings, proposed indexes and unused or redundant indexes
+                (see db_index_advisor.advise_indexes()), or None on failure
+        """
+        conn = self.db_ops.db.get_connection()
+        if not conn:
+            return None
+            
+        try:
+            return advise_indexes(conn.conn, query_stats.get_workload())
+        except sqlite3.Error as e:
+            logger.error(f"Error getting index advice: {e}")
+            return None
+        finally:
+            conn.disconnect()
+    
+    def get_index_report(self):
+        """Get the index advice for the statements run so far as text.
+        
+        Returns:
+            str: Human-readable report
+        """
+        advice = self.get_index_advice()
+        if advice is None:
+            return "Index advice is not available, see the log for details."
+        return format_advice(advice)
+    
+    def export_database(self, dest_path, compact=False, progress_callback=None):
+        """Copy the live database to another file on the backup thread.
+        
+        Args:
+            dest_path (str): Destination path
+            compact (bool): Write a compacted copy with VACUUM INTO
+            progress_callback (callable, optional): Called as (copied, total) pages
+            
+        Returns:
+            concurrent.futures.Future: Resolves to True if the copy was written
+        """
+        return BackupService.for_path(self.db_path).export(dest_path, compact, progress_callback)
+    
+    def merge_database(self, source_path, check_files=False, thumbnails_dir=None, progress_callback=None):
+        """Merge another database into this one on the writer thread.
+        
+        The merge runs in one transaction between write batches; see
+        db_merge.merge_database().
+        
+        Args:
+            source_path (str): Database to import
+            check_files (bool): Only import images whose file exists on this machine
+            thumbnails_dir (str, optional): Clear the thumbnail path of imported
+                images whose thumbnail is not in this directory
+            progress_callback (callable, optional): Called as (step, steps, message)
+                from the writer thread
+            
+        Returns:
+            concurrent.futures.Future: Resolves to the merge statistics
+        """
+        return self.db_ops.db.writer.submit_exclusive(
+            merge_database, source_path,
+            check_files=check_files,
+            thumbnails_dir=thumbnails_dir,
+            progress_callback=progress_callback
+        )
+    
     def get_image_by_id(self, image_id):
         """Get an image by its ID.
         
@@ -278,27 +604,83 @@ class DatabaseManager:
         """
         return self.db_ops.get_image_by_id(image_id)
     
-    def delete_image(self, image_id):
+    def delete_image(self, image_id, wait=True):
         """Delete an image from the database.
         
         Args:
             image_id (int): ID of the image to delete
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
             
         Returns:
             bool: True if successful, False otherwise
         """
-        return self.db_ops.delete_image(image_id)
+        return self.db_ops.delete_image(image_id, wait=wait)
+    
+    def delete_images_bulk(self, image_ids, wait=True):
+        """Delete many images from the database in one transaction.
+        
+        Args:
+            image_ids (list): IDs of the images to delete
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
+            
+        Returns:
+            int: Number of images deleted
+        """
+        return self.db_ops.delete_images_bulk(image_ids, wait=wait)
+    
+    def get_scan_manifest(self, folder_id, paths=None):
+        """Get the stat fingerprint of every image in a folder as last scanned.
+        
+        Args:
+            folder_id (int): ID of the folder
+            paths (iterable, optional): Only get these full paths
+            
+        Returns:
+            dict: Normalized full path -> ManifestEntry, or None on error
+        """
+        return self.db_ops.get_scan_manifest(folder_id, paths)
     
-    def update_folder_scan_time(self, folder_id):
+    def update_scan_manifest(self, states, wait=True):
+        """Record the stat fingerprint of images that were not processed again.
+        
+        Args:
+            states (dict): image_id -> FileState
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
+            
+        Returns:
+            int: Number of images updated
+        """
+        return self.db_ops.update_scan_manifest(states, wait=wait)
+    
+    def update_folder_scan_time(self, folder_id, wait=True):
         """Update the last scan time for a folder.
         
         Args:
             folder_id (int): ID of the folder to update
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
             
         Returns:
             bool: True if successful, False otherwise
         """
-        return self.db_ops.update_folder_scan_time(folder_id)
+        return self.db_ops.update_folder_scan_time(folder_id, wait=wait)
+    
+    def submit_write(self, operation, *args, **kwargs):
+        """Queue a write operation on the database writer thread.
+        
+        Args:
+            operation (callable): Called as operation(conn, *args, **kwargs)
+            *args: Positional arguments for the operation
+            **kwargs: Keyword arguments for the operation
+            
+        Returns:
+            concurrent.futures.Future: Resolves to the operation's return value
+                once it has been committed
+        """
+        return self.db_ops.db.submit_write(operation, *args, **kwargs)
     
     def _create_performance_indexes(self):
         """Create additional indexes to improve query performance.
@@ -344,18 +726,20 @@ class DatabaseManager:
         logger.info("Virtual tables created (compatibility mode)")
         return True
         
-    def update_image_path(self, image_id, new_filename, new_full_path):
+    def update_image_path(self, image_id, new_filename, new_full_path, wait=True):
         """Update the filename and path for an image.
         
         Args:
             image_id (int): ID of the image to update
             new_filename (str): New filename for the image
             new_full_path (str): New full path for the image
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
             
         Returns:
             bool: True if successful, False otherwise
         """
-        return self.db_ops.update_image_path(image_id, new_filename, new_full_path)
+        return self.db_ops.update_image_path(image_id, new_filename, new_full_path, wait=wait)
     
     def get_image_description(self, image_id):
         """Get the AI description for an image.
@@ -393,29 +777,33 @@ class DatabaseManager:
         """
         return self.db_ops.get_catalogs()
     
-    def add_image_to_catalog(self, image_id, catalog_id):
+    def add_image_to_catalog(self, image_id, catalog_id, wait=True):
         """Add an image to a catalog.
         
         Args:
             image_id (int): ID of the image to add
             catalog_id (int): ID of the catalog to add the image to
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
             
         Returns:
             bool: True if successful, False otherwise
         """
-        return self.db_ops.add_image_to_catalog(image_id, catalog_id)
+        return self.db_ops.add_image_to_catalog(image_id, catalog_id, wait=wait)
     
-    def remove_image_from_catalog(self, image_id, catalog_id):
+    def remove_image_from_catalog(self, image_id, catalog_id, wait=True):
         """Remove an image from a catalog.
         
         Args:
             image_id (int): ID of the image to remove
             catalog_id (int): ID of the catalog to remove the image from
+            wait (bool, optional): Wait for the write to be committed. When
+                False a Future resolving to the result is returned instead.
             
         Returns:
             bool: True if successful, False otherwise
         """
-        return self.db_ops.remove_image_from_catalog(image_id, catalog_id)
+        return self.db_ops.remove_image_from_catalog(image_id, catalog_id, wait=wait)
     
     def get_images_for_catalog(self, catalog_id, limit=1000000, offset=0):
         """Get images for a specific catalog.
@@ -430,6 +818,21 @@ class DatabaseManager:
         """
         return self.db_ops.get_images_for_catalog(catalog_id, limit, offset)
     
+    def get_images_for_catalog_page(self, catalog_id, page_token=None, page_size=200, grid=False):
+        """Get one page of images for a specific catalog.
+        
+        Args:
+            catalog_id (int): ID of the catalog to get images for
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows, without the descriptions
+            
+        Returns:
+            tuple: (images, next_token) where next_token is None on the last page
+        """
+        return self.db_ops.get_images_for_catalog_page(catalog_id, page_token, page_size, grid)
+    
     def get_catalog_by_id(self, catalog_id):
         """Get a catalog by its ID.
         
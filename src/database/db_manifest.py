@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Scan manifest for StarImageBrowse
+Stores the size, modification time (in nanoseconds) and inode of every image
+file as it was when last scanned. A rescan stats the files it walks, compares
+them with the manifest and only processes the files that are new or changed;
+indexed files that are gone are deleted. A rescan of an unchanged folder
+therefore costs one directory walk and one indexed read, no file is opened.
+"""
+
+import logging
+from collections import namedtuple
+from datetime import datetime
+
+logger = logging.getLogger("StarImageBrowse.database.db_manifest")
+
+# Columns added to images for the manifest; file_size is already there
+MANIFEST_COLUMNS = {
+    "file_mtime_ns": "INTEGER",
+    "file_inode": "INTEGER",
+}
+
+# Covers the manifest read, so a folder's manifest comes from the index alone
+MANIFEST_INDEXES_SQL = {
+    "idx_images_manifest": """CREATE INDEX IF NOT EXISTS idx_images_manifest
+    ON images (folder_id, full_path, file_size, file_mtime_ns, file_inode, last_modified_date)""",
+}
+
+MANIFEST_SELECT_SQL = """SELECT image_id, full_path, file_size, file_mtime_ns, file_inode, last_modified_date
+    FROM images WHERE folder_id = ?"""
+
+# Paths looked up per statement when reading part of a manifest
+MANIFEST_LOOKUP_CHUNK = 500
+
+MANIFEST_UPDATE_SQL = "UPDATE images SET file_size = ?, file_mtime_ns = ?, file_inode = ? WHERE image_id = ?"
+
+# What a rescan does with a file, see classify_file()
+FILE_NEW = "new"
+FILE_CHANGED = "changed"
+FILE_ADOPTED = "adopted"
+FILE_UNCHANGED = "unchanged"
+
+# Stat fingerprint of a file. inode is 0 where the platform does not report one
+FileState = namedtuple("FileState", ["size", "mtime_ns", "inode"])
+
+# What the manifest holds for an indexed image
+ManifestEntry = namedtuple("ManifestEntry", ["image_id", "size", "mtime_ns", "inode", "last_modified_date"])
+
+# Outcome of comparing a walk with the manifest. new and changed map paths to
+# their FileState, adopted maps image IDs to theirs and deleted lists image IDs
+ManifestDiff = namedtuple("ManifestDiff", ["new", "changed", "adopted", "deleted", "unchanged"])
+
+
+def create_manifest_schema(conn):
+    """Add the manifest columns to images and index them.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+    for column, column_type in MANIFEST_COLUMNS.items():
+        if column not in columns:
+            logger.info(f"Adding {column} column to images table")
+            conn.execute(f"ALTER TABLE images ADD COLUMN {column} {column_type}")
+
+    for index_sql in MANIFEST_INDEXES_SQL.values():
+        conn.execute(index_sql)
+
+
+def file_state(stat_result, inode=None):
+    """Build the fingerprint of a file from its stat result.
+
+    Args:
+        stat_result (os.stat_result): Result of os.stat() or DirEntry.stat()
+        inode (int, optional): Inode if known separately, as from DirEntry.inode()
+
+    Returns:
+        FileState: Fingerprint of the file
+    """
+    return FileState(stat_result.st_size, stat_result.st_mtime_ns, inode if inode is not None else stat_result.st_ino)
+
+
+def read_manifest(conn, folder_id, paths=None):
+    """Read the manifest of a monitored folder.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        folder_id (int): Folder to read
+        paths (iterable, optional): Only read these normalized full paths
+
+    Returns:
+        dict: Normalized full path -> ManifestEntry
+    """
+    if paths is None:
+        rows = conn.execute(MANIFEST_SELECT_SQL, (folder_id,)).fetchall()
+    else:
+        paths = list(paths)
+        rows = []
+        for start in range(0, len(paths), MANIFEST_LOOKUP_CHUNK):
+            chunk = paths[start:start + MANIFEST_LOOKUP_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows.extend(conn.execute(
+                f"{MANIFEST_SELECT_SQL} AND full_path IN ({placeholders})", [folder_id] + chunk
+            ).fetchall())
+
+    return {row[1]: ManifestEntry(row[0], row[2], row[3], row[4], row[5]) for row in rows}
+
+
+def _matches_legacy(entry, state):
+    """Check an image scanned before the manifest existed against a file.
+
+    Such images only have their size and modification date, stored to the
+    second, which is close enough to take over the file without reading it.
+    """
+    if entry.size != state.size or entry.last_modified_date is None:
+        return False
+    modified = datetime.fromtimestamp(state.mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+    return str(entry.last_modified_date)[:19] == modified
+
+
+def classify_file(entry, state):
+    """Decide what a rescan has to do with one file.
+
+    A file is changed if its size or modification time differs, or if it has
+    a different inode (it was replaced) where both inodes are known.
+
+    Args:
+        entry (ManifestEntry): Manifest entry of the file's path, or None
+        state (FileState): Fingerprint of the file
+
+    Returns:
+        str: FILE_NEW, FILE_CHANGED, FILE_ADOPTED or FILE_UNCHANGED
+    """
+    if entry is None:
+        return FILE_NEW
+    if entry.mtime_ns is None:
+        return FILE_ADOPTED if _matches_legacy(entry, state) else FILE_CHANGED
+    if (entry.size != state.size or entry.mtime_ns != state.mtime_ns
+            or (entry.inode and state.inode and entry.inode != state.inode)):
+        return FILE_CHANGED
+    return FILE_UNCHANGED
+
+
+def diff_manifest(manifest, files):
+    """Compare the files found by a walk with the manifest.
+
+    Args:
+        manifest (dict): Result of read_manifest()
+        files (dict): Normalized full path -> FileState of every image found
+
+    Returns:
+        ManifestDiff: Files to process, images to update or delete, and the
+            number of unchanged files
+    """
+    new = {}
+    changed = {}
+    adopted = {}
+    unchanged = 0
+
+    for path, state in files.items():
+        entry = manifest.get(path)
+        status = classify_file(entry, state)
+        if status == FILE_NEW:
+            new[path] = state
+        elif status == FILE_CHANGED:
+            changed[path] = state
+        elif status == FILE_ADOPTED:
+            adopted[entry.image_id] = state
+        else:
+            unchanged += 1
+
+    deleted = [entry.image_id for path, entry in manifest.items() if path not in files]
+    return ManifestDiff(new, changed, adopted, deleted, unchanged)
+
+
+def write_manifest(conn, states):
+    """Record the fingerprint of images whose files were not processed again.
+
+    Args:
+        conn (DatabaseConnection): Connection from the writer thread
+        states (dict): image_id -> FileState
+
+    Returns:
+        int: Number of images updated
+    """
+    if not states:
+        return 0
+    return conn.conn.executemany(MANIFEST_UPDATE_SQL, [
+        (state.size, state.mtime_ns, state.inode, image_id)
+        for image_id, state in states.items()
+    ]).rowcount
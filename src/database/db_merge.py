@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Database merge import for StarImageBrowse
+Copies folders, images, catalogs and catalog mappings from another database
+file by attaching it and running one INSERT ... SELECT per table inside a
+single transaction. Source IDs are remapped by joining on the natural keys
+(folder path, image path, catalog name), and the full-text indexes are
+rebuilt once at the end instead of row by row.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+
+from src.database.db_directories import assign_directories
+from src.database.db_fts import rebuild_fts_index
+
+logger = logging.getLogger("StarImageBrowse.database.db_merge")
+
+# Schema name the source database is attached under
+SOURCE_SCHEMA = "merge_source"
+
+# Rows per statement when salvaging a table that cannot be read in one pass
+SALVAGE_CHUNK_ROWS = 10000
+
+# Insert triggers that keep the FTS indexes current row by row; they are
+# suspended during an import and the indexes rebuilt once instead
+FTS_INSERT_TRIGGERS = ("images_ai_insert", "images_trigram_insert")
+
+# Columns derived from other rows; they are rebuilt in the target rather
+# than copied, as the rows they point to may be missing or renumbered
+DERIVED_IMAGE_COLUMNS = ("directory_id",)
+
+
+def _table_names(conn, schema):
+    """Return the table names in a schema."""
+    return {row[0] for row in conn.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")}
+
+
+def _common_columns(conn, table, exclude=()):
+    """Return the columns a table has in both databases, in target order.
+
+    Args:
+        conn (sqlite3.Connection): Connection with the source attached
+        table (str): Table name
+        exclude (tuple): Columns to leave out
+
+    Returns:
+        list: Column names
+    """
+    source_columns = {row[1] for row in conn.execute(f"PRAGMA {SOURCE_SCHEMA}.table_info({table})")}
+    return [
+        row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")
+        if row[1] in source_columns and row[1] not in exclude
+    ]
+
+
+def _attach(conn, source_path):
+    """Attach the source database, committing anything the caller left open.
+
+    ATTACH is not allowed inside a transaction.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute(f"ATTACH DATABASE ? AS {SOURCE_SCHEMA}", (source_path,))
+
+
+def _detach(conn):
+    """Detach the source database."""
+    try:
+        conn.execute(f"DETACH DATABASE {SOURCE_SCHEMA}")
+    except sqlite3.Error as e:
+        logger.warning(f"Could not detach imported database: {e}")
+
+
+def _suspend_fts_triggers(conn):
+    """Drop the FTS insert triggers.
+
+    Returns:
+        list: CREATE statements of the dropped triggers, for _restore_fts_triggers()
+    """
+    placeholders = ", ".join("?" for _ in FTS_INSERT_TRIGGERS)
+    rows = conn.execute(
+        f"SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+        FTS_INSERT_TRIGGERS
+    ).fetchall()
+    for name, _ in rows:
+        conn.execute(f"DROP TRIGGER main.{name}")
+    return [sql for _, sql in rows]
+
+
+def _restore_fts_triggers(conn, triggers):
+    """Recreate the suspended triggers and rebuild the FTS indexes once."""
+    for trigger_sql in triggers:
+        conn.execute(trigger_sql)
+    if "image_fts" in _table_names(conn, "main"):
+        rebuild_fts_index(conn, commit=False)
+
+
+def _insert(conn, sql, params=()):
+    """Run an INSERT ... SELECT and return the number of rows it inserted.
+
+    rowcount leaves out rows written by triggers, such as counter updates.
+    """
+    return conn.execute(sql, params).rowcount
+
+
+def _copy_table(conn, table, exclude=(), salvage=False):
+    """Copy the rows of a table that are not in the target yet, keeping their IDs.
+
+    Args:
+        conn (sqlite3.Connection): Connection with the source attached
+        table (str): Table name
+        exclude (tuple): Columns not to copy
+        salvage (bool): If the source table cannot be read in one pass, copy
+            it in rowid ranges and skip the ranges that fail
+
+    Returns:
+        int: Rows inserted
+    """
+    columns = ", ".join(_common_columns(conn, table, exclude))
+    sql = f"INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM {SOURCE_SCHEMA}.{table}"
+    if not salvage:
+        return _insert(conn, sql)
+
+    conn.execute("SAVEPOINT merge_table")
+    try:
+        copied = _insert(conn, sql)
+        conn.execute("RELEASE merge_table")
+        return copied
+    except sqlite3.DatabaseError as e:
+        conn.execute("ROLLBACK TO merge_table")
+        conn.execute("RELEASE merge_table")
+        logger.warning(f"Could not copy {table} in one pass, salvaging it in chunks: {e}")
+
+    low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {SOURCE_SCHEMA}.{table}").fetchone()
+    if low is None:
+        return 0
+
+    copied = 0
+    for start in range(low, high + 1, SALVAGE_CHUNK_ROWS):
+        conn.execute("SAVEPOINT merge_chunk")
+        try:
+            copied += _insert(conn, f"{sql} WHERE rowid >= ? AND rowid < ?", (start, start + SALVAGE_CHUNK_ROWS))
+            conn.execute("RELEASE merge_chunk")
+        except sqlite3.DatabaseError as e:
+            conn.execute("ROLLBACK TO merge_chunk")
+            conn.execute("RELEASE merge_chunk")
+            logger.warning(f"Skipped unreadable {table} rows {start}-{start + SALVAGE_CHUNK_ROWS - 1}: {e}")
+    return copied
+
+
+def copy_database(conn, source_path):
+    """Copy everything from another database into an empty one, keeping IDs.
+
+    Used to rebuild a damaged database: each table is copied with one
+    statement, or in rowid ranges past the parts that cannot be read. The
+    directory hierarchy is rebuilt from the copied image paths.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the new database
+        source_path (str): Database to copy from
+
+    Returns:
+        dict: Rows copied per table (folders, images, catalogs, catalog_mappings)
+    """
+    stats = {"folders": 0, "images": 0, "catalogs": 0, "catalog_mappings": 0}
+    tables = {
+        "folders": "folders",
+        "images": "images",
+        "catalogs": "catalogs",
+        "catalog_mappings": "image_catalog_mapping",
+    }
+
+    started = time.time()
+    _attach(conn, source_path)
+    try:
+        source_tables = _table_names(conn, SOURCE_SCHEMA)
+        target_tables = _table_names(conn, "main")
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            triggers = _suspend_fts_triggers(conn)
+            for key, table in tables.items():
+                if table in source_tables and table in target_tables:
+                    exclude = DERIVED_IMAGE_COLUMNS if table == "images" else ()
+                    stats[key] = _copy_table(conn, table, exclude=exclude, salvage=True)
+            if "directories" in target_tables:
+                assign_directories(conn)
+            _restore_fts_triggers(conn, triggers)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    finally:
+        _detach(conn)
+
+    logger.info(f"Copied {stats} from {source_path} in {time.time() - started:.2f}s")
+    return stats
+
+
+def merge_database(conn, source_path, check_files=False, thumbnails_dir=None, progress_callback=None):
+    """Merge another database into this one in a single transaction.
+
+    Folders are matched by path, images by full path and catalogs by name;
+    everything not present yet is added with new IDs. Images already in the
+    target are left as they are, but their catalog memberships from the
+    source are added.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the target database, not in a transaction
+        source_path (str): Database to import
+        check_files (bool): Only import images whose file exists on this machine
+        thumbnails_dir (str, optional): Clear the thumbnail path of imported
+            images whose thumbnail is not in this directory
+        progress_callback (callable, optional): Called as (step, steps, message)
+
+    Returns:
+        dict: Rows added (folders, images, catalogs, catalog_mappings) and
+            skipped_images, the source images not imported
+    """
+    stats = {"folders": 0, "images": 0, "catalogs": 0, "catalog_mappings": 0, "skipped_images": 0}
+    steps = 5
+
+    def report(step, message):
+        if progress_callback:
+            progress_callback(step, steps, message)
+
+    started = time.time()
+    _attach(conn, source_path)
+    try:
+        source_tables = _table_names(conn, SOURCE_SCHEMA)
+        target_tables = _table_names(conn, "main")
+
+        if check_files:
+            conn.create_function("merge_file_exists", 1, lambda path: bool(path) and os.path.exists(path))
+        if thumbnails_dir:
+            conn.create_function(
+                "merge_thumbnail_exists", 1,
+                lambda path: bool(path) and os.path.exists(os.path.join(thumbnails_dir, path))
+            )
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            triggers = _suspend_fts_triggers(conn)
+
+            report(0, "Importing folders...")
+            columns = _common_columns(conn, "folders", exclude=("folder_id",))
+            column_list = ", ".join(columns)
+            stats["folders"] = _insert(
+                conn,
+                f"INSERT OR IGNORE INTO main.folders ({column_list}) SELECT {column_list} FROM {SOURCE_SCHEMA}.folders"
+            )
+
+            # Source folder IDs are remapped by joining on the folder path
+            report(1, "Importing images...")
+            columns = _common_columns(conn, "images", exclude=("image_id", "folder_id") + DERIVED_IMAGE_COLUMNS)
+            values = [
+                "CASE WHEN merge_thumbnail_exists(si.thumbnail_path) THEN si.thumbnail_path END"
+                if column == "thumbnail_path" and thumbnails_dir else f"si.{column}"
+                for column in columns
+            ]
+            stats["images"] = _insert(
+                conn,
+                f"""INSERT OR IGNORE INTO main.images (folder_id, {", ".join(columns)})
+                    SELECT f.folder_id, {", ".join(values)}
+                    FROM {SOURCE_SCHEMA}.images si
+                    JOIN {SOURCE_SCHEMA}.folders sf ON sf.folder_id = si.folder_id
+                    JOIN main.folders f ON f.path = sf.path
+                    WHERE {"merge_file_exists(si.full_path)" if check_files else "1"}"""
+            )
+            total_images = conn.execute(f"SELECT COUNT(*) FROM {SOURCE_SCHEMA}.images").fetchone()[0]
+            stats["skipped_images"] = total_images - stats["images"]
+            if "directories" in target_tables:
+                assign_directories(conn)
+
+            catalog_tables = {"catalogs", "image_catalog_mapping"}
+            if catalog_tables <= source_tables and catalog_tables <= target_tables:
+                report(2, "Importing catalogs...")
+                columns = _common_columns(conn, "catalogs", exclude=("catalog_id",))
+                column_list = ", ".join(columns)
+                stats["catalogs"] = _insert(
+                    conn,
+                    f"INSERT OR IGNORE INTO main.catalogs ({column_list}) SELECT {column_list} FROM {SOURCE_SCHEMA}.catalogs"
+                )
+
+                # Image and catalog IDs are remapped by full path and catalog name
+                columns = _common_columns(conn, "image_catalog_mapping", exclude=("mapping_id", "image_id", "catalog_id"))
+                extra_columns = "".join(f", {column}" for column in columns)
+                extra_values = "".join(f", sm.{column}" for column in columns)
+                stats["catalog_mappings"] = _insert(
+                    conn,
+                    f"""INSERT OR IGNORE INTO main.image_catalog_mapping (image_id, catalog_id{extra_columns})
+                        SELECT i.image_id, c.catalog_id{extra_values}
+                        FROM {SOURCE_SCHEMA}.image_catalog_mapping sm
+                        JOIN {SOURCE_SCHEMA}.images si ON si.image_id = sm.image_id
+                        JOIN main.images i ON i.full_path = si.full_path
+                        JOIN {SOURCE_SCHEMA}.catalogs sc ON sc.catalog_id = sm.catalog_id
+                        JOIN main.catalogs c ON c.name = sc.name"""
+                )
+
+            report(3, "Rebuilding the search index...")
+            _restore_fts_triggers(conn, triggers)
+
+            report(4, "Committing the import...")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    finally:
+        _detach(conn)
+
+    report(steps, "Import finished")
+    logger.info(f"Merged {source_path} in {time.time() - started:.2f}s: {stats}")
+    return stats
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Schema migrations for StarImageBrowse
+Holds the one definition of the database schema as an ordered list of
+migration steps. PRAGMA user_version records the last step applied, so
+opening an up-to-date database costs a single pragma read and every step
+runs once per database.
+
+A schema change is made by appending a step; existing steps are never
+edited, as databases in the field have already run them. Steps must be
+idempotent because databases created before versioning start at version 0
+with part of the schema already in place.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+
+from src.database.db_counters import are_counters_current, create_counters_schema, rebuild_counters
+from src.database.db_directories import assign_directories, create_directories_schema
+from src.database.db_fts import create_fts_schema, is_fts_index_current, rebuild_fts_index
+from src.database.db_manifest import create_manifest_schema
+from src.database.db_paging import GRID_INDEXES_SQL, PAGING_INDEXES_SQL
+
+logger = logging.getLogger("StarImageBrowse.database.db_migrations")
+
+FOLDERS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS folders (
+    folder_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT UNIQUE NOT NULL,
+    enabled INTEGER DEFAULT 1,
+    last_scan_time TIMESTAMP
+)"""
+
+IMAGES_TABLE_SQL = """CREATE TABLE IF NOT EXISTS images (
+    image_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    folder_id INTEGER,
+    filename TEXT NOT NULL,
+    full_path TEXT UNIQUE NOT NULL,
+    file_size INTEGER,
+    file_hash TEXT,
+    creation_date TIMESTAMP,
+    last_modified_date TIMESTAMP,
+    thumbnail_path TEXT,
+    ai_description TEXT,
+    user_description TEXT,
+    last_scanned TIMESTAMP,
+    width INTEGER,
+    height INTEGER,
+    format TEXT,
+    date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (folder_id) REFERENCES folders (folder_id)
+)"""
+
+IMAGES_INDEXES_SQL = {
+    "idx_images_full_path": "CREATE INDEX IF NOT EXISTS idx_images_full_path ON images (full_path)",
+    "idx_images_ai_description": "CREATE INDEX IF NOT EXISTS idx_images_ai_description ON images (ai_description)",
+    "idx_images_user_description": "CREATE INDEX IF NOT EXISTS idx_images_user_description ON images (user_description)",
+    "idx_images_folder_id": "CREATE INDEX IF NOT EXISTS idx_images_folder_id ON images (folder_id)",
+    "idx_images_last_modified": "CREATE INDEX IF NOT EXISTS idx_images_last_modified ON images (last_modified_date DESC)",
+    "idx_images_search_modified": """CREATE INDEX IF NOT EXISTS idx_images_search_modified
+    ON images (ai_description, last_modified_date DESC)""",
+    "idx_images_search_modified_user": """CREATE INDEX IF NOT EXISTS idx_images_search_modified_user
+    ON images (user_description, last_modified_date DESC)""",
+}
+
+# Columns added to images after the first release, with their types
+ADDED_IMAGE_COLUMNS = {
+    "width": "INTEGER",
+    "height": "INTEGER",
+    "format": "TEXT",
+    "date_added": "TIMESTAMP",
+}
+
+ADDED_IMAGE_INDEXES_SQL = {
+    "idx_images_dimensions": "CREATE INDEX IF NOT EXISTS idx_images_dimensions ON images (width, height)",
+    "idx_images_date_added": "CREATE INDEX IF NOT EXISTS idx_images_date_added ON images (date_added DESC)",
+}
+
+CATALOGS_TABLE_SQL = """CREATE TABLE IF NOT EXISTS catalogs (
+    catalog_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    description TEXT,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)"""
+
+CATALOG_MAPPING_TABLE_SQL = """CREATE TABLE IF NOT EXISTS image_catalog_mapping (
+    mapping_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    image_id INTEGER NOT NULL,
+    catalog_id INTEGER NOT NULL,
+    added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (image_id) REFERENCES images (image_id) ON DELETE CASCADE,
+    FOREIGN KEY (catalog_id) REFERENCES catalogs (catalog_id) ON DELETE CASCADE,
+    UNIQUE(image_id, catalog_id)
+)"""
+
+CATALOG_INDEXES_SQL = {
+    "idx_catalog_mapping_image_id": """CREATE INDEX IF NOT EXISTS idx_catalog_mapping_image_id
+    ON image_catalog_mapping (image_id)""",
+    "idx_catalog_mapping_catalog_id": """CREATE INDEX IF NOT EXISTS idx_catalog_mapping_catalog_id
+    ON image_catalog_mapping (catalog_id)""",
+}
+
+# Algorithm of the hashes stored before it was recorded with them, see
+# image_processing.fingerprint.LEGACY_ALGORITHM
+LEGACY_HASH_ALGORITHM = "md5"
+
+# Indexes dropped by migration 7. Description searches use LIKE '%...%' or
+# the FTS index, which the description indexes cannot serve; the others
+# repeat the UNIQUE index on full_path or the rowid order of image_id.
+UNHELPFUL_INDEXES = (
+    "idx_images_ai_description",
+    "idx_images_user_description",
+    "idx_images_search_modified",
+    "idx_images_search_modified_user",
+    "idx_images_search",
+    "idx_images_full_path",
+    "idx_images_path",
+    "idx_images_image_id",
+)
+
+
+def _create_base_tables(conn):
+    """Create the folders and images tables with their indexes."""
+    conn.execute(FOLDERS_TABLE_SQL)
+    conn.execute(IMAGES_TABLE_SQL)
+    for index_sql in IMAGES_INDEXES_SQL.values():
+        conn.execute(index_sql)
+
+
+def _add_image_columns(conn):
+    """Add the dimension, format and date_added columns to older images tables."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+    for column, column_type in ADDED_IMAGE_COLUMNS.items():
+        if column not in existing:
+            logger.info(f"Adding {column} column to images table")
+            conn.execute(f"ALTER TABLE images ADD COLUMN {column} {column_type}")
+
+    # ALTER TABLE cannot add a column with a non-constant default
+    if "date_added" not in existing:
+        conn.execute("UPDATE images SET date_added = CURRENT_TIMESTAMP WHERE date_added IS NULL")
+
+    for index_sql in ADDED_IMAGE_INDEXES_SQL.values():
+        conn.execute(index_sql)
+
+
+def _create_catalog_tables(conn):
+    """Create the catalogs and image_catalog_mapping tables."""
+    conn.execute(CATALOGS_TABLE_SQL)
+    conn.execute(CATALOG_MAPPING_TABLE_SQL)
+    for index_sql in CATALOG_INDEXES_SQL.values():
+        conn.execute(index_sql)
+
+
+def _create_paging_indexes(conn):
+    """Create the composite indexes used by keyset pagination."""
+    for index_sql in PAGING_INDEXES_SQL.values():
+        conn.execute(index_sql)
+
+
+def _create_search_index(conn):
+    """Create the FTS and trigram indexes, replacing older layouts."""
+    if not is_fts_index_current(conn):
+        create_fts_schema(conn)
+        rebuild_fts_index(conn, commit=False)
+
+
+def _create_counters(conn):
+    """Create the maintained image counters and fill them in."""
+    if not are_counters_current(conn):
+        create_counters_schema(conn)
+        rebuild_counters(conn)
+
+
+def _drop_unhelpful_indexes(conn):
+    """Drop indexes no query can use, which only slow down writes."""
+    for index_name in UNHELPFUL_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+def _create_grid_indexes(conn):
+    """Replace the paging indexes with covering versions for the grid listings."""
+    for index_sql in GRID_INDEXES_SQL.values():
+        conn.execute(index_sql)
+    for index_name in PAGING_INDEXES_SQL:
+        conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+
+def _create_directories(conn):
+    """Create the directory hierarchy and place the existing images in it."""
+    create_directories_schema(conn)
+    assign_directories(conn)
+
+
+def _add_hash_algorithm(conn):
+    """Record the algorithm of each file hash; existing hashes are MD5 of the whole file."""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+    if "hash_algorithm" not in existing:
+        logger.info("Adding hash_algorithm column to images table")
+        conn.execute("ALTER TABLE images ADD COLUMN hash_algorithm TEXT")
+    conn.execute(
+        "UPDATE images SET hash_algorithm = ? WHERE file_hash IS NOT NULL AND hash_algorithm IS NULL",
+        (LEGACY_HASH_ALGORITHM,)
+    )
+
+
+# (version, description, step) in the order they are applied. Append only.
+MIGRATIONS = (
+    (1, "folders and images tables", _create_base_tables),
+    (2, "image dimension, format and date_added columns", _add_image_columns),
+    (3, "catalog tables", _create_catalog_tables),
+    (4, "keyset pagination indexes", _create_paging_indexes),
+    (5, "full-text and substring search indexes", _create_search_index),
+    (6, "image counters", _create_counters),
+    (7, "drop unhelpful indexes", _drop_unhelpful_indexes),
+    (8, "covering thumbnail grid indexes", _create_grid_indexes),
+    (9, "directory hierarchy and closure table", _create_directories),
+    (10, "scan manifest columns", create_manifest_schema),
+    (11, "file hash algorithm column", _add_hash_algorithm),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Read the schema version recorded in a database.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        int: Last migration applied, 0 for new or unversioned databases
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply the migrations a database has not run yet.
+
+    Each step runs in its own IMMEDIATE transaction together with the
+    user_version update, so an interrupted upgrade resumes at the failed
+    step, and a second process upgrading the same file waits and then skips
+    the steps already applied.
+
+    Args:
+        conn (sqlite3.Connection): Database connection, not in a transaction
+
+    Returns:
+        list: Versions applied by this call
+
+    Raises:
+        sqlite3.Error: If a step fails; it is rolled back
+    """
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        if version > SCHEMA_VERSION:
+            logger.warning(f"Database schema version {version} is newer than this application ({SCHEMA_VERSION})")
+        return []
+
+    if conn.in_transaction:
+        conn.commit()
+
+    applied = []
+    for step_version, description, step in MIGRATIONS:
+        if step_version <= version:
+            continue
+
+        started = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another connection may have applied it while this one waited
+            if get_schema_version(conn) >= step_version:
+                conn.execute("COMMIT")
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {step_version}")
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.error(f"Schema migration {step_version} ({description}) failed: {e}")
+            raise
+
+        applied.append(step_version)
+        logger.info(f"Applied schema migration {step_version}: {description} in {time.time() - started:.2f}s")
+
+    return applied
+
+
+def create_schema(conn):
+    """Create the complete schema in a new, empty database.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+    """
+    migrate(conn)
+
+
+def migrate_database(db_path):
+    """Bring the schema of a database file up to date.
+
+    Args:
+        db_path (str): Path to the database file
+
+    Returns:
+        tuple: (success, message)
+    """
+    if not os.path.exists(db_path):
+        return False, f"Database file not found: {db_path}"
+
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        applied = migrate(conn)
+        if applied:
+            return True, f"Successfully upgraded database schema with {len(applied)} changes"
+        return True, "Database schema is already up-to-date"
+
+    except sqlite3.Error as e:
+        return False, f"Failed to upgrade database: {str(e)}"
+    finally:
+        if conn:
+            conn.close()
@@ -8,13 +8,53 @@ Provides high-level database operations using the core database system.
 import os
 import logging
 import sqlite3
+from collections import namedtuple
 from datetime import datetime
 from pathlib import Path
 
 from src.database.db_core import Database, DatabaseConnection
+from src.database.db_counters import CATALOG_SCOPE, FOLDER_SCOPE, LIBRARY_SCOPE, read_counts
+from src.database.db_directories import get_folder_paths, resolve_directory, subtree_condition
+from src.database.db_fts import (
+    BM25_RANK_SQL, MIN_SUBSTRING_LENGTH, build_match_expression, has_trigram_index, split_substring_terms,
+    substring_condition
+)
+from src.database.db_manifest import read_manifest, write_manifest
+from src.database.db_paging import (
+    KEYSET_ORDER_SQL, decode_page_token, grid_columns_sql, keyset_segments, split_page
+)
+from src.database.db_write_buffer import WriteBehindBuffer
+from src.database.db_writer import write_operation
 
 logger = logging.getLogger("StarImageBrowse.database.db_operations")
 
+# Columns written by add_images_bulk(), in statement order (full_path is third)
+BULK_INSERT_COLUMNS = (
+    "folder_id", "filename", "full_path", "file_size", "file_hash", "hash_algorithm",
+    "creation_date", "last_modified_date", "thumbnail_path",
+    "ai_description", "last_scanned", "format", "date_added",
+    "width", "height", "directory_id", "file_mtime_ns", "file_inode"
+)
+
+# Columns an upsert leaves alone when the image is already known
+BULK_INSERT_KEEP = {"full_path", "creation_date", "date_added"}
+
+# Values an upsert only replaces when the scan produced one
+BULK_UPSERT_SET_SQL = {
+    column: f"COALESCE(excluded.{column}, {column})"
+    for column in ("file_hash", "thumbnail_path", "ai_description", "format", "width", "height")
+}
+# The algorithm goes with the hash it describes
+BULK_UPSERT_SET_SQL["hash_algorithm"] = (
+    "CASE WHEN excluded.file_hash IS NULL THEN hash_algorithm ELSE excluded.hash_algorithm END"
+)
+
+# Bound parameters per statement (SQLITE_MAX_VARIABLE_NUMBER before 3.32 was 999)
+BULK_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+# Row types returned by iter_images(), by column tuple
+_IMAGE_ROW_TYPES = {}
+
 class DatabaseOperations:
     """High-level database operations for StarImageBrowse."""
     
@@ -26,8 +66,12 @@ class DatabaseOperations:
         """
         self.db_path = db_path
         self.db = Database(db_path)
+        
+        # Coalesces the per-image updates of AI batches and scans
+        self.write_buffer = WriteBehindBuffer(self.db)
         logger.info(f"Database operations initialized for: {db_path}")
         
+    @write_operation(failure_result=None)
     def add_folder(self, folder_path):
         """Add a folder to monitor for images.
         
@@ -123,6 +167,7 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
+    @write_operation(failure_result=False)
     def remove_folder(self, folder_id):
         """Remove a folder from monitoring.
         
@@ -192,6 +237,7 @@ class DatabaseOperations:
         # Then convert to os-specific path format
         return os.path.normpath(normalized)
     
+    @write_operation(failure_result=None)
     def add_image(self, folder_id, filename, full_path, file_size, file_hash=None, thumbnail_path=None, ai_description=None, image_format=None):
         """Add an image to the database.
         
@@ -241,17 +287,23 @@ class DatabaseOperations:
                 creation_date = datetime.now()
                 last_modified_date = datetime.now()
                 
+            # Place the image in the directory hierarchy of its folder
+            directory_id = None
+            folder_path = get_folder_paths(conn.conn, [folder_id]).get(folder_id)
+            if folder_path:
+                directory_id = resolve_directory(conn.conn, folder_id, folder_path, full_path)
+                
             # Add the image
             cursor = conn.execute(
                 """INSERT INTO images (
                     folder_id, filename, full_path, file_size, file_hash,
                     creation_date, last_modified_date, thumbnail_path,
-                    ai_description, last_scanned, format, date_added
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    ai_description, last_scanned, format, date_added, directory_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
                 (
                     folder_id, filename, full_path, file_size, file_hash,
                     creation_date, last_modified_date, thumbnail_path,
-                    ai_description, datetime.now(), image_format, datetime.now()
+                    ai_description, datetime.now(), image_format, datetime.now(), directory_id
                 )
             )
             if not cursor:
@@ -279,7 +331,145 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
-    def update_image_description(self, image_id, ai_description=None, user_description=None, retry_count=0):
+    @write_operation(failure_result=None)
+    def add_images_bulk(self, images):
+        """Add or update many images in one transaction.
+        
+        Rows are written with multi-row INSERT ... ON CONFLICT(full_path) DO UPDATE
+        statements. Images already in the database get their file metadata
+        refreshed; existing descriptions are kept unless a new one is given.
+        
+        Args:
+            images (list): Image dictionaries with the add_image() arguments as
+                keys (folder_id, filename, full_path, file_size and optionally
+                file_hash, thumbnail_path, ai_description, image_format).
+                hash_algorithm names the algorithm of file_hash. Optional
+                creation_date, last_modified_date, width and height keys
+                avoid stat()-ing the file again; file_mtime_ns and
+                file_inode record the file in the scan manifest.
+                
+        Returns:
+            list: The image_id for each input image (None where a row could not
+                be written), or None if the batch failed
+        """
+        if not images:
+            return []
+            
+        conn = self.db.get_connection()
+        if not conn:
+            return None
+            
+        try:
+            # Begin transaction
+            if not conn.begin_transaction():
+                raise Exception("Failed to begin transaction")
+                
+            columns = list(BULK_INSERT_COLUMNS)
+            
+            # Images are placed in the directory hierarchy of their folder
+            folder_paths = get_folder_paths(conn.conn, {image["folder_id"] for image in images})
+            directories = {}
+            
+            now = datetime.now()
+            rows = []
+            for image in images:
+                full_path = self._normalize_path(image["full_path"])
+                thumbnail_path = image.get("thumbnail_path")
+                if thumbnail_path:
+                    thumbnail_path = self._normalize_path(thumbnail_path)
+                    
+                creation_date = image.get("creation_date")
+                last_modified_date = image.get("last_modified_date")
+                if creation_date is None or last_modified_date is None:
+                    try:
+                        stat = os.stat(full_path)
+                        creation_date = creation_date or datetime.fromtimestamp(stat.st_ctime)
+                        last_modified_date = last_modified_date or datetime.fromtimestamp(stat.st_mtime)
+                    except OSError:
+                        creation_date = creation_date or now
+                        last_modified_date = last_modified_date or now
+                        
+                folder_id = image["folder_id"]
+                directory_id = None
+                if folder_id in folder_paths:
+                    directory_id = resolve_directory(
+                        conn.conn, folder_id, folder_paths[folder_id], full_path, directories
+                    )
+                    
+                values = {
+                    "folder_id": folder_id,
+                    "filename": image.get("filename") or os.path.basename(full_path),
+                    "full_path": full_path,
+                    "file_size": image.get("file_size"),
+                    "file_hash": image.get("file_hash"),
+                    "hash_algorithm": image.get("hash_algorithm"),
+                    "creation_date": creation_date,
+                    "last_modified_date": last_modified_date,
+                    "thumbnail_path": thumbnail_path,
+                    "ai_description": image.get("ai_description"),
+                    "last_scanned": now,
+                    "format": image.get("image_format"),
+                    "date_added": now,
+                    "width": image.get("width"),
+                    "height": image.get("height"),
+                    "directory_id": directory_id,
+                    "file_mtime_ns": image.get("file_mtime_ns"),
+                    "file_inode": image.get("file_inode"),
+                }
+                rows.append(tuple(values[column] for column in columns))
+                
+            updates = ", ".join(f"{column} = {BULK_UPSERT_SET_SQL.get(column, 'excluded.' + column)}"
+                                for column in columns if column not in BULK_INSERT_KEEP)
+            row_sql = "(" + ", ".join("?" for _ in columns) + ")"
+            use_returning = sqlite3.sqlite_version_info >= (3, 35, 0)
+            
+            image_ids = {}
+            rows_per_statement = max(1, BULK_MAX_VARIABLES // len(columns))
+            for start in range(0, len(rows), rows_per_statement):
+                chunk = rows[start:start + rows_per_statement]
+                query = (
+                    f"INSERT INTO images ({', '.join(columns)}) "
+                    f"VALUES {', '.join(row_sql for _ in chunk)} "
+                    f"ON CONFLICT(full_path) DO UPDATE SET {updates}"
+                )
+                params = [value for row in chunk for value in row]
+                
+                if use_returning:
+                    cursor = conn.execute(query + " RETURNING image_id, full_path", params)
+                    if not cursor:
+                        raise Exception("Failed to insert images")
+                else:
+                    # RETURNING needs SQLite 3.35; look the IDs up instead
+                    if not conn.execute(query, params):
+                        raise Exception("Failed to insert images")
+                    paths = [row[2] for row in chunk]
+                    cursor = conn.execute(
+                        f"SELECT image_id, full_path FROM images WHERE full_path IN ({', '.join('?' for _ in paths)})",
+                        paths
+                    )
+                    if not cursor:
+                        raise Exception("Failed to look up inserted images")
+                        
+                # RETURNING rows come back in no particular order
+                for row in cursor.fetchall():
+                    image_ids[row[1]] = row[0]
+                    
+            # Commit the transaction
+            if not conn.commit():
+                raise Exception("Failed to commit transaction")
+                
+            logger.debug(f"Bulk added {len(rows)} images")
+            return [image_ids.get(row[2]) for row in rows]
+            
+        except Exception as e:
+            logger.error(f"Error bulk adding images: {e}")
+            conn.rollback()
+            return None
+            
+        finally:
+            conn.disconnect()
+            
+    def update_image_description(self, image_id, ai_description=None, user_description=None, retry_count=0, wait=True):
         """Update the AI or user description for an image.
         
         Args:
@@ -287,18 +477,151 @@ class DatabaseOperations:
             ai_description (str, optional): AI-generated description to update
             user_description (str, optional): User-provided description to update
             retry_count (int): Number of times this operation has been retried
+            wait (bool): Wait for the write to be committed. When False a
+                Future resolving to the result is returned instead.
             
         Returns:
             bool: True if successful, False otherwise
         """
+        # Validate inputs
+        if ai_description is None and user_description is None:
+            logger.warning("No description provided for update")
+            return False
+            
+        # This write replaces what is buffered for the same fields
+        self.write_buffer.discard_description(image_id, ai_description, user_description)
+        
+        if not wait:
+            return self.db.submit_write(
+                lambda conn: self.update_image_description(image_id, ai_description, user_description, retry_count)
+            )
+            
         # Maximum number of repair attempts
         MAX_RETRIES = 1
         
-        # Validate inputs
+        try:
+            return self._write_image_description(image_id, ai_description, user_description, wait=False).result()
+            
+        except sqlite3.DatabaseError as sqlite_error:
+            # Handle database corruption. The repair runs here, outside the
+            # writer thread, once the failed write has been rolled back.
+            error_msg = str(sqlite_error).lower()
+            
+            # Check if this is a corruption error
+            if "malformed" in error_msg or "corrupt" in error_msg or "disk i/o error" in error_msg:
+                logger.error(f"Database corruption detected: {sqlite_error}")
+                
+                # Attempt repair if we haven't exceeded retry limit
+                if retry_count < MAX_RETRIES and not self.db.writer.is_writer_thread():
+                    logger.warning("Attempting database repair...")
+                    
+                    # Force close all database connections
+                    self.db.close_all_connections()
+                    
+                    # Import repair function here to avoid circular imports
+                    from src.database.db_repair import repair_database
+                    
+                    # Try to repair the database
+                    repair_success = repair_database(self.db_path)
+                    
+                    if repair_success:
+                        logger.info("Database repair successful, retrying operation")
+                        # Retry the operation with incremented retry count
+                        return self.update_image_description(image_id, ai_description, user_description, retry_count + 1)
+                    else:
+                        logger.error("Database repair failed")
+                else:
+                    logger.error(f"Maximum retry attempts ({MAX_RETRIES}) reached for database repair")
+            
+            logger.error(f"Database error updating image description: {sqlite_error}")
+            return False
+        except Exception as e:
+            logger.error(f"Error updating image description: {e}")
+            return False
+            
+    def queue_image_description(self, image_id, ai_description=None, user_description=None):
+        """Buffer a description update to be written with others.
+        
+        Used for the steady stream of AI results; the update is committed
+        within the buffer's flush interval.
+        
+        Args:
+            image_id (int): ID of the image to update
+            ai_description (str, optional): AI-generated description to update
+            user_description (str, optional): User-provided description to update
+            
+        Returns:
+            concurrent.futures.Future: Resolves once the update is committed,
+                or None if no description was given
+        """
         if ai_description is None and user_description is None:
             logger.warning("No description provided for update")
-            return False
+            return None
+        return self.write_buffer.queue_description(image_id, ai_description, user_description)
+        
+    def queue_image_dimensions(self, image_id, width, height):
+        """Buffer a dimensions update to be written with others.
+        
+        Args:
+            image_id (int): ID of the image to update
+            width (int): Width of the image in pixels
+            height (int): Height of the image in pixels
+            
+        Returns:
+            concurrent.futures.Future: Resolves once the update is committed,
+                or None if the dimensions are invalid
+        """
+        try:
+            width = int(width)
+            height = int(height)
+        except (ValueError, TypeError):
+            logger.error(f"Invalid dimensions for image {image_id}: width={width}, height={height}")
+            return None
+            
+        if width <= 0 or height <= 0:
+            logger.warning(f"Skipping dimension update for image {image_id} - invalid dimensions")
+            return None
+        return self.write_buffer.queue_dimensions(image_id, width, height)
+        
+    def queue_image_path(self, image_id, new_filename, new_full_path):
+        """Buffer a filename and path update to be written with others.
+        
+        Args:
+            image_id (int): ID of the image to update
+            new_filename (str): New filename for the image
+            new_full_path (str): New full path for the image
+            
+        Returns:
+            concurrent.futures.Future: Resolves once the update is committed
+        """
+        return self.write_buffer.queue_path(image_id, new_filename, self._normalize_path(new_full_path))
+        
+    def flush_writes(self, wait=True):
+        """Write the buffered updates now.
+        
+        Args:
+            wait (bool): Wait until they are committed
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self.write_buffer.flush(wait=wait)
+        
+    @write_operation(failure_result=False)
+    def _write_image_description(self, image_id, ai_description, user_description):
+        """Write an image description on the writer thread.
+        
+        Database errors are re-raised so update_image_description() can
+        repair a corrupted database.
+        
+        Args:
+            image_id (int): ID of the image to update
+            ai_description (str): AI-generated description, or None to keep it
+            user_description (str): User-provided description, or None to keep it
             
+        Returns:
+            bool: True if successful, False otherwise
+        """
         conn = self.db.get_connection()
         if not conn:
             return False
@@ -342,42 +665,9 @@ class DatabaseOperations:
             logger.debug(f"Updated description for image ID: {image_id}")
             return True
             
-        except sqlite3.DatabaseError as sqlite_error:
-            # Handle database corruption
-            error_msg = str(sqlite_error).lower()
+        except sqlite3.DatabaseError:
             conn.rollback()
-            
-            # Check if this is a corruption error
-            if "malformed" in error_msg or "corrupt" in error_msg or "disk i/o error" in error_msg:
-                logger.error(f"Database corruption detected: {sqlite_error}")
-                
-                # Attempt repair if we haven't exceeded retry limit
-                if retry_count < MAX_RETRIES:
-                    logger.warning("Attempting database repair...")
-                    
-                    # Make sure to disconnect this connection
-                    conn.disconnect()
-                    
-                    # Force close all database connections
-                    self.db.close_all_connections()
-                    
-                    # Import repair function here to avoid circular imports
-                    from src.database.db_repair import repair_database
-                    
-                    # Try to repair the database
-                    repair_success = repair_database(self.db_path)
-                    
-                    if repair_success:
-                        logger.info("Database repair successful, retrying operation")
-                        # Retry the operation with incremented retry count
-                        return self.update_image_description(image_id, ai_description, user_description, retry_count + 1)
-                    else:
-                        logger.error("Database repair failed")
-                else:
-                    logger.error(f"Maximum retry attempts ({MAX_RETRIES}) reached for database repair")
-            
-            logger.error(f"Database error updating image description: {sqlite_error}")
-            return False
+            raise
         except Exception as e:
             logger.error(f"Error updating image description: {e}")
             conn.rollback()
@@ -386,13 +676,22 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
-    def search_images(self, query, limit=100, offset=0):
-        """Search for images based on their descriptions.
+    def _search_descriptions(self, query, folder_id=None, limit=100, offset=0, directory_id=None):
+        """Search image descriptions and filenames, optionally within one folder or directory.
+        
+        Terms that look like file name pieces ("IMG_20", "0042") are matched as
+        substrings of the file name and descriptions through the trigram index,
+        when the database has one; the remaining words are translated into an
+        FTS5 expression and ranked with bm25(). If the indexes find nothing
+        for the whole query (or the FTS query fails), every page is searched
+        as a substring instead so infix matches are still found.
         
         Args:
-            query (str): Search query to match against descriptions
+            query (str): Search query as typed by the user
+            folder_id (int, optional): ID of the folder to search within
             limit (int, optional): Maximum number of results to return
             offset (int, optional): Offset for pagination
+            directory_id (int, optional): ID of the directory whose subtree to search
             
         Returns:
             list: List of image dictionaries matching the search criteria
@@ -402,53 +701,84 @@ class DatabaseOperations:
             return []
             
         try:
-            # Use full-text search if available
-            try:
-                # Try FTS query first
+            folder_clause = ""
+            folder_params = ()
+            if folder_id is not None:
+                folder_clause += " AND i.folder_id = ?"
+                folder_params += (folder_id,)
+            if directory_id is not None:
+                folder_clause += " AND " + subtree_condition()
+                folder_params += (directory_id,)
+            images = []
+            
+            # File name fragments go to the trigram index, words to the FTS index
+            query = query.strip()
+            trigram = has_trigram_index(conn.conn)
+            fragments, words = split_substring_terms(query) if trigram else ([], query)
+            conditions = []
+            values = []
+            for fragment in fragments:
+                condition, condition_values = substring_condition(fragment)
+                conditions.append(condition)
+                values.extend(condition_values)
+                
+            from_clause = "images i"
+            order_by = "i.last_modified_date DESC"
+            match, exclude = build_match_expression(words)
+            if match:
+                from_clause = "image_fts JOIN images i ON i.image_id = image_fts.rowid"
+                conditions.append("image_fts MATCH ?")
+                values.append(match)
+                order_by = f"{BM25_RANK_SQL}, {order_by}"
+            if exclude:
+                conditions.append("i.image_id NOT IN (SELECT rowid FROM image_fts WHERE image_fts MATCH ?)")
+                values.append(exclude)
+                
+            # Every page of a query comes from the same plan, so the fallback
+            # only runs when the indexes have no hits on any page
+            use_fallback = not conditions
+            if conditions:
+                where = f"{' AND '.join(conditions)}{folder_clause}"
                 cursor = conn.execute(
-                    """SELECT i.* FROM images i
-                    JOIN image_fts f ON i.image_id = f.image_id
-                    WHERE image_fts MATCH ?
-                    ORDER BY i.last_modified_date DESC
+                    f"""SELECT i.* FROM {from_clause}
+                    WHERE {where}
+                    ORDER BY {order_by}
                     LIMIT ? OFFSET ?""",
-                    (query, limit, offset)
+                    tuple(values) + folder_params + (limit, offset)
                 )
-                if cursor and cursor.fetchone():
-                    # Reset cursor and fetch all results
-                    cursor = conn.execute(
-                        """SELECT i.* FROM images i
-                        JOIN image_fts f ON i.image_id = f.image_id
-                        WHERE image_fts MATCH ?
-                        ORDER BY i.last_modified_date DESC
-                        LIMIT ? OFFSET ?""",
-                        (query, limit, offset)
-                    )
+                if cursor:
+                    images = [dict(row) for row in cursor.fetchall()]
+                if not images:
+                    if offset:
+                        # A page past the last index hit still has hits before it
+                        cursor = conn.execute(
+                            f"SELECT EXISTS (SELECT 1 FROM {from_clause} WHERE {where})",
+                            tuple(values) + folder_params
+                        )
+                        use_fallback = not (cursor and cursor.fetchone()[0])
+                    else:
+                        use_fallback = True
+                    
+            if use_fallback:
+                # Fall back to a substring search, from the trigram index when possible
+                if len(query) >= MIN_SUBSTRING_LENGTH and trigram:
+                    condition, condition_values = substring_condition(query)
                 else:
-                    # Fall back to LIKE query
                     search_term = f"%{query}%"
-                    cursor = conn.execute(
-                        """SELECT * FROM images
-                        WHERE ai_description LIKE ? OR user_description LIKE ?
-                        ORDER BY last_modified_date DESC
-                        LIMIT ? OFFSET ?""",
-                        (search_term, search_term, limit, offset)
-                    )
-            except sqlite3.Error:
-                # Fall back to LIKE query if FTS fails
-                search_term = f"%{query}%"
+                    condition = "(i.ai_description LIKE ? OR i.user_description LIKE ? OR i.filename LIKE ?)"
+                    condition_values = [search_term, search_term, search_term]
                 cursor = conn.execute(
-                    """SELECT * FROM images
-                    WHERE ai_description LIKE ? OR user_description LIKE ?
-                    ORDER BY last_modified_date DESC
+                    f"""SELECT i.* FROM images i
+                    WHERE {condition}{folder_clause}
+                    ORDER BY i.last_modified_date DESC
                     LIMIT ? OFFSET ?""",
-                    (search_term, search_term, limit, offset)
+                    tuple(condition_values) + folder_params + (limit, offset)
                 )
-                
-            if not cursor:
-                raise Exception("Failed to search images")
-                
-            # Convert to list of dictionaries
-            images = [dict(row) for row in cursor.fetchall()]
+                if not cursor:
+                    raise Exception("Failed to search images")
+                    
+                # Convert to list of dictionaries
+                images = [dict(row) for row in cursor.fetchall()]
             
             return images
             
@@ -459,6 +789,19 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
+    def search_images(self, query, limit=100, offset=0):
+        """Search for images based on their descriptions.
+        
+        Args:
+            query (str): Search query to match against descriptions
+            limit (int, optional): Maximum number of results to return
+            offset (int, optional): Offset for pagination
+            
+        Returns:
+            list: List of image dictionaries matching the search criteria
+        """
+        return self._search_descriptions(query, None, limit, offset)
+            
     def search_images_in_folder(self, folder_id, query, limit=100, offset=0):
         """Search for images based on their descriptions within a specific folder.
         
@@ -471,77 +814,31 @@ class DatabaseOperations:
         Returns:
             list: List of image dictionaries matching the search criteria in the specified folder
         """
-        conn = self.db.get_connection()
-        if not conn:
-            return []
-            
-        try:
-            # Use full-text search if available and filter by folder_id
-            try:
-                # Try FTS query first with folder_id filter
-                cursor = conn.execute(
-                    """SELECT i.* FROM images i
-                    JOIN image_fts f ON i.image_id = f.image_id
-                    WHERE image_fts MATCH ? AND i.folder_id = ?
-                    ORDER BY i.last_modified_date DESC
-                    LIMIT ? OFFSET ?""",
-                    (query, folder_id, limit, offset)
-                )
-                if cursor and cursor.fetchone():
-                    # Reset cursor and fetch all results
-                    cursor = conn.execute(
-                        """SELECT i.* FROM images i
-                        JOIN image_fts f ON i.image_id = f.image_id
-                        WHERE image_fts MATCH ? AND i.folder_id = ?
-                        ORDER BY i.last_modified_date DESC
-                        LIMIT ? OFFSET ?""",
-                        (query, folder_id, limit, offset)
-                    )
-                else:
-                    # Fall back to LIKE query with folder_id filter
-                    search_term = f"%{query}%"
-                    cursor = conn.execute(
-                        """SELECT * FROM images
-                        WHERE (ai_description LIKE ? OR user_description LIKE ?)
-                        AND folder_id = ?
-                        ORDER BY last_modified_date DESC
-                        LIMIT ? OFFSET ?""",
-                        (search_term, search_term, folder_id, limit, offset)
-                    )
-            except sqlite3.Error:
-                # Fall back to LIKE query if FTS fails
-                search_term = f"%{query}%"
-                cursor = conn.execute(
-                    """SELECT * FROM images
-                    WHERE (ai_description LIKE ? OR user_description LIKE ?)
-                    AND folder_id = ?
-                    ORDER BY last_modified_date DESC
-                    LIMIT ? OFFSET ?""",
-                    (search_term, search_term, folder_id, limit, offset)
-                )
-                
-            if not cursor:
-                raise Exception("Failed to search images in folder")
-                
-            # Convert to list of dictionaries
-            images = [dict(row) for row in cursor.fetchall()]
-            
-            return images
+        return self._search_descriptions(query, folder_id, limit, offset)
             
-        except Exception as e:
-            logger.error(f"Error searching images in folder: {e}")
-            return []
+    def search_images_in_directory(self, directory_id, query, limit=100, offset=0):
+        """Search for images based on their descriptions within a directory and its subdirectories.
+        
+        Args:
+            directory_id (int): ID of the directory to search within
+            query (str): Search query to match against descriptions
+            limit (int, optional): Maximum number of results to return
+            offset (int, optional): Offset for pagination
             
-        finally:
-            conn.disconnect()
+        Returns:
+            list: List of image dictionaries matching the search criteria in the directory tree
+        """
+        return self._search_descriptions(query, None, limit, offset, directory_id)
             
-    def get_images_for_folder(self, folder_id, limit=10000000, offset=0):
+    def get_images_for_folder(self, folder_id, limit=10000000, offset=0, grid=False):
         """Get images for a specific folder.
         
         Args:
             folder_id (int): ID of the folder to get images for
             limit (int, optional): Maximum number of results to return
             offset (int, optional): Offset for pagination
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows (GRID_COLUMNS), read from the covering grid index
             
         Returns:
             list: List of image dictionaries in the folder
@@ -552,10 +849,11 @@ class DatabaseOperations:
             
         try:
             # Execute query
+            columns = grid_columns_sql() if grid else "i.*"
             cursor = conn.execute(
-                """SELECT * FROM images
-                WHERE folder_id = ?
-                ORDER BY last_modified_date DESC
+                f"""SELECT {columns} FROM images i
+                WHERE i.folder_id = ?
+                ORDER BY i.last_modified_date DESC, i.image_id DESC
                 LIMIT ? OFFSET ?""",
                 (folder_id, limit, offset)
             )
@@ -574,24 +872,340 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
 
-    def get_images_by_date_range(self, from_date, to_date, limit=1000000, offset=0):
-        """Get images within a specific date range.
-        
+    def _get_images_page(self, from_clause, conditions, values, page_token, page_size, description, grid=False):
+        """Fetch one page of a listing ordered by (last_modified_date, image_id).
+
+        The page starts right after the position stored in page_token, so the
+        cost of a page does not grow with how deep into the listing it is.
+
         Args:
-            from_date (str): Start date in 'YYYY-MM-DD HH:MM:SS' format
-            to_date (str): End date in 'YYYY-MM-DD HH:MM:SS' format
-            limit (int, optional): Maximum number of results to return
-            offset (int, optional): Offset for pagination
-            
+            from_clause (str): FROM clause; the images table must be aliased as i
+            conditions (list): WHERE conditions selecting the listing
+            values (list): Parameters for the conditions
+            page_token (str): Token returned with the previous page, or None
+            page_size (int): Number of images per page
+            description (str): What is being listed, for error messages
+            grid (bool): Select only the grid columns instead of whole rows
+
         Returns:
-            list: List of image dictionaries within the date range
+            tuple: (images, next_token) where next_token is None on the last page
         """
         conn = self.db.get_connection()
         if not conn:
-            return []
-            
+            return [], None
+
         try:
-            # Execute query checking only last_modified_date as per Phase 3 requirements
+            position = decode_page_token(page_token)
+            rows = []
+
+            for condition, condition_values in keyset_segments(position.get("key")):
+                segment_conditions = list(conditions)
+                if condition:
+                    segment_conditions.append(condition)
+
+                query = f"SELECT {grid_columns_sql() if grid else 'i.*'} FROM {from_clause}"
+                if segment_conditions:
+                    query += " WHERE " + " AND ".join(segment_conditions)
+                query += " ORDER BY " + KEYSET_ORDER_SQL.format(alias="i") + " LIMIT ?"
+
+                segment_values = tuple(values) + tuple(condition_values) + (page_size + 1 - len(rows),)
+                cursor = conn.execute(query, segment_values)
+                if not cursor:
+                    raise Exception(f"Failed to get page of {description}")
+
+                rows.extend(dict(row) for row in cursor.fetchall())
+                if len(rows) > page_size:
+                    break
+
+            return split_page(rows, page_size)
+
+        except Exception as e:
+            logger.error(f"Error getting page of {description}: {e}")
+            return [], None
+
+        finally:
+            conn.disconnect()
+
+    def get_images_for_folder_page(self, folder_id, page_token=None, page_size=200, grid=False):
+        """Get one page of images for a specific folder.
+
+        Args:
+            folder_id (int): ID of the folder to get images for
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows (GRID_COLUMNS), read from the covering grid index
+
+        Returns:
+            tuple: (images, next_token) where next_token is None on the last page
+        """
+        return self._get_images_page(
+            "images i", ["i.folder_id = ?"], [folder_id],
+            page_token, page_size, "images for folder", grid
+        )
+
+    def get_all_images_page(self, page_token=None, page_size=200, grid=False):
+        """Get one page of images from all enabled folders.
+
+        Args:
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows (GRID_COLUMNS), read from the covering grid index
+
+        Returns:
+            tuple: (images, next_token) where next_token is None on the last page
+        """
+        # The unary + keeps SQLite from driving the query through the folder
+        # index, which would need a sort over every image; the date index
+        # returns rows already in page order.
+        return self._get_images_page(
+            "images i", ["+i.folder_id IN (SELECT folder_id FROM folders WHERE enabled = 1)"], [],
+            page_token, page_size, "all images", grid
+        )
+
+    def get_images_for_catalog_page(self, catalog_id, page_token=None, page_size=200, grid=False):
+        """Get one page of images for a specific catalog.
+
+        Args:
+            catalog_id (int): ID of the catalog to get images for
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows (GRID_COLUMNS)
+
+        Returns:
+            tuple: (images, next_token) where next_token is None on the last page
+        """
+        return self._get_images_page(
+            "images i JOIN image_catalog_mapping m ON i.image_id = m.image_id",
+            ["m.catalog_id = ?"], [catalog_id],
+            page_token, page_size, "images for catalog", grid
+        )
+
+    def get_directory(self, directory_id):
+        """Get a directory of the folder hierarchy by its ID.
+
+        Args:
+            directory_id (int): ID of the directory to get
+
+        Returns:
+            dict: Directory data (directory_id, folder_id, parent_id, path, name)
+                or None if not found
+        """
+        conn = self.db.get_connection()
+        if not conn:
+            return None
+
+        try:
+            cursor = conn.execute("SELECT * FROM directories WHERE directory_id = ?", (directory_id,))
+            if not cursor:
+                raise Exception("Failed to get directory")
+
+            directory = cursor.fetchone()
+            return dict(directory) if directory else None
+
+        except Exception as e:
+            logger.error(f"Error getting directory by ID: {e}")
+            return None
+
+        finally:
+            conn.disconnect()
+
+    def get_subdirectories(self, folder_id, directory_id=None):
+        """Get the subdirectories of a directory with the number of images below each.
+
+        The counts are computed when asked for, through the closure table, so
+        a tree view can load them one level at a time as it is expanded.
+        Directories with no images left below them are left out.
+
+        Args:
+            folder_id (int): ID of the monitored folder
+            directory_id (int, optional): ID of the parent directory; None for
+                the top level directories of the folder
+
+        Returns:
+            list: Directory dictionaries (directory_id, folder_id, path, name,
+                image_count, has_children) ordered by name
+        """
+        conn = self.db.get_connection()
+        if not conn:
+            return []
+
+        try:
+            if directory_id is None:
+                parent_sql = "(SELECT directory_id FROM directories WHERE folder_id = ? AND parent_id IS NULL)"
+                parent_params = (folder_id,)
+            else:
+                parent_sql = "?"
+                parent_params = (directory_id,)
+
+            cursor = conn.execute(
+                f"""SELECT * FROM (
+                    SELECT d.directory_id, d.folder_id, d.path, d.name,
+                        (SELECT COUNT(*) FROM directory_closure c
+                         JOIN images i ON i.directory_id = c.descendant_id
+                         WHERE c.ancestor_id = d.directory_id) AS image_count,
+                        EXISTS (SELECT 1 FROM directory_closure c
+                                JOIN images i ON i.directory_id = c.descendant_id
+                                WHERE c.ancestor_id = d.directory_id AND c.depth > 0) AS has_children
+                    FROM directories d
+                    WHERE d.parent_id = {parent_sql}
+                ) WHERE image_count > 0
+                ORDER BY name COLLATE NOCASE""",
+                parent_params
+            )
+            if not cursor:
+                raise Exception("Failed to get subdirectories")
+
+            return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            logger.error(f"Error getting subdirectories: {e}")
+            return []
+
+        finally:
+            conn.disconnect()
+
+    def _directory_scope(self, directory_id):
+        """Build the condition selecting the images in a directory and below it.
+
+        A folder's root directory holds all of its images, so it is listed
+        through the folder instead of the closure table.
+
+        Args:
+            directory_id (int): ID of the directory
+
+        Returns:
+            tuple: (condition, values), or (None, None) if the directory does not exist
+        """
+        directory = self.get_directory(directory_id)
+        if not directory:
+            return None, None
+        if directory["parent_id"] is None:
+            return "i.folder_id = ?", [directory["folder_id"]]
+        return subtree_condition(), [directory_id]
+
+    def get_images_for_directory_page(self, directory_id, page_token=None, page_size=200, grid=False):
+        """Get one page of images in a directory and its subdirectories.
+
+        Args:
+            directory_id (int): ID of the directory to get images for
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+            grid (bool, optional): Return only the columns the thumbnail grid
+                shows (GRID_COLUMNS), read from the covering directory index
+
+        Returns:
+            tuple: (images, next_token) where next_token is None on the last page
+        """
+        condition, values = self._directory_scope(directory_id)
+        if condition is None:
+            return [], None
+
+        return self._get_images_page(
+            "images i", [condition], values,
+            page_token, page_size, "images for directory", grid
+        )
+
+    def get_image_count_for_directory(self, directory_id):
+        """Get the number of images in a directory and its subdirectories.
+
+        Args:
+            directory_id (int): ID of the directory to count images for
+
+        Returns:
+            int: Number of images in the directory tree
+        """
+        directory = self.get_directory(directory_id)
+        if not directory:
+            return 0
+        if directory["parent_id"] is None:
+            # The root directory holds the whole folder, which has a maintained counter
+            return self.get_image_count_for_folder(directory["folder_id"])
+
+        conn = self.db.get_connection()
+        if not conn:
+            return 0
+
+        try:
+            cursor = conn.execute(f"SELECT COUNT(*) FROM images i WHERE {subtree_condition()}", (directory_id,))
+            if not cursor:
+                raise Exception("Failed to count images for directory")
+
+            return cursor.fetchone()[0]
+
+        except Exception as e:
+            logger.error(f"Error counting images for directory {directory_id}: {e}")
+            return 0
+
+        finally:
+            conn.disconnect()
+
+    def get_image_descriptions(self, image_ids):
+        """Get the descriptions of images listed without them.
+
+        Grid listings leave the descriptions out; this fetches them for the
+        images that need them.
+
+        Args:
+            image_ids (list): IDs of the images
+
+        Returns:
+            dict: image_id -> {'ai_description': str, 'user_description': str}
+        """
+        image_ids = list(dict.fromkeys(image_ids))
+        if not image_ids:
+            return {}
+
+        conn = self.db.get_connection()
+        if not conn:
+            return {}
+
+        try:
+            descriptions = {}
+            for start in range(0, len(image_ids), BULK_MAX_VARIABLES):
+                chunk = image_ids[start:start + BULK_MAX_VARIABLES]
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor = conn.execute(
+                    f"""SELECT image_id, ai_description, user_description FROM images
+                    WHERE image_id IN ({placeholders})""",
+                    chunk
+                )
+                if not cursor:
+                    raise Exception("Failed to get image descriptions")
+                for row in cursor.fetchall():
+                    descriptions[row['image_id']] = {
+                        "ai_description": row['ai_description'],
+                        "user_description": row['user_description'],
+                    }
+            return descriptions
+
+        except Exception as e:
+            logger.error(f"Error getting image descriptions: {e}")
+            return {}
+
+        finally:
+            conn.disconnect()
+
+    def get_images_by_date_range(self, from_date, to_date, limit=1000000, offset=0):
+        """Get images within a specific date range.
+        
+        Args:
+            from_date (str): Start date in 'YYYY-MM-DD HH:MM:SS' format
+            to_date (str): End date in 'YYYY-MM-DD HH:MM:SS' format
+            limit (int, optional): Maximum number of results to return
+            offset (int, optional): Offset for pagination
+            
+        Returns:
+            list: List of image dictionaries within the date range
+        """
+        conn = self.db.get_connection()
+        if not conn:
+            return []
+            
+        try:
+            # Execute query checking only last_modified_date as per Phase 3 requirements
             # This focuses search on when the file was last modified
             cursor = conn.execute(
                 """SELECT * FROM images
@@ -649,7 +1263,7 @@ class DatabaseOperations:
             query = f"""
                 SELECT * FROM images
                 WHERE folder_id IN ({placeholders})
-                ORDER BY last_modified_date DESC
+                ORDER BY last_modified_date DESC, image_id DESC
                 LIMIT ? OFFSET ?
             """
             
@@ -672,59 +1286,157 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
-    def get_image_count(self):
-        """Get the total number of images in the database.
+    def _get_image_row_type(self, columns):
+        """Validate requested image columns and get the row type for them.
         
+        Args:
+            columns (tuple): Column names from the images table
+            
         Returns:
-            int: Total number of images
+            type: namedtuple class with one field per column
         """
+        columns = tuple(columns)
+        row_type = _IMAGE_ROW_TYPES.get(columns)
+        if row_type is not None:
+            return row_type
+            
+        if not columns:
+            raise ValueError("iter_images() needs at least one column")
+            
         conn = self.db.get_connection()
         if not conn:
-            return 0
+            raise sqlite3.OperationalError("Could not connect to the database")
             
         try:
-            # Execute query to count all images
-            cursor = conn.execute("SELECT COUNT(*) as count FROM images")
-            if not cursor:
-                raise Exception("Failed to count images")
-                
-            result = cursor.fetchone()
-            if not result:
-                return 0
-                
-            return result['count']
-            
-        except Exception as e:
-            logger.error(f"Error counting images: {e}")
-            return 0
-            
+            known = {row[1] for row in conn.conn.execute("PRAGMA table_info(images)").fetchall()}
         finally:
             conn.disconnect()
             
-    def get_image_count_for_folder(self, folder_id):
-        """Get the number of images in a specific folder.
+        unknown = [column for column in columns if column not in known]
+        if unknown:
+            raise ValueError(f"Unknown image columns: {', '.join(unknown)}")
+            
+        row_type = namedtuple("ImageRow", columns)
+        _IMAGE_ROW_TYPES[columns] = row_type
+        return row_type
+        
+    def iter_images(self, filter=None, batch_size=1000, columns=("image_id", "full_path")):
+        """Stream images in image_id order without loading the library into memory.
+        
+        Rows are read in chunks of batch_size with a keyset condition on
+        image_id. Each chunk uses its own short read, so no snapshot is held
+        while the caller works and images added or removed meanwhile may or
+        may not be included.
         
         Args:
-            folder_id (int): ID of the folder to count images for
+            filter (dict, optional): Any of folder_id (int), catalog_id (int)
+                and image_ids (iterable of int); all given conditions apply
+            batch_size (int, optional): Rows fetched per query
+            columns (tuple, optional): Columns of the images table to return
+            
+        Yields:
+            ImageRow: namedtuple with the requested columns, in that order
+            
+        Raises:
+            ValueError: If a column or filter key is unknown
+        """
+        filter = dict(filter or {})
+        unknown = set(filter) - {"folder_id", "catalog_id", "image_ids"}
+        if unknown:
+            raise ValueError(f"Unknown image filter: {', '.join(sorted(unknown))}")
+            
+        row_type = self._get_image_row_type(columns)
+        batch_size = max(1, int(batch_size))
+        
+        # image_id drives the keyset; select it even when it is not returned
+        select_columns = ", ".join(f"i.{column}" for column in ("image_id",) + row_type._fields)
+        
+        from_clause = "images i"
+        conditions = []
+        values = []
+        if filter.get("catalog_id") is not None:
+            from_clause += " JOIN image_catalog_mapping m ON m.image_id = i.image_id"
+            conditions.append("m.catalog_id = ?")
+            values.append(filter["catalog_id"])
+        if filter.get("folder_id") is not None:
+            conditions.append("i.folder_id = ?")
+            values.append(filter["folder_id"])
+            
+        image_ids = None
+        if filter.get("image_ids") is not None:
+            image_ids = sorted(set(filter["image_ids"]))
+            # Keep the IN list within the bound parameter limit
+            batch_size = min(batch_size, BULK_MAX_VARIABLES - len(values) - 2)
+            
+        last_id = None
+        while True:
+            chunk_conditions = list(conditions)
+            chunk_values = list(values)
+            if image_ids is not None:
+                chunk_ids = image_ids[:batch_size]
+                image_ids = image_ids[batch_size:]
+                if not chunk_ids:
+                    return
+                chunk_conditions.append(f"i.image_id IN ({', '.join('?' for _ in chunk_ids)})")
+                chunk_values.extend(chunk_ids)
+            elif last_id is not None:
+                chunk_conditions.append("i.image_id > ?")
+                chunk_values.append(last_id)
+                
+            where_clause = f"WHERE {' AND '.join(chunk_conditions)}" if chunk_conditions else ""
+            query = f"""
+                SELECT {select_columns} FROM {from_clause}
+                {where_clause}
+                ORDER BY i.image_id
+                LIMIT ?
+            """
+            chunk_values.append(batch_size)
+            
+            conn = self.db.get_connection()
+            if not conn:
+                logger.error("Error streaming images: could not connect to the database")
+                return
+                
+            try:
+                cursor = conn.execute(query, chunk_values)
+                if not cursor:
+                    logger.error("Error streaming images: query failed")
+                    return
+                rows = cursor.fetchall()
+            finally:
+                # Release the connection before handing rows to the caller
+                conn.disconnect()
+                
+            for row in rows:
+                yield row_type._make(tuple(row)[1:])
+                
+            if image_ids is None:
+                if len(rows) < batch_size:
+                    return
+                last_id = rows[-1][0]
+                
+    def _read_counter(self, scope, scope_id, description):
+        """Read one maintained image counter.
+        
+        Args:
+            scope (str): Counter scope (library, folder or catalog)
+            scope_id (int): Folder or catalog ID, 0 for the library
+            description (str): What is being counted, for log messages
             
         Returns:
-            int: Number of images in the folder
+            int: The count, 0 if there is no counter yet
         """
         conn = self.db.get_connection()
         if not conn:
             return 0
             
         try:
-            if folder_id == 0:  # All folders
-                return self.get_image_count()
-                
-            # Execute query to count images in the folder
             cursor = conn.execute(
-                "SELECT COUNT(*) as count FROM images WHERE folder_id = ?",
-                (folder_id,)
+                "SELECT count FROM counters WHERE scope = ? AND scope_id = ?",
+                (scope, scope_id)
             )
             if not cursor:
-                raise Exception(f"Failed to count images for folder {folder_id}")
+                raise Exception(f"Failed to count {description}")
                 
             result = cursor.fetchone()
             if not result:
@@ -733,12 +1445,34 @@ class DatabaseOperations:
             return result['count']
             
         except Exception as e:
-            logger.error(f"Error counting images for folder {folder_id}: {e}")
+            logger.error(f"Error counting {description}: {e}")
             return 0
             
         finally:
             conn.disconnect()
             
+    def get_image_count(self):
+        """Get the total number of images in the database.
+        
+        Returns:
+            int: Total number of images
+        """
+        return self._read_counter(LIBRARY_SCOPE, 0, "images")
+            
+    def get_image_count_for_folder(self, folder_id):
+        """Get the number of images in a specific folder.
+        
+        Args:
+            folder_id (int): ID of the folder to count images for
+            
+        Returns:
+            int: Number of images in the folder
+        """
+        if folder_id == 0:  # All folders
+            return self.get_image_count()
+            
+        return self._read_counter(FOLDER_SCOPE, folder_id, f"images for folder {folder_id}")
+            
     def get_image_count_for_catalog(self, catalog_id):
         """Get the number of images in a specific catalog.
         
@@ -748,29 +1482,25 @@ class DatabaseOperations:
         Returns:
             int: Number of images in the catalog
         """
+        return self._read_counter(CATALOG_SCOPE, catalog_id, f"images for catalog {catalog_id}")
+            
+    def get_image_counts(self):
+        """Get the library, folder and catalog image counts in one query.
+        
+        Returns:
+            dict: {"library": int, "folders": {folder_id: int}, "catalogs": {catalog_id: int}};
+                folders and catalogs without images may be missing
+        """
         conn = self.db.get_connection()
         if not conn:
-            return 0
+            return {"library": 0, "folders": {}, "catalogs": {}}
             
         try:
-            # Execute query to count images in the catalog
-            cursor = conn.execute(
-                """SELECT COUNT(*) as count FROM image_catalog_mapping 
-                   WHERE catalog_id = ?""",
-                (catalog_id,)
-            )
-            if not cursor:
-                raise Exception(f"Failed to count images for catalog {catalog_id}")
-                
-            result = cursor.fetchone()
-            if not result:
-                return 0
-                
-            return result['count']
+            return read_counts(conn.conn)
             
         except Exception as e:
-            logger.error(f"Error counting images for catalog {catalog_id}: {e}")
-            return 0
+            logger.error(f"Error reading image counts: {e}")
+            return {"library": 0, "folders": {}, "catalogs": {}}
             
         finally:
             conn.disconnect()
@@ -808,6 +1538,7 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
+    @write_operation(failure_result=False)
     def delete_image(self, image_id):
         """Delete an image from the database.
         
@@ -852,6 +1583,7 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
+    @write_operation(failure_result=False)
     def update_image_path(self, image_id, new_filename, new_full_path):
         """Update the filename and path for an image.
         
@@ -875,10 +1607,22 @@ class DatabaseOperations:
             if not conn.begin_transaction():
                 raise Exception("Failed to begin transaction")
                 
+            # A move to another directory changes the image's place in the hierarchy
+            cursor = conn.execute("SELECT folder_id, directory_id FROM images WHERE image_id = ?", (image_id,))
+            if not cursor:
+                raise Exception("Failed to get image folder")
+                
+            image = cursor.fetchone()
+            directory_id = image['directory_id'] if image else None
+            if image and image['folder_id'] is not None:
+                folder_path = get_folder_paths(conn.conn, [image['folder_id']]).get(image['folder_id'])
+                if folder_path:
+                    directory_id = resolve_directory(conn.conn, image['folder_id'], folder_path, new_full_path)
+                    
             # Update the image
             cursor = conn.execute(
-                "UPDATE images SET filename = ?, full_path = ? WHERE image_id = ?",
-                (new_filename, new_full_path, image_id)
+                "UPDATE images SET filename = ?, full_path = ?, directory_id = ? WHERE image_id = ?",
+                (new_filename, new_full_path, directory_id, image_id)
             )
             if not cursor:
                 raise Exception("Failed to update image path")
@@ -904,6 +1648,122 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
     
+    @write_operation(failure_result=0)
+    def delete_images_bulk(self, image_ids):
+        """Delete many images, and their catalog entries, in one transaction.
+        
+        Args:
+            image_ids (list): IDs of the images to delete
+            
+        Returns:
+            int: Number of images deleted
+        """
+        if not image_ids:
+            return 0
+            
+        conn = self.db.get_connection()
+        if not conn:
+            return 0
+            
+        try:
+            # Begin transaction
+            if not conn.begin_transaction():
+                raise Exception("Failed to begin transaction")
+                
+            deleted = 0
+            chunk_size = BULK_MAX_VARIABLES
+            for start in range(0, len(image_ids), chunk_size):
+                chunk = image_ids[start:start + chunk_size]
+                placeholders = ", ".join("?" for _ in chunk)
+                
+                # Foreign keys are not enforced, so catalog entries are removed here
+                if not conn.execute(f"DELETE FROM image_catalog_mapping WHERE image_id IN ({placeholders})", chunk):
+                    raise Exception("Failed to delete catalog entries")
+                cursor = conn.execute(f"DELETE FROM images WHERE image_id IN ({placeholders})", chunk)
+                if not cursor:
+                    raise Exception("Failed to delete images")
+                deleted += cursor.rowcount
+                
+            # Commit the transaction
+            if not conn.commit():
+                raise Exception("Failed to commit transaction")
+                
+            logger.info(f"Deleted {deleted} images")
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"Error bulk deleting images: {e}")
+            conn.rollback()
+            return 0
+            
+        finally:
+            conn.disconnect()
+            
+    def get_scan_manifest(self, folder_id, paths=None):
+        """Get the stat fingerprint of every image in a folder as last scanned.
+        
+        Args:
+            folder_id (int): ID of the folder
+            paths (iterable, optional): Only get these full paths
+            
+        Returns:
+            dict: Normalized full path -> ManifestEntry, or None on error
+        """
+        conn = self.db.get_connection()
+        if not conn:
+            return None
+            
+        try:
+            if paths is not None:
+                paths = [self._normalize_path(path) for path in paths]
+            return read_manifest(conn.conn, folder_id, paths)
+            
+        except sqlite3.Error as e:
+            logger.error(f"Error reading scan manifest for folder {folder_id}: {e}")
+            return None
+            
+        finally:
+            conn.disconnect()
+            
+    @write_operation(failure_result=0)
+    def update_scan_manifest(self, states):
+        """Record the stat fingerprint of images that were not processed again.
+        
+        Args:
+            states (dict): image_id -> FileState
+            
+        Returns:
+            int: Number of images updated
+        """
+        if not states:
+            return 0
+            
+        conn = self.db.get_connection()
+        if not conn:
+            return 0
+            
+        try:
+            # Begin transaction
+            if not conn.begin_transaction():
+                raise Exception("Failed to begin transaction")
+                
+            updated = write_manifest(conn, states)
+            
+            # Commit the transaction
+            if not conn.commit():
+                raise Exception("Failed to commit transaction")
+                
+            return updated
+            
+        except Exception as e:
+            logger.error(f"Error updating scan manifest: {e}")
+            conn.rollback()
+            return 0
+            
+        finally:
+            conn.disconnect()
+            
+    @write_operation(failure_result=False)
     def update_folder_scan_time(self, folder_id):
         """Update the last scan time for a folder.
         
@@ -985,6 +1845,7 @@ class DatabaseOperations:
         
     # Catalog operations (new feature)
     
+    @write_operation(failure_result=None)
     def create_catalog(self, name, description=""):
         """Create a new catalog.
         
@@ -1073,6 +1934,7 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
+    @write_operation(failure_result=False)
     def add_image_to_catalog(self, image_id, catalog_id):
         """Add an image to a catalog.
         
@@ -1129,6 +1991,7 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
+    @write_operation(failure_result=False)
     def remove_image_from_catalog(self, image_id, catalog_id):
         """Remove an image from a catalog.
         
@@ -1192,7 +2055,7 @@ class DatabaseOperations:
                 SELECT i.* FROM images i
                 JOIN image_catalog_mapping m ON i.image_id = m.image_id
                 WHERE m.catalog_id = ?
-                ORDER BY i.last_modified_date DESC
+                ORDER BY i.last_modified_date DESC, i.image_id DESC
                 LIMIT ? OFFSET ?
             """
             
@@ -1244,6 +2107,7 @@ class DatabaseOperations:
         finally:
             conn.disconnect()
             
+    @write_operation(failure_result=False)
     def delete_catalog(self, catalog_id):
         """Delete a catalog.
         
@@ -84,19 +84,8 @@ def add_get_all_images_count_method(db_ops):
         Returns:
             int: Total number of images
         """
-        conn = self.db.get_connection()
-        if not conn:
-            logger.error("Failed to get database connection")
-            return 0
-            
-        try:
-            cursor = conn.execute("SELECT COUNT(*) FROM images")
-            count = cursor.fetchone()[0]
-            return count
-        
-        except Exception as e:
-            logger.error(f"Error counting all images: {e}")
-            return 0
+        # Read from the maintained counters instead of COUNT(*)
+        return self.get_image_count()
     
     # Add method to the object
     import types
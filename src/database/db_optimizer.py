@@ -9,9 +9,14 @@ import os
 import logging
 import sqlite3
 import time
-import shutil
 from pathlib import Path
 
+from src.database.db_fts import ensure_fts_index
+from src.database.db_merge import copy_database
+from src.database.db_migrations import migrate
+from src.database.db_backup import online_backup
+from src.database.db_wal import remove_wal_files
+
 logger = logging.getLogger("StarImageBrowse.database.db_optimizer")
 
 class DatabaseOptimizer:
@@ -34,14 +39,13 @@ class DatabaseOptimizer:
         logger.info("Starting database optimization...")
         start_time = time.time()
         
-        # Create a backup before optimization
+        # Create a backup before optimization. The online backup takes a
+        # consistent snapshot while the writer and readers stay open.
         backup_path = f"{self.db_manager.db_path}.backup_optimize"
-        try:
-            shutil.copy2(self.db_manager.db_path, backup_path)
-            logger.info(f"Created backup before optimization at {backup_path}")
-        except Exception as e:
-            logger.error(f"Failed to create backup before optimization: {e}")
+        if not online_backup(self.db_manager.db_path, backup_path):
+            logger.error("Failed to create backup before optimization")
             return False
+        logger.info(f"Created backup before optimization at {backup_path}")
         
         # Use a safer approach by creating a new optimized copy
         return self._create_optimized_copy(backup_path, start_time)
@@ -100,8 +104,11 @@ class DatabaseOptimizer:
             
             # Replace old database with new one
             try:
-                # Close any existing connections to the database
+                # Close every connection to the database, including the
+                # writer thread and the pooled readers, which let queued
+                # writes finish first
                 self.db_manager.disconnect()
+                self.db_manager.db_ops.db.close_all_connections()
                 
                 # Windows-friendly approach: Instead of replacing the file directly, use SQLite's backup API
                 # This bypasses Windows file locking issues
@@ -137,8 +144,10 @@ class DatabaseOptimizer:
                     # Create a backup of the original first
                     backup_path = f"{self.db_manager.db_path}.backup"
                     try:
-                        shutil.copy2(self.db_manager.db_path, backup_path)
+                        if not online_backup(self.db_manager.db_path, backup_path):
+                            raise sqlite3.OperationalError("could not back up the original database")
                         os.replace(new_db_path, self.db_manager.db_path)
+                        remove_wal_files(self.db_manager.db_path)
                         logger.info(f"Successfully replaced original database with optimized version using file replacement")
                     except Exception as replace_error:
                         logger.error(f"File replacement fallback also failed: {replace_error}")
@@ -146,6 +155,7 @@ class DatabaseOptimizer:
                         if os.path.exists(backup_path):
                             try:
                                 os.replace(backup_path, self.db_manager.db_path)
+                                remove_wal_files(self.db_manager.db_path)
                                 logger.info("Restored original database from backup")
                             except:
                                 logger.error("Could not restore from backup")
@@ -201,13 +211,9 @@ class DatabaseOptimizer:
                 CREATE INDEX IF NOT EXISTS idx_images_last_modified ON images (last_modified_date DESC)
             ''')
             
-            # Compound index for search queries with sorting
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_images_search_modified ON images (ai_description, last_modified_date DESC)
-            ''')
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_images_search_modified_user ON images (user_description, last_modified_date DESC)
-            ''')
+            # Description searches use LIKE '%...%' or the FTS index, which no
+            # B-tree index on the description columns can serve; further
+            # indexes come from the index advisor (see db_index_advisor)
             
             conn.commit()
             logger.info("Performance indexes created successfully")
@@ -364,35 +370,9 @@ class DatabaseOptimizer:
                     logger.error("Failed to connect to database for creating virtual tables")
                     return False
             
-            # Create virtual table for full-text search on descriptions
-            self.db_manager.cursor.execute('''
-                CREATE VIRTUAL TABLE IF NOT EXISTS image_fts USING fts5(
-                    image_id UNINDEXED,
-                    ai_description,
-                    user_description,
-                    content='images',
-                    content_rowid='image_id'
-                )
-            ''')
-            
-            # Check if the FTS table needs to be populated
-            self.db_manager.cursor.execute("SELECT COUNT(*) FROM image_fts")
-            fts_count = self.db_manager.cursor.fetchone()[0]
-            
-            self.db_manager.cursor.execute("SELECT COUNT(*) FROM images")
-            images_count = self.db_manager.cursor.fetchone()[0]
-            
-            # Populate FTS table if needed
-            if fts_count < images_count:
-                logger.info("Populating full-text search table...")
-                self.db_manager.cursor.execute('''
-                    INSERT INTO image_fts(image_id, ai_description, user_description)
-                    SELECT image_id, ai_description, user_description FROM images
-                    WHERE image_id NOT IN (SELECT image_id FROM image_fts)
-                ''')
-            
-            # Create triggers to keep FTS table in sync
-            self._create_fts_triggers()
+            # Create (or upgrade) the full-text search table, its triggers and contents
+            if not ensure_fts_index(self.db_manager.conn):
+                raise sqlite3.Error("Failed to create full-text search index")
             
             self.db_manager.conn.commit()
             logger.info("Virtual tables created successfully")
@@ -438,8 +418,8 @@ class DatabaseOptimizer:
             # Set synchronous mode to NORMAL for better performance with good reliability
             cursor.execute("PRAGMA synchronous=NORMAL")
             
-            # Set journal mode to DELETE for better compatibility
-            cursor.execute("PRAGMA journal_mode=DELETE")
+            # The journal mode stays WAL, set once by db_wal.enable_wal(); switching
+            # it needs every other connection closed
             
             # Set temp store to MEMORY for better performance
             cursor.execute("PRAGMA temp_store=MEMORY")
@@ -453,35 +433,6 @@ class DatabaseOptimizer:
             logger.error(f"Error setting safe performance PRAGMAs: {e}")
             raise
     
-    def _create_fts_triggers(self):
-        """Create triggers to keep FTS table in sync with the images table."""
-        # Trigger for INSERT
-        self.db_manager.cursor.execute('''
-            CREATE TRIGGER IF NOT EXISTS images_ai_insert AFTER INSERT ON images BEGIN
-                INSERT INTO image_fts(image_id, ai_description, user_description)
-                VALUES (new.image_id, new.ai_description, new.user_description);
-            END
-        ''')
-        
-        # Trigger for UPDATE
-        self.db_manager.cursor.execute('''
-            CREATE TRIGGER IF NOT EXISTS images_ai_update AFTER UPDATE ON images BEGIN
-                UPDATE image_fts SET 
-                    ai_description = new.ai_description,
-                    user_description = new.user_description
-                WHERE image_id = new.image_id;
-            END
-        ''')
-        
-        # Trigger for DELETE
-        self.db_manager.cursor.execute('''
-            CREATE TRIGGER IF NOT EXISTS images_ai_delete AFTER DELETE ON images BEGIN
-                DELETE FROM image_fts WHERE image_id = old.image_id;
-            END
-        ''')
-        
-        logger.info("FTS triggers created successfully")
-    
     def _create_schema(self, conn, cursor):
         """Create the database schema in a new database.
         
@@ -489,83 +440,7 @@ class DatabaseOptimizer:
             conn: Database connection
             cursor: Database cursor
         """
-        # Create folders table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS folders (
-                folder_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                path TEXT UNIQUE NOT NULL,
-                enabled INTEGER DEFAULT 1,
-                last_scan_time TIMESTAMP
-            )
-        ''')
-        
-        # Create images table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS images (
-                image_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                folder_id INTEGER,
-                filename TEXT NOT NULL,
-                full_path TEXT UNIQUE NOT NULL,
-                file_size INTEGER,
-                file_hash TEXT,
-                creation_date TIMESTAMP,
-                last_modified_date TIMESTAMP,
-                thumbnail_path TEXT,
-                ai_description TEXT,
-                user_description TEXT,
-                last_scanned TIMESTAMP,
-                width INTEGER,
-                height INTEGER,
-                format TEXT,
-                date_added TIMESTAMP,
-                FOREIGN KEY (folder_id) REFERENCES folders (folder_id)
-            )
-        ''')
-        
-        # Create catalogs table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS catalogs (
-                catalog_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                description TEXT,
-                created_date TIMESTAMP
-            )
-        ''')
-        
-        # Create image_catalog_mapping table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS image_catalog_mapping (
-                mapping_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                image_id INTEGER,
-                catalog_id INTEGER,
-                added_date TIMESTAMP,
-                FOREIGN KEY (image_id) REFERENCES images (image_id),
-                FOREIGN KEY (catalog_id) REFERENCES catalogs (catalog_id)
-            )
-        ''')
-        
-        # Create index on full_path for faster lookups
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_full_path ON images (full_path)
-        ''')
-        
-        # Create index for searching descriptions
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_ai_description ON images (ai_description)
-        ''')
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_user_description ON images (user_description)
-        ''')
-        
-        # Create indexes for catalog mappings
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_catalog_mapping_image_id ON image_catalog_mapping (image_id)
-        ''')
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_catalog_mapping_catalog_id ON image_catalog_mapping (catalog_id)
-        ''')
-        
-        conn.commit()
+        migrate(conn)
         logger.info("Database schema created successfully")
     
     def _copy_data(self, source_db_path, dest_conn, dest_cursor):
@@ -580,154 +455,9 @@ class DatabaseOptimizer:
             bool: True if data was copied successfully, False otherwise
         """
         try:
-            # Connect to source database
-            source_conn = sqlite3.connect(source_db_path)
-            source_conn.row_factory = sqlite3.Row
-            source_cursor = source_conn.cursor()
-            
-            # Copy folders
-            logger.info("Copying folders...")
-            source_cursor.execute("SELECT * FROM folders")
-            folders = source_cursor.fetchall()
-            
-            for folder in folders:
-                folder_dict = dict(folder)
-                dest_cursor.execute(
-                    "INSERT INTO folders (folder_id, path, enabled, last_scan_time) VALUES (?, ?, ?, ?)",
-                    (
-                        folder_dict['folder_id'],
-                        folder_dict['path'],
-                        folder_dict['enabled'],
-                        folder_dict['last_scan_time']
-                    )
-                )
-                
-            # Get total number of images to copy
-            source_cursor.execute("SELECT COUNT(*) FROM images")
-            total_images = source_cursor.fetchone()[0]
-            logger.info(f"Total images to copy: {total_images}")
-            
-            # Determine optimal batch size based on total images
-            # Smaller batch for very large databases to prevent memory issues
-            if total_images > 100000:
-                batch_size = 250
-            elif total_images > 50000:
-                batch_size = 500
-            else:
-                batch_size = 1000
-                
-            # Copy images in batches to avoid memory issues
-            logger.info(f"Copying images using batch size of {batch_size}...")
-            offset = 0
-            total_copied = 0
-            progress_interval = min(10000, max(1000, total_images // 10))  # Report progress at reasonable intervals
-            next_progress_report = progress_interval
-            
-            while True:
-                source_cursor.execute(f"SELECT * FROM images LIMIT {batch_size} OFFSET {offset}")
-                images = source_cursor.fetchall()
-                
-                if not images:
-                    break
-                    
-                for image in images:
-                    image_dict = dict(image)
-                    
-                    # Check if additional columns exist in the source database
-                    width = image_dict.get('width')
-                    height = image_dict.get('height')
-                    format_value = image_dict.get('format')
-                    date_added = image_dict.get('date_added')
-                    
-                    dest_cursor.execute(
-                        """INSERT INTO images (
-                            image_id, folder_id, filename, full_path, file_size, file_hash,
-                            creation_date, last_modified_date, thumbnail_path,
-                            ai_description, user_description, last_scanned,
-                            width, height, format, date_added
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                        (
-                            image_dict['image_id'],
-                            image_dict['folder_id'],
-                            image_dict['filename'],
-                            image_dict['full_path'],
-                            image_dict['file_size'],
-                            image_dict['file_hash'],
-                            image_dict['creation_date'],
-                            image_dict['last_modified_date'],
-                            image_dict['thumbnail_path'],
-                            image_dict['ai_description'],
-                            image_dict['user_description'],
-                            image_dict['last_scanned'],
-                            width,
-                            height,
-                            format_value,
-                            date_added
-                        )
-                    )
-                
-                total_copied += len(images)
-                
-                # Report progress at intervals, or for every batch in small databases
-                if total_copied >= next_progress_report or total_images < 1000:
-                    percentage = (total_copied / total_images) * 100 if total_images > 0 else 100
-                    logger.info(f"Copied {total_copied}/{total_images} images ({percentage:.1f}%)...")
-                    next_progress_report = total_copied + progress_interval
-                
-                offset += batch_size
-                dest_conn.commit()  # Commit each batch
-            
-            # Copy catalogs
-            try:
-                logger.info("Copying catalogs...")
-                source_cursor.execute("SELECT * FROM catalogs")
-                catalogs = source_cursor.fetchall()
-                
-                for catalog in catalogs:
-                    catalog_dict = dict(catalog)
-                    dest_cursor.execute(
-                        "INSERT INTO catalogs (catalog_id, name, description, created_date) VALUES (?, ?, ?, ?)",
-                        (
-                            catalog_dict['catalog_id'],
-                            catalog_dict['name'],
-                            catalog_dict['description'],
-                            catalog_dict['created_date']
-                        )
-                    )
-                logger.info(f"Copied {len(catalogs)} catalogs")
-                
-                # Copy image_catalog_mapping
-                logger.info("Copying catalog mappings...")
-                source_cursor.execute("SELECT * FROM image_catalog_mapping")
-                mappings = source_cursor.fetchall()
-                
-                for mapping in mappings:
-                    mapping_dict = dict(mapping)
-                    dest_cursor.execute(
-                        "INSERT INTO image_catalog_mapping (mapping_id, image_id, catalog_id, added_date) VALUES (?, ?, ?, ?)",
-                        (
-                            mapping_dict['mapping_id'],
-                            mapping_dict['image_id'],
-                            mapping_dict['catalog_id'],
-                            mapping_dict['added_date']
-                        )
-                    )
-                logger.info(f"Copied {len(mappings)} catalog mappings")
-            except sqlite3.Error as e:
-                # Do not fail if catalog tables don't exist in source, they might be new
-                logger.warning(f"Could not copy catalog data: {e} - this might be expected if upgrading from an older version")
-            
-            dest_conn.commit()
-            
-            # Close source connection
-            source_conn.close()
-            
-            # Verify all images were copied
-            if total_copied < total_images:
-                logger.warning(f"Not all images were copied! Expected {total_images}, but copied {total_copied}.")
-            else:
-                logger.info(f"Successfully copied all {total_copied} images and {len(folders)} folders")
-                
+            # One INSERT ... SELECT per table; the search index is rebuilt once
+            stats = copy_database(dest_conn, source_db_path)
+            logger.info(f"Successfully copied all {stats['images']} images and {stats['folders']} folders")
             return True
         except sqlite3.Error as e:
             logger.error(f"Error copying data: {e}")
@@ -156,13 +156,9 @@ class DatabaseOptimizer:
                 CREATE INDEX IF NOT EXISTS idx_images_last_modified ON images (last_modified_date DESC)
             ''')
             
-            # Compound index for search queries with sorting
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_images_search_modified ON images (ai_description, last_modified_date DESC)
-            ''')
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_images_search_modified_user ON images (user_description, last_modified_date DESC)
-            ''')
+            # Description searches use LIKE '%...%' or the FTS index, which no
+            # B-tree index on the description columns can serve; further
+            # indexes come from the index advisor (see db_index_advisor)
             
             conn.commit()
             logger.info("Performance indexes created successfully")
@@ -393,8 +389,8 @@ class DatabaseOptimizer:
             # Set synchronous mode to NORMAL for better performance with good reliability
             cursor.execute("PRAGMA synchronous=NORMAL")
             
-            # Set journal mode to DELETE for better compatibility
-            cursor.execute("PRAGMA journal_mode=DELETE")
+            # The journal mode stays WAL, set once by db_wal.enable_wal(); switching
+            # it needs every other connection closed
             
             # Set temp store to MEMORY for better performance
             cursor.execute("PRAGMA temp_store=MEMORY")
@@ -473,19 +469,6 @@ class DatabaseOptimizer:
             )
         ''')
         
-        # Create index on full_path for faster lookups
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_full_path ON images (full_path)
-        ''')
-        
-        # Create index for searching descriptions
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_ai_description ON images (ai_description)
-        ''')
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_images_user_description ON images (user_description)
-        ''')
-        
         conn.commit()
         logger.info("Database schema created successfully")
     
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Keyset pagination for StarImageBrowse
+Encodes and decodes the opaque continuation tokens used by the paged image
+listing queries and builds the seek conditions that replace LIMIT/OFFSET.
+"""
+
+import json
+import base64
+import sqlite3
+import logging
+
+logger = logging.getLogger("StarImageBrowse.database.db_paging")
+
+TOKEN_VERSION = 1
+
+# Listings are ordered newest first with image_id as a tie breaker so every
+# row has a unique position and a page can resume right after the last one.
+KEYSET_ORDER_SQL = "{alias}.last_modified_date DESC, {alias}.image_id DESC"
+
+# Composite indexes matching KEYSET_ORDER_SQL, so a page is an index range
+# scan that starts at the token position instead of skipping OFFSET rows.
+# Schema migration 8 replaces them with GRID_INDEXES_SQL.
+PAGING_INDEXES_SQL = {
+    "idx_images_folder_modified_id": """CREATE INDEX IF NOT EXISTS idx_images_folder_modified_id
+    ON images (folder_id, last_modified_date DESC, image_id DESC)""",
+    "idx_images_modified_id": """CREATE INDEX IF NOT EXISTS idx_images_modified_id
+    ON images (last_modified_date DESC, image_id DESC)""",
+}
+
+# Columns the thumbnail grid shows. Grid listings select only these, leaving
+# out the descriptions, which are often longer than the rest of the row and
+# are fetched when the metadata panel needs them.
+GRID_COLUMNS = (
+    "image_id", "folder_id", "filename", "full_path", "thumbnail_path",
+    "width", "height", "last_modified_date",
+)
+
+# Covering versions of the paging indexes: they hold every grid column, so a
+# grid page is read from the index alone without visiting the table rows.
+GRID_INDEXES_SQL = {
+    "idx_images_folder_grid": """CREATE INDEX IF NOT EXISTS idx_images_folder_grid
+    ON images (folder_id, last_modified_date DESC, image_id DESC,
+               filename, full_path, thumbnail_path, width, height)""",
+    "idx_images_grid": """CREATE INDEX IF NOT EXISTS idx_images_grid
+    ON images (last_modified_date DESC, image_id DESC,
+               folder_id, filename, full_path, thumbnail_path, width, height)""",
+}
+
+
+def grid_columns_sql(alias="i"):
+    """Build the select list of a grid listing.
+
+    Args:
+        alias (str): Alias of the images table in the query
+
+    Returns:
+        str: Comma separated, qualified grid columns
+    """
+    return ", ".join(f"{alias}.{column}" for column in GRID_COLUMNS)
+
+
+def ensure_paging_indexes(conn):
+    """Create the covering indexes used by keyset pagination if they are missing.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        bool: True if the indexes exist, False otherwise
+    """
+    try:
+        for index_sql in GRID_INDEXES_SQL.values():
+            conn.execute(index_sql)
+        conn.commit()
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"Error creating pagination indexes: {e}")
+        return False
+
+
+def encode_page_token(last_row=None, offset=None):
+    """Build an opaque continuation token.
+
+    Args:
+        last_row (dict, optional): Last row of the current page; the next page
+            starts after its (last_modified_date, image_id) position
+        offset (int, optional): Row offset, used for relevance ranked results
+            that have no stable keyset order
+
+    Returns:
+        str: URL-safe token to pass back as page_token
+    """
+    if last_row is not None:
+        payload = {"v": TOKEN_VERSION, "k": [last_row["last_modified_date"], last_row["image_id"]]}
+    else:
+        payload = {"v": TOKEN_VERSION, "o": int(offset or 0)}
+
+    data = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_page_token(page_token):
+    """Decode a continuation token created by encode_page_token().
+
+    Args:
+        page_token (str): Token returned by a previous page, or None for the first page
+
+    Returns:
+        dict: {'key': (last_modified_date, image_id)} or {'offset': int};
+            an empty dict for the first page or an unreadable token
+    """
+    if not page_token:
+        return {}
+
+    try:
+        padded = page_token + "=" * (-len(page_token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload.get("v") != TOKEN_VERSION:
+            raise ValueError(f"unsupported token version {payload.get('v')}")
+
+        if "k" in payload:
+            last_modified_date, image_id = payload["k"]
+            return {"key": (last_modified_date, int(image_id))}
+        return {"offset": max(0, int(payload.get("o", 0)))}
+
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        logger.warning(f"Ignoring invalid page token: {e}")
+        return {}
+
+
+def keyset_segments(key=None, alias="i"):
+    """Build the WHERE conditions selecting the rows after a keyset position.
+
+    SQLite sorts NULL lowest, so rows without a modification date come after
+    all dated rows. A row value comparison never matches NULL, so the listing
+    is read in up to two index range scans: the dated rows after the position,
+    then the undated rows. Callers run the segments in order until the page is
+    full.
+
+    Args:
+        key (tuple, optional): (last_modified_date, image_id) of the last row
+            already shown, or None for the first page
+        alias (str): Alias of the images table in the query
+
+    Returns:
+        list: (condition, values) tuples; condition is None when no filter is needed
+    """
+    if key is None:
+        return [(None, [])]
+
+    last_modified_date, image_id = key
+    if last_modified_date is None:
+        return [(f"({alias}.last_modified_date IS NULL AND {alias}.image_id < ?)", [image_id])]
+
+    return [
+        (f"({alias}.last_modified_date, {alias}.image_id) < (?, ?)", [last_modified_date, image_id]),
+        (f"{alias}.last_modified_date IS NULL", []),
+    ]
+
+
+def split_page(rows, page_size):
+    """Split the page_size + 1 rows fetched for a page into the page and its next token.
+
+    Args:
+        rows (list): Image dictionaries fetched with LIMIT page_size + 1
+        page_size (int): Number of images per page
+
+    Returns:
+        tuple: (images, next_token) where next_token is None on the last page
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    images = rows[:page_size]
+    return images, encode_page_token(last_row=images[-1])
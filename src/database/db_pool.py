@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Connection pooling for StarImageBrowse
+Keeps reusable read connections per thread. With the database in WAL mode
+these reads are not blocked by the background writer.
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+
+from src.database.db_core import DatabaseConnection
+from src.database.db_statement_cache import STATEMENT_CACHE_SIZE
+from src.database.db_wal import BUSY_TIMEOUT_MS, configure_connection
+
+logger = logging.getLogger("StarImageBrowse.database.db_pool")
+
+# Idle connections kept per thread; nested calls on one thread may need more
+# than one connection at a time, extra ones are closed when released
+MAX_IDLE_PER_THREAD = 2
+
+
+class PooledConnection(DatabaseConnection):
+    """A database connection that returns to its pool instead of closing."""
+
+    def __init__(self, db_path, pool):
+        """Initialize a pooled connection.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            pool (ReaderPool): Pool the connection belongs to
+        """
+        super().__init__(db_path)
+        self.pool = pool
+        self.generation = pool.generation
+
+    def connect(self):
+        """Establish a connection to the database."""
+        if self.conn is not None:
+            return True
+
+        try:
+            # Connections stay on the thread that leased them; the check is
+            # disabled only so close_all() can close them from another thread
+            self.conn = sqlite3.connect(
+                self.db_path,
+                timeout=BUSY_TIMEOUT_MS / 1000,
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE
+            )
+            self.conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+            configure_connection(self.conn)
+            self.cursor = self.conn.cursor()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error connecting to database: {e}")
+            self.conn = None
+            return False
+
+    def disconnect(self):
+        """Return the connection to the pool, rolling back any open transaction."""
+        self.finish_statement()
+        self.pool.release(self)
+
+    def close(self):
+        """Close the underlying database connection."""
+        super().disconnect()
+
+
+class ReaderPool:
+    """Reusable database connections, kept separately for each thread.
+
+    SQLite connections are not shared between threads, so every thread gets
+    its own idle list. In WAL mode readers never wait for the writer, which
+    makes reusing the connections safe while background work writes.
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, db_path):
+        """Get the pool for a database file, creating it on first use.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+
+        Returns:
+            ReaderPool: Pool shared by everyone using that file
+        """
+        key = os.path.abspath(db_path)
+        with cls._lock:
+            pool = cls._instances.get(key)
+            if pool is None:
+                pool = cls(db_path)
+                cls._instances[key] = pool
+            return pool
+
+    def __init__(self, db_path):
+        """Initialize the pool.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.idle = {}  # thread ident -> (thread, [PooledConnection])
+        self.generation = 0
+        self.created = 0
+        self.reused = 0
+
+    def get_connection(self):
+        """Lease a connection for the calling thread.
+
+        Returns:
+            PooledConnection: A connected database connection, or None if the
+                database cannot be opened
+        """
+        thread = threading.current_thread()
+        with self.lock:
+            entry = self.idle.get(thread.ident)
+            if entry and entry[0] is thread and entry[1]:
+                self.reused += 1
+                return entry[1].pop()
+
+        conn = PooledConnection(self.db_path, self)
+        if not conn.connect():
+            return None
+
+        with self.lock:
+            self.created += 1
+        return conn
+
+    def release(self, conn):
+        """Take a connection back from the calling thread.
+
+        Args:
+            conn (PooledConnection): Connection returned by get_connection()
+        """
+        if conn.conn is None:
+            return
+
+        try:
+            if conn.in_transaction or conn.conn.in_transaction:
+                conn.conn.rollback()
+                conn.in_transaction = False
+            # A fresh cursor drops any unfinished SELECT, which would otherwise
+            # hold a read snapshot and stop WAL checkpoints from completing
+            conn.cursor.close()
+            conn.cursor = conn.conn.cursor()
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding pooled connection after error: {e}")
+            conn.close()
+            return
+
+        thread = threading.current_thread()
+        with self.lock:
+            if conn.generation == self.generation:
+                entry = self.idle.get(thread.ident)
+                if entry is None or entry[0] is not thread:
+                    self._prune_dead_threads()
+                    entry = (thread, [])
+                    self.idle[thread.ident] = entry
+                if len(entry[1]) < MAX_IDLE_PER_THREAD:
+                    entry[1].append(conn)
+                    return
+
+        conn.close()
+
+    def _prune_dead_threads(self):
+        """Close idle connections of threads that have finished. Caller holds the lock."""
+        for ident, (thread, connections) in list(self.idle.items()):
+            if not thread.is_alive():
+                for conn in connections:
+                    conn.close()
+                del self.idle[ident]
+
+    def prune_dead_threads(self):
+        """Close idle connections of threads that have finished."""
+        with self.lock:
+            self._prune_dead_threads()
+
+    def close_all(self):
+        """Close every idle connection; leased ones are closed when released."""
+        with self.lock:
+            self.generation += 1
+            for thread, connections in self.idle.values():
+                for conn in connections:
+                    conn.close()
+            self.idle = {}
+
+    def get_stats(self):
+        """Get statistics about the pool.
+
+        Returns:
+            dict: Statistics about the pool
+        """
+        with self.lock:
+            return {
+                "threads": len(self.idle),
+                "idle_connections": sum(len(c) for _, c in self.idle.values()),
+                "connections_created": self.created,
+                "connections_reused": self.reused,
+            }
@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Query statistics for StarImageBrowse
+Times every statement run through DatabaseConnection.execute(), grouped by
+normalized SQL, and keeps a log of slow statements with their query plans so
+the hot queries can be found in a running application.
+"""
+
+import re
+import time
+import sqlite3
+import logging
+import threading
+import functools
+from collections import deque
+
+logger = logging.getLogger("StarImageBrowse.database.db_querystats")
+
+# Statements taking longer than this (execute plus fetching) are logged as slow
+SLOW_QUERY_THRESHOLD_MS = 100
+
+# Slow statements kept in the log, oldest are dropped first
+MAX_SLOW_QUERIES = 50
+
+# Latencies kept per statement for the percentile
+LATENCY_SAMPLES = 256
+
+# Longer statements are cut off in the slow query log
+MAX_LOGGED_QUERY_LENGTH = 2000
+
+# Statements EXPLAIN QUERY PLAN can describe
+EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+# Statements whose first execution is kept as an example for the index advisor
+ADVISABLE_PREFIXES = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+_ROW_LIST_RE = re.compile(r"\((\?(?:, \.\.\.)?)\)(?:\s*,\s*\(\1\))+")
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(query):
+    """Reduce a statement to the form its statistics are grouped under.
+
+    Whitespace is collapsed, literals become ? and placeholder lists of any
+    length become "?, ...", so IN lists and multi-row VALUES of different
+    sizes count as one statement.
+
+    Args:
+        query (str): SQL statement
+
+    Returns:
+        str: Normalized statement
+    """
+    normalized = " ".join(query.split())
+    normalized = _STRING_LITERAL_RE.sub("?", normalized)
+    normalized = _NUMBER_LITERAL_RE.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST_RE.sub("?, ...", normalized)
+    return _ROW_LIST_RE.sub(r"(\1), ...", normalized)
+
+
+class _StatementStats:
+    """Running totals for one normalized statement."""
+
+    __slots__ = ("count", "total_ms", "max_ms", "rows", "samples", "example")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+        self.example = None  # (query, params) of the first execution
+
+
+class QueryStats:
+    """Per-statement timing and the slow query log, shared by all connections."""
+
+    def __init__(self, slow_threshold_ms=SLOW_QUERY_THRESHOLD_MS):
+        """Initialize the statistics.
+
+        Args:
+            slow_threshold_ms (float): Slow query threshold in milliseconds
+        """
+        self.enabled = True
+        self.slow_threshold_ms = slow_threshold_ms
+        self.lock = threading.Lock()
+        self.statements = {}  # normalized SQL -> _StatementStats
+        self.slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+        self.plans = {}  # normalized SQL -> query plan text
+        self.started = time.time()
+
+    def record(self, normalized, elapsed_ms, rows, query=None, params=None):
+        """Add one finished statement to the totals.
+
+        Args:
+            normalized (str): Normalized statement
+            elapsed_ms (float): Time spent executing and fetching
+            rows (int): Rows returned to the caller
+            query (str, optional): Statement as executed, kept as the example
+                of a new statement
+            params (tuple, optional): Parameters the statement ran with
+
+        Returns:
+            bool: True if the statement was slow
+        """
+        with self.lock:
+            stats = self.statements.get(normalized)
+            if stats is None:
+                stats = _StatementStats()
+                self.statements[normalized] = stats
+                if query is not None and normalized.upper().startswith(ADVISABLE_PREFIXES):
+                    stats.example = (query, params)
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.rows += rows
+            stats.samples.append(elapsed_ms)
+            if elapsed_ms > stats.max_ms:
+                stats.max_ms = elapsed_ms
+        return elapsed_ms >= self.slow_threshold_ms
+
+    def needs_plan(self, normalized):
+        """Check whether a slow statement still needs its query plan captured.
+
+        Args:
+            normalized (str): Normalized statement
+
+        Returns:
+            bool: True if EXPLAIN QUERY PLAN should be run for it
+        """
+        if not normalized.upper().startswith(EXPLAINABLE_PREFIXES):
+            return False
+        with self.lock:
+            return normalized not in self.plans
+
+    def log_slow_query(self, normalized, query, elapsed_ms, rows, plan=None):
+        """Add a statement to the slow query log.
+
+        Args:
+            normalized (str): Normalized statement
+            query (str): Statement as executed
+            elapsed_ms (float): Time spent executing and fetching
+            rows (int): Rows returned to the caller
+            plan (str, optional): Newly captured EXPLAIN QUERY PLAN output
+        """
+        query = " ".join(query.split())
+        if len(query) > MAX_LOGGED_QUERY_LENGTH:
+            query = query[:MAX_LOGGED_QUERY_LENGTH] + " ..."
+        with self.lock:
+            if plan is not None:
+                self.plans[normalized] = plan
+            self.slow_queries.append({
+                "sql": normalized,
+                "query": query,
+                "elapsed_ms": elapsed_ms,
+                "rows": rows,
+                "plan": self.plans.get(normalized, ""),
+                "timestamp": time.time(),
+            })
+        logger.warning(f"Slow query ({elapsed_ms:.1f} ms, {rows} rows): {normalized}")
+
+    def get_stats(self, limit=None, order_by="total_ms"):
+        """Get the per-statement statistics.
+
+        Args:
+            limit (int, optional): Return only this many statements
+            order_by (str, optional): Key to sort by, highest first
+                (total_ms, avg_ms, p95_ms, max_ms, count or rows)
+
+        Returns:
+            list: Dictionaries with sql, count, total_ms, avg_ms, p95_ms,
+                max_ms, rows and avg_rows
+        """
+        with self.lock:
+            snapshot = [
+                (sql, stats.count, stats.total_ms, stats.max_ms, stats.rows, sorted(stats.samples))
+                for sql, stats in self.statements.items()
+            ]
+
+        results = []
+        for sql, count, total_ms, max_ms, rows, samples in snapshot:
+            p95_ms = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+            results.append({
+                "sql": sql,
+                "count": count,
+                "total_ms": total_ms,
+                "avg_ms": total_ms / count if count else 0.0,
+                "p95_ms": p95_ms,
+                "max_ms": max_ms,
+                "rows": rows,
+                "avg_rows": rows / count if count else 0.0,
+            })
+
+        results.sort(key=lambda entry: entry[order_by], reverse=True)
+        return results[:limit] if limit else results
+
+    def get_workload(self):
+        """Get the statements that can be checked by the index advisor.
+
+        Returns:
+            list: Dictionaries with sql, count, total_ms, query and params,
+                busiest first; query and params are one execution of the statement
+        """
+        with self.lock:
+            workload = [
+                {
+                    "sql": sql,
+                    "count": stats.count,
+                    "total_ms": stats.total_ms,
+                    "query": stats.example[0],
+                    "params": stats.example[1],
+                }
+                for sql, stats in self.statements.items()
+                if stats.example is not None
+            ]
+        workload.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return workload
+
+    def get_slow_queries(self):
+        """Get the slow query log, newest first.
+
+        Returns:
+            list: Dictionaries with sql, query, elapsed_ms, rows, plan and timestamp
+        """
+        with self.lock:
+            return list(reversed(self.slow_queries))
+
+    def reset(self):
+        """Clear all statistics, the slow query log and the captured plans."""
+        with self.lock:
+            self.statements = {}
+            self.slow_queries.clear()
+            self.plans = {}
+            self.started = time.time()
+
+    def format_report(self, limit=20):
+        """Format the busiest statements and the slow query log as text.
+
+        Args:
+            limit (int, optional): Number of statements to list
+
+        Returns:
+            str: Human-readable report
+        """
+        stats = self.get_stats(limit=limit)
+        slow_queries = self.get_slow_queries()
+        elapsed = time.time() - self.started
+
+        lines = [f"Statements by total time (last {elapsed / 60:.0f} minutes):", ""]
+        if not stats:
+            lines.append("No statements recorded yet.")
+        for entry in stats:
+            lines.append(
+                f"{entry['total_ms']:10.1f} ms total  {entry['count']:7d}x  "
+                f"avg {entry['avg_ms']:.2f} ms  p95 {entry['p95_ms']:.2f} ms  "
+                f"max {entry['max_ms']:.2f} ms  avg rows {entry['avg_rows']:.1f}"
+            )
+            lines.append(f"    {entry['sql']}")
+
+        lines += ["", f"Slow queries (over {self.slow_threshold_ms:g} ms):", ""]
+        if not slow_queries:
+            lines.append("No slow queries recorded.")
+        for entry in slow_queries:
+            logged_at = time.strftime("%H:%M:%S", time.localtime(entry["timestamp"]))
+            lines.append(f"{logged_at}  {entry['elapsed_ms']:.1f} ms  {entry['rows']} rows")
+            lines.append(f"    {entry['query']}")
+            for plan_line in entry["plan"].splitlines():
+                lines.append(f"      {plan_line}")
+
+        return "\n".join(lines)
+
+
+# Statistics shared by every connection in the process
+query_stats = QueryStats()
+
+
+def explain_query_plan(conn, query, params=None):
+    """Get the EXPLAIN QUERY PLAN output for a statement.
+
+    Args:
+        conn (sqlite3.Connection): Connection the statement ran on
+        query (str): SQL statement
+        params (tuple, optional): Parameters the statement ran with
+
+    Returns:
+        str: One line per plan step, indented by depth, or "" if unavailable
+    """
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+    except sqlite3.Error as e:
+        logger.debug(f"Could not explain query: {e}")
+        return ""
+
+    depths = {0: 0}
+    lines = []
+    for row in rows:
+        node_id, parent_id, detail = row[0], row[1], row[3]
+        depth = depths.get(parent_id, 0) + 1
+        depths[node_id] = depth
+        lines.append(f"{'  ' * (depth - 1)}{detail}")
+    return "\n".join(lines)
+
+
+class StatementTimer:
+    """Times one statement from execute() until its results are consumed.
+
+    Fetch calls go through the timer, so the recorded latency covers stepping
+    through the results but not the caller's work between fetches. The
+    statement is recorded once its rows run out or finish() is called.
+    """
+
+    def __init__(self, conn, cursor, query, params, elapsed):
+        """Initialize the timer.
+
+        Args:
+            conn (sqlite3.Connection): Connection the statement ran on
+            cursor (sqlite3.Cursor): Cursor holding the results
+            query (str): SQL statement
+            params (tuple): Parameters the statement ran with
+            elapsed (float): Seconds spent in execute()
+        """
+        self.conn = conn
+        self.cursor = cursor
+        self.query = query
+        self.params = params
+        self.elapsed = elapsed
+        self.rows = 0
+        self.finished = False
+
+    def __getattr__(self, name):
+        """Forward everything else (lastrowid, rowcount, description) to the cursor."""
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        """Iterate over the remaining rows."""
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def fetchone(self):
+        """Fetch the next row, or None when there are no more."""
+        started = time.perf_counter()
+        row = self.cursor.fetchone()
+        self.elapsed += time.perf_counter() - started
+        if row is None:
+            self.finish()
+        else:
+            self.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        """Fetch up to size rows."""
+        size = self.cursor.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = self.cursor.fetchmany(size)
+        self.elapsed += time.perf_counter() - started
+        self.rows += len(rows)
+        if len(rows) < size:
+            self.finish()
+        return rows
+
+    def fetchall(self):
+        """Fetch all remaining rows."""
+        started = time.perf_counter()
+        rows = self.cursor.fetchall()
+        self.elapsed += time.perf_counter() - started
+        self.rows += len(rows)
+        self.finish()
+        return rows
+
+    def finish(self):
+        """Record the statement; later calls do nothing."""
+        if self.finished:
+            return
+        self.finished = True
+
+        try:
+            normalized = normalize_sql(self.query)
+            elapsed_ms = self.elapsed * 1000
+            if not query_stats.record(normalized, elapsed_ms, self.rows, self.query, self.params):
+                return
+
+            plan = None
+            if query_stats.needs_plan(normalized):
+                plan = explain_query_plan(self.conn, self.query, self.params)
+            query_stats.log_slow_query(normalized, self.query, elapsed_ms, self.rows, plan)
+        except Exception as e:
+            logger.debug(f"Error recording query statistics: {e}")
@@ -13,6 +13,10 @@ import time
 from pathlib import Path
 from PyQt6.QtWidgets import QMessageBox
 
+from src.database.db_merge import copy_database
+from src.database.db_migrations import migrate
+from src.database.db_wal import checkpoint_database, remove_wal_files
+
 logger = logging.getLogger("StarImageBrowse.database.db_repair")
 
 def check_database_integrity(db_path):
@@ -81,6 +85,7 @@ def repair_database(db_path, parent_widget=None):
     # Create backup of corrupted database - use a consistent name for a single backup file
     backup_path = f"{db_path}.backup"
     try:
+        checkpoint_database(db_path)
         shutil.copy2(db_path, backup_path)
         logger.info(f"Created backup of corrupted database at {backup_path}")
         
@@ -129,6 +134,7 @@ def repair_database(db_path, parent_widget=None):
         # Replace old database with new one
         try:
             os.remove(db_path)
+            remove_wal_files(db_path)
             shutil.move(new_db_path, db_path)
             
             logger.info("Database repair completed successfully")
@@ -174,87 +180,7 @@ def create_schema(conn, cursor):
         conn: Database connection
         cursor: Database cursor
     """
-    # Create folders table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS folders (
-            folder_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            path TEXT UNIQUE NOT NULL,
-            enabled INTEGER DEFAULT 1,
-            last_scan_time TIMESTAMP
-        )
-    ''')
-    
-    # Create images table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS images (
-            image_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            folder_id INTEGER,
-            filename TEXT NOT NULL,
-            full_path TEXT UNIQUE NOT NULL,
-            file_size INTEGER,
-            file_hash TEXT,
-            creation_date TIMESTAMP,
-            last_modified_date TIMESTAMP,
-            thumbnail_path TEXT,
-            ai_description TEXT,
-            user_description TEXT,
-            last_scanned TIMESTAMP,
-            width INTEGER,
-            height INTEGER,
-            FOREIGN KEY (folder_id) REFERENCES folders (folder_id)
-        )
-    ''')
-    
-    # Create index on full_path for faster lookups
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_full_path ON images (full_path)
-    ''')
-    
-    # Create index for searching descriptions
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_ai_description ON images (ai_description)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_user_description ON images (user_description)
-    ''')
-    
-    # Create index for image dimensions
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_dimensions ON images (width, height)
-    ''')
-    
-    # Create Catalogs table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS catalogs (
-            catalog_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            description TEXT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create Image-Catalog mapping table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS image_catalog_mapping (
-            mapping_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            image_id INTEGER NOT NULL,
-            catalog_id INTEGER NOT NULL,
-            added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (image_id) REFERENCES images (image_id) ON DELETE CASCADE,
-            FOREIGN KEY (catalog_id) REFERENCES catalogs (catalog_id) ON DELETE CASCADE,
-            UNIQUE(image_id, catalog_id)
-        )
-    ''')
-    
-    # Create indexes for the catalog tables
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_catalog_mapping_image_id ON image_catalog_mapping (image_id)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_catalog_mapping_catalog_id ON image_catalog_mapping (catalog_id)
-    ''')
-    
-    conn.commit()
+    migrate(conn)
 
 def recover_data(old_db_path, new_conn, new_cursor):
     """Try to recover data from a corrupted database.
@@ -275,184 +201,10 @@ def recover_data(old_db_path, new_conn, new_cursor):
     }
     
     try:
-        # Try to connect to old database in read-only mode with recovery mode
-        uri = f"file:{old_db_path}?mode=ro"
-        old_conn = sqlite3.connect(uri, uri=True)
-        old_cursor = old_conn.cursor()
-        
-        # Try to recover folders
-        try:
-            old_cursor.execute("SELECT * FROM folders")
-            folders = old_cursor.fetchall()
-            
-            for folder in folders:
-                try:
-                    # Ensure we have at least the required fields
-                    if len(folder) >= 2:
-                        folder_id = folder[0]
-                        path = folder[1]
-                        enabled = folder[2] if len(folder) > 2 else 1
-                        
-                        new_cursor.execute(
-                            "INSERT INTO folders (folder_id, path, enabled) VALUES (?, ?, ?)",
-                            (folder_id, path, enabled)
-                        )
-                        recovered_stats["folders"] += 1
-                except Exception as e:
-                    logger.warning(f"Failed to recover folder: {e}")
-        except Exception as e:
-            logger.warning(f"Failed to recover folders: {e}")
-        
-        # Try to recover images
-        try:
-            # Try to get total number of images first
-            try:
-                old_cursor.execute("SELECT COUNT(*) FROM images")
-                total_images = old_cursor.fetchone()[0]
-                logger.info(f"Found {total_images} images to recover")
-            except Exception as e:
-                # If count fails, we'll proceed without knowing the total
-                logger.warning(f"Failed to get total image count: {e}")
-                total_images = None
-                
-            # Determine batch size based on estimated database size
-            if total_images and total_images > 100000:
-                batch_size = 250
-            elif total_images and total_images > 50000:
-                batch_size = 500
-            else:
-                batch_size = 1000
-                
-            # Process images in batches to avoid memory issues
-            logger.info(f"Recovering images using batch size of {batch_size}...")
-            offset = 0
-            has_more_images = True
-            total_recovered = 0
-            progress_interval = 5000  # Report progress every 5000 images
-            next_progress_report = progress_interval
-                
-            # Continue fetching batches until no more images
-            while has_more_images:
-                try:
-                    old_cursor.execute(f"SELECT * FROM images LIMIT {batch_size} OFFSET {offset}")
-                    images = old_cursor.fetchall()
-                    
-                    if not images:
-                        has_more_images = False
-                        break
-                        
-                    # Process this batch
-                    for image in images:
-                        try:
-                            # Ensure we have at least the required fields
-                            if len(image) >= 4:
-                                # Extract the fields we need
-                                image_id = image[0]
-                                folder_id = image[1]
-                                filename = image[2]
-                                full_path = image[3]
-                                
-                                # Get optional fields with defaults
-                                thumbnail_path = image[8] if len(image) > 8 else None
-                                ai_description = image[9] if len(image) > 9 else None
-                                user_description = image[10] if len(image) > 10 else None
-                                
-                                # Get width and height if available
-                                width = image[12] if len(image) > 12 else None
-                                height = image[13] if len(image) > 13 else None
-                                
-                                # Insert into new database
-                                new_cursor.execute(
-                                    """INSERT INTO images 
-                                       (image_id, folder_id, filename, full_path, thumbnail_path, 
-                                        ai_description, user_description, width, height) 
-                                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                                    (image_id, folder_id, filename, full_path, thumbnail_path,
-                                     ai_description, user_description, width, height)
-                                )
-                                recovered_stats["images"] += 1
-                        except Exception as e:
-                            logger.warning(f"Failed to recover image: {e}")
-                    
-                    # Update counters and commit batch
-                    total_recovered += len(images)
-                    if total_recovered >= next_progress_report:
-                        if total_images:
-                            percentage = (total_recovered / total_images) * 100
-                            logger.info(f"Recovered {total_recovered}/{total_images} images ({percentage:.1f}%)...")
-                        else:
-                            logger.info(f"Recovered {total_recovered} images so far...")
-                        next_progress_report = total_recovered + progress_interval
-                    
-                    offset += batch_size
-                    new_conn.commit()  # Commit each batch as we go
-                except Exception as e:
-                    logger.warning(f"Error processing batch at offset {offset}: {e}")
-                    offset += batch_size  # Skip problematic batch and continue
-        except Exception as e:
-            logger.warning(f"Failed to recover images: {e}")
-        
-        # Try to recover catalogs
-        try:
-            old_cursor.execute("SELECT * FROM catalogs")
-            catalogs = old_cursor.fetchall()
-            
-            logger.info(f"Found {len(catalogs)} catalogs to recover")
-            
-            for catalog in catalogs:
-                try:
-                    # Ensure we have at least the required fields
-                    if len(catalog) >= 2:
-                        catalog_id = catalog[0]
-                        name = catalog[1]
-                        description = catalog[2] if len(catalog) > 2 else None
-                        created_date = catalog[3] if len(catalog) > 3 else None
-                        
-                        new_cursor.execute(
-                            """INSERT INTO catalogs 
-                               (catalog_id, name, description, created_date) 
-                               VALUES (?, ?, ?, ?)""",
-                            (catalog_id, name, description, created_date)
-                        )
-                        recovered_stats["catalogs"] += 1
-                except Exception as e:
-                    logger.warning(f"Failed to recover catalog: {e}")
-        except Exception as e:
-            logger.warning(f"Failed to recover catalogs: {e}")
-        
-        # Try to recover catalog-image mappings
-        try:
-            old_cursor.execute("SELECT * FROM image_catalog_mapping")
-            mappings = old_cursor.fetchall()
-            
-            logger.info(f"Found {len(mappings)} catalog-image mappings to recover")
-            
-            for mapping in mappings:
-                try:
-                    # Ensure we have at least the required fields
-                    if len(mapping) >= 3:
-                        mapping_id = mapping[0]
-                        image_id = mapping[1]
-                        catalog_id = mapping[2]
-                        added_date = mapping[3] if len(mapping) > 3 else None
-                        
-                        new_cursor.execute(
-                            """INSERT INTO image_catalog_mapping 
-                               (mapping_id, image_id, catalog_id, added_date) 
-                               VALUES (?, ?, ?, ?)""",
-                            (mapping_id, image_id, catalog_id, added_date)
-                        )
-                        recovered_stats["catalog_mappings"] += 1
-                except Exception as e:
-                    logger.warning(f"Failed to recover catalog-image mapping: {e}")
-        except Exception as e:
-            logger.warning(f"Failed to recover catalog-image mappings: {e}")
-        
-        # Close old connection
-        old_conn.close()
-        
+        # Each table is copied in one statement, or in chunks past unreadable pages
+        recovered_stats = copy_database(new_conn, old_db_path)
     except Exception as e:
-        logger.warning(f"Failed to connect to corrupted database for recovery: {e}")
+        logger.warning(f"Failed to recover data from corrupted database: {e}")
     
     # Log recovery statistics
     logger.info(f"Recovery statistics: {recovered_stats}")
@@ -531,6 +283,7 @@ def rebuild_database(db_path):
     backup_path = f"{db_path}.backup"
     try:
         if os.path.exists(db_path):
+            checkpoint_database(db_path)
             shutil.copy2(db_path, backup_path)
             logger.info(f"Created backup of corrupted database at {backup_path}")
     except Exception as e:
@@ -571,6 +324,7 @@ def rebuild_database(db_path):
             try:
                 if os.path.exists(db_path):
                     os.remove(db_path)
+                    remove_wal_files(db_path)
                 shutil.copy2(new_db_path, db_path)
                 os.remove(new_db_path)
                 logger.info("Replaced corrupted database with rebuilt one")
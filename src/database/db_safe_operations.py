@@ -13,6 +13,8 @@ import shutil
 import time
 from pathlib import Path
 
+from src.database.db_wal import checkpoint_database, remove_wal_files
+
 logger = logging.getLogger("StarImageBrowse.database.db_safe_operations")
 
 def safe_update_description(db_path, image_id, ai_description=None, user_description=None):
@@ -132,6 +134,7 @@ def repair_database(db_path):
     # Create a backup of the current database - use a consistent name for a single backup file
     backup_path = f"{db_path}.backup"
     try:
+        checkpoint_database(db_path)
         shutil.copy2(db_path, backup_path)
         logger.info(f"Created backup at {backup_path}")
     except Exception as e:
@@ -195,6 +198,7 @@ def repair_database(db_path):
                 
                 # Replace the original database with the repaired one
                 os.remove(db_path)
+                remove_wal_files(db_path)
                 shutil.copy2(temp_db_path, db_path)
                 os.remove(temp_db_path)
                 
@@ -221,6 +225,7 @@ def repair_database(db_path):
         try:
             if os.path.exists(db_path):
                 os.remove(db_path)
+                remove_wal_files(db_path)
                 logger.info("Removed corrupted database")
         except Exception as e:
             logger.error(f"Failed to remove corrupted database: {e}")
@@ -6,17 +6,44 @@ Implements database sharding for handling very large image collections.
 """
 
 import os
+import re
+import heapq
 import logging
 import sqlite3
+import itertools
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import shutil
 
 from src.database.db_core import Database, DatabaseConnection
+from src.database.db_counters import read_counts
+from src.database.db_directories import assign_directories
 from src.database.db_indexing import DatabaseIndexOptimizer
 
 logger = logging.getLogger("StarImageBrowse.database.db_sharding")
 
+# Threads used to query shards concurrently
+MAX_SHARD_QUERY_WORKERS = 8
+
+# Size a size-based shard is kept near
+DEFAULT_TARGET_SHARD_IMAGES = 50000
+DEFAULT_TARGET_SHARD_BYTES = 512 * 1024 * 1024
+
+# A shard is only split once it is this far over its target, so shards that
+# hover around the target are not moved back and forth
+REBALANCE_TOLERANCE = 1.25
+
+# Schema name the source shard is attached under while a folder is moved
+MOVE_SOURCE_SCHEMA = "shard_source"
+
+# Images and bytes held by a shard or a folder
+ShardSize = namedtuple("ShardSize", ["images", "bytes"])
+EMPTY_SIZE = ShardSize(0, 0)
+
 class ShardingStrategy:
     """Base class for database sharding strategies."""
     
@@ -49,6 +76,33 @@ class ShardingStrategy:
             list: List of all shard identifiers
         """
         raise NotImplementedError("Subclasses must implement this method")
+    
+    def place_folder(self, folder_id, folder_size, shard_sizes):
+        """Choose the shard for a folder knowing how large it and the shards are.
+        
+        Strategies that do not look at sizes route by folder ID.
+        
+        Args:
+            folder_id (int): Folder ID
+            folder_size (ShardSize): Images and bytes of the folder
+            shard_sizes (dict): Shard identifier -> ShardSize of the existing shards
+            
+        Returns:
+            str: Shard identifier
+        """
+        return self.get_shard_for_folder(folder_id)
+    
+    def plan_rebalance(self, folder_sizes, folder_shards):
+        """Plan the folder moves that bring the shards back near their target size.
+        
+        Args:
+            folder_sizes (dict): Folder ID -> ShardSize
+            folder_shards (dict): Folder ID -> shard identifier
+            
+        Returns:
+            list: (folder_id, source_shard, target_shard) moves, in order
+        """
+        return []
 
 
 class FolderBasedSharding(ShardingStrategy):
@@ -178,6 +232,266 @@ class DateBasedSharding(ShardingStrategy):
         return sorted(list(set(shards)))  # Remove duplicates and sort
 
 
+class SizeBasedSharding(ShardingStrategy):
+    """Places folders so every shard stays near a target number of images and bytes.
+    
+    Shards are filled by size rather than by folder ID, so one large folder
+    does not make one large shard next to small ones. A folder is never
+    split, so a folder larger than the target gets a shard of its own.
+    """
+    
+    def __init__(self, target_images=DEFAULT_TARGET_SHARD_IMAGES, target_bytes=DEFAULT_TARGET_SHARD_BYTES):
+        """Initialize size-based sharding.
+        
+        Args:
+            target_images (int): Number of images a shard is kept near
+            target_bytes (int): Database size in bytes a shard is kept near
+        """
+        self.target_images = target_images
+        self.target_bytes = target_bytes
+        
+    def _fits(self, shard_size, folder_size):
+        """Check whether a folder can be added to a shard without passing the target."""
+        return (shard_size.images + folder_size.images <= self.target_images
+                and shard_size.bytes + folder_size.bytes <= self.target_bytes)
+    
+    def is_oversized(self, shard_size):
+        """Check whether a shard has grown far enough past the target to be split.
+        
+        Args:
+            shard_size (ShardSize): Images and bytes of the shard
+            
+        Returns:
+            bool: True if the shard should be rebalanced
+        """
+        return (shard_size.images > self.target_images * REBALANCE_TOLERANCE
+                or shard_size.bytes > self.target_bytes * REBALANCE_TOLERANCE)
+    
+    def _new_shard_id(self, shard_ids):
+        """Name the next shard after the highest numbered one."""
+        numbers = [int(match.group(1)) for match in map(re.compile(r"shard_(\d+)$").match, shard_ids) if match]
+        return f"shard_{max(numbers) + 1 if numbers else 0}"
+        
+    def get_shard_for_folder(self, folder_id):
+        """Get the shard for a new folder when no shard sizes are known.
+        
+        Args:
+            folder_id (int): Folder ID
+            
+        Returns:
+            str: Shard identifier
+        """
+        return self.place_folder(folder_id, EMPTY_SIZE, {})
+    
+    def get_shard_for_image(self, image_data):
+        """Get the shard for a specific image.
+        
+        Args:
+            image_data (dict): Image data
+            
+        Returns:
+            str: Shard identifier
+        """
+        return self.get_shard_for_folder(image_data['folder_id'])
+    
+    def get_all_shards(self):
+        """Get all possible shards.
+        
+        Returns:
+            list: List of all shard identifiers
+        """
+        # Shards are created as they fill up; the ShardManager lists them
+        return []
+    
+    def place_folder(self, folder_id, folder_size, shard_sizes):
+        """Put a folder in the smallest shard it fits in, or in a new shard.
+        
+        Args:
+            folder_id (int): Folder ID
+            folder_size (ShardSize): Images and bytes of the folder
+            shard_sizes (dict): Shard identifier -> ShardSize of the existing shards
+            
+        Returns:
+            str: Shard identifier
+        """
+        candidates = [shard_id for shard_id, size in shard_sizes.items() if self._fits(size, folder_size)]
+        if candidates:
+            return min(candidates, key=lambda shard_id: (shard_sizes[shard_id].images, shard_id))
+        return self._new_shard_id(shard_sizes)
+    
+    def plan_rebalance(self, folder_sizes, folder_shards):
+        """Plan the folder moves that split the oversized shards.
+        
+        The largest folder of an oversized shard stays in place; the others
+        move, largest first, until the shard is back within its target. Each
+        moved folder goes to the smallest shard with room for it, or to a new
+        shard.
+        
+        Args:
+            folder_sizes (dict): Folder ID -> ShardSize
+            folder_shards (dict): Folder ID -> shard identifier
+            
+        Returns:
+            list: (folder_id, source_shard, target_shard) moves, in order
+        """
+        shard_folders = {}
+        for folder_id, shard_id in folder_shards.items():
+            shard_folders.setdefault(shard_id, []).append(folder_id)
+            
+        def total(folder_ids):
+            sizes = [folder_sizes.get(folder_id, EMPTY_SIZE) for folder_id in folder_ids]
+            return ShardSize(sum(size.images for size in sizes), sum(size.bytes for size in sizes))
+            
+        shard_sizes = {shard_id: total(folder_ids) for shard_id, folder_ids in shard_folders.items()}
+        
+        moves = []
+        for shard_id in sorted(shard_folders):
+            if not self.is_oversized(shard_sizes[shard_id]):
+                continue
+                
+            folders = sorted(shard_folders[shard_id], key=lambda f: folder_sizes.get(f, EMPTY_SIZE), reverse=True)
+            if len(folders) == 1:
+                logger.info(f"Shard {shard_id} holds a single folder larger than the target size")
+                continue
+                
+            for folder_id in folders[1:]:
+                size = shard_sizes[shard_id]
+                if size.images <= self.target_images and size.bytes <= self.target_bytes:
+                    break
+                    
+                folder_size = folder_sizes.get(folder_id, EMPTY_SIZE)
+                others = {other: other_size for other, other_size in shard_sizes.items() if other != shard_id}
+                target = self.place_folder(folder_id, folder_size, others)
+                if target not in others:
+                    # A new shard, named after every shard including this one
+                    target = self._new_shard_id(shard_sizes)
+                moves.append((folder_id, shard_id, target))
+                
+                shard_sizes[shard_id] = ShardSize(size.images - folder_size.images, size.bytes - folder_size.bytes)
+                target_size = shard_sizes.get(target, EMPTY_SIZE)
+                shard_sizes[target] = ShardSize(target_size.images + folder_size.images,
+                                                target_size.bytes + folder_size.bytes)
+                
+        return moves
+
+
+def _table_columns(conn, schema, table):
+    """Return the column names of a table in an attached schema."""
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _copy_columns(conn, table, exclude=()):
+    """Return the columns a table has in both the source and the target, in target order."""
+    source_columns = set(_table_columns(conn, MOVE_SOURCE_SCHEMA, table))
+    return [
+        column for column in _table_columns(conn, "main", table)
+        if column in source_columns and column not in exclude
+    ]
+
+
+def _copy_folder(conn, folder_id):
+    """Copy a folder and its images from the attached source into the target.
+
+    Image IDs are kept. directory_id refers to the directories of the source
+    database, so the hierarchy is rebuilt in the target instead.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the target, with the source
+            attached as MOVE_SOURCE_SCHEMA, in a transaction
+        folder_id (int): Folder to copy
+
+    Returns:
+        int: Images copied
+    """
+    # Rows left behind by an interrupted move are replaced
+    conn.execute("DELETE FROM main.images WHERE folder_id = ?", (folder_id,))
+
+    folder_columns = ", ".join(_copy_columns(conn, "folders"))
+    conn.execute(
+        f"""INSERT OR IGNORE INTO main.folders ({folder_columns})
+            SELECT {folder_columns} FROM {MOVE_SOURCE_SCHEMA}.folders WHERE folder_id = ?""",
+        (folder_id,)
+    )
+
+    columns = ", ".join(_copy_columns(conn, "images", exclude=("directory_id",)))
+    copied = conn.execute(
+        f"""INSERT OR IGNORE INTO main.images ({columns})
+            SELECT {columns} FROM {MOVE_SOURCE_SCHEMA}.images WHERE folder_id = ?""",
+        (folder_id,)
+    ).rowcount
+    assign_directories(conn, folder_id)
+    return copied
+
+
+def _sync_folder(conn, folder_id):
+    """Apply the writes made to a folder in the source since it was copied.
+
+    Changed rows are deleted and inserted again rather than replaced, so the
+    delete triggers keeping the search index and counters current fire.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the target, with the source
+            attached as MOVE_SOURCE_SCHEMA, in a transaction
+        folder_id (int): Folder being moved
+
+    Returns:
+        int: Images added, changed or removed since the copy
+    """
+    columns = ", ".join(_copy_columns(conn, "images", exclude=("directory_id",)))
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS shard_move_changed (image_id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.shard_move_changed")
+    conn.execute(
+        f"""INSERT INTO temp.shard_move_changed
+            SELECT image_id FROM (
+                SELECT {columns} FROM {MOVE_SOURCE_SCHEMA}.images WHERE folder_id = ?
+                EXCEPT
+                SELECT {columns} FROM main.images WHERE folder_id = ?
+            )""",
+        (folder_id, folder_id)
+    )
+
+    removed = conn.execute(
+        f"""DELETE FROM main.images WHERE folder_id = ? AND (
+                image_id IN (SELECT image_id FROM temp.shard_move_changed)
+                OR image_id NOT IN (SELECT image_id FROM {MOVE_SOURCE_SCHEMA}.images WHERE folder_id = ?)
+            )""",
+        (folder_id, folder_id)
+    ).rowcount
+    added = conn.execute(
+        f"""INSERT OR IGNORE INTO main.images ({columns})
+            SELECT {columns} FROM {MOVE_SOURCE_SCHEMA}.images
+            WHERE image_id IN (SELECT image_id FROM temp.shard_move_changed)""",
+    ).rowcount
+    assign_directories(conn, folder_id)
+
+    folder_columns = _copy_columns(conn, "folders", exclude=("folder_id",))
+    if folder_columns:
+        column_list = ", ".join(folder_columns)
+        conn.execute(
+            f"""UPDATE main.folders SET ({column_list}) =
+                (SELECT {column_list} FROM {MOVE_SOURCE_SCHEMA}.folders WHERE folder_id = ?)
+                WHERE folder_id = ?""",
+            (folder_id, folder_id)
+        )
+    return max(removed, added)
+
+
+def _delete_folder(conn, folder_id, schema="main"):
+    """Delete a folder and its images from one database.
+
+    Args:
+        conn (sqlite3.Connection): Connection, in a transaction
+        folder_id (int): Folder to delete
+        schema (str): Schema holding the folder
+
+    Returns:
+        int: Images deleted
+    """
+    deleted = conn.execute(f"DELETE FROM {schema}.images WHERE folder_id = ?", (folder_id,)).rowcount
+    conn.execute(f"DELETE FROM {schema}.folders WHERE folder_id = ?", (folder_id,))
+    return deleted
+
+
 class ShardManager:
     """Manages database shards for large image collections."""
     
@@ -197,11 +511,27 @@ class ShardManager:
         # Default to folder-based sharding if none provided
         self.sharding_strategy = sharding_strategy or FolderBasedSharding()
         
-        # Cache of database instances for each shard
+        # Cache of database instances for each shard, and for the main database
         self.db_cache = {}
+        self.base_db = None
         
-        # Cache of folder to shard mapping
+        # Routing cache: folder to shard mapping, the last measured size of
+        # each folder and the shards on disk. Folder moves and new shards
+        # invalidate it; the lock makes a move's switch atomic for lookups.
         self.folder_shard_map = {}
+        self.folder_sizes = {}
+        self.shard_ids = None
+        self.routing_lock = threading.RLock()
+        
+        # Write barrier for folder moves: writers register through
+        # folder_write(), and a move waits for them and holds new ones off
+        # while it catches up, switches the route and clears the source.
+        self.write_condition = threading.Condition()
+        self.active_writes = {}  # folder_id -> writers inside folder_write()
+        self.moving_folders = set()
+        
+        # Created on first use by get_query_executor()
+        self.query_executor = None
         
         logger.info(f"Shard manager initialized with base DB: {base_db_path}, sharding enabled: {enable_sharding}")
         
@@ -216,12 +546,22 @@ class ShardManager:
         os.makedirs(shards_dir, exist_ok=True)
         logger.info(f"Initialized shards directory: {shards_dir}")
     
+    def _get_base_db(self):
+        """Get the cached database instance for the main database file.
+        
+        Returns:
+            Database: Database instance
+        """
+        if self.base_db is None:
+            self.base_db = Database(self.base_db_path)
+        return self.base_db
+    
     def _get_shard_path(self, shard_id):
         """Get the path for a specific shard.
         
         Args:
             shard_id (str): Shard identifier
-            
+        
         Returns:
             str: Path to the shard database file
         """
@@ -231,36 +571,53 @@ class ShardManager:
         """Load the mapping of folders to shards from the main database."""
         if not self.enable_sharding:
             return
-            
+        
         # Use the main database to get folders
-        main_db = Database(self.base_db_path)
+        main_db = self._get_base_db()
         conn = main_db.get_connection()
         
         try:
             if not conn.connect():
                 logger.error("Failed to connect to main database")
                 return
-                
-            cursor = conn.execute("SELECT folder_id, shard_id FROM folder_shard_mapping")
+            
+            # Creates the table, or adds the size columns to an older one
+            self._create_folder_shard_mapping_table(conn)
+            
+            cursor = conn.execute(
+                "SELECT folder_id, shard_id, image_count, byte_count, moving_to FROM folder_shard_mapping"
+            )
             if not cursor:
-                logger.warning("Failed to load folder shard mapping or table doesn't exist")
-                # Table might not exist yet, create it
-                self._create_folder_shard_mapping_table(conn)
+                logger.warning("Failed to load folder shard mapping")
                 return
-                
+            
             # Load the mapping
-            for row in cursor.fetchall():
-                self.folder_shard_map[row['folder_id']] = row['shard_id']
-                
-            logger.info(f"Loaded {len(self.folder_shard_map)} folder shard mappings")
+            rows = cursor.fetchall()
+            with self.routing_lock:
+                self.folder_shard_map = {row['folder_id']: row['shard_id'] for row in rows}
+                self.folder_sizes = {
+                    row['folder_id']: ShardSize(row['image_count'] or 0, row['byte_count'] or 0)
+                    for row in rows
+                }
             
+            logger.info(f"Loaded {len(rows)} folder shard mappings")
+            interrupted = [
+                (row['folder_id'], row['moving_to']) for row in rows
+                if row['moving_to'] and row['moving_to'] != row['shard_id']
+            ]
+        
         except Exception as e:
             logger.error(f"Error loading folder shard mapping: {e}")
-            # Table might not exist yet, create it
-            self._create_folder_shard_mapping_table(conn)
-            
+            return
+        
         finally:
             conn.disconnect()
+        
+        # Copies left behind by moves that were interrupted are not routed to
+        for folder_id, shard_id in interrupted:
+            logger.warning(f"Removing the copy of folder {folder_id} left in {shard_id} by an interrupted move")
+            if self._discard_folder_copy(folder_id, shard_id):
+                self._set_folder_moving(folder_id, None)
     
     def _create_folder_shard_mapping_table(self, conn):
         """Create the folder shard mapping table in the main database.
@@ -273,131 +630,345 @@ class ShardManager:
             if not conn.begin_transaction():
                 logger.error("Failed to begin transaction")
                 return
-                
-            # Create the mapping table
+            
+            # Create the mapping table. moving_to names a shard holding a copy of
+            # the folder that is not routed to: the target while the folder is
+            # copied, the source between the switch and its delete. A move that
+            # is interrupted leaves it set, and that copy is deleted on load.
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS folder_shard_mapping (
                     folder_id INTEGER PRIMARY KEY,
-                    shard_id TEXT NOT NULL
+                    shard_id TEXT NOT NULL,
+                    image_count INTEGER DEFAULT 0,
+                    byte_count INTEGER DEFAULT 0,
+                    moving_to TEXT
                 )
             """)
             
+            # Tables created before size tracking lack the size and move columns
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(folder_shard_mapping)").fetchall()}
+            for column, column_type in (("image_count", "INTEGER DEFAULT 0"),
+                                        ("byte_count", "INTEGER DEFAULT 0"),
+                                        ("moving_to", "TEXT")):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE folder_shard_mapping ADD COLUMN {column} {column_type}")
+            
             # Commit transaction
             if not conn.commit():
                 logger.error("Failed to commit transaction")
                 return
-                
-            logger.info("Created folder shard mapping table")
-            
+        
         except Exception as e:
             logger.error(f"Error creating folder shard mapping table: {e}")
             conn.rollback()
     
-    def _update_folder_shard_mapping(self, folder_id, shard_id):
+    def _update_folder_shard_mapping(self, folder_id, shard_id, size=None, stale_shard_id=None):
         """Update the folder to shard mapping in the main database.
         
         Args:
             folder_id (int): Folder ID
             shard_id (str): Shard identifier
-            
+            size (ShardSize, optional): Images and bytes of the folder
+            stale_shard_id (str, optional): Shard still holding a copy of the
+                folder, recorded in moving_to until the copy is deleted
+        
         Returns:
             bool: True if successful, False otherwise
         """
         if not self.enable_sharding:
             return True
-            
-        # Update local cache
-        self.folder_shard_map[folder_id] = shard_id
+        
+        size = size or self.folder_sizes.get(folder_id, EMPTY_SIZE)
         
         # Update database
-        main_db = Database(self.base_db_path)
+        main_db = self._get_base_db()
         conn = main_db.get_connection()
         
         try:
             if not conn.connect():
                 logger.error("Failed to connect to main database")
                 return False
-                
+            
             # Begin transaction
             if not conn.begin_transaction():
                 logger.error("Failed to begin transaction")
                 return False
-                
-            # Update or insert the mapping
-            conn.execute("""
-                INSERT OR REPLACE INTO folder_shard_mapping (folder_id, shard_id)
-                VALUES (?, ?)
-            """, (folder_id, shard_id))
+            
+            # Update or insert the mapping; this also switches a move
+            cursor = conn.execute("""
+                INSERT INTO folder_shard_mapping (folder_id, shard_id, image_count, byte_count, moving_to)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (folder_id) DO UPDATE SET
+                    shard_id = excluded.shard_id,
+                    image_count = excluded.image_count,
+                    byte_count = excluded.byte_count,
+                    moving_to = excluded.moving_to
+            """, (folder_id, shard_id, size.images, size.bytes, stale_shard_id))
+            if not cursor:
+                raise Exception("Failed to write folder shard mapping")
             
             # Commit transaction
             if not conn.commit():
                 logger.error("Failed to commit transaction")
                 return False
-                
+            
+            # Update local cache
+            with self.routing_lock:
+                self.folder_shard_map[folder_id] = shard_id
+                self.folder_sizes[folder_id] = size
+            
             logger.debug(f"Updated folder shard mapping: folder={folder_id}, shard={shard_id}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error updating folder shard mapping: {e}")
             conn.rollback()
             return False
+        
+        finally:
+            conn.disconnect()
+    
+    def _set_folder_moving(self, folder_id, shard_id):
+        """Record the shard holding a copy of a folder that is not routed to.
+        
+        Args:
+            folder_id (int): Folder ID
+            shard_id (str): Shard the folder is being copied to, or None
+                once no such copy is left
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        conn = self._get_base_db().get_connection()
+        
+        try:
+            if not conn.connect():
+                logger.error("Failed to connect to main database")
+                return False
+            
+            if not conn.begin_transaction():
+                logger.error("Failed to begin transaction")
+                return False
+            
+            cursor = conn.execute(
+                "UPDATE folder_shard_mapping SET moving_to = ? WHERE folder_id = ?",
+                (shard_id, folder_id)
+            )
+            if not cursor:
+                conn.rollback()
+                return False
+            return conn.commit()
+        
+        finally:
+            conn.disconnect()
+    
+    def _discard_folder_copy(self, folder_id, shard_id):
+        """Delete a copy of a folder from a shard it is not routed to.
+        
+        Args:
+            folder_id (int): Folder ID
+            shard_id (str): Shard holding the copy
+        
+        Returns:
+            bool: True if the copy is gone, False otherwise
+        """
+        shard_path = self._get_shard_path(shard_id)
+        if not os.path.exists(shard_path):
+            return True
+        
+        conn = None
+        try:
+            conn = sqlite3.connect(shard_path, timeout=30, isolation_level=None)
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = _delete_folder(conn, folder_id)
+            conn.execute("COMMIT")
+            logger.info(f"Removed {deleted} images of folder {folder_id} from {shard_id}")
+            return True
+        
+        except sqlite3.Error as e:
+            logger.error(f"Error removing folder {folder_id} from {shard_id}: {e}")
+            if conn is not None and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return False
+        
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    def invalidate_routing(self, folder_id=None):
+        """Drop cached routing so the next lookup reads the mapping again.
+        
+        Args:
+            folder_id (int, optional): Folder whose route changed; None drops
+                every route and the list of shards
+        """
+        with self.routing_lock:
+            if folder_id is None:
+                self.folder_shard_map.clear()
+                self.folder_sizes.clear()
+            else:
+                self.folder_shard_map.pop(folder_id, None)
+            self.shard_ids = None
+    
+    def _read_folder_shard(self, folder_id):
+        """Read the shard of one folder from the mapping table.
+        
+        Args:
+            folder_id (int): Folder ID
+        
+        Returns:
+            str: Shard identifier, or None if the folder has not been placed
+        """
+        conn = self._get_base_db().get_connection()
+        
+        try:
+            if not conn.connect():
+                return None
+            
+            cursor = conn.execute(
+                "SELECT shard_id, image_count, byte_count FROM folder_shard_mapping WHERE folder_id = ?",
+                (folder_id,)
+            )
+            row = cursor.fetchone() if cursor else None
+            if not row:
+                return None
             
+            self.folder_sizes[folder_id] = ShardSize(row['image_count'] or 0, row['byte_count'] or 0)
+            return row['shard_id']
+        
         finally:
             conn.disconnect()
     
+    def _route_folder(self, folder_id):
+        """Get the shard a folder is routed to, placing new folders.
+        
+        Args:
+            folder_id (int): Folder ID
+        
+        Returns:
+            str: Shard identifier
+        """
+        with self.routing_lock:
+            shard_id = self.folder_shard_map.get(folder_id)
+            if shard_id:
+                return shard_id
+            
+            shard_id = self._read_folder_shard(folder_id)
+            if shard_id:
+                self.folder_shard_map[folder_id] = shard_id
+                return shard_id
+            
+            # Assign a shard for this folder
+            shard_id = self.sharding_strategy.place_folder(folder_id, EMPTY_SIZE, self.get_shard_sizes())
+            self._update_folder_shard_mapping(folder_id, shard_id, EMPTY_SIZE)
+            return shard_id
+    
     def get_db_for_folder(self, folder_id):
         """Get the database instance for a specific folder.
         
         Args:
             folder_id (int): Folder ID
-            
+        
         Returns:
             Database: Database instance
         """
         if not self.enable_sharding:
             # Return the main database if sharding is disabled
-            return Database(self.base_db_path)
-            
-        # Check if we have a shard mapping for this folder
-        shard_id = self.folder_shard_map.get(folder_id)
+            return self._get_base_db()
         
-        if not shard_id:
-            # Assign a shard for this folder
-            shard_id = self.sharding_strategy.get_shard_for_folder(folder_id)
-            # Update the mapping
-            self._update_folder_shard_mapping(folder_id, shard_id)
+        return self.get_db_for_shard(self._route_folder(folder_id))
+    
+    @contextmanager
+    def folder_write(self, folder_id):
+        """Write to the shard of a folder without racing a move of the folder.
+        
+        Writers holding on to a shard's Database could commit to the source
+        after a move has caught up, and the move would then delete those
+        rows. Writes made inside this block cannot: a move waits for them to
+        finish and new ones wait for the move. Writes must be committed
+        before the block is left, and a folder must not be moved from inside
+        a write to it.
+        
+        Args:
+            folder_id (int): Folder to write to
+        
+        Yields:
+            Database: Database the folder is routed to
+        """
+        with self.write_condition:
+            while folder_id in self.moving_folders:
+                self.write_condition.wait()
+            self.active_writes[folder_id] = self.active_writes.get(folder_id, 0) + 1
+        
+        try:
+            yield self.get_db_for_folder(folder_id)
+        finally:
+            with self.write_condition:
+                self.active_writes[folder_id] -= 1
+                if not self.active_writes[folder_id]:
+                    del self.active_writes[folder_id]
+                self.write_condition.notify_all()
+    
+    def is_folder_moving(self, folder_id):
+        """Check whether writes to a folder are held off by a move.
+        
+        Args:
+            folder_id (int): Folder ID
+        
+        Returns:
+            bool: True while the move of the folder is switching shards
+        """
+        with self.write_condition:
+            return folder_id in self.moving_folders
+    
+    @contextmanager
+    def _block_folder_writes(self, folder_id):
+        """Wait for the writes to a folder to finish and hold off new ones."""
+        with self.write_condition:
+            while folder_id in self.moving_folders:
+                self.write_condition.wait()
+            self.moving_folders.add(folder_id)
+            while self.active_writes.get(folder_id):
+                self.write_condition.wait()
         
-        return self.get_db_for_shard(shard_id)
+        try:
+            yield
+        finally:
+            with self.write_condition:
+                self.moving_folders.discard(folder_id)
+                self.write_condition.notify_all()
     
     def get_db_for_shard(self, shard_id):
         """Get the database instance for a specific shard.
         
         Args:
             shard_id (str): Shard identifier
-            
+        
         Returns:
             Database: Database instance
         """
         if not self.enable_sharding:
             # Return the main database if sharding is disabled
-            return Database(self.base_db_path)
+            return self._get_base_db()
+        
+        with self.routing_lock:
+            # Check if we have this shard in the cache
+            if shard_id in self.db_cache:
+                return self.db_cache[shard_id]
             
-        # Check if we have this shard in the cache
-        if shard_id in self.db_cache:
-            return self.db_cache[shard_id]
+            # Create the shard database path
+            shard_path = self._get_shard_path(shard_id)
             
-        # Create the shard database path
-        shard_path = self._get_shard_path(shard_id)
-        
-        # Create the shard database if it doesn't exist
-        if not os.path.exists(shard_path):
-            self._initialize_shard(shard_id, shard_path)
+            # Create the shard database if it doesn't exist
+            if not os.path.exists(shard_path):
+                self._initialize_shard(shard_id, shard_path)
+                self.shard_ids = None
             
-        # Create and cache the database instance
-        db = Database(shard_path)
-        self.db_cache[shard_id] = db
-        
-        return db
+            # Create and cache the database instance
+            db = Database(shard_path)
+            self.db_cache[shard_id] = db
+            
+            return db
     
     def _initialize_shard(self, shard_id, shard_path):
         """Initialize a new shard database.
@@ -405,7 +976,7 @@ class ShardManager:
         Args:
             shard_id (str): Shard identifier
             shard_path (str): Path to the shard database file
-            
+        
         Returns:
             bool: True if successful, False otherwise
         """
@@ -417,13 +988,9 @@ class ShardManager:
             
             # If main database exists, copy schema from it
             if os.path.exists(self.base_db_path):
-                # Create a new empty database
-                conn = sqlite3.connect(shard_path)
-                conn.close()
-                
-                # Create a new database instance
+                # Create a new database instance; it creates the schema
+                # because the file does not exist yet
                 db = Database(shard_path)
-                # It will initialize automatically
                 
                 # Create optimized indexes
                 index_optimizer = DatabaseIndexOptimizer(shard_path)
@@ -434,7 +1001,7 @@ class ShardManager:
             else:
                 logger.error(f"Main database {self.base_db_path} does not exist")
                 return False
-                
+        
         except Exception as e:
             logger.error(f"Error initializing shard {shard_id}: {e}")
             return False
@@ -445,14 +1012,14 @@ class ShardManager:
         Args:
             query_type (str): Type of query (e.g., 'folder', 'search', 'date_range')
             **kwargs: Additional arguments for the query
-            
+        
         Returns:
             list: List of Database instances
         """
         if not self.enable_sharding:
             # Return the main database if sharding is disabled
-            return [Database(self.base_db_path)]
-            
+            return [self._get_base_db()]
+        
         if query_type == 'folder':
             folder_id = kwargs.get('folder_id')
             if folder_id is not None:
@@ -460,7 +1027,7 @@ class ShardManager:
             else:
                 logger.error("Folder ID is required for folder query")
                 return []
-                
+        
         elif query_type == 'image':
             image_id = kwargs.get('image_id')
             if image_id is not None:
@@ -469,11 +1036,11 @@ class ShardManager:
             else:
                 logger.error("Image ID is required for image query")
                 return []
-                
+        
         elif query_type == 'search' or query_type == 'all_images':
             # For search queries or getting all images, query all shards
             return self.get_all_shard_dbs()
-            
+        
         elif query_type == 'date_range':
             # For date range queries, we can be more selective with date-based sharding
             if isinstance(self.sharding_strategy, DateBasedSharding):
@@ -486,7 +1053,7 @@ class ShardManager:
                         from_date = datetime.strptime(from_date, '%Y-%m-%d %H:%M:%S')
                     if isinstance(to_date, str):
                         to_date = datetime.strptime(to_date, '%Y-%m-%d %H:%M:%S')
-                        
+                    
                     # Get all possible shards within this date range
                     shards = []
                     current = from_date
@@ -509,12 +1076,29 @@ class ShardManager:
             else:
                 # If not using date-based sharding, query all shards
                 return self.get_all_shard_dbs()
-                
+        
         else:
             logger.warning(f"Unknown query type: {query_type}")
             # Default to all shards
             return self.get_all_shard_dbs()
     
+    def _list_shard_ids(self):
+        """List the shards on disk, from the routing cache when it is current.
+        
+        Returns:
+            list: Shard identifiers
+        """
+        with self.routing_lock:
+            if self.shard_ids is None:
+                shards_dir = os.path.join(self.base_dir, "shards")
+                if os.path.exists(shards_dir):
+                    self.shard_ids = sorted(
+                        os.path.splitext(f)[0] for f in os.listdir(shards_dir) if f.endswith('.db')
+                    )
+                else:
+                    self.shard_ids = []
+            return list(self.shard_ids)
+    
     def get_all_shard_dbs(self):
         """Get database instances for all existing shards.
         
@@ -523,29 +1107,236 @@ class ShardManager:
         """
         if not self.enable_sharding:
             # Return the main database if sharding is disabled
-            return [Database(self.base_db_path)]
-            
-        # First, check the shards directory
-        shards_dir = os.path.join(self.base_dir, "shards")
+            return [self._get_base_db()]
+        
+        shard_ids = self._list_shard_ids()
+        if not shard_ids:
+            # If no shard files yet, return main database
+            return [self._get_base_db()]
+        
+        # Get database instances for each shard
+        return [self.get_db_for_shard(shard_id) for shard_id in shard_ids]
+    
+    def get_shard_sizes(self):
+        """Get the size of every shard from the last measured folder sizes.
+        
+        Returns:
+            dict: Shard identifier -> ShardSize
+        """
+        with self.routing_lock:
+            sizes = {shard_id: EMPTY_SIZE for shard_id in self._list_shard_ids()}
+            for folder_id, shard_id in self.folder_shard_map.items():
+                folder_size = self.folder_sizes.get(folder_id, EMPTY_SIZE)
+                size = sizes.get(shard_id, EMPTY_SIZE)
+                sizes[shard_id] = ShardSize(size.images + folder_size.images, size.bytes + folder_size.bytes)
+            return sizes
+    
+    def refresh_shard_stats(self):
+        """Measure every shard and record the images and bytes of each folder.
         
-        if not os.path.exists(shards_dir):
-            # If shards directory doesn't exist yet, return main database
-            return [Database(self.base_db_path)]
+        Image counts come from the counters each shard maintains. A shard's
+        bytes are its used database pages; a folder is charged its share of
+        them by image count.
+        
+        Returns:
+            dict: Shard identifier -> ShardSize
+        """
+        if not self.enable_sharding:
+            return {}
+        
+        self._load_folder_shard_mapping()
+        
+        shard_sizes = {}
+        folder_sizes = {}
+        for shard_id in self._list_shard_ids():
+            conn = self.get_db_for_shard(shard_id).get_connection()
+            if not conn:
+                continue
+            
+            try:
+                counts = read_counts(conn.conn)
+                page_size = conn.conn.execute("PRAGMA page_size").fetchone()[0]
+                page_count = conn.conn.execute("PRAGMA page_count").fetchone()[0]
+                free_pages = conn.conn.execute("PRAGMA freelist_count").fetchone()[0]
+                shard_bytes = (page_count - free_pages) * page_size
+                
+                # Rows of a folder routed elsewhere are left over from an interrupted move
+                images = 0
+                used_bytes = 0
+                for folder_id, count in counts["folders"].items():
+                    if self.folder_shard_map.get(folder_id) != shard_id:
+                        continue
+                    folder_bytes = shard_bytes * count // counts["library"] if counts["library"] else 0
+                    folder_sizes[folder_id] = ShardSize(count, folder_bytes)
+                    images += count
+                    used_bytes += folder_bytes
+                shard_sizes[shard_id] = ShardSize(images, used_bytes)
+            
+            except sqlite3.Error as e:
+                logger.error(f"Error measuring shard {shard_id}: {e}")
             
-        # Find all .db files in the shards directory
-        shard_files = [f for f in os.listdir(shards_dir) if f.endswith('.db')]
+            finally:
+                conn.disconnect()
         
-        if not shard_files:
-            # If no shard files yet, return main database
-            return [Database(self.base_db_path)]
+        # Record the sizes so placement works without measuring again
+        conn = self._get_base_db().get_connection()
+        try:
+            if conn.connect() and conn.begin_transaction():
+                for folder_id, size in folder_sizes.items():
+                    conn.execute(
+                        "UPDATE folder_shard_mapping SET image_count = ?, byte_count = ? WHERE folder_id = ?",
+                        (size.images, size.bytes, folder_id)
+                    )
+                conn.commit()
+        finally:
+            conn.disconnect()
+        
+        with self.routing_lock:
+            self.folder_sizes.update(folder_sizes)
+        
+        logger.info(f"Shard sizes: {shard_sizes}")
+        return shard_sizes
+    
+    def _open_copy_connection(self, target_path, source_path):
+        """Open a connection to a target database with a source attached for copying.
+        
+        Args:
+            target_path (str): Database to copy into
+            source_path (str): Database to copy from
+        
+        Returns:
+            sqlite3.Connection: Connection with the source attached as MOVE_SOURCE_SCHEMA
+        """
+        conn = sqlite3.connect(target_path, timeout=30, isolation_level=None)
+        conn.execute(f"ATTACH DATABASE ? AS {MOVE_SOURCE_SCHEMA}", (source_path,))
+        return conn
+    
+    def move_folder(self, folder_id, target_shard_id):
+        """Move a folder to another shard while it stays available.
+        
+        The move has two phases. The folder is first copied to the target
+        while reads and writes still go to the source shard. Then writes
+        made through folder_write() are held off, and holding the routing
+        lock so no lookup sees a half-finished move, the rows written during
+        the copy are brought over and the mapping is switched to the target.
+        The folder is deleted from the source before writes resume, so no
+        write can land in the source after the catch-up.
+        
+        Args:
+            folder_id (int): Folder to move
+            target_shard_id (str): Shard to move it to
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not self.enable_sharding:
+            return False
+        
+        source_shard_id = self._route_folder(folder_id)
+        if source_shard_id == target_shard_id:
+            return True
+        
+        # Creates the target shard if needed
+        self.get_db_for_shard(target_shard_id)
+        source_path = self._get_shard_path(source_shard_id)
+        target_path = self._get_shard_path(target_shard_id)
+        
+        if not os.path.exists(source_path):
+            # Nothing was written for the folder yet, only the route changes
+            return self._update_folder_shard_mapping(folder_id, target_shard_id)
+        
+        logger.info(f"Moving folder {folder_id} from {source_shard_id} to {target_shard_id}")
+        conn = None
+        switched = False
+        try:
+            conn = self._open_copy_connection(target_path, source_path)
+            self._set_folder_moving(folder_id, target_shard_id)
             
-        # Get database instances for each shard
-        dbs = []
-        for shard_file in shard_files:
-            shard_id = os.path.splitext(shard_file)[0]
-            dbs.append(self.get_db_for_shard(shard_id))
+            # Phase one: copy while the folder stays routed to the source
+            conn.execute("BEGIN IMMEDIATE")
+            copied = _copy_folder(conn, folder_id)
+            conn.execute("COMMIT")
             
-        return dbs
+            # Phase two: hold off writers, catch up and switch the route
+            with self._block_folder_writes(folder_id):
+                with self.routing_lock:
+                    conn.execute("BEGIN IMMEDIATE")
+                    changed = _sync_folder(conn, folder_id)
+                    conn.execute("COMMIT")
+                    
+                    if not self._update_folder_shard_mapping(folder_id, target_shard_id,
+                                                             stale_shard_id=source_shard_id):
+                        raise sqlite3.OperationalError("failed to switch the folder shard mapping")
+                    switched = True
+                
+                # The source copy is no longer routed to and can go
+                conn.execute("BEGIN IMMEDIATE")
+                _delete_folder(conn, folder_id, MOVE_SOURCE_SCHEMA)
+                conn.execute("COMMIT")
+            self._set_folder_moving(folder_id, None)
+            
+            logger.info(f"Moved folder {folder_id} to {target_shard_id}: {copied} images copied, "
+                        f"{changed} changed during the copy")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error moving folder {folder_id} to {target_shard_id}: {e}")
+            if conn is not None and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            
+            # Remove the copy the folder is not routed to, so it is not counted twice.
+            # If that fails too, moving_to still names it and it is removed on the next load.
+            stale_shard_id = source_shard_id if switched else target_shard_id
+            if self._discard_folder_copy(folder_id, stale_shard_id):
+                self._set_folder_moving(folder_id, None)
+            return False
+        
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    def rebalance(self, progress_callback=None):
+        """Split oversized shards by moving folders to smaller or new shards.
+        
+        Only strategies that track sizes plan moves; for the others this
+        just records the current sizes.
+        
+        Args:
+            progress_callback (callable, optional): Called as (step, steps, message)
+        
+        Returns:
+            dict: Moves planned and made, failed moves and the shard sizes afterwards
+        """
+        if not self.enable_sharding:
+            return {"planned": 0, "moved": 0, "failed": 0, "shards": {}}
+        
+        shard_sizes = self.refresh_shard_stats()
+        with self.routing_lock:
+            moves = self.sharding_strategy.plan_rebalance(dict(self.folder_sizes), dict(self.folder_shard_map))
+        
+        moved = 0
+        for step, (folder_id, source_shard_id, target_shard_id) in enumerate(moves):
+            if progress_callback:
+                progress_callback(step, len(moves),
+                                  f"Moving folder {folder_id} from {source_shard_id} to {target_shard_id}...")
+            if self.move_folder(folder_id, target_shard_id):
+                moved += 1
+        
+        if moves:
+            shard_sizes = self.refresh_shard_stats()
+            logger.info(f"Rebalanced shards: moved {moved} of {len(moves)} folders")
+        
+        return {"planned": len(moves), "moved": moved, "failed": len(moves) - moved, "shards": shard_sizes}
+    
+    def get_query_executor(self):
+        """Get the executor that runs queries on all relevant shards concurrently.
+        
+        Returns:
+            ShardQueryExecutor: Executor bound to this shard manager
+        """
+        if self.query_executor is None:
+            self.query_executor = ShardQueryExecutor(self)
+        return self.query_executor
     
     def migrate_to_sharding(self):
         """Migrate the database from a single file to sharded structure.
@@ -556,7 +1347,7 @@ class ShardManager:
         if not self.enable_sharding:
             logger.warning("Sharding is disabled, cannot migrate")
             return False
-            
+        
         logger.info("Starting migration to sharded database structure...")
         
         # Create a backup of the main database
@@ -569,7 +1360,7 @@ class ShardManager:
             return False
         
         # Open the main database
-        main_db = Database(self.base_db_path)
+        main_db = self._get_base_db()
         main_conn = main_db.get_connection()
         
         if not main_conn.connect():
@@ -582,92 +1373,72 @@ class ShardManager:
             if not cursor:
                 logger.error("Failed to get folders")
                 return False
-                
+            
             folders = cursor.fetchall()
             logger.info(f"Found {len(folders)} folders to migrate")
             
+            # Size-aware strategies get each folder's images and its share of
+            # the database size; placing the largest folders first packs the
+            # shards evenly
+            counts = read_counts(main_conn.conn)
+            page_size = main_conn.conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = main_conn.conn.execute("PRAGMA page_count").fetchone()[0]
+            main_bytes = page_size * page_count
+            folder_sizes = {
+                folder['folder_id']: ShardSize(
+                    counts["folders"].get(folder['folder_id'], 0),
+                    main_bytes * counts["folders"].get(folder['folder_id'], 0) // counts["library"]
+                    if counts["library"] else 0
+                )
+                for folder in folders
+            }
+            folders = sorted(folders, key=lambda folder: folder_sizes[folder['folder_id']], reverse=True)
+            shard_sizes = self.get_shard_sizes()
+            
             # Process each folder
             for folder in folders:
                 folder_id = folder['folder_id']
+                folder_size = folder_sizes[folder_id]
                 
                 # Determine which shard to use for this folder
-                shard_id = self.sharding_strategy.get_shard_for_folder(folder_id)
+                shard_id = self.sharding_strategy.place_folder(folder_id, folder_size, shard_sizes)
+                size = shard_sizes.get(shard_id, EMPTY_SIZE)
+                shard_sizes[shard_id] = ShardSize(size.images + folder_size.images, size.bytes + folder_size.bytes)
                 
-                # Get the database for this shard
-                shard_db = self.get_db_for_shard(shard_id)
-                shard_conn = shard_db.get_connection()
-                
-                if not shard_conn.connect():
-                    logger.error(f"Failed to connect to shard database for folder {folder_id}")
-                    continue
+                # Creates the shard database if needed
+                self.get_db_for_shard(shard_id)
                 
+                shard_conn = None
                 try:
-                    # Begin transaction
-                    if not shard_conn.begin_transaction():
-                        logger.error(f"Failed to begin transaction in shard for folder {folder_id}")
-                        continue
-                        
-                    # Copy folder to shard
-                    shard_conn.execute(
-                        "INSERT OR IGNORE INTO folders (folder_id, path, enabled, last_scan_time) VALUES (?, ?, ?, ?)",
-                        (folder_id, folder['path'], 1, datetime.now())
-                    )
-                    
-                    # Get images for this folder
-                    cursor = main_conn.execute("SELECT * FROM images WHERE folder_id = ?", (folder_id,))
-                    if not cursor:
-                        logger.error(f"Failed to get images for folder {folder_id}")
-                        shard_conn.rollback()
-                        continue
-                        
-                    images = cursor.fetchall()
-                    logger.info(f"Migrating {len(images)} images for folder {folder_id} to shard {shard_id}")
-                    
-                    # Copy images to shard in batches
-                    batch_size = 100
-                    for i in range(0, len(images), batch_size):
-                        batch = images[i:i+batch_size]
-                        
-                        for image in batch:
-                            shard_conn.execute(
-                                """
-                                INSERT OR IGNORE INTO images (
-                                    image_id, folder_id, filename, full_path, file_size, 
-                                    file_hash, last_modified_date, thumbnail_path, 
-                                    ai_description, user_description, last_scanned
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                """,
-                                (
-                                    image['image_id'], image['folder_id'], image['filename'],
-                                    image['full_path'], image['file_size'], image['file_hash'],
-                                    image['last_modified_date'], image['thumbnail_path'],
-                                    image['ai_description'], image['user_description'],
-                                    image['last_scanned']
-                                )
-                            )
-                            
-                    # Commit transaction
-                    if not shard_conn.commit():
-                        logger.error(f"Failed to commit transaction in shard for folder {folder_id}")
-                        continue
+                    # Copy the folder and its images in one set-based transaction
+                    shard_conn = self._open_copy_connection(self._get_shard_path(shard_id), self.base_db_path)
+                    shard_conn.execute("BEGIN IMMEDIATE")
+                    copied = _copy_folder(shard_conn, folder_id)
+                    shard_conn.execute("COMMIT")
+                    logger.info(f"Migrated {copied} images for folder {folder_id} to shard {shard_id}")
                     
                     # Record the folder-shard mapping
-                    self._update_folder_shard_mapping(folder_id, shard_id)
-                    
-                except Exception as e:
+                    self._update_folder_shard_mapping(folder_id, shard_id, folder_size)
+                
+                except sqlite3.Error as e:
                     logger.error(f"Error migrating folder {folder_id} to shard: {e}")
-                    shard_conn.rollback()
-                    
+                    if shard_conn is not None and shard_conn.in_transaction:
+                        shard_conn.execute("ROLLBACK")
+                
                 finally:
-                    shard_conn.disconnect()
+                    if shard_conn is not None:
+                        shard_conn.close()
+            
+            # Split any shard the estimates let grow past its target
+            self.rebalance()
             
             logger.info("Migration to sharded database structure completed successfully")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error during migration: {e}")
             return False
-            
+        
         finally:
             main_conn.disconnect()
     
@@ -678,6 +1449,171 @@ class ShardManager:
             # No direct way to close a Database object, but it's okay
             # as connections are short-lived and closed after use
             pass
-            
+        
         self.db_cache.clear()
+        self.base_db = None
+        
+        if self.query_executor is not None:
+            self.query_executor.shutdown()
+            self.query_executor = None
         logger.debug("Shard manager cleaned up")
+
+
+def _sort_value(value):
+    """Sort key for one column that orders NULLs the way SQLite does.
+
+    SQLite puts NULLs first in ascending order and last in descending order;
+    comparing (is not None, value) tuples gives the same result.
+    """
+    return (value is not None, value)
+
+
+class ShardQueryExecutor:
+    """Runs one query on several shards in parallel and combines the results."""
+    
+    def __init__(self, shard_manager, max_workers=MAX_SHARD_QUERY_WORKERS):
+        """Initialize the executor.
+        
+        Args:
+            shard_manager (ShardManager): Shard manager that selects the shards
+            max_workers (int): Maximum number of shards queried at the same time
+        """
+        self.shard_manager = shard_manager
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ShardQuery")
+        
+    def _query_shard(self, db, query, params):
+        """Run a query on one shard.
+        
+        Args:
+            db (Database): Shard database
+            query (str): SQL query
+            params (tuple): Query parameters
+            
+        Returns:
+            list: Result rows as dictionaries
+        """
+        conn = db.get_connection()
+        if not conn:
+            raise Exception(f"Failed to connect to shard {db.db_path}")
+            
+        try:
+            cursor = conn.execute(query, params)
+            if not cursor:
+                raise Exception(f"Query failed on shard {db.db_path}")
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.disconnect()
+            
+    def fan_out(self, dbs, query, params=()):
+        """Run the same query on every shard concurrently.
+        
+        Args:
+            dbs (list): Shard databases, e.g. from ShardManager.get_dbs_for_query()
+            query (str): SQL query
+            params (tuple): Query parameters
+            
+        Returns:
+            list: One list of result rows per shard that answered; shards that
+                fail are logged and skipped
+        """
+        if len(dbs) == 1:
+            # Nothing to overlap, skip the thread hop
+            try:
+                return [self._query_shard(dbs[0], query, params)]
+            except Exception as e:
+                logger.error(f"Error querying shard {dbs[0].db_path}: {e}")
+                return []
+                
+        futures = [(db, self.pool.submit(self._query_shard, db, query, params)) for db in dbs]
+        results = []
+        for db, future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Error querying shard {db.db_path}: {e}")
+        return results
+        
+    def fetch_ordered(self, query_type, query, params=(), order_by=("image_id",), descending=False,
+                      limit=100, offset=0, **kwargs):
+        """Run an ordered query on the relevant shards and merge the results.
+        
+        Each shard gets LIMIT limit + offset, since no row past that position
+        in a shard can appear in the requested page. The sorted shard results
+        are combined with a k-way heap merge, so the cost is about one shard's
+        query plus merging, not the sum of all shards.
+        
+        Args:
+            query_type (str): Query type passed to ShardManager.get_dbs_for_query()
+            query (str): SQL query ending in an ORDER BY over the order_by
+                columns, all in the direction given by descending, without LIMIT
+            params (tuple): Query parameters
+            order_by (tuple): Result columns the query is ordered by
+            descending (bool): Whether the ORDER BY is descending
+            limit (int): Maximum number of rows to return
+            offset (int): Number of rows to skip
+            **kwargs: Arguments for get_dbs_for_query()
+            
+        Returns:
+            list: Merged result rows as dictionaries
+        """
+        dbs = self.shard_manager.get_dbs_for_query(query_type, **kwargs)
+        if not dbs:
+            return []
+            
+        shard_rows = self.fan_out(dbs, f"{query} LIMIT ?", tuple(params) + (limit + offset,))
+        
+        def sort_key(row):
+            return tuple(_sort_value(row[column]) for column in order_by)
+            
+        merged = heapq.merge(*shard_rows, key=sort_key, reverse=descending)
+        return list(itertools.islice(merged, offset, offset + limit))
+        
+    def count(self, query_type, query, params=(), **kwargs):
+        """Run a COUNT(*) query on the relevant shards and add up the results.
+        
+        Args:
+            query_type (str): Query type passed to ShardManager.get_dbs_for_query()
+            query (str): SQL query returning a single count
+            params (tuple): Query parameters
+            **kwargs: Arguments for get_dbs_for_query()
+            
+        Returns:
+            int: Total count over all shards
+        """
+        dbs = self.shard_manager.get_dbs_for_query(query_type, **kwargs)
+        total = 0
+        for rows in self.fan_out(dbs, query, params):
+            if rows:
+                total += list(rows[0].values())[0] or 0
+        return total
+        
+    def get_all_images(self, limit=100, offset=0):
+        """Get images from all shards, newest first.
+        
+        Args:
+            limit (int): Maximum number of images to return
+            offset (int): Number of images to skip
+            
+        Returns:
+            list: Image dictionaries
+        """
+        return self.fetch_ordered(
+            "all_images",
+            "SELECT * FROM images ORDER BY last_modified_date DESC, image_id DESC",
+            order_by=("last_modified_date", "image_id"),
+            descending=True,
+            limit=limit,
+            offset=offset
+        )
+        
+    def get_image_count(self):
+        """Get the number of images over all shards.
+        
+        Returns:
+            int: Total number of images
+        """
+        return self.count("all_images", "SELECT COUNT(*) FROM images")
+        
+    def shutdown(self):
+        """Stop the worker threads."""
+        self.pool.shutdown(wait=False)
@@ -8,10 +8,14 @@ This module ensures the database is in a good state at application startup.
 import os
 import logging
 import sqlite3
-import shutil
 import time
 from pathlib import Path
 
+from src.database.db_health import copy_for_recovery, forget_verification, start_background_backup, verify_database
+from src.database.db_merge import copy_database
+from src.database.db_migrations import migrate
+from src.database.db_wal import remove_wal_files
+
 logger = logging.getLogger("StarImageBrowse.database.db_startup_repair")
 
 def ensure_database_integrity(db_path):
@@ -32,39 +36,17 @@ def ensure_database_integrity(db_path):
         logger.info("Database does not exist, will be created when needed")
         return True
     
-    # Create backup of current database - use a consistent name for a single backup file
-    backup_path = f"{db_path}.backup"
-    try:
-        shutil.copy2(db_path, backup_path)
-        logger.info(f"Created backup at {backup_path}")
-    except Exception as e:
-        logger.error(f"Failed to create backup: {e}")
-        # Continue anyway, we'll try to repair
-    
-    # Try to open the database and check integrity
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Run integrity check
-        cursor.execute("PRAGMA integrity_check")
-        result = cursor.fetchone()
+    # Quick check after a clean shutdown, full integrity check otherwise
+    if verify_database(db_path):
+        # Refresh the backup without holding up startup
+        start_background_backup(db_path)
+        return True
         
-        if result and result[0] == "ok":
-            logger.info("Database integrity check passed")
-            conn.close()
-            return True
-        else:
-            logger.warning(f"Database integrity check failed: {result[0] if result else 'Unknown error'}")
-            conn.close()
-            
-            # Database is corrupted, rebuild it
-            return rebuild_database(db_path, backup_path)
-            
-    except sqlite3.Error as e:
-        logger.error(f"Error checking database integrity: {e}")
-        # Database is likely corrupted, rebuild it
-        return rebuild_database(db_path, backup_path)
+    # Database is corrupted, rebuild it from a copy of what is left
+    salvage_path = copy_for_recovery(db_path)
+    rebuilt = rebuild_database(db_path, salvage_path or f"{db_path}.backup")
+    forget_verification(db_path)
+    return rebuilt
 
 def rebuild_database(db_path, backup_path):
     """
@@ -83,6 +65,7 @@ def rebuild_database(db_path, backup_path):
         # Remove the corrupted database
         if os.path.exists(db_path):
             os.remove(db_path)
+            remove_wal_files(db_path)
             logger.info("Removed corrupted database")
         
         # Create a new database
@@ -114,107 +97,7 @@ def rebuild_database(db_path, backup_path):
 
 def create_schema(conn, cursor):
     """Create the database schema."""
-    # Create folders table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS folders (
-            folder_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            path TEXT UNIQUE NOT NULL,
-            enabled INTEGER DEFAULT 1,
-            last_scan_time TIMESTAMP
-        )
-    ''')
-    
-    # Create images table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS images (
-            image_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            folder_id INTEGER,
-            filename TEXT NOT NULL,
-            full_path TEXT UNIQUE NOT NULL,
-            file_size INTEGER,
-            file_hash TEXT,
-            creation_date TIMESTAMP,
-            last_modified_date TIMESTAMP,
-            thumbnail_path TEXT,
-            ai_description TEXT,
-            user_description TEXT,
-            last_scanned TIMESTAMP,
-            width INTEGER,
-            height INTEGER,
-            FOREIGN KEY (folder_id) REFERENCES folders (folder_id)
-        )
-    ''')
-    
-    # Create index on full_path for faster lookups
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_full_path ON images (full_path)
-    ''')
-    
-    # Create index for searching descriptions
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_ai_description ON images (ai_description)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_user_description ON images (user_description)
-    ''')
-    
-    # Create index for dimension searches
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_dimensions ON images (width, height)
-    ''')
-    
-    # Create performance indexes
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_folder_id ON images (folder_id)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_last_modified ON images (last_modified_date DESC)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_search_modified ON images (ai_description, last_modified_date DESC)
-    ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_images_search_modified_user ON images (user_description, last_modified_date DESC)
-    ''')
-    
-    # Create virtual table for full-text search
-    cursor.execute('''
-        CREATE VIRTUAL TABLE IF NOT EXISTS image_fts USING fts5(
-            image_id UNINDEXED,
-            ai_description,
-            user_description,
-            content='images',
-            content_rowid='image_id'
-        )
-    ''')
-    
-    # Create triggers to keep FTS table in sync with the images table
-    # Trigger for INSERT
-    cursor.execute('''
-        CREATE TRIGGER IF NOT EXISTS images_ai_insert AFTER INSERT ON images BEGIN
-            INSERT INTO image_fts(image_id, ai_description, user_description)
-            VALUES (new.image_id, new.ai_description, new.user_description);
-        END
-    ''')
-    
-    # Trigger for UPDATE
-    cursor.execute('''
-        CREATE TRIGGER IF NOT EXISTS images_ai_update AFTER UPDATE ON images BEGIN
-            UPDATE image_fts SET 
-                ai_description = new.ai_description,
-                user_description = new.user_description
-            WHERE image_id = new.image_id;
-        END
-    ''')
-    
-    # Trigger for DELETE
-    cursor.execute('''
-        CREATE TRIGGER IF NOT EXISTS images_ai_delete AFTER DELETE ON images BEGIN
-            DELETE FROM image_fts WHERE image_id = old.image_id;
-        END
-    ''')
-    
-    conn.commit()
+    migrate(conn)
     logger.info("Database schema created successfully")
 
 def recover_data(backup_path, conn, cursor):
@@ -226,91 +109,9 @@ def recover_data(backup_path, conn, cursor):
     logger.info(f"Attempting to recover data from backup: {backup_path}")
     
     try:
-        # Connect to backup database
-        backup_conn = sqlite3.connect(backup_path)
-        backup_conn.row_factory = sqlite3.Row
-        backup_cursor = backup_conn.cursor()
-        
-        # Recover folders
-        try:
-            backup_cursor.execute("SELECT * FROM folders")
-            folders = backup_cursor.fetchall()
-            
-            for folder in folders:
-                folder_dict = dict(folder)
-                cursor.execute(
-                    "INSERT INTO folders (folder_id, path, enabled, last_scan_time) VALUES (?, ?, ?, ?)",
-                    (
-                        folder_dict['folder_id'],
-                        folder_dict['path'],
-                        folder_dict['enabled'],
-                        folder_dict['last_scan_time']
-                    )
-                )
-            
-            logger.info(f"Recovered {len(folders)} folders")
-        except Exception as e:
-            logger.warning(f"Error recovering folders: {e}")
-        
-        # Recover images in batches
-        try:
-            batch_size = 500
-            offset = 0
-            total_recovered = 0
-            
-            while True:
-                backup_cursor.execute(f"SELECT * FROM images LIMIT {batch_size} OFFSET {offset}")
-                images = backup_cursor.fetchall()
-                
-                if not images:
-                    break
-                
-                for image in images:
-                    image_dict = dict(image)
-                    try:
-                        cursor.execute(
-                            """INSERT INTO images (
-                                image_id, folder_id, filename, full_path, file_size, file_hash,
-                                creation_date, last_modified_date, thumbnail_path,
-                                ai_description, user_description, last_scanned
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                            (
-                                image_dict['image_id'],
-                                image_dict['folder_id'],
-                                image_dict['filename'],
-                                image_dict['full_path'],
-                                image_dict['file_size'],
-                                image_dict['file_hash'],
-                                image_dict['creation_date'],
-                                image_dict['last_modified_date'],
-                                image_dict['thumbnail_path'],
-                                image_dict['ai_description'],
-                                image_dict['user_description'],
-                                image_dict['last_scanned']
-                            )
-                        )
-                        total_recovered += 1
-                    except sqlite3.Error as e:
-                        # Skip this image if there's an error
-                        logger.warning(f"Error recovering image {image_dict.get('image_id')}: {e}")
-                
-                offset += batch_size
-                conn.commit()  # Commit each batch
-            
-            logger.info(f"Recovered {total_recovered} images")
-            
-            # Populate FTS table
-            cursor.execute('''
-                INSERT INTO image_fts(image_id, ai_description, user_description)
-                SELECT image_id, ai_description, user_description FROM images
-                WHERE image_id NOT IN (SELECT image_id FROM image_fts)
-            ''')
-            
-        except Exception as e:
-            logger.warning(f"Error recovering images: {e}")
-        
-        backup_conn.close()
-        conn.commit()
+        # Copies every table in one transaction and rebuilds the FTS index once
+        stats = copy_database(conn, backup_path)
+        logger.info(f"Recovered {stats['folders']} folders and {stats['images']} images")
         
     except Exception as e:
         logger.error(f"Error recovering data from backup: {e}")
@@ -322,8 +123,8 @@ def set_performance_settings(conn, cursor):
         # Set synchronous mode to NORMAL for better performance with good reliability
         cursor.execute("PRAGMA synchronous=NORMAL")
         
-        # Set journal mode to DELETE for better compatibility
-        cursor.execute("PRAGMA journal_mode=DELETE")
+        # The journal mode stays WAL, set once by db_wal.enable_wal(); switching
+        # it needs every other connection closed
         
         # Set temp store to MEMORY for better performance
         cursor.execute("PRAGMA temp_store=MEMORY")
@@ -2,168 +2,216 @@
 # -*- coding: utf-8 -*-
 """
 Prepared statement caching for StarImageBrowse
-Improves query performance by caching and reusing prepared statements.
+Improves query performance by reusing compiled statements. sqlite3 keeps an
+LRU cache of prepared statements per connection, keyed by the exact SQL text;
+this module sizes that cache for long-lived connections, keeps the SQL text
+canonical so equivalent queries share one entry, and tracks how often the
+cache is hit.
 """
 
+import re
 import logging
-import time
 import sqlite3
+import functools
 from collections import OrderedDict
 
 logger = logging.getLogger("StarImageBrowse.database.db_statement_cache")
 
+# Prepared statements kept per long-lived connection (sqlite3 defaults to 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Quoted strings, identifiers and comments are kept as they are, other
+# whitespace is collapsed. A line comment keeps the newline that ends it, or
+# the rest of the statement would become part of the comment.
+_SQL_TOKEN_RE = re.compile(
+    r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|/\*.*?(?:\*/|\Z))|(--[^\n]*)\s*|\s+""",
+    re.DOTALL
+)
+
+
+def _canonical_token(match):
+    """Get the canonical text of a token matched by _SQL_TOKEN_RE.
+
+    Args:
+        match (re.Match): Quoted text, a comment or whitespace
+
+    Returns:
+        str: Replacement text for the token
+    """
+    if match.group(1):
+        return match.group(1)
+    if match.group(2):
+        return match.group(2) + "\n"
+    return " "
+
+
+@functools.lru_cache(maxsize=1024)
+def canonical_sql(query):
+    """Collapse the whitespace of a statement outside quoted text and comments.
+
+    sqlite3 looks up prepared statements by their exact text, so the same
+    query written with different indentation would otherwise be compiled
+    and cached twice.
+
+    Args:
+        query (str): SQL query
+
+    Returns:
+        str: The query with runs of whitespace replaced by one space
+    """
+    return _SQL_TOKEN_RE.sub(_canonical_token, query).strip()
+
+
+
 class PreparedStatementCache:
-    """Cache for SQLite prepared statements to improve query performance."""
-    
-    def __init__(self, max_size=100, expiration_seconds=300):
-        """Initialize the prepared statement cache.
-        
+    """Tracks the prepared statement cache of one sqlite3 connection.
+
+    sqlite3 compiles and caches the statements itself. This class mirrors its
+    LRU bookkeeping for the statements run through it, which gives exact hit
+    and miss counts as long as the connection is only used through it.
+    """
+
+    def __init__(self, max_size=STATEMENT_CACHE_SIZE):
+        """Initialize the statement cache.
+
         Args:
-            max_size (int): Maximum number of statements to cache
-            expiration_seconds (int): Number of seconds before a statement expires
+            max_size (int): Number of statements the connection caches; pass the
+                same value as cached_statements when connecting
         """
         self.max_size = max_size
-        self.expiration_seconds = expiration_seconds
-        self.cache = OrderedDict()  # {query_hash: (statement, last_used_time)}
-        
-    def _get_hash(self, query, params=None):
-        """Get a hash for a query and its parameters.
-        
-        Args:
-            query (str): SQL query
-            params (tuple, optional): Query parameters
-            
-        Returns:
-            int: Hash of the query and parameters
-        """
-        # Include parameter types in the hash to ensure type safety
-        param_types = None
-        if params:
-            if isinstance(params, (list, tuple)):
-                param_types = tuple(type(p).__name__ for p in params)
-            elif isinstance(params, dict):
-                param_types = tuple((k, type(v).__name__) for k, v in params.items())
-                
-        return hash((query, param_types))
-        
-    def get(self, conn, query, params=None):
-        """Get a prepared statement from the cache or prepare a new one.
-        
+        self.statements = OrderedDict()  # canonical SQL -> None, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def prepare(self, query):
+        """Get the canonical text for a query and record whether it is cached.
+
         Args:
-            conn (sqlite3.Connection): Database connection
             query (str): SQL query
-            params (tuple, optional): Query parameters
-            
+
         Returns:
-            sqlite3.Cursor: Prepared statement
+            str: Canonical SQL to execute
         """
-        query_hash = self._get_hash(query, params)
-        
-        # Check if the statement is in the cache
-        if query_hash in self.cache:
-            statement, last_used_time = self.cache[query_hash]
-            
-            # Check if the statement has expired
-            if time.time() - last_used_time > self.expiration_seconds:
-                # Remove from cache and prepare a new statement
-                del self.cache[query_hash]
-                logger.debug(f"Statement expired: {query}")
-            else:
-                # Move to the end of the OrderedDict (most recently used)
-                self.cache.move_to_end(query_hash)
-                self.cache[query_hash] = (statement, time.time())
-                logger.debug(f"Using cached statement: {query}")
-                return statement
-        
-        # Prepare a new statement
-        try:
-            statement = conn.cursor()
-            if params is None:
-                statement.execute(query)
-            else:
-                statement.execute(query, params)
-                
-            # Add to cache
-            self.cache[query_hash] = (statement, time.time())
-            
-            # If the cache is too large, remove the least recently used statement
-            if len(self.cache) > self.max_size:
-                self.cache.popitem(last=False)
-                
-            logger.debug(f"Prepared new statement: {query}")
-            return statement
-            
-        except sqlite3.Error as e:
-            logger.error(f"Error preparing statement: {e}")
-            raise
-            
+        sql = canonical_sql(query)
+        if sql in self.statements:
+            self.statements.move_to_end(sql)
+            self.hits += 1
+            return sql
+
+        self.misses += 1
+        self.statements[sql] = None
+        if len(self.statements) > self.max_size:
+            self.statements.popitem(last=False)
+            self.evictions += 1
+        return sql
+
     def clear(self):
-        """Clear the statement cache."""
-        self.cache.clear()
+        """Forget the cached statements, e.g. after the connection was reopened."""
+        self.statements.clear()
         logger.debug("Statement cache cleared")
-        
-    def remove(self, query, params=None):
-        """Remove a specific statement from the cache.
-        
-        Args:
-            query (str): SQL query
-            params (tuple, optional): Query parameters
-        """
-        query_hash = self._get_hash(query, params)
-        if query_hash in self.cache:
-            del self.cache[query_hash]
-            logger.debug(f"Removed statement from cache: {query}")
-            
+
     def get_stats(self):
         """Get statistics about the cache.
-        
+
         Returns:
             dict: Cache statistics
         """
+        lookups = self.hits + self.misses
         return {
-            "size": len(self.cache),
+            "size": len(self.statements),
             "max_size": self.max_size,
-            "hit_ratio": 0,  # Would need to track hits and misses over time
-            "oldest_statement_age": max(time.time() - self.cache[k][1] for k in self.cache) if self.cache else 0
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
         }
 
 
 # Enhancement to DatabaseConnection for statement caching
 class CachedDatabaseConnection:
     """Enhances DatabaseConnection with prepared statement caching."""
-    
-    def __init__(self, db_path, max_cache_size=100, expiration_seconds=300):
+
+    def __init__(self, db_path, max_cache_size=STATEMENT_CACHE_SIZE):
         """Initialize a cached database connection.
-        
+
         Args:
             db_path (str): Path to the SQLite database file
             max_cache_size (int): Maximum number of statements to cache
-            expiration_seconds (int): Number of seconds before a statement expires
         """
         from .db_core import DatabaseConnection
         self.db_connection = DatabaseConnection(db_path)
-        self.statement_cache = PreparedStatementCache(max_cache_size, expiration_seconds)
-        
+        self.statement_cache = PreparedStatementCache(max_cache_size)
+
     def __getattr__(self, name):
         """Delegate attribute access to the underlying DatabaseConnection."""
         return getattr(self.db_connection, name)
-        
+
+    def connect(self):
+        """Establish a connection with a statement cache of the configured size."""
+        if self.db_connection.conn is not None:
+            return True
+
+        try:
+            conn = sqlite3.connect(
+                self.db_connection.db_path,
+                cached_statements=self.statement_cache.max_size
+            )
+            conn.row_factory = sqlite3.Row
+            self.db_connection.conn = conn
+            self.db_connection.cursor = conn.cursor()
+            self.statement_cache.clear()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error connecting to database: {e}")
+            return False
+
+    def begin_transaction(self):
+        """Begin a transaction on the cached connection."""
+        if not self.connect():
+            return False
+        return self.db_connection.begin_transaction()
+
+    def execute(self, query, params=None):
+        """Execute a SQL query on the shared cursor, reusing its prepared statement.
+
+        Args:
+            query (str): SQL query to execute
+            params (tuple, optional): Parameters for the query
+
+        Returns:
+            cursor: Database cursor for fetching results
+        """
+        if not self.connect():
+            return None
+        return self.db_connection.execute(self.statement_cache.prepare(query), params)
+
     def execute_cached(self, query, params=None):
         """Execute a SQL query using a cached prepared statement.
-        
+
+        Every call runs the statement again on a new cursor, so the results are
+        always current; only the compilation is skipped. A statement still
+        being read by an earlier cursor is compiled a second time by sqlite3.
+
         Args:
             query (str): SQL query to execute
             params (tuple, optional): Parameters for the query
-            
+
         Returns:
             cursor: Database cursor for fetching results
         """
-        if self.db_connection.conn is None:
-            if not self.db_connection.connect():
-                return None
-                
+        if not self.connect():
+            return None
+
         try:
-            return self.statement_cache.get(self.db_connection.conn, query, params)
+            cursor = self.db_connection.conn.cursor()
+            cursor.execute(self.statement_cache.prepare(query), params or ())
+            return cursor
         except sqlite3.Error as e:
             logger.error(f"Error executing cached statement: {e}")
             return None
+
+    def disconnect(self):
+        """Close the connection; its prepared statements are discarded with it."""
+        self.db_connection.disconnect()
+        self.statement_cache.clear()
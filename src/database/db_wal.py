@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Write-ahead logging support for StarImageBrowse
+Connection settings for WAL mode and helpers for handling the -wal and -shm
+files whenever the database file is copied or replaced.
+"""
+
+import os
+import sqlite3
+import logging
+
+logger = logging.getLogger("StarImageBrowse.database.db_wal")
+
+# How long a connection waits for a lock before SQLite reports "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+
+def configure_connection(conn):
+    """Apply the settings every long-lived connection uses.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+    """
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    # NORMAL is durable across application crashes in WAL mode
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+def enable_wal(conn):
+    """Switch a database to write-ahead logging.
+
+    The journal mode is stored in the database file, so this only has to
+    succeed once per database.
+
+    Args:
+        conn (sqlite3.Connection): Database connection, not inside a transaction
+
+    Returns:
+        bool: True if the database is in WAL mode
+    """
+    try:
+        mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if str(mode).lower() != "wal":
+            logger.warning(f"Could not enable WAL mode, journal mode is {mode}")
+            return False
+        return True
+
+    except sqlite3.Error as e:
+        logger.error(f"Error enabling WAL mode: {e}")
+        return False
+
+
+def checkpoint_database(db_path):
+    """Copy all committed WAL content into the main database file.
+
+    Call this before copying the database file with file system tools,
+    otherwise the copy misses transactions still held in the -wal file.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+
+    Returns:
+        bool: True if the checkpoint completed
+    """
+    if not os.path.exists(db_path):
+        return False
+
+    try:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        try:
+            busy = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+            return busy == 0
+        finally:
+            conn.close()
+
+    except sqlite3.Error as e:
+        logger.error(f"Error checkpointing database: {e}")
+        return False
+
+
+def remove_wal_files(db_path):
+    """Delete the -wal and -shm files that belong to a database file.
+
+    Must be called whenever the database file itself is deleted or replaced;
+    a leftover WAL file would otherwise be replayed onto the new database.
+
+    Args:
+        db_path (str): Path to the SQLite database file
+    """
+    for suffix in ("-wal", "-shm"):
+        path = db_path + suffix
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.error(f"Error removing {path}: {e}")
@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Write-behind buffer for StarImageBrowse
+Collects small per-image updates (AI descriptions, dimensions and renamed
+paths) and writes them in one executemany() transaction per kind, instead of
+one write operation per image. Repeated updates of the same image before a
+flush are coalesced into one.
+
+A flush happens when enough updates are pending or when the oldest one has
+waited long enough, whichever comes first, and always before the database is
+closed. Updates are durable once the Future returned when queueing them has
+resolved.
+
+Each kind of update is written in a savepoint of its own, and a path update
+that would give two images the same path is skipped on its own, so one bad
+update never costs the others in the flush. Updates whose write failed are
+queued again for the next flush.
+"""
+
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future
+
+from src.database.db_directories import get_folder_paths, resolve_directory
+
+logger = logging.getLogger("StarImageBrowse.database.db_write_buffer")
+
+# Pending updates that trigger a flush without waiting for the interval
+DEFAULT_MAX_PENDING = 500
+
+# Seconds the oldest pending update waits for others to join it
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Seconds close() waits for the last flush
+CLOSE_TIMEOUT = 30
+
+# Flushes an update is tried in before it is given up
+MAX_WRITE_ATTEMPTS = 3
+
+# Kinds of update, as attributes of PendingWrites
+UPDATE_KINDS = ("descriptions", "dimensions", "paths")
+
+# COALESCE keeps a description the update does not set
+UPDATE_DESCRIPTIONS_SQL = """UPDATE images SET
+    ai_description = COALESCE(?, ai_description),
+    user_description = COALESCE(?, user_description)
+    WHERE image_id = ?"""
+
+UPDATE_DIMENSIONS_SQL = "UPDATE images SET width = ?, height = ? WHERE image_id = ?"
+
+UPDATE_PATHS_SQL = "UPDATE images SET filename = ?, full_path = ?, directory_id = ? WHERE image_id = ?"
+
+
+class PendingWrites:
+    """Updates taken from the buffer for one flush."""
+
+    def __init__(self):
+        self.descriptions = {}  # image_id -> (ai_description, user_description)
+        self.dimensions = {}    # image_id -> (width, height)
+        self.paths = {}         # image_id -> (filename, full_path)
+        self.future = Future()
+        self.created = time.monotonic()
+        self.attempts = 0
+
+    def __len__(self):
+        return len(self.descriptions) + len(self.dimensions) + len(self.paths)
+
+
+def _write_descriptions(raw, descriptions):
+    """Write description updates; returns the rows updated."""
+    return raw.executemany(UPDATE_DESCRIPTIONS_SQL, [
+        (ai_description, user_description, image_id)
+        for image_id, (ai_description, user_description) in descriptions.items()
+    ]).rowcount
+
+
+def _write_dimensions(raw, dimensions):
+    """Write dimension updates; returns the rows updated."""
+    return raw.executemany(UPDATE_DIMENSIONS_SQL, [
+        (width, height, image_id)
+        for image_id, (width, height) in dimensions.items()
+    ]).rowcount
+
+
+def _write_paths(raw, paths, conflicts):
+    """Write path updates one by one, skipping those whose path is taken.
+
+    Args:
+        raw (sqlite3.Connection): Writer connection
+        paths (dict): image_id -> (filename, full_path)
+        conflicts (list): Receives the image IDs whose new path another image has
+
+    Returns:
+        int: Rows updated
+    """
+    # A move to another directory changes the image's place in the hierarchy
+    image_ids = list(paths)
+    placeholders = ", ".join("?" for _ in image_ids)
+    images = {
+        row[0]: (row[1], row[2])
+        for row in raw.execute(
+            f"SELECT image_id, folder_id, directory_id FROM images WHERE image_id IN ({placeholders})",
+            image_ids
+        )
+    }
+    folder_paths = get_folder_paths(raw, {folder_id for folder_id, _ in images.values() if folder_id is not None})
+
+    cache = {}
+    updated = 0
+    for image_id, (filename, full_path) in paths.items():
+        if image_id not in images:
+            continue
+        folder_id, directory_id = images[image_id]
+        if folder_id in folder_paths:
+            directory_id = resolve_directory(raw, folder_id, folder_paths[folder_id], full_path, cache)
+        try:
+            updated += raw.execute(UPDATE_PATHS_SQL, (filename, full_path, directory_id, image_id)).rowcount
+        except sqlite3.IntegrityError:
+            # UNIQUE(full_path): only this statement is undone
+            logger.warning(f"Not moving image {image_id} to {full_path}: another image has that path")
+            conflicts.append(image_id)
+    return updated
+
+
+def apply_pending_writes(conn, pending):
+    """Write a set of coalesced updates.
+
+    Each kind of update is written in its own savepoint, so a kind that
+    fails is undone without the others.
+
+    Args:
+        conn (DatabaseConnection): Connection from the writer thread
+        pending (PendingWrites): Updates to write
+
+    Returns:
+        dict: Rows updated for descriptions, dimensions and paths, the
+            image IDs of path updates skipped because the path is taken
+            ("conflicts"), and the error of each kind that failed ("failed")
+    """
+    raw = conn.conn
+    counts = {"descriptions": 0, "dimensions": 0, "paths": 0, "conflicts": [], "failed": {}}
+    writers = {
+        "descriptions": _write_descriptions,
+        "dimensions": _write_dimensions,
+        "paths": lambda raw, paths: _write_paths(raw, paths, counts["conflicts"]),
+    }
+
+    for kind in UPDATE_KINDS:
+        updates = getattr(pending, kind)
+        if not updates:
+            continue
+        raw.execute("SAVEPOINT buffered_writes")
+        try:
+            counts[kind] = writers[kind](raw, updates)
+        except sqlite3.DatabaseError as e:
+            logger.error(f"Error writing {len(updates)} buffered {kind} updates: {e}")
+            raw.execute("ROLLBACK TO buffered_writes")
+            counts["failed"][kind] = str(e)
+        raw.execute("RELEASE buffered_writes")
+
+    return counts
+
+
+def _copy_outcome(source, target):
+    """Resolve a future with the outcome of another."""
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class WriteBehindBuffer:
+    """Coalesces per-image updates and writes them through the database writer.
+
+    A flusher thread takes everything pending and hands it to the writer as
+    one operation, so updates keep accumulating while a flush is committed.
+    """
+
+    def __init__(self, db, max_pending=DEFAULT_MAX_PENDING, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """Initialize the buffer. The flusher thread starts with the first update.
+
+        Args:
+            db (Database): Database whose writer commits the updates
+            max_pending (int): Pending updates that trigger a flush
+            flush_interval (float): Seconds the oldest update waits for a flush
+        """
+        self.db = db
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.condition = threading.Condition()
+        self.pending = PendingWrites()
+        self.flush_requested = False
+        self.closed = False
+        self.thread = None
+        self.exit_registered = False
+        self.flushes = 0
+        self.updates = 0
+
+    def _ensure_started(self):
+        """Start the flusher thread if it is not running; called holding the condition."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="DatabaseWriteBuffer", daemon=True)
+        self.thread.start()
+        if not self.exit_registered:
+            atexit.register(self.close)
+            self.exit_registered = True
+
+    def _queue(self, table, image_id, value):
+        """Add an update and wake the flusher when the buffer is full.
+
+        Args:
+            table (dict): Attribute of PendingWrites the update belongs to
+            image_id (int): Image to update
+            value (tuple): Update for that image
+
+        Returns:
+            concurrent.futures.Future: Resolves when the update is committed
+        """
+        with self.condition:
+            self._ensure_started()
+            if not len(self.pending):
+                self.pending.created = time.monotonic()
+            getattr(self.pending, table)[image_id] = value
+
+            # The first update starts the flush interval; a full buffer flushes now
+            size = len(self.pending)
+            if size == 1 or size >= self.max_pending:
+                self.condition.notify()
+            return self.pending.future
+
+    def queue_description(self, image_id, ai_description=None, user_description=None):
+        """Queue a description update; None keeps the current value.
+
+        Args:
+            image_id (int): ID of the image to update
+            ai_description (str, optional): AI-generated description
+            user_description (str, optional): User-provided description
+
+        Returns:
+            concurrent.futures.Future: Resolves to the flush's row counts once committed
+        """
+        with self.condition:
+            # A later update of the same image keeps the fields it does not set
+            previous_ai, previous_user = self.pending.descriptions.get(image_id, (None, None))
+            return self._queue("descriptions", image_id, (
+                ai_description if ai_description is not None else previous_ai,
+                user_description if user_description is not None else previous_user,
+            ))
+
+    def queue_dimensions(self, image_id, width, height):
+        """Queue a dimensions update.
+
+        Args:
+            image_id (int): ID of the image to update
+            width (int): Width in pixels
+            height (int): Height in pixels
+
+        Returns:
+            concurrent.futures.Future: Resolves to the flush's row counts once committed
+        """
+        return self._queue("dimensions", image_id, (width, height))
+
+    def queue_path(self, image_id, filename, full_path):
+        """Queue a filename and path update.
+
+        Args:
+            image_id (int): ID of the image to update
+            filename (str): New filename
+            full_path (str): New normalized full path
+
+        Returns:
+            concurrent.futures.Future: Resolves to the flush's row counts once committed
+        """
+        return self._queue("paths", image_id, (filename, full_path))
+
+    def discard_description(self, image_id, ai_description=None, user_description=None):
+        """Drop the pending description fields a direct write is about to replace.
+
+        Without this an older buffered AI description could be flushed over
+        a description the user has just cleared.
+
+        Args:
+            image_id (int): ID of the image being written directly
+            ai_description (str, optional): Set by the direct write if not None
+            user_description (str, optional): Set by the direct write if not None
+        """
+        with self.condition:
+            pending = self.pending.descriptions.get(image_id)
+            if pending is None:
+                return
+            remaining = (
+                None if ai_description is not None else pending[0],
+                None if user_description is not None else pending[1],
+            )
+            if remaining == (None, None):
+                del self.pending.descriptions[image_id]
+            else:
+                self.pending.descriptions[image_id] = remaining
+
+    def flush(self, wait=True, timeout=None):
+        """Write everything pending now.
+
+        Args:
+            wait (bool): Wait until the updates are committed
+            timeout (float, optional): Seconds to wait
+
+        Returns:
+            bool: True if the updates were committed (or wait is False), False otherwise
+        """
+        with self.condition:
+            if not len(self.pending):
+                return True
+            future = self.pending.future
+            self.flush_requested = True
+            self.condition.notify()
+
+        if not wait:
+            return True
+        try:
+            future.result(timeout)
+            return True
+        except Exception as e:
+            logger.error(f"Error flushing buffered writes: {e}")
+            return False
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Flush the pending updates and stop the flusher thread.
+
+        Args:
+            timeout (float): Seconds to wait for the last flush
+
+        Returns:
+            bool: True if nothing was left unwritten, False otherwise
+        """
+        with self.condition:
+            thread = self.thread
+            self.closed = True
+            self.condition.notify()
+
+        if thread is None or thread is threading.current_thread():
+            return True
+
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("Buffered writes were not flushed before closing")
+            return False
+        return True
+
+    def _take(self):
+        """Wait until a flush is due, take the pending updates and queue their write.
+
+        The write is queued before the buffer is released, so a direct write
+        that discards buffered fields afterwards is always committed later.
+
+        Returns:
+            tuple: (PendingWrites, Future of the write), or None once closed and empty
+        """
+        with self.condition:
+            while True:
+                size = len(self.pending)
+                if size and (self.closed or self.flush_requested or size >= self.max_pending):
+                    break
+                if self.closed:
+                    return None
+
+                if size:
+                    remaining = self.pending.created + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                else:
+                    self.flush_requested = False
+                    self.condition.wait()
+
+            pending = self.pending
+            self.pending = PendingWrites()
+            self.flush_requested = False
+            return pending, self.db.writer.submit(apply_pending_writes, pending)
+
+    def _run(self):
+        """Flusher thread main loop."""
+        while True:
+            taken = self._take()
+            if taken is None:
+                break
+
+            pending, write = taken
+            try:
+                counts = write.result()
+            except Exception as e:
+                # Nothing was written; try the whole flush again
+                logger.error(f"Error writing {len(pending)} buffered updates: {e}")
+                self._requeue(pending, UPDATE_KINDS, e)
+                continue
+
+            self.flushes += 1
+            self.updates += len(pending)
+            logger.debug(f"Flushed {len(pending)} buffered updates: {counts}")
+            if counts["failed"]:
+                self._requeue(pending, counts["failed"], counts)
+            else:
+                pending.future.set_result(counts)
+
+    def _requeue(self, pending, kinds, outcome):
+        """Queue the updates of a failed write again, unless they were tried often enough.
+
+        The future of the failed write resolves with the next one's outcome.
+
+        Args:
+            pending (PendingWrites): Updates taken for the failed write
+            kinds (iterable): Kinds of update to queue again
+            outcome: Row counts or exception to resolve the future with when
+                the updates are given up
+        """
+        if pending.attempts + 1 >= MAX_WRITE_ATTEMPTS:
+            logger.error(f"Giving up {len(pending)} buffered updates after {MAX_WRITE_ATTEMPTS} attempts")
+            if isinstance(outcome, Exception):
+                pending.future.set_exception(outcome)
+            else:
+                pending.future.set_result(outcome)
+            return
+
+        with self.condition:
+            if not len(self.pending):
+                self.pending.created = time.monotonic()
+            self.pending.attempts = max(self.pending.attempts, pending.attempts + 1)
+            for kind in kinds:
+                queued = getattr(self.pending, kind)
+                for image_id, value in getattr(pending, kind).items():
+                    # An update queued since the failed write is newer
+                    newer = queued.get(image_id)
+                    if newer is None:
+                        queued[image_id] = value
+                    elif kind == "descriptions":
+                        queued[image_id] = tuple(
+                            new if new is not None else old for new, old in zip(newer, value)
+                        )
+            future = self.pending.future
+            self.condition.notify()
+
+        future.add_done_callback(lambda done: _copy_outcome(done, pending.future))
+
+    def get_stats(self):
+        """Get statistics about the buffer.
+
+        Returns:
+            dict: Statistics about the buffer
+        """
+        with self.condition:
+            return {
+                "pending": len(self.pending),
+                "flushes": self.flushes,
+                "updates": self.updates,
+                "running": self.thread is not None and self.thread.is_alive(),
+            }
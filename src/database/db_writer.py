@@ -0,0 +1,487 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Database writer for StarImageBrowse
+Runs all queued write operations on one dedicated thread and commits them in
+groups, so concurrent writers never compete for the database lock.
+"""
+
+import os
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+import functools
+from concurrent.futures import Future
+
+from src.database.db_core import DatabaseConnection
+from src.database.db_statement_cache import STATEMENT_CACHE_SIZE
+from src.database.db_wal import BUSY_TIMEOUT_MS, configure_connection
+
+logger = logging.getLogger("StarImageBrowse.database.db_writer")
+
+# Upper bound on the operations committed together in one transaction
+MAX_BATCH_SIZE = 200
+
+
+class WriterConnection(DatabaseConnection):
+    """Connection handed to a write operation running on the writer thread.
+
+    Operations keep the usual begin_transaction()/commit()/rollback() calls;
+    here they map to a savepoint inside the batch transaction, so rolling back
+    one operation leaves the others in the batch untouched.
+    """
+
+    def __init__(self, conn):
+        """Initialize the connection wrapper.
+
+        Args:
+            conn (sqlite3.Connection): The writer thread's connection
+        """
+        super().__init__(None)
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+    def connect(self):
+        """The writer connection is always open."""
+        return True
+
+    def begin_transaction(self):
+        """Begin a transaction (a savepoint in the batch)."""
+        try:
+            self.cursor.execute("SAVEPOINT write_operation")
+            self.in_transaction = True
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error beginning transaction: {e}")
+            return False
+
+    def commit(self):
+        """Commit the current transaction into the batch."""
+        if not self.in_transaction:
+            return False
+
+        try:
+            self.cursor.execute("RELEASE write_operation")
+            self.in_transaction = False
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error committing transaction: {e}")
+            return False
+
+    def rollback(self):
+        """Rollback the current transaction."""
+        if not self.in_transaction:
+            return False
+
+        try:
+            self.cursor.execute("ROLLBACK TO write_operation")
+            self.cursor.execute("RELEASE write_operation")
+            self.in_transaction = False
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error rolling back transaction: {e}")
+            return False
+
+    def disconnect(self):
+        """Finish the operation; the writer keeps the connection open."""
+        self.finish_statement()
+        if self.in_transaction:
+            self.rollback()
+        try:
+            self.cursor.close()
+        except sqlite3.Error:
+            pass
+
+
+class _ExclusiveOperation:
+    """Write operation that runs alone, outside the writer's batch transaction."""
+
+    def __init__(self, operation):
+        self.operation = operation
+
+
+class DatabaseWriter:
+    """Single writer thread for one database file.
+
+    Write operations are callables taking a connection as first argument.
+    submit() queues them and returns a Future; the writer thread drains the
+    queue, runs everything waiting in one transaction and commits once.
+    Futures complete only after their batch has been committed.
+    """
+
+    _instances = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, db_path):
+        """Get the writer for a database file, creating it on first use.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+
+        Returns:
+            DatabaseWriter: Writer shared by everyone using that file
+        """
+        key = os.path.abspath(db_path)
+        with cls._lock:
+            writer = cls._instances.get(key)
+            if writer is None:
+                writer = cls(db_path)
+                cls._instances[key] = writer
+            return writer
+
+    def __init__(self, db_path, max_batch_size=MAX_BATCH_SIZE):
+        """Initialize the writer. The thread starts with the first write.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            max_batch_size (int): Maximum operations committed together
+        """
+        self.db_path = db_path
+        self.max_batch_size = max_batch_size
+        self.queue = queue.Queue()
+        self.thread = None
+        self.conn = None
+        self.start_lock = threading.Lock()
+        self.reset_requested = False
+        self.batches = 0
+        self.operations = 0
+
+    def _ensure_started(self):
+        """Start the writer thread if it is not running."""
+        with self.start_lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(
+                target=self._run,
+                name=f"DatabaseWriter-{os.path.basename(self.db_path)}",
+                daemon=True
+            )
+            self.thread.start()
+            atexit.register(self.stop)
+
+    def is_writer_thread(self):
+        """Return True if called from the writer thread."""
+        return threading.current_thread() is self.thread
+
+    def submit(self, operation, *args, **kwargs):
+        """Queue a write operation.
+
+        Args:
+            operation (callable): Called as operation(conn, *args, **kwargs) on
+                the writer thread, where conn behaves like a DatabaseConnection
+            *args: Positional arguments for the operation
+            **kwargs: Keyword arguments for the operation
+
+        Returns:
+            concurrent.futures.Future: Resolves to the operation's return value
+                once its batch is committed, or to the exception it raised
+        """
+        future = Future()
+
+        if self.is_writer_thread():
+            # A write issued from inside another write joins the running batch
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(self._run_operation(operation, args, kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._ensure_started()
+        self.queue.put((operation, args, kwargs, future))
+        return future
+
+    def submit_exclusive(self, operation, *args, **kwargs):
+        """Queue an operation that manages its own transaction.
+
+        The operation runs on the writer thread between batches and gets the
+        writer's sqlite3.Connection in autocommit mode, so it can do what is
+        not allowed inside a transaction (such as ATTACH) and commit large
+        changes in one transaction of its own. Other writes wait meanwhile.
+
+        Args:
+            operation (callable): Called as operation(conn, *args, **kwargs)
+            *args: Positional arguments for the operation
+            **kwargs: Keyword arguments for the operation
+
+        Returns:
+            concurrent.futures.Future: Resolves to the operation's return value
+        """
+        future = Future()
+
+        if self.is_writer_thread():
+            future.set_exception(RuntimeError("Exclusive operations cannot run inside a write operation"))
+            return future
+
+        self._ensure_started()
+        self.queue.put((_ExclusiveOperation(operation), args, kwargs, future))
+        return future
+
+    def get_connection(self):
+        """Get a connection for code running on the writer thread.
+
+        Returns:
+            WriterConnection: Connection taking part in the running batch
+        """
+        return WriterConnection(self.conn)
+
+    def _connect(self):
+        """Open the writer connection if needed."""
+        if self.conn is not None:
+            return
+
+        # Autocommit mode: the writer issues BEGIN/COMMIT itself
+        self.conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        self.conn.row_factory = sqlite3.Row
+        configure_connection(self.conn)
+
+    def _close(self):
+        """Close the writer connection."""
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Error closing writer connection: {e}")
+            self.conn = None
+
+    def _run(self):
+        """Writer thread main loop."""
+        stopping = False
+        pending = None
+        while not stopping:
+            item = pending if pending is not None else self.queue.get()
+            pending = None
+            if item is None:
+                break
+
+            if isinstance(item[0], _ExclusiveOperation):
+                self._run_exclusive(item)
+            else:
+                batch = [item]
+                while len(batch) < self.max_batch_size:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    if isinstance(item[0], _ExclusiveOperation):
+                        # Runs after this batch has been committed
+                        pending = item
+                        break
+                    batch.append(item)
+
+                try:
+                    self._process_batch(batch)
+                except Exception as e:
+                    logger.error(f"Unexpected error in write batch: {e}")
+                    self._close()
+                    for _, _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+
+            if self.reset_requested:
+                self.reset_requested = False
+                self._close()
+
+        self._close()
+
+    def _run_exclusive(self, item):
+        """Run an exclusive operation and complete its future.
+
+        Args:
+            item (tuple): (_ExclusiveOperation, args, kwargs, future)
+        """
+        exclusive, args, kwargs, future = item
+        if not future.set_running_or_notify_cancel():
+            return
+
+        result, error = None, None
+        try:
+            self._connect()
+            result = exclusive.operation(self.conn, *args, **kwargs)
+        except Exception as e:
+            error = e
+
+        if self.conn is not None and self.conn.in_transaction:
+            logger.warning("Exclusive write operation left a transaction open, rolling it back")
+            try:
+                self.conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                self._close()
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _run_operation(self, operation, args, kwargs):
+        """Run one operation inside its own savepoint.
+
+        Args:
+            operation (callable): Write operation
+            args (tuple): Positional arguments
+            kwargs (dict): Keyword arguments
+
+        Returns:
+            The operation's return value
+        """
+        self.conn.execute("SAVEPOINT batch_item")
+        conn = WriterConnection(self.conn)
+        try:
+            result = operation(conn, *args, **kwargs)
+            conn.disconnect()
+            self.conn.execute("RELEASE batch_item")
+            return result
+        except BaseException:
+            conn.in_transaction = False
+            try:
+                self.conn.execute("ROLLBACK TO batch_item")
+                self.conn.execute("RELEASE batch_item")
+            except sqlite3.Error as e:
+                logger.error(f"Error rolling back failed write operation: {e}")
+            raise
+
+    def _process_batch(self, batch):
+        """Run a batch of operations in one transaction and complete their futures.
+
+        Args:
+            batch (list): (operation, args, kwargs, future) tuples
+        """
+        outcomes = []
+        try:
+            self._connect()
+            self.conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            logger.error(f"Error starting write batch: {e}")
+            self._close()
+            for _, _, _, future in batch:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+
+        for operation, args, kwargs, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                outcomes.append((future, self._run_operation(operation, args, kwargs), None))
+            except Exception as e:
+                outcomes.append((future, None, e))
+
+        try:
+            self.conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"Error committing write batch of {len(outcomes)} operations: {e}")
+            try:
+                self.conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            self._close()
+            outcomes = [(future, None, error or e) for future, _, error in outcomes]
+
+        self.batches += 1
+        self.operations += len(outcomes)
+        if len(outcomes) > 1:
+            logger.debug(f"Committed {len(outcomes)} write operations in one transaction")
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def reset_connection(self, timeout=10):
+        """Close the writer connection after the queued writes have finished.
+
+        Used before the database file is repaired or replaced; the writer
+        reconnects on the next write.
+
+        Args:
+            timeout (float): Seconds to wait for queued writes
+        """
+        if self.thread is None or not self.thread.is_alive():
+            return
+
+        self.reset_requested = True
+        if self.is_writer_thread():
+            return
+
+        try:
+            self.submit(lambda conn: None).result(timeout)
+        except Exception as e:
+            logger.warning(f"Writer did not finish queued writes: {e}")
+
+    def stop(self, timeout=10):
+        """Finish the queued writes and stop the writer thread.
+
+        Args:
+            timeout (float): Seconds to wait for the thread
+        """
+        thread = self.thread
+        if thread is None or not thread.is_alive() or self.is_writer_thread():
+            return
+
+        self.queue.put(None)
+        thread.join(timeout)
+
+    def get_stats(self):
+        """Get statistics about the writer.
+
+        Returns:
+            dict: Statistics about the writer
+        """
+        return {
+            "queued": self.queue.qsize(),
+            "batches": self.batches,
+            "operations": self.operations,
+            "running": self.thread is not None and self.thread.is_alive(),
+        }
+
+
+def write_operation(failure_result=None):
+    """Decorator running a DatabaseOperations method on the writer thread.
+
+    The method keeps using self.db.get_connection(), which hands out the
+    writer's connection on the writer thread. The wrapped method takes an extra
+    keyword argument wait: when False it returns a Future instead of waiting
+    for the commit.
+
+    Args:
+        failure_result: Returned when the batch holding the write fails to commit
+
+    Returns:
+        callable: The decorator
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, wait=True, **kwargs):
+            writer = self.db.writer
+            if writer.is_writer_thread():
+                # Already inside a write: run as part of it
+                result = method(self, *args, **kwargs)
+                if wait:
+                    return result
+                future = Future()
+                future.set_result(result)
+                return future
+
+            future = writer.submit(lambda conn: method(self, *args, **kwargs))
+            if not wait:
+                return future
+
+            try:
+                return future.result()
+            except sqlite3.Error as e:
+                logger.error(f"Error in {method.__name__}: {e}")
+                return failure_result
+        return wrapper
+    return decorator
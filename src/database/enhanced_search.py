@@ -10,6 +10,13 @@ import sqlite3
 from datetime import datetime, timedelta
 from typing import List, Dict, Union, Optional, Tuple
 
+from src.database.db_fts import (
+    BM25_RANK_SQL, build_match_expression, has_trigram_index, split_substring_terms, substring_condition
+)
+from src.database.db_paging import (
+    KEYSET_ORDER_SQL, decode_page_token, encode_page_token, keyset_segments, split_page
+)
+
 logger = logging.getLogger("StarImageBrowse.database.enhanced_search")
 
 class EnhancedSearch:
@@ -23,58 +30,6 @@ class EnhancedSearch:
         """
         self.db_ops = db_operations
         
-        # Ensure the database has width and height columns
-        self._ensure_dimension_columns()
-        
-    def _ensure_dimension_columns(self):
-        """Ensure the database has width and height columns in the images table.
-        
-        This is called during initialization to make sure the dimension search will work.
-        """
-        conn = self.db_ops.db.get_connection()
-        if not conn:
-            logger.error("Failed to get database connection to check dimension columns")
-            return
-            
-        try:
-            # Check if images table has width and height columns
-            cursor = conn.execute("PRAGMA table_info(images)")
-            if not cursor:
-                logger.error("Failed to get table info for images table")
-                return
-                
-            columns = {row[1] for row in cursor.fetchall()}
-            
-            # Add width and height columns if they don't exist
-            if "width" not in columns or "height" not in columns:
-                logger.info("Adding missing dimension columns to images table")
-                
-                if "width" not in columns:
-                    try:
-                        conn.execute("ALTER TABLE images ADD COLUMN width INTEGER")
-                        logger.info("Added width column to images table")
-                    except Exception as e:
-                        logger.error(f"Error adding width column: {e}")
-                
-                if "height" not in columns:
-                    try:
-                        conn.execute("ALTER TABLE images ADD COLUMN height INTEGER")
-                        logger.info("Added height column to images table")
-                    except Exception as e:
-                        logger.error(f"Error adding height column: {e}")
-                
-                # Create index on width and height for faster dimension searches
-                try:
-                    conn.execute("CREATE INDEX IF NOT EXISTS idx_images_dimensions ON images (width, height)")
-                    logger.info("Created index on width and height columns")
-                except Exception as e:
-                    logger.error(f"Error creating dimension index: {e}")
-            
-        except Exception as e:
-            logger.error(f"Error checking dimension columns: {e}")
-        finally:
-            conn.disconnect()
-    
     def reset_connection(self):
         """Reset the database connection for the enhanced search.
         
@@ -90,15 +45,149 @@ class EnhancedSearch:
                 if hasattr(self.db_ops.db, 'connect') and callable(self.db_ops.db.connect):
                     self.db_ops.db.connect()
                     logger.info("Enhanced search database connection reset successful")
-                    
-                # Ensure dimension columns exist after reconnection
-                self._ensure_dimension_columns()
             except Exception as e:
                 logger.error(f"Error resetting enhanced search database connection: {e}")
         
+    def _build_filters(self, params, folder_id=None, catalog_id=None, use_fts=True, trigram=False):
+        """Build the FROM clause and WHERE conditions for a search.
+        
+        Text criteria are answered from the image_fts index when use_fts is True,
+        so the text match and the folder/catalog/date/dimension filters are
+        evaluated by a single statement. With trigram, file name fragments such
+        as "IMG_20" are matched as substrings through the image_trigram index
+        and the remaining words through image_fts.
+        
+        Args:
+            params (dict): Search parameters (see search())
+            folder_id (int, optional): ID of the folder to search in
+            catalog_id (int, optional): ID of the catalog to search in
+            use_fts (bool): Use the FTS index for text criteria instead of LIKE
+            trigram (bool): The database has the trigram index for substring search
+            
+        Returns:
+            tuple: (from_clause, conditions, values, ranked) where ranked is True
+                if the rows can be ordered with bm25()
+        """
+        from_clause = "images i"
+        conditions = []
+        values = []
+        ranked = False
+        
+        # 1. Text search
+        query_text = ""
+        if params.get('text_enabled', False) and params.get('text_query'):
+            query_text = params['text_query'].strip()
+            
+        if query_text:
+            if use_fts:
+                fragments = []
+                if trigram:
+                    fragments, query_text = split_substring_terms(query_text)
+                for fragment in fragments:
+                    condition, condition_values = substring_condition(fragment)
+                    conditions.append(condition)
+                    values.extend(condition_values)
+                    
+                match, exclude = build_match_expression(query_text)
+                if match:
+                    from_clause = "image_fts JOIN images i ON i.image_id = image_fts.rowid"
+                    conditions.append("image_fts MATCH ?")
+                    values.append(match)
+                    ranked = True
+                if exclude:
+                    conditions.append("i.image_id NOT IN (SELECT rowid FROM image_fts WHERE image_fts MATCH ?)")
+                    values.append(exclude)
+                logger.debug(f"Full-text search for '{query_text}': fragments={fragments!r} "
+                             f"match={match!r} exclude={exclude!r}")
+            else:
+                like_pattern = f"%{query_text}%"
+                conditions.append("(i.ai_description LIKE ? OR i.user_description LIKE ? OR i.filename LIKE ?)")
+                values.extend([like_pattern, like_pattern, like_pattern])
+        
+        # Scope
+        scope = params.get('scope', 'folder')
+        if scope == 'folder' and folder_id is not None:
+            conditions.append("i.folder_id = ?")
+            values.append(folder_id)
+        elif scope == 'catalog' and catalog_id is not None:
+            from_clause += " JOIN image_catalog_mapping m ON m.image_id = i.image_id"
+            conditions.append("m.catalog_id = ?")
+            values.append(catalog_id)
+        
+        # 2. Date range
+        if params.get('date_enabled', False):
+            date_from = params.get('date_from')
+            date_to = params.get('date_to')
+            
+            if date_from and date_to:
+                # Convert to datetime objects if they're not already
+                if not isinstance(date_from, datetime):
+                    date_from = datetime.combine(date_from, datetime.min.time())
+                if not isinstance(date_to, datetime):
+                    date_to = datetime.combine(date_to, datetime.max.time())
+                
+                conditions.append("i.last_modified_date BETWEEN ? AND ?")
+                values.append(date_from)
+                values.append(date_to)
+        
+        # 3. Image dimensions
+        if params.get('dimensions_enabled', False):
+            # Only images that have dimensions stored can match
+            conditions.append("(i.width IS NOT NULL AND i.height IS NOT NULL AND i.width > 0 AND i.height > 0)")
+            
+            dimension_preset = params.get('dimension_preset', 0)
+            
+            if dimension_preset == 5:  # Square
+                conditions.append("i.width = i.height")
+            elif dimension_preset == 6:  # Portrait
+                conditions.append("i.height > i.width")
+            elif dimension_preset == 7:  # Landscape
+                conditions.append("i.width > i.height")
+            else:  # Custom or specific resolution
+                # Convert parameters to integers to ensure proper comparison
+                try:
+                    min_width = int(params.get('min_width', 0) or 0)
+                    max_width = int(params.get('max_width', 10000) or 10000)
+                    min_height = int(params.get('min_height', 0) or 0)
+                    max_height = int(params.get('max_height', 10000) or 10000)
+                    
+                    # Apply dimension filters only if they're useful values
+                    if min_width > 0:
+                        conditions.append("i.width >= ?")
+                        values.append(min_width)
+                    
+                    if max_width < 10000:
+                        conditions.append("i.width <= ?")
+                        values.append(max_width)
+                    
+                    if min_height > 0:
+                        conditions.append("i.height >= ?")
+                        values.append(min_height)
+                    
+                    if max_height < 10000:
+                        conditions.append("i.height <= ?")
+                        values.append(max_height)
+                except (ValueError, TypeError) as e:
+                    logger.error(f"Error converting dimension values: {e}")
+        
+        return from_clause, conditions, values, ranked
+    
+    def _uses_text_search(self, params):
+        """Return True if the search parameters include a text query."""
+        return bool(
+            params.get('text_enabled', False)
+            and params.get('text_query')
+            and params['text_query'].strip()
+        )
+    
     def search(self, params, folder_id=None, catalog_id=None, limit=1000000, offset=0):
         """Execute a search with multiple criteria.
         
+        Text queries go through the image_fts index and are ranked with bm25();
+        they support prefix (car*), phrase ("red car") and boolean
+        (AND/OR/NOT, -term) syntax. If the FTS query fails, the search falls
+        back to LIKE matching.
+        
         Args:
             params (dict): Search parameters dictionary with the following keys:
                 scope (str): 'folder', 'catalog', or 'all'
@@ -128,160 +217,41 @@ class EnhancedSearch:
             return []
             
         try:
-            # Build the query
-            query_parts = []
-            query_params = []
-            
-            # Base query - depends on scope
-            scope = params.get('scope', 'folder')
-            
-            if scope == 'folder' and folder_id is not None:
-                base_query = "SELECT * FROM images WHERE folder_id = ?"
-                query_params.append(folder_id)
-            elif scope == 'catalog' and catalog_id is not None:
-                base_query = """
-                    SELECT i.* FROM images i
-                    JOIN image_catalog_mapping m ON i.image_id = m.image_id
-                    WHERE m.catalog_id = ?
-                """
-                query_params.append(catalog_id)
-            else:
-                base_query = "SELECT * FROM images WHERE 1=1"
-            
-            # Add criteria based on enabled options
-            # 1. Text search
-            if params.get('text_enabled', False) and params.get('text_query'):
-                query_text = params['text_query'].strip()
-                if query_text:
-                    try:
-                        # Always use basic LIKE search - more reliable and simpler
-                        logger.info(f"Searching for: '{query_text}' using basic LIKE search")
-                        like_pattern = f"%{query_text}%"
-                        query_parts.append("(ai_description LIKE ? OR user_description LIKE ? OR filename LIKE ?)")
-                        query_params.extend([like_pattern, like_pattern, like_pattern])
-                    except Exception as e:
-                        # Fallback to basic LIKE search on error
-                        logger.warning(f"Error using FTS: {e}, using fallback LIKE search")
-                        like_pattern = f"%{query_text}%"
-                        query_parts.append("(ai_description LIKE ? OR user_description LIKE ? OR filename LIKE ?)")
-                        query_params.extend([like_pattern, like_pattern, like_pattern])
+            attempts = [True, False] if self._uses_text_search(params) else [False]
+            trigram = attempts[0] and has_trigram_index(conn.conn)
             
-            # 2. Date range
-            if params.get('date_enabled', False):
-                date_from = params.get('date_from')
-                date_to = params.get('date_to')
+            for use_fts in attempts:
+                from_clause, conditions, values, ranked = self._build_filters(
+                    params, folder_id, catalog_id, use_fts, trigram
+                )
                 
-                if date_from and date_to:
-                    # Convert to datetime objects if they're not already
-                    if not isinstance(date_from, datetime):
-                        date_from = datetime.combine(date_from, datetime.min.time())
-                    if not isinstance(date_to, datetime):
-                        date_to = datetime.combine(date_to, datetime.max.time())
+                final_query = f"SELECT i.* FROM {from_clause}"
+                if conditions:
+                    final_query += " WHERE " + " AND ".join(conditions)
                     
-                    query_parts.append("last_modified_date BETWEEN ? AND ?")
-                    query_params.append(date_from)
-                    query_params.append(date_to)
-            
-            # 3. Image dimensions
-            if params.get('dimensions_enabled', False):
-                # Log dimension search parameters for debugging
-                logger.info(f"Dimension search enabled with params: {params}")
+                if ranked:
+                    final_query += f" ORDER BY {BM25_RANK_SQL}, i.last_modified_date DESC, i.image_id DESC"
+                else:
+                    final_query += " ORDER BY i.last_modified_date DESC, i.image_id DESC"
+                final_query += " LIMIT ? OFFSET ?"
                 
-                # Check if the database has any images with dimensions
-                has_dimensions = False
-                try:
-                    check_conn = self.db_ops.db.get_connection()
-                    if check_conn:
-                        cursor = check_conn.execute("SELECT COUNT(*) FROM images WHERE width IS NOT NULL AND height IS NOT NULL")
-                        if cursor:
-                            count = cursor.fetchone()[0]
-                            has_dimensions = count > 0
-                            logger.info(f"Found {count} images with dimensions in database")
-                        check_conn.disconnect()
-                except Exception as e:
-                    logger.error(f"Error checking for images with dimensions: {e}")
-                
-                if not has_dimensions:
-                    logger.warning("No images with dimensions found in database - dimension search will return no results")
-                    # Force no results by adding an impossible condition
-                    query_parts.append("1=0")
-                    return
-                
-                # Add a condition to filter only images that have dimensions stored
-                query_parts.append("(width IS NOT NULL AND height IS NOT NULL AND width > 0 AND height > 0)")
-                
-                dimension_preset = params.get('dimension_preset', 0)
+                logger.debug(f"Executing search query: {final_query}")
+                logger.debug(f"Query parameters: {values}")
                 
-                if dimension_preset == 5:  # Square
-                    query_parts.append("width = height")
-                    logger.info("Searching for square images")
-                elif dimension_preset == 6:  # Portrait
-                    query_parts.append("height > width")
-                    logger.info("Searching for portrait images")
-                elif dimension_preset == 7:  # Landscape
-                    query_parts.append("width > height")
-                    logger.info("Searching for landscape images")
-                else:  # Custom or specific resolution
-                    # Convert parameters to integers to ensure proper comparison
-                    try:
-                        min_width = int(params.get('min_width', 0) or 0)
-                        max_width = int(params.get('max_width', 10000) or 10000)
-                        min_height = int(params.get('min_height', 0) or 0)
-                        max_height = int(params.get('max_height', 10000) or 10000)
-                        
-                        logger.info(f"Dimension filters: width {min_width}-{max_width}, height {min_height}-{max_height}")
-                        
-                        # Apply dimension filters only if they're useful values
-                        if min_width > 0:
-                            query_parts.append("width >= ?")
-                            query_params.append(min_width)
-                        
-                        if max_width < 10000:
-                            query_parts.append("width <= ?")
-                            query_params.append(max_width)
-                        
-                        if min_height > 0:
-                            query_parts.append("height >= ?")
-                            query_params.append(min_height)
-                        
-                        if max_height < 10000:
-                            query_parts.append("height <= ?")
-                            query_params.append(max_height)
-                    except (ValueError, TypeError) as e:
-                        logger.error(f"Error converting dimension values: {e}")
-            
-            # Combine all parts of the query
-            final_query = base_query
-            if query_parts:
-                final_query += " AND " + " AND ".join(query_parts)
-            
-            # Add order by clause
-            final_query += " ORDER BY last_modified_date DESC LIMIT ? OFFSET ?"
-            query_params.append(limit)
-            query_params.append(offset)
-            
-            # Execute the query
-            logger.info(f"Executing search query: {final_query}")
-            logger.info(f"Query parameters: {query_params}")
-            
-            try:
-                cursor = conn.execute(final_query, tuple(query_params))
-                if not cursor:
-                    logger.error("Failed to execute search query")
-                    return []
-                
-                # Convert to list of dictionaries
-                results = [dict(row) for row in cursor.fetchall()]
-                logger.info(f"Found {len(results)} images matching search criteria")
-                
-                # Log first few results for debugging
-                if results and len(results) > 0:
-                    sample = results[0]
-                    logger.info(f"Sample result - ID: {sample.get('image_id')}, Width: {sample.get('width')}, Height: {sample.get('height')}")
-            except Exception as query_error:
-                logger.error(f"Error executing search query: {query_error}")
+                cursor = conn.execute(final_query, tuple(values) + (limit, offset))
+                if cursor:
+                    break
+                    
+                if use_fts:
+                    logger.warning("Full-text search failed, falling back to LIKE search")
+            else:
+                logger.error("Failed to execute search query")
                 return []
             
+            # Convert to list of dictionaries
+            results = [dict(row) for row in cursor.fetchall()]
+            logger.info(f"Found {len(results)} images matching search criteria")
+            
             return results
             
         except Exception as e:
@@ -291,6 +261,136 @@ class EnhancedSearch:
         finally:
             conn.disconnect()
     
+    def search_page(self, params, folder_id=None, catalog_id=None, page_token=None, page_size=200):
+        """Execute a search and return one page of results with a continuation token.
+
+        Results in date order resume after the (last_modified_date, image_id)
+        stored in the token. Relevance ranked text searches have no stable
+        keyset order, so their tokens carry a row offset instead.
+
+        Args:
+            params (dict): Search parameters (see search())
+            folder_id (int, optional): ID of the folder to search in
+            catalog_id (int, optional): ID of the catalog to search in
+            page_token (str, optional): Token returned with the previous page
+            page_size (int, optional): Number of images per page
+
+        Returns:
+            tuple: (results, next_token) where next_token is None on the last page
+        """
+        conn = self.db_ops.db.get_connection()
+        if not conn:
+            logger.error("Failed to get database connection for search")
+            return [], None
+
+        try:
+            position = decode_page_token(page_token)
+            attempts = [True, False] if self._uses_text_search(params) else [False]
+            trigram = attempts[0] and has_trigram_index(conn.conn)
+
+            for use_fts in attempts:
+                from_clause, conditions, values, ranked = self._build_filters(
+                    params, folder_id, catalog_id, use_fts, trigram
+                )
+
+                if ranked:
+                    offset = position.get("offset", 0)
+                    segments = [(None, [])]
+                    order_by = f"{BM25_RANK_SQL}, " + KEYSET_ORDER_SQL.format(alias="i")
+                else:
+                    segments = keyset_segments(position.get("key"))
+                    order_by = KEYSET_ORDER_SQL.format(alias="i")
+
+                rows = []
+                failed = False
+                for condition, condition_values in segments:
+                    segment_conditions = conditions + [condition] if condition else conditions
+
+                    final_query = f"SELECT i.* FROM {from_clause}"
+                    if segment_conditions:
+                        final_query += " WHERE " + " AND ".join(segment_conditions)
+                    final_query += f" ORDER BY {order_by} LIMIT ?"
+
+                    segment_values = values + condition_values + [page_size + 1 - len(rows)]
+                    if ranked:
+                        final_query += " OFFSET ?"
+                        segment_values.append(offset)
+
+                    logger.debug(f"Executing paged search query: {final_query}")
+
+                    cursor = conn.execute(final_query, tuple(segment_values))
+                    if not cursor:
+                        failed = True
+                        break
+
+                    rows.extend(dict(row) for row in cursor.fetchall())
+                    if len(rows) > page_size:
+                        break
+
+                if not failed:
+                    break
+
+                if use_fts:
+                    logger.warning("Full-text search failed, falling back to LIKE search")
+            else:
+                logger.error("Failed to execute search query")
+                return [], None
+
+            if ranked:
+                if len(rows) <= page_size:
+                    return rows, None
+                return rows[:page_size], encode_page_token(offset=offset + page_size)
+
+            return split_page(rows, page_size)
+
+        except Exception as e:
+            logger.error(f"Error performing paged enhanced search: {e}")
+            return [], None
+
+        finally:
+            conn.disconnect()
+
+    def count_results(self, params, folder_id=None, catalog_id=None):
+        """Count the images matching a search without fetching them.
+        
+        Args:
+            params (dict): Search parameters (see search())
+            folder_id (int, optional): ID of the folder to search in
+            catalog_id (int, optional): ID of the catalog to search in
+            
+        Returns:
+            int: Number of matching images
+        """
+        conn = self.db_ops.db.get_connection()
+        if not conn:
+            return 0
+            
+        try:
+            attempts = [True, False] if self._uses_text_search(params) else [False]
+            trigram = attempts[0] and has_trigram_index(conn.conn)
+            
+            for use_fts in attempts:
+                from_clause, conditions, values, _ = self._build_filters(
+                    params, folder_id, catalog_id, use_fts, trigram
+                )
+                
+                count_query = f"SELECT COUNT(*) FROM {from_clause}"
+                if conditions:
+                    count_query += " WHERE " + " AND ".join(conditions)
+                    
+                cursor = conn.execute(count_query, tuple(values))
+                if cursor:
+                    return cursor.fetchone()[0]
+                    
+            return 0
+            
+        except Exception as e:
+            logger.error(f"Error counting search results: {e}")
+            return 0
+            
+        finally:
+            conn.disconnect()
+    
     def update_image_dimensions(self, image_id, width, height):
         """Update the width and height of an image.
         
@@ -302,9 +402,6 @@ class EnhancedSearch:
         Returns:
             bool: True if successful, False otherwise
         """
-        # Ensure the database has width and height columns
-        self._ensure_dimension_columns()
-        
         conn = self.db_ops.db.get_connection()
         if not conn:
             return False
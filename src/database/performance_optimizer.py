@@ -13,7 +13,7 @@ from pathlib import Path
 
 from .db_indexing import DatabaseIndexOptimizer
 from .db_core import Database, DatabaseConnection
-from .db_statement_cache import CachedDatabaseConnection
+from .db_statement_cache import STATEMENT_CACHE_SIZE, CachedDatabaseConnection
 from .db_optimizer import DatabaseOptimizer
 
 logger = logging.getLogger("StarImageBrowse.database.performance_optimizer")
@@ -168,21 +168,16 @@ class DatabasePerformanceOptimizer:
         
         return results
     
-    def get_cached_connection(self, max_cache_size=100, expiration_seconds=300):
+    def get_cached_connection(self, max_cache_size=STATEMENT_CACHE_SIZE):
         """Get a cached database connection with prepared statement caching.
         
         Args:
-            max_cache_size (int): Maximum size of the statement cache
-            expiration_seconds (int): Expiration time for cached statements
+            max_cache_size (int): Maximum number of prepared statements kept
             
         Returns:
             CachedDatabaseConnection: A database connection with statement caching
         """
-        return CachedDatabaseConnection(
-            self.db_path, 
-            max_cache_size=max_cache_size, 
-            expiration_seconds=expiration_seconds
-        )
+        return CachedDatabaseConnection(self.db_path, max_cache_size=max_cache_size)
     
     def get_index_usage_stats(self):
         """Get statistics about index usage.
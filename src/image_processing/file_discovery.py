@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Parallel file discovery for StarImageBrowse
+Walks a directory tree with several threads, each listing directories with
+os.scandir, and streams the image files found through a bounded queue. The
+scanner starts processing the first images while the rest of the tree is
+still being walked, and the walkers pause when processing falls behind.
+
+Files are recognized by the extension in their directory entry, so walking
+costs no stat() call per file. Only files without an extension are opened
+to check their content, and files are only stat()-ed when their fingerprint
+is asked for.
+"""
+
+import os
+import queue
+import logging
+import threading
+
+from src.database.db_manifest import file_state
+from src.image_processing.image_ingest import SUPPORTED_EXTENSIONS, probe_image
+
+logger = logging.getLogger("StarImageBrowse.image_processing.file_discovery")
+
+# Threads listing directories; listing is I/O bound, so this can exceed the cores
+DEFAULT_DISCOVERY_THREADS = 4
+
+# Files found but not yet taken by the consumer before the walkers wait
+DEFAULT_QUEUE_SIZE = 1000
+
+# Seconds a blocked walker waits before checking whether discovery was stopped
+_PUT_TIMEOUT = 0.5
+
+# Marks the end of the stream in the output queue
+_DONE = object()
+
+
+class FileDiscovery:
+    """Streams the files below a directory as several threads find them.
+
+    Iterate over it to get (path, state) pairs; state is the FileState of the
+    file when with_state is set and None otherwise. Paths are normalized.
+    Iterating starts the walkers; leaving the loop early stops them.
+    """
+
+    def __init__(self, root, extensions=SUPPORTED_EXTENSIONS, threads=DEFAULT_DISCOVERY_THREADS,
+                 queue_size=DEFAULT_QUEUE_SIZE, with_state=False, ignored_dirs=()):
+        """Initialize the discovery.
+
+        Args:
+            root (str): Directory to walk
+            extensions (set): Lower-case file extensions to accept, with the dot
+            threads (int): Number of walker threads
+            queue_size (int): Files buffered for the consumer
+            with_state (bool): stat() each file found for its FileState
+            ignored_dirs (iterable): Directories not to descend into
+        """
+        self.root = root
+        self.extensions = extensions
+        self.threads = max(1, threads)
+        self.with_state = with_state
+        self.ignored_dirs = {os.path.normcase(os.path.abspath(path)) for path in ignored_dirs}
+
+        self.directories = queue.Queue()
+        self.output = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.outstanding = 0  # directories queued or being listed
+        self.stopped = threading.Event()
+        self.workers = []
+
+        self.failed_dirs = []  # directories that could not be listed
+        self.directories_listed = 0
+        self.files_found = 0
+
+    def __iter__(self):
+        self.start()
+        try:
+            while True:
+                item = self.output.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.stop()
+
+    def start(self):
+        """Start the walker threads."""
+        self._queue_directory(self.root)
+        for index in range(self.threads):
+            worker = threading.Thread(target=self._walk, name=f"FileDiscovery-{index}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self):
+        """Stop the walkers, dropping the files not taken yet."""
+        self.stopped.set()
+        for _ in self.workers:
+            self.directories.put(None)
+        # Unblock walkers waiting for room in the output queue
+        while True:
+            try:
+                self.output.get_nowait()
+            except queue.Empty:
+                break
+        for worker in self.workers:
+            worker.join(timeout=1.0)
+        self.workers = []
+
+    def is_complete(self, path):
+        """Check whether the walk covered the directory a path is in.
+
+        A file missing from a directory that could not be listed is not gone,
+        so callers must not treat it as deleted.
+
+        Args:
+            path (str): Path below the root
+
+        Returns:
+            bool: False if the path is in or below a directory that failed
+        """
+        path = os.path.normcase(path)
+        return not any(path.startswith(failed + os.sep) for failed in self.failed_dirs)
+
+    def _queue_directory(self, directory):
+        """Add a directory to walk."""
+        with self.lock:
+            self.outstanding += 1
+        self.directories.put(directory)
+
+    def _finish_directory(self):
+        """Count a directory as listed and end the stream after the last one."""
+        with self.lock:
+            self.outstanding -= 1
+            self.directories_listed += 1
+            done = self.outstanding == 0
+        if done:
+            for _ in range(self.threads):
+                self.directories.put(None)
+            self._put(_DONE)
+
+    def _put(self, item):
+        """Hand an item to the consumer, waiting while the queue is full.
+
+        Returns:
+            bool: False if discovery was stopped
+        """
+        while not self.stopped.is_set():
+            try:
+                self.output.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _walk(self):
+        """Walker thread main loop: list directories until the tree is done."""
+        while True:
+            directory = self.directories.get()
+            if directory is None or self.stopped.is_set():
+                return
+            try:
+                self._list(directory)
+            finally:
+                self._finish_directory()
+
+    def _list(self, directory):
+        """List one directory, queueing its subdirectories and streaming its files."""
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if self.stopped.is_set():
+                        return
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if os.path.normcase(os.path.abspath(entry.path)) not in self.ignored_dirs:
+                                self._queue_directory(entry.path)
+                            continue
+
+                        ext = os.path.splitext(entry.name)[1].lower()
+                        if ext not in self.extensions and (ext or not entry.is_file() or not probe_image(entry.path)):
+                            continue
+
+                        state = file_state(entry.stat(), entry.inode()) if self.with_state else None
+                        with self.lock:
+                            self.files_found += 1
+                        if not self._put((os.path.normpath(entry.path), state)):
+                            return
+                    except OSError as e:
+                        logger.warning(f"Error reading directory entry {entry.path}: {e}")
+        except OSError as e:
+            logger.warning(f"Error listing directory {directory}: {e}")
+            with self.lock:
+                self.failed_dirs.append(os.path.normcase(os.path.normpath(directory)))
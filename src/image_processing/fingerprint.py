@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+File fingerprints for StarImageBrowse
+Content hashes identifying image files, for duplicate detection and naming
+thumbnails. Two kinds are available:
+
+- Sampled (the default): BLAKE2b over the file size and the first, middle
+  and last SAMPLE_BYTES of the file. Reads at most three small ranges, so a
+  50 MB render costs the same as a 50 KB one. Files written by the same
+  tool rarely match at all three places and in size, but it is not proof
+  of identical content.
+- Full: BLAKE2b (or MD5, which older libraries used) over every byte, to
+  verify duplicates before acting on them.
+
+The algorithm is stored with each hash, because hashes of different
+algorithms never match even for the same file.
+"""
+
+import hashlib
+import logging
+
+logger = logging.getLogger("StarImageBrowse.image_processing.fingerprint")
+
+# Bytes hashed from the start, middle and end of a file in sampled mode
+SAMPLE_BYTES = 64 * 1024
+
+# Bytes read per call when hashing whole files
+READ_BUFFER_SIZE = 1024 * 1024
+
+# Size of the BLAKE2b digests, in bytes
+DIGEST_SIZE = 32
+
+# Algorithm names as stored with the hashes
+ALGORITHM_MD5 = "md5"
+ALGORITHM_BLAKE2 = "blake2b"
+ALGORITHM_SAMPLED = f"blake2b-sampled-{SAMPLE_BYTES // 1024}k"
+
+# Hashes stored before the algorithm was recorded are MD5 of the whole file
+LEGACY_ALGORITHM = ALGORITHM_MD5
+
+# Algorithms hashing every byte, which can confirm two files are identical
+FULL_ALGORITHMS = (ALGORITHM_BLAKE2, ALGORITHM_MD5)
+
+# Setting values (scanner.hash_algorithm) -> algorithm
+HASH_MODES = {
+    "sampled": ALGORITHM_SAMPLED,
+    "blake2b": ALGORITHM_BLAKE2,
+    "md5": ALGORITHM_MD5,
+}
+
+DEFAULT_HASH_MODE = "sampled"
+
+
+def algorithm_for_mode(mode):
+    """Get the algorithm for a hash_algorithm setting value.
+
+    Args:
+        mode (str): Setting value, see HASH_MODES
+
+    Returns:
+        str: Algorithm name; the default for unknown values
+    """
+    algorithm = HASH_MODES.get(mode)
+    if algorithm is None:
+        logger.warning(f"Unknown hash algorithm setting {mode!r}, using {DEFAULT_HASH_MODE}")
+        algorithm = HASH_MODES[DEFAULT_HASH_MODE]
+    return algorithm
+
+
+def new_hasher(algorithm):
+    """Create a hasher for an algorithm that hashes whole files.
+
+    Args:
+        algorithm (str): ALGORITHM_BLAKE2 or ALGORITHM_MD5
+
+    Returns:
+        hashlib hash object
+    """
+    if algorithm == ALGORITHM_BLAKE2:
+        return hashlib.blake2b(digest_size=DIGEST_SIZE)
+    if algorithm == ALGORITHM_MD5:
+        return hashlib.md5()
+    raise ValueError(f"Not a whole-file hash algorithm: {algorithm}")
+
+
+def sample_ranges(file_size, sample_bytes=SAMPLE_BYTES):
+    """Get the byte ranges a sampled fingerprint covers.
+
+    Args:
+        file_size (int): Size of the file
+        sample_bytes (int): Bytes per sample
+
+    Returns:
+        list: (offset, length) of the start, middle and end; one range
+            covering the file when it is too small to sample
+    """
+    if file_size <= 3 * sample_bytes:
+        return [(0, file_size)]
+    return [
+        (0, sample_bytes),
+        ((file_size - sample_bytes) // 2, sample_bytes),
+        (file_size - sample_bytes, sample_bytes),
+    ]
+
+
+def _sampled_hasher(file_size):
+    """Create the hasher of a sampled fingerprint, keyed by the file size."""
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    hasher.update(file_size.to_bytes(8, "little"))
+    return hasher
+
+
+def fingerprint_bytes(data, algorithm=ALGORITHM_SAMPLED):
+    """Fingerprint the contents of a file already in memory.
+
+    Args:
+        data (bytes): Complete contents of the file
+        algorithm (str): Algorithm name
+
+    Returns:
+        str: Hex digest
+    """
+    if algorithm != ALGORITHM_SAMPLED:
+        hasher = new_hasher(algorithm)
+        hasher.update(data)
+        return hasher.hexdigest()
+
+    view = memoryview(data)
+    hasher = _sampled_hasher(len(data))
+    for offset, length in sample_ranges(len(data)):
+        hasher.update(view[offset:offset + length])
+    return hasher.hexdigest()
+
+
+def fingerprint_file(file_path, algorithm=ALGORITHM_SAMPLED, file_size=None):
+    """Fingerprint a file on disk.
+
+    Args:
+        file_path (str): Path to the file
+        algorithm (str): Algorithm name
+        file_size (int, optional): Size of the file if already known
+
+    Returns:
+        str: Hex digest
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    with open(file_path, "rb") as f:
+        if algorithm != ALGORITHM_SAMPLED:
+            hasher = new_hasher(algorithm)
+            for chunk in iter(lambda: f.read(READ_BUFFER_SIZE), b""):
+                hasher.update(chunk)
+            return hasher.hexdigest()
+
+        if file_size is None:
+            file_size = f.seek(0, 2)
+        hasher = _sampled_hasher(file_size)
+        for offset, length in sample_ranges(file_size):
+            f.seek(offset)
+            hasher.update(f.read(length))
+        return hasher.hexdigest()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Single-read image ingest for StarImageBrowse
+Reads every file once during a scan: the bytes are fingerprinted,
+the header (size, format, mode, EXIF and PNG text chunks) comes from the same
+buffer, and the thumbnail is decoded from it. Discovery only looks at the
+first bytes of a file to recognize its format.
+"""
+
+import io
+import os
+import logging
+from collections import namedtuple
+from pathlib import Path
+
+from src.image_processing.fingerprint import ALGORITHM_SAMPLED, fingerprint_bytes, fingerprint_file
+
+logger = logging.getLogger("StarImageBrowse.image_processing.image_ingest")
+
+# Bytes read to recognize a format during discovery
+PROBE_BYTES = 16
+
+# Larger files are fingerprinted and decoded from disk instead of being
+# held in memory
+MAX_BUFFERED_BYTES = 64 * 1024 * 1024
+
+# Extensions treated as images; files without an extension are probed too
+SUPPORTED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp'}
+
+# Header information of an image. exif maps tag names to values and text holds
+# the text chunks of PNG files (such as generation parameters)
+ImageHeader = namedtuple("ImageHeader", ["width", "height", "format", "mode", "exif", "text"])
+
+# Everything a scan needs from one read of a file
+IngestResult = namedtuple("IngestResult", ["file_hash", "hash_algorithm", "header", "thumbnail_path"])
+
+
+def sniff_format(data):
+    """Recognize an image format from the first bytes of a file.
+
+    Args:
+        data (bytes): At least the first PROBE_BYTES of the file
+
+    Returns:
+        str: PIL format name, or None if the bytes are not a supported image
+    """
+    if data.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if data.startswith(b"BM"):
+        return "BMP"
+    # Classic and BigTIFF, in either byte order
+    if data[:4] in (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+"):
+        return "TIFF"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def probe_image(file_path):
+    """Check whether a file is a supported image by reading only its first bytes.
+
+    Used while walking folders, where opening every file with PIL would read
+    far more than needed.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        str: PIL format name, or None if the file is not a supported image
+    """
+    ext = Path(file_path).suffix.lower()
+    if ext and ext not in SUPPORTED_EXTENSIONS:
+        return None
+
+    try:
+        with open(file_path, "rb") as f:
+            image_format = sniff_format(f.read(PROBE_BYTES))
+    except OSError as e:
+        logger.warning(f"Error reading image header: {file_path}, error: {e}")
+        return None
+
+    if image_format is None:
+        logger.debug(f"Not a recognized image file: {file_path}")
+    return image_format
+
+
+def read_header(img):
+    """Extract the header information of an opened image without decoding it.
+
+    Args:
+        img (PIL.Image.Image): Opened image
+
+    Returns:
+        ImageHeader: Header information
+    """
+    from PIL import ExifTags
+
+    exif = {}
+    try:
+        exif = {
+            ExifTags.TAGS.get(tag, tag): value
+            for tag, value in img.getexif().items()
+        }
+    except Exception as e:
+        logger.debug(f"Error reading EXIF data: {e}")
+
+    # PNG text chunks are only all known once the image has been read, so
+    # the ones before the image data are taken from info here
+    text = {key: value for key, value in img.info.items() if isinstance(value, str)} if img.format == "PNG" else {}
+
+    width, height = img.size
+    return ImageHeader(width, height, img.format, img.mode, exif, text)
+
+
+def _read_and_hash(file_path, file_size, hash_algorithm):
+    """Read a file once and fingerprint it.
+
+    Args:
+        file_path (str): Path to the file
+        file_size (int): Size of the file in bytes
+        hash_algorithm (str): Fingerprint algorithm, see fingerprint
+
+    Returns:
+        tuple: (hex digest, file contents or None if the file was too large to buffer)
+    """
+    if file_size > MAX_BUFFERED_BYTES:
+        # A sampled fingerprint only reads three ranges of the file
+        return fingerprint_file(file_path, hash_algorithm, file_size), None
+
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return fingerprint_bytes(data, hash_algorithm), data
+
+
+def ingest_image(file_path, thumbnail_generator=None, file_size=None, hash_algorithm=ALGORITHM_SAMPLED):
+    """Hash an image, read its header and generate its thumbnail from one read.
+
+    Args:
+        file_path (str): Path to the image file
+        thumbnail_generator (ThumbnailGenerator, optional): Generator for the
+            thumbnail; without one no thumbnail is made
+        file_size (int, optional): Size of the file if already known
+        hash_algorithm (str): Fingerprint algorithm, see fingerprint
+
+    Returns:
+        IngestResult: Fields are None for the steps that failed
+    """
+    from PIL import Image
+
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+
+    try:
+        file_hash, data = _read_and_hash(file_path, file_size, hash_algorithm)
+    except OSError as e:
+        logger.error(f"Error reading {file_path}: {e}")
+        return IngestResult(None, None, None, None)
+
+    source = io.BytesIO(data) if data is not None else file_path
+    header = None
+    thumbnail_path = None
+    try:
+        with Image.open(source) as img:
+            header = read_header(img)
+            logger.debug(f"Read header of {file_path}: {header.width}×{header.height} {header.format}")
+
+            if thumbnail_generator is not None:
+                thumbnail_path = thumbnail_generator.generate_thumbnail_from_image(img, file_path)
+                if not thumbnail_path:
+                    logger.warning(f"Failed to generate thumbnail for {file_path}")
+
+            # Once decoded (its tiles consumed), a PNG also has the text chunks
+            # that follow the image data
+            if header.format == "PNG" and not img.tile:
+                header = header._replace(text=dict(img.text))
+
+    except Exception as e:
+        logger.warning(f"Failed to read image {file_path}: {e}")
+
+    return IngestResult(file_hash, hash_algorithm, header, thumbnail_path)
@@ -6,20 +6,34 @@ Handles scanning directories for images and processing them.
 """
 
 import os
+import stat
 import logging
-import hashlib
 import traceback
 import sys
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
+from src.database.db_ingest import ImageIngestSink
+from src.database.db_manifest import (
+    FILE_ADOPTED, FILE_UNCHANGED, classify_file, diff_manifest, file_state
+)
+from src.image_processing.file_discovery import DEFAULT_DISCOVERY_THREADS, FileDiscovery
+from src.image_processing.fingerprint import (
+    ALGORITHM_BLAKE2, DEFAULT_HASH_MODE, algorithm_for_mode, fingerprint_file
+)
+from src.image_processing.image_ingest import SUPPORTED_EXTENSIONS, ingest_image, probe_image
+
 logger = logging.getLogger("StarImageBrowse.image_scanner")
 
+# Images handed to the workers per worker before the scanner waits for results
+IN_FLIGHT_PER_WORKER = 4
+
 class ImageScanner:
     """Scans directories for images and processes them."""
     
-    def __init__(self, db_manager, thumbnail_generator, ai_processor=None, max_workers=4):
+    def __init__(self, db_manager, thumbnail_generator, ai_processor=None, max_workers=4,
+                 discovery_threads=DEFAULT_DISCOVERY_THREADS, hash_algorithm=None):
         """Initialize the image scanner.
         
         Args:
@@ -27,93 +41,67 @@ class ImageScanner:
             thumbnail_generator: Thumbnail generator instance
             ai_processor: AI image processor instance (optional)
             max_workers (int): Maximum number of worker threads
+            discovery_threads (int): Threads walking folders in parallel
+            hash_algorithm (str, optional): Fingerprint algorithm for new
+                images; the sampled fingerprint by default
         """
         self.db_manager = db_manager
         self.thumbnail_generator = thumbnail_generator
         self.ai_processor = ai_processor
         self.max_workers = max_workers
-        self.supported_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp'}
+        self.discovery_threads = discovery_threads
+        self.supported_extensions = SUPPORTED_EXTENSIONS
+        self.hash_algorithm = hash_algorithm or algorithm_for_mode(DEFAULT_HASH_MODE)
         
         logger.debug(f"Image scanner initialized with {max_workers} workers")
     
     def is_supported_image(self, file_path):
         """Check if a file is a supported image type.
         
+        Only the first bytes of the file are read; the image itself is
+        decoded once, when it is ingested.
+        
         Args:
             file_path (str): Path to the file
             
         Returns:
             bool: True if the file is a supported image, False otherwise
         """
-        try:
-            # First check: file extension
-            ext = Path(file_path).suffix.lower()
-            is_supported_ext = ext in self.supported_extensions
-            
-            if not is_supported_ext:
-                # Some image files might have wrong or missing extensions
-                # Log this for debugging but continue with content-based checks
-                logger.debug(f"Unsupported file extension: {file_path} (ext: {ext})")
-                
-                # If it's a file with no extension, we'll still try to check its content
-                if ext == '':
-                    logger.debug(f"File has no extension, will check content: {file_path}")
-                else:
-                    # If it has an unsupported extension, return False
-                    return False
-            
-            # Second check: try to open with PIL to verify it's actually an image
-            try:
-                from PIL import Image, UnidentifiedImageError
-                with Image.open(file_path) as img:
-                    # Get the actual format detected by PIL
-                    actual_format = img.format
-                    if actual_format:
-                        logger.debug(f"Image format detected: {file_path} (format: {actual_format})")
-                        return True
-                    else:
-                        logger.warning(f"Unknown image format for file: {file_path}")
-                        return False
-            except UnidentifiedImageError:
-                logger.warning(f"Not a valid image file (PIL cannot identify): {file_path}")
-                return False
-            except Exception as e:
-                logger.warning(f"Error opening image with PIL: {file_path}, error: {str(e)}")
-                # If the file extension is supported but PIL can't open it, it might be corrupted
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error checking if file is a supported image: {file_path}, error: {str(e)}")
-            return False
+        image_format = probe_image(file_path)
+        if image_format:
+            logger.debug(f"Image format detected: {file_path} (format: {image_format})")
+            return True
+        return False
     
-    def compute_file_hash(self, file_path):
+    def compute_file_hash(self, file_path, algorithm=ALGORITHM_BLAKE2):
         """Compute a hash for the file to detect duplicates.
         
+        Hashes every byte by default, to confirm that files whose sampled
+        fingerprints match really are identical.
+        
         Args:
             file_path (str): Path to the file
+            algorithm (str): Fingerprint algorithm, see fingerprint
             
         Returns:
-            str: MD5 hash of the file, or None if hashing failed
+            str: Hex digest of the file, or None if hashing failed
         """
         try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            return fingerprint_file(file_path, algorithm)
         except (IOError, OSError) as e:
             logger.error(f"Error computing hash for {file_path}: {e}")
             return None
     
-    def process_image(self, folder_id, file_path):
-        """Process a single image file.
+    def prepare_image(self, folder_id, file_path):
+        """Read everything needed to store an image, without touching the database.
         
         Args:
             folder_id (int): ID of the folder containing the image
             file_path (str): Path to the image file
             
         Returns:
-            dict: Processing results
+            dict: Processing results; on success "record" holds the image
+                record for add_images_bulk()
         """
         try:
             # Make sure the file exists
@@ -128,7 +116,8 @@ class ImageScanner:
             
             # Check file size - skip empty files
             try:
-                file_size = os.path.getsize(file_path)
+                file_stat = os.stat(file_path)
+                file_size = file_stat.st_size
                 if file_size == 0:
                     logger.warning(f"Empty file (0 bytes): {file_path}")
                     return {
@@ -159,34 +148,21 @@ class ImageScanner:
                     "extension": ext
                 }
             
-            # Get file information
+            # Hash, header and thumbnail all come from one read of the file
             filename = os.path.basename(file_path)
-            file_hash = self.compute_file_hash(file_path)
+            ingest = ingest_image(file_path, self.thumbnail_generator, file_size, self.hash_algorithm)
+            file_hash = ingest.file_hash
+            thumbnail_path = ingest.thumbnail_path
+            header = ingest.header
             if not file_hash:
                 logger.warning(f"Failed to compute file hash: {file_path}")
                 # Continue processing even without hash
-                
-            # Extract image dimensions and format using PIL
-            width = None
-            height = None
-            image_format = None
-            try:
-                from PIL import Image
-                with Image.open(file_path) as img:
-                    width, height = img.size
-                    image_format = img.format  # Get the image format (JPEG, PNG, etc.)
-                    logger.debug(f"Extracted dimensions {width}×{height} and format {image_format} from {file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to extract dimensions and format from {file_path}: {e}")
             
-            # Generate thumbnail
-            try:
-                thumbnail_path = self.thumbnail_generator.generate_thumbnail(file_path)
-                if not thumbnail_path:
-                    logger.warning(f"Failed to generate thumbnail for {file_path}")
-            except Exception as e:
-                logger.error(f"Error generating thumbnail for {file_path}: {e}")
-                thumbnail_path = None
+            if header is None:
+                logger.warning(f"Failed to extract dimensions and format from {file_path}")
+                width = height = image_format = None
+            else:
+                width, height, image_format = header.width, header.height, header.format
             
             # Generate AI description if AI processor is available
             ai_description = None
@@ -196,41 +172,30 @@ class ImageScanner:
                 except Exception as e:
                     logger.error(f"Error generating AI description for {file_path}: {e}")
             
-            # Add to database
-            try:
-                image_id = self.db_manager.add_image(
-                    folder_id=folder_id,
-                    filename=filename,
-                    full_path=file_path,
-                    file_size=file_size,
-                    file_hash=file_hash,
-                    thumbnail_path=thumbnail_path,
-                    ai_description=ai_description,
-                    image_format=image_format
-                )
-                
-                # Update image dimensions if extracted successfully
-                if image_id and width and height and hasattr(self.db_manager, 'enhanced_search'):
-                    try:
-                        self.db_manager.enhanced_search.update_image_dimensions(image_id, width, height)
-                    except Exception as e:
-                        logger.warning(f"Failed to update dimensions in database: {e}")
-                
-                if not image_id:
-                    logger.warning(f"Failed to add image to database: {file_path}")
-                    return {"success": False, "error": "Failed to add to database", "filename": filename}
-                
-            except Exception as e:
-                logger.error(f"Database error when adding image {file_path}: {e}")
-                return {"success": False, "error": f"Database error: {str(e)}", "filename": filename}
-            
             return {
                 "success": True,
-                "image_id": image_id,
                 "filename": filename,
                 "thumbnail_path": thumbnail_path,
                 "ai_description": ai_description is not None,
-                "dimensions": (width, height) if width and height else None
+                "dimensions": (width, height) if width and height else None,
+                "header": header,
+                "record": {
+                    "folder_id": folder_id,
+                    "filename": filename,
+                    "full_path": file_path,
+                    "file_size": file_size,
+                    "file_hash": file_hash,
+                    "hash_algorithm": ingest.hash_algorithm if file_hash else None,
+                    "thumbnail_path": thumbnail_path,
+                    "ai_description": ai_description,
+                    "image_format": image_format,
+                    "creation_date": datetime.fromtimestamp(file_stat.st_ctime),
+                    "last_modified_date": datetime.fromtimestamp(file_stat.st_mtime),
+                    "width": width,
+                    "height": height,
+                    "file_mtime_ns": file_stat.st_mtime_ns,
+                    "file_inode": file_stat.st_ino
+                }
             }
             
         except Exception as e:
@@ -240,16 +205,78 @@ class ImageScanner:
             logger.error(f"Exception details: {traceback.format_exception(*exc_info)}")
             return {"success": False, "error": str(e), "filename": os.path.basename(file_path)}
     
-    def scan_folder(self, folder_id, folder_path, progress_callback=None):
+    def process_image(self, folder_id, file_path):
+        """Process a single image file.
+        
+        Args:
+            folder_id (int): ID of the folder containing the image
+            file_path (str): Path to the image file
+            
+        Returns:
+            dict: Processing results
+        """
+        result = self.prepare_image(folder_id, file_path)
+        record = result.pop("record", None)
+        if not result.get("success", False):
+            return result
+            
+        filename = result["filename"]
+        
+        # Add to database
+        try:
+            image_ids = self.db_manager.add_images_bulk([record])
+            image_id = image_ids[0] if image_ids else None
+            
+            if not image_id:
+                logger.warning(f"Failed to add image to database: {file_path}")
+                return {"success": False, "error": "Failed to add to database", "filename": filename}
+            
+        except Exception as e:
+            logger.error(f"Database error when adding image {file_path}: {e}")
+            return {"success": False, "error": f"Database error: {str(e)}", "filename": filename}
+        
+        result["image_id"] = image_id
+        return result
+    
+    def discover_images(self, folder_path, with_state=True):
+        """Start discovering the image files below a folder.
+        
+        Several threads walk the folder; iterating over the result yields the
+        files as they are found. See FileDiscovery.
+        
+        Args:
+            folder_path (str): Path to the folder
+            with_state (bool): Include the stat fingerprint of each file
+            
+        Returns:
+            FileDiscovery: Stream of (normalized full path, FileState or None)
+        """
+        # Thumbnails stored inside a monitored folder are not images of it
+        thumbnail_dir = getattr(self.thumbnail_generator, "thumbnail_dir", None)
+        return FileDiscovery(
+            folder_path,
+            self.supported_extensions,
+            threads=self.discovery_threads,
+            with_state=with_state,
+            ignored_dirs=[thumbnail_dir] if thumbnail_dir else ()
+        )
+    
+    def scan_folder(self, folder_id, folder_path, progress_callback=None, incremental=True):
         """Scan a folder for images and process them.
         
+        An incremental scan compares the files with the scan manifest and
+        only processes new and changed ones; images whose file is gone are
+        deleted. A full scan processes every file again.
+        
         Args:
             folder_id (int): ID of the folder to scan
             folder_path (str): Path to the folder
             progress_callback (function, optional): Progress callback function
+            incremental (bool): Only process files that changed since the last scan
             
         Returns:
-            dict: Scan results with counts of processed, failed, and skipped images
+            dict: Scan results with counts of processed, failed, skipped and
+                deleted images
         """
         try:
             if not os.path.exists(folder_path) or not os.path.isdir(folder_path):
@@ -262,68 +289,39 @@ class ImageScanner:
                 "processed": 0,
                 "failed": 0,
                 "skipped": 0,
+                "deleted": 0,
                 "total": 0,
                 "errors": []
             }
             
-            # Find all image files recursively
-            image_files = []
-            for root, _, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if self.is_supported_image(file_path):
-                        image_files.append(file_path)
-            
-            results["total"] = len(image_files)
-            logger.info(f"Found {results['total']} image files in {folder_path}")
+            # Images are processed while the folder is still being walked
+            manifest = self.db_manager.get_scan_manifest(folder_id) if incremental else None
+            discovery = self.discover_images(folder_path, with_state=manifest is not None)
+            
+            if manifest is None:
+                image_files = (path for path, _ in discovery)
+            else:
+                seen = set()
+                adopted = {}
+                image_files = self._changed_files(discovery, manifest, seen, adopted, results)
+            
+            self._process_files(folder_id, image_files, results, progress_callback)
+            logger.info(f"Found {discovery.files_found} image files in {discovery.directories_listed} "
+                        f"directories of {folder_path}")
+            
+            if manifest is not None:
+                # Images indexed before the manifest existed only need their fingerprint
+                if adopted:
+                    self.db_manager.update_scan_manifest(adopted)
+                
+                # Files under a directory that could not be listed are not gone
+                deleted = [entry.image_id for path, entry in manifest.items()
+                           if entry.image_id not in seen and discovery.is_complete(path)]
+                if deleted:
+                    results["deleted"] = self.db_manager.delete_images_bulk(deleted)
             
-            if results["total"] == 0:
+            if discovery.files_found == 0:
                 logger.warning(f"No image files found in folder: {folder_path}")
-                # Update the last scan time for the folder anyway
-                self.db_manager.update_folder_scan_time(folder_id)
-                return results
-            
-            # Process images in parallel
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_path = {
-                    executor.submit(self.process_image, folder_id, file_path): file_path
-                    for file_path in image_files
-                }
-                
-                completed = 0
-                for future in future_to_path:
-                    file_path = future_to_path[future]
-                    try:
-                        result = future.result()
-                        if result.get("success", False):
-                            results["processed"] += 1
-                        else:
-                            results["failed"] += 1
-                            error_info = {
-                                "file": os.path.basename(file_path),
-                                "error": result.get("error", "Unknown error")
-                            }
-                            results["errors"].append(error_info)
-                            logger.warning(f"Failed to process image {file_path}: {result.get('error')}")
-                    except Exception as e:
-                        # Capture and log the exception
-                        exc_info = sys.exc_info()
-                        logger.error(f"Exception processing image {file_path}: {e}")
-                        logger.error(f"Exception details: {traceback.format_exception(*exc_info)}")
-                        
-                        results["failed"] += 1
-                        error_info = {
-                            "file": os.path.basename(file_path),
-                            "error": str(e)
-                        }
-                        results["errors"].append(error_info)
-                    
-                    completed += 1
-                    if progress_callback:
-                        try:
-                            progress_callback(completed, results["total"])
-                        except Exception as e:
-                            logger.error(f"Error in callback: {e}")
             
             # Update the last scan time for the folder
             try:
@@ -332,7 +330,8 @@ class ImageScanner:
                 logger.error(f"Error updating folder scan time: {e}")
             
             logger.info(f"Folder scan complete: {folder_path}")
-            logger.info(f"Processed: {results['processed']}, Failed: {results['failed']}, Total: {results['total']}")
+            logger.info(f"Processed: {results['processed']}, Failed: {results['failed']}, "
+                        f"Skipped: {results['skipped']}, Deleted: {results['deleted']}, Total: {results['total']}")
             
             return results
             
@@ -346,11 +345,214 @@ class ImageScanner:
                 "processed": 0,
                 "failed": 0,
                 "skipped": 0,
+                "deleted": 0,
                 "total": 0,
                 "errors": [{"file": "folder", "error": str(e)}],
                 "error": str(e)
             }
     
+    def _apply_manifest(self, folder_id, manifest, files, results):
+        """Compare files with the scan manifest and record what needs no processing.
+        
+        Images whose file is gone are deleted, and images indexed before the
+        manifest existed take over the fingerprint of their unchanged file.
+        
+        Args:
+            folder_id (int): ID of the folder the files are in
+            manifest (dict): Manifest of the images the files may belong to
+            files (dict): Normalized full path -> FileState of the image files found
+            results (dict): Scan results to update
+            
+        Returns:
+            list: Paths of the new and changed files to process
+        """
+        diff = diff_manifest(manifest, files)
+        results["skipped"] += diff.unchanged + len(diff.adopted)
+        logger.info(f"Folder {folder_id}: {len(diff.new)} new, {len(diff.changed)} changed, "
+                    f"{diff.unchanged + len(diff.adopted)} unchanged, {len(diff.deleted)} removed")
+        
+        # Images indexed before the manifest existed only need their fingerprint
+        if diff.adopted:
+            self.db_manager.update_scan_manifest(diff.adopted)
+        if diff.deleted:
+            results["deleted"] += self.db_manager.delete_images_bulk(diff.deleted)
+        
+        return list(diff.new) + list(diff.changed)
+    
+    def _changed_files(self, discovery, manifest, seen, adopted, results):
+        """Filter discovered files down to those that are new or changed.
+        
+        Args:
+            discovery (iterable): (path, FileState) pairs of the files found
+            manifest (dict): Manifest of the folder being scanned
+            seen (set): Filled with the image IDs of every indexed file found
+            adopted (dict): Filled with image_id -> FileState of images
+                indexed before the manifest existed whose file is unchanged
+            results (dict): Scan results to update
+            
+        Yields:
+            str: Path of each new or changed file
+        """
+        for path, state in discovery:
+            entry = manifest.get(path)
+            status = classify_file(entry, state)
+            if entry is not None:
+                seen.add(entry.image_id)
+            
+            if status == FILE_ADOPTED:
+                adopted[entry.image_id] = state
+                results["skipped"] += 1
+            elif status == FILE_UNCHANGED:
+                results["skipped"] += 1
+            else:
+                yield path
+    
+    def _process_files(self, folder_id, image_files, results, progress_callback=None):
+        """Prepare images in parallel and write them to the database in batches.
+        
+        Files are taken from image_files as the workers are ready for them,
+        so it can be a stream still being discovered; the number of files
+        handed to the workers at once is bounded.
+        
+        Args:
+            folder_id (int): ID of the folder the files are in
+            image_files (iterable): Paths of the image files to process
+            results (dict): Scan results to update
+            progress_callback (function, optional): Called as (completed, total
+                found so far)
+        """
+        max_in_flight = self.max_workers * IN_FLIGHT_PER_WORKER
+        completed = 0
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor, \
+                ImageIngestSink(self.db_manager) as sink:
+            in_flight = {}
+            
+            def collect(done):
+                nonlocal completed
+                for future in done:
+                    self._collect_result(future, in_flight.pop(future), sink, results)
+                    completed += 1
+                    if progress_callback:
+                        try:
+                            progress_callback(completed, results["total"])
+                        except Exception as e:
+                            logger.error(f"Error in callback: {e}")
+            
+            for file_path in image_files:
+                results["total"] += 1
+                in_flight[executor.submit(self.prepare_image, folder_id, file_path)] = file_path
+                if len(in_flight) >= max_in_flight:
+                    collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            
+            while in_flight:
+                collect(wait(in_flight, return_when=FIRST_COMPLETED).done)
+        
+        results["processed"] = len(sink.added)
+        for file_path in sink.failed:
+            results["failed"] += 1
+            results["errors"].append({
+                "file": os.path.basename(file_path),
+                "error": "Failed to add to database"
+            })
+    
+    def _collect_result(self, future, file_path, sink, results):
+        """Hand a prepared image to the sink or record why it failed.
+        
+        Args:
+            future (concurrent.futures.Future): Future of prepare_image()
+            file_path (str): Path of the image
+            sink (ImageIngestSink): Sink writing the images
+            results (dict): Scan results to update
+        """
+        try:
+            result = future.result()
+            if result.get("success", False):
+                sink.add(result["record"])
+            else:
+                results["failed"] += 1
+                error_info = {
+                    "file": os.path.basename(file_path),
+                    "error": result.get("error", "Unknown error")
+                }
+                results["errors"].append(error_info)
+                logger.warning(f"Failed to process image {file_path}: {result.get('error')}")
+        except Exception as e:
+            # Capture and log the exception
+            exc_info = sys.exc_info()
+            logger.error(f"Exception processing image {file_path}: {e}")
+            logger.error(f"Exception details: {traceback.format_exception(*exc_info)}")
+            
+            results["failed"] += 1
+            error_info = {
+                "file": os.path.basename(file_path),
+                "error": str(e)
+            }
+            results["errors"].append(error_info)
+    
+    def ingest_changes(self, folder_id, changed_paths=(), deleted_paths=()):
+        """Bring the images of specific files up to date.
+        
+        Used by the folder watcher: only the given paths are compared with
+        the scan manifest, so a handful of changed files in a large folder
+        costs a handful of lookups instead of a folder scan.
+        
+        Args:
+            folder_id (int): ID of the folder the files are in
+            changed_paths (iterable): Files that were created or modified
+            deleted_paths (iterable): Files that were deleted or moved away
+            
+        Returns:
+            dict: Results with counts of processed, failed, skipped and deleted images
+        """
+        results = {
+            "processed": 0,
+            "failed": 0,
+            "skipped": 0,
+            "deleted": 0,
+            "total": 0,
+            "errors": []
+        }
+        
+        paths = {os.path.normpath(path) for path in changed_paths} | {os.path.normpath(path) for path in deleted_paths}
+        if not paths:
+            return results
+        
+        try:
+            manifest = self.db_manager.get_scan_manifest(folder_id, paths)
+            if manifest is None:
+                raise RuntimeError("Failed to read the scan manifest")
+            
+            # A path reported deleted may exist again, so every path is checked on disk
+            files = {}
+            for path in paths:
+                try:
+                    stat_result = os.stat(path)
+                except OSError:
+                    continue
+                if not stat.S_ISREG(stat_result.st_mode):
+                    continue
+                ext = os.path.splitext(path)[1].lower()
+                if ext not in self.supported_extensions and (ext or not probe_image(path)):
+                    continue
+                files[path] = file_state(stat_result)
+            
+            image_files = self._apply_manifest(folder_id, manifest, files, results)
+            if image_files:
+                self._process_files(folder_id, image_files, results)
+            
+            return results
+            
+        except Exception as e:
+            # Capture and log the exception
+            exc_info = sys.exc_info()
+            logger.error(f"Error ingesting changes in folder {folder_id}: {e}")
+            logger.error(f"Exception details: {traceback.format_exception(*exc_info)}")
+            
+            results["errors"].append({"file": "folder", "error": str(e)})
+            results["error"] = str(e)
+            return results
+    
     def scan_all_folders(self, progress_callback=None):
         """Scan all enabled folders for images.
         
@@ -161,6 +161,75 @@ class ThumbnailGenerator:
             logger.error(f"Error getting file size for {image_path}: {e}")
             return None
         
+        thumbnail_path, absolute_thumbnail_path = self._thumbnail_target(image_path)
+        
+        # Check if thumbnail already exists
+        if os.path.exists(absolute_thumbnail_path) and not force:
+            # Check if the original image is newer than the thumbnail
+            if os.path.getmtime(image_path) <= os.path.getmtime(absolute_thumbnail_path):
+                logger.debug(f"Thumbnail already exists and is up to date: {absolute_thumbnail_path}")
+                return thumbnail_path
+        
+        try:
+            # Open the image
+            with Image.open(image_path) as img:
+                return self._render_thumbnail(img, image_path, thumbnail_path, absolute_thumbnail_path, target_format)
+                
+        except UnidentifiedImageError as e:
+            logger.error(f"Unidentified image format for {image_path}: {e}")
+            return None
+        except OSError as e:
+            logger.error(f"OS error generating thumbnail for {image_path}: {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"Value error generating thumbnail for {image_path}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error generating thumbnail for {image_path}: {str(e)}")
+            return None
+    
+    def generate_thumbnail_from_image(self, img, image_path, force=False, target_format=None):
+        """Generate a thumbnail from an image that is already open.
+        
+        Used by the scanner, which reads each file once and decodes the
+        thumbnail from that read instead of opening the file again.
+        
+        Args:
+            img (PIL.Image.Image): Opened original image; it may be decoded at a reduced scale
+            image_path (str): Path to the original image, which names the thumbnail
+            force (bool): If True, regenerate thumbnail even if it exists
+            target_format (str, optional): Target format for the thumbnail ('JPEG', 'PNG', 'WebP')
+            
+        Returns:
+            str: Path to the generated thumbnail, or None if generation failed
+        """
+        thumbnail_path, absolute_thumbnail_path = self._thumbnail_target(image_path)
+        
+        # Check if thumbnail already exists
+        if os.path.exists(absolute_thumbnail_path) and not force:
+            # Check if the original image is newer than the thumbnail
+            if os.path.getmtime(image_path) <= os.path.getmtime(absolute_thumbnail_path):
+                logger.debug(f"Thumbnail already exists and is up to date: {absolute_thumbnail_path}")
+                return thumbnail_path
+        
+        try:
+            return self._render_thumbnail(img, image_path, thumbnail_path, absolute_thumbnail_path, target_format)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error generating thumbnail for {image_path}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error generating thumbnail for {image_path}: {str(e)}")
+            return None
+    
+    def _thumbnail_target(self, image_path):
+        """Work out where the thumbnail of an image is stored.
+        
+        Args:
+            image_path (str): Path to the original image
+            
+        Returns:
+            tuple: (relative path stored in the database, absolute path)
+        """
         # Get the relative path for storage in the database
         thumbnail_path = self.get_thumbnail_path(image_path)
         
@@ -189,90 +258,87 @@ class ThumbnailGenerator:
         # Create parent directory if it doesn't exist
         os.makedirs(os.path.dirname(absolute_thumbnail_path), exist_ok=True)
         
-        # Check if thumbnail already exists
-        if os.path.exists(absolute_thumbnail_path) and not force:
-            # Check if the original image is newer than the thumbnail
-            if os.path.getmtime(image_path) <= os.path.getmtime(absolute_thumbnail_path):
-                logger.debug(f"Thumbnail already exists and is up to date: {absolute_thumbnail_path}")
-                return thumbnail_path
+        return thumbnail_path, absolute_thumbnail_path
+    
+    def _render_thumbnail(self, img, image_path, thumbnail_path, absolute_thumbnail_path, target_format=None):
+        """Scale an opened image down and save it as a thumbnail.
+        
+        Args:
+            img (PIL.Image.Image): Opened original image
+            image_path (str): Path to the original image, for logging
+            thumbnail_path (str): Relative thumbnail path to return
+            absolute_thumbnail_path (str): Where to save the thumbnail
+            target_format (str, optional): Target format for the thumbnail ('JPEG', 'PNG', 'WebP')
+            
+        Returns:
+            str: thumbnail_path, or None if the thumbnail could not be saved
+        """
+        # JPEG can be decoded at a fraction of its size, still at least as
+        # large as the thumbnail, which is much faster than a full decode
+        if img.format == "JPEG":
+            img.draft("RGB", self.size)
+        
+        # Log image format and mode for debugging
+        logger.debug(f"Processing image: {image_path}, format: {img.format}, mode: {img.mode}, size: {img.size}")
+        
+        # Handle different image modes
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            # Create a white background for images with transparency
+            logger.debug(f"Converting transparent image to RGB: {image_path}")
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            
+            # Paste the image on the background if it has alpha
+            try:
+                if img.mode == 'RGBA':
+                    background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
+                elif img.mode == 'LA':
+                    background.paste(img, mask=img.split()[1])  # 1 is the alpha channel
+                elif img.mode == 'P' and 'transparency' in img.info:
+                    background.paste(img, mask=img.convert('RGBA').split()[3])
+                img = background
+            except Exception as e:
+                logger.warning(f"Error handling transparency in {image_path}: {e}")
+                # Fall back to simple conversion
+                img = img.convert('RGB')
+        elif img.mode != 'RGB':
+            logger.debug(f"Converting image from {img.mode} to RGB: {image_path}")
+            img = img.convert('RGB')
         
+        # Create a proportional thumbnail
         try:
-            # Open the image
-            with Image.open(image_path) as img:
-                # Log image format and mode for debugging
-                logger.debug(f"Processing image: {image_path}, format: {img.format}, mode: {img.mode}, size: {img.size}")
-                
-                # Handle different image modes
-                if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-                    # Create a white background for images with transparency
-                    logger.debug(f"Converting transparent image to RGB: {image_path}")
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    
-                    # Paste the image on the background if it has alpha
-                    try:
-                        if img.mode == 'RGBA':
-                            background.paste(img, mask=img.split()[3])  # 3 is the alpha channel
-                        elif img.mode == 'LA':
-                            background.paste(img, mask=img.split()[1])  # 1 is the alpha channel
-                        elif img.mode == 'P' and 'transparency' in img.info:
-                            background.paste(img, mask=img.convert('RGBA').split()[3])
-                        img = background
-                    except Exception as e:
-                        logger.warning(f"Error handling transparency in {image_path}: {e}")
-                        # Fall back to simple conversion
-                        img = img.convert('RGB')
-                elif img.mode != 'RGB':
-                    logger.debug(f"Converting image from {img.mode} to RGB: {image_path}")
-                    img = img.convert('RGB')
-                
-                # Create a proportional thumbnail
-                try:
-                    img.thumbnail(self.size, Image.Resampling.LANCZOS)
-                except Exception as e:
-                    logger.warning(f"Error using LANCZOS resampling for {image_path}: {e}")
-                    # Fall back to simpler resampling method
-                    try:
-                        img.thumbnail(self.size, Image.Resampling.NEAREST)
-                    except Exception as e2:
-                        logger.error(f"Error creating thumbnail with fallback method: {e2}")
-                        return None
-                
-                # Save the thumbnail in the specified format
-                try:
-                    # Use target_format if specified, otherwise default to JPEG
-                    output_format = target_format or "JPEG"
-                    
-                    if output_format.upper() == "WEBP":
-                        img.save(absolute_thumbnail_path, "WEBP", quality=85, lossless=False)
-                    elif output_format.upper() == "PNG":
-                        img.save(absolute_thumbnail_path, "PNG", compress_level=6, optimize=True)
-                    else:  # Default to JPEG
-                        img.save(absolute_thumbnail_path, "JPEG", quality=85, optimize=True)
-                    logger.debug(f"Generated thumbnail: {absolute_thumbnail_path}")
-                    return thumbnail_path
-                except Exception as e:
-                    logger.error(f"Error saving thumbnail for {image_path}: {e}")
-                    # Try with lower quality if optimization fails
-                    try:
-                        img.save(absolute_thumbnail_path, "JPEG", quality=70, optimize=False)
-                        logger.debug(f"Generated thumbnail with reduced quality: {absolute_thumbnail_path}")
-                        return thumbnail_path
-                    except Exception as e2:
-                        logger.error(f"Error saving thumbnail with reduced quality: {e2}")
-                        return None
-                
-        except UnidentifiedImageError as e:
-            logger.error(f"Unidentified image format for {image_path}: {e}")
-            return None
-        except OSError as e:
-            logger.error(f"OS error generating thumbnail for {image_path}: {e}")
-            return None
-        except ValueError as e:
-            logger.error(f"Value error generating thumbnail for {image_path}: {e}")
-            return None
+            img.thumbnail(self.size, Image.Resampling.LANCZOS)
         except Exception as e:
-            logger.error(f"Unexpected error generating thumbnail for {image_path}: {str(e)}")
-            return None
+            logger.warning(f"Error using LANCZOS resampling for {image_path}: {e}")
+            # Fall back to simpler resampling method
+            try:
+                img.thumbnail(self.size, Image.Resampling.NEAREST)
+            except Exception as e2:
+                logger.error(f"Error creating thumbnail with fallback method: {e2}")
+                return None
+        
+        # Save the thumbnail in the specified format
+        try:
+            # Use target_format if specified, otherwise default to JPEG
+            output_format = target_format or "JPEG"
+            
+            if output_format.upper() == "WEBP":
+                img.save(absolute_thumbnail_path, "WEBP", quality=85, lossless=False)
+            elif output_format.upper() == "PNG":
+                img.save(absolute_thumbnail_path, "PNG", compress_level=6, optimize=True)
+            else:  # Default to JPEG
+                img.save(absolute_thumbnail_path, "JPEG", quality=85, optimize=True)
+            logger.debug(f"Generated thumbnail: {absolute_thumbnail_path}")
+            return thumbnail_path
+        except Exception as e:
+            logger.error(f"Error saving thumbnail for {image_path}: {e}")
+            # Try with lower quality if optimization fails
+            try:
+                img.save(absolute_thumbnail_path, "JPEG", quality=70, optimize=False)
+                logger.debug(f"Generated thumbnail with reduced quality: {absolute_thumbnail_path}")
+                return thumbnail_path
+            except Exception as e2:
+                logger.error(f"Error saving thumbnail with reduced quality: {e2}")
+                return None
     
     def delete_thumbnail(self, thumbnail_path):
         """Delete a thumbnail.
@@ -154,8 +154,8 @@ class BackgroundScanner:
                     def progress_callback(current, total):
                         self.signals.scan_progress.emit(folder_path, current, total)
                     
-                    # Scan the folder
-                    results = self.image_scanner.scan_folder(folder_id, folder_path, progress_callback)
+                    # Scan the folder, processing only files changed since the last scan
+                    results = self.image_scanner.scan_folder(folder_id, folder_path, progress_callback, incremental=True)
                     
                     # Update statistics
                     processed = results.get("processed", 0)
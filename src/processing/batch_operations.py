@@ -234,11 +234,14 @@ class BatchOperations:
                 
                 if image_id and description:
                     try:
-                        # Update description in database
-                        self.db_manager.update_image_description(image_id, description)
+                        # Update description in database, buffered with the other results
+                        self.db_manager.queue_image_description(image_id, description)
                         logger.debug(f"Updated description for image {image_id}")
                     except Exception as e:
                         logger.error(f"Error updating description for image {image_id}: {e}")
+            
+            # Commit them together before the operation is reported complete
+            self.db_manager.flush_writes()
     
     def generate_descriptions(self, images: List[Dict], parent=None, show_progress=True,
                              on_complete=None) -> str:
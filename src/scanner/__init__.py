@@ -6,5 +6,6 @@ Contains modules for scanning and monitoring folders for images
 """
 
 from .background_scanner import BackgroundScanner
+from .folder_watcher import FolderWatcher
 
-__all__ = ['BackgroundScanner']
+__all__ = ['BackgroundScanner', 'FolderWatcher']
@@ -31,12 +31,12 @@ class BackgroundScanner:
         """Initialize the background scanner.
         
         Args:
-            image_scanner: Optional image scanner instance (for compatibility with MainWindow)
+            image_scanner: Optional image scanner instance used to scan folders incrementally
             db_manager (DatabaseOperations): Database manager instance
             config_manager: Optional config manager instance (for compatibility with MainWindow)
             interval_minutes (int): Scan interval in minutes
         """
-        self.image_scanner = image_scanner  # Not used, for compatibility
+        self.image_scanner = image_scanner  # Reconciles folders with the scan manifest when given
         self.db_manager = db_manager
         self.config_manager = config_manager  # Not used, for compatibility
         self.interval_minutes = interval_minutes
@@ -178,6 +178,12 @@ class BackgroundScanner:
             logger.warning(f"Folder does not exist: {folder_path}")
             return 0
             
+        # A safety net for the folder watcher: new, changed and removed files
+        # are found by comparing the folder with the scan manifest
+        if self.image_scanner is not None:
+            results = self.image_scanner.scan_folder(folder_id, folder_path, incremental=True)
+            return results.get("processed", 0)
+            
         # Get existing images for this folder
         existing_images = {}
         db_images = self.db_manager.get_images_in_folder(folder_id)
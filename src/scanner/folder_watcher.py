@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Folder watcher for StarImageBrowse
+Subscribes to file system events in the monitored folders and brings the
+database up to date as files are created, modified, moved or deleted, so new
+images show up without waiting for the next background scan.
+
+Events are collected per folder and applied once the folder has been quiet
+for a moment, so a burst of events, such as a render job writing hundreds of
+images, is ingested in a few batches instead of file by file. Changes to
+directories (a subtree moved or deleted) are reconciled with an incremental
+scan of the folder. Periodic full scans remain as a safety net for events
+the file system does not deliver.
+"""
+
+import os
+import time
+import logging
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from ..image_processing.image_ingest import SUPPORTED_EXTENSIONS
+
+logger = logging.getLogger("StarImageBrowse.scanner.folder_watcher")
+
+# Seconds a folder must be quiet before its changes are applied
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+
+# Seconds after which changes are applied even if events keep coming
+MAX_DELAY_SECONDS = 10.0
+
+# Seconds between checks for folders added, removed or disabled
+FOLDER_REFRESH_SECONDS = 60
+
+
+class FolderWatcherSignals(QObject):
+    """Signals for the folder watcher."""
+    changes_applied = pyqtSignal(int, dict)  # (folder_id, results)
+    watch_error = pyqtSignal(str, str)  # (folder_path, error_message)
+
+
+class PendingChanges:
+    """Changes collected for one folder since they were last applied."""
+
+    def __init__(self):
+        self.changed = set()
+        self.deleted = set()
+        self.rescan = False
+        self.first_event = time.monotonic()
+        self.last_event = self.first_event
+
+
+class _FolderEventHandler(FileSystemEventHandler):
+    """Forwards the events of one monitored folder to the watcher."""
+
+    def __init__(self, watcher, folder_id):
+        """Initialize the handler.
+
+        Args:
+            watcher (FolderWatcher): Watcher collecting the changes
+            folder_id (int): Folder the events belong to
+        """
+        super().__init__()
+        self.watcher = watcher
+        self.folder_id = folder_id
+
+    def on_created(self, event):
+        if event.is_directory:
+            # Files in a directory moved or copied in may not get events of their own
+            self.watcher.note_rescan(self.folder_id, event.src_path)
+        else:
+            self.watcher.note_changed(self.folder_id, event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.note_changed(self.folder_id, event.src_path)
+
+    def on_closed(self, event):
+        # Sent on Linux once a file written to is closed
+        self.watcher.note_changed(self.folder_id, event.src_path)
+
+    def on_deleted(self, event):
+        if event.is_directory:
+            self.watcher.note_rescan(self.folder_id, event.src_path)
+        else:
+            self.watcher.note_deleted(self.folder_id, event.src_path)
+
+    def on_moved(self, event):
+        if event.is_directory:
+            self.watcher.note_rescan(self.folder_id, event.src_path)
+        else:
+            self.watcher.note_deleted(self.folder_id, event.src_path)
+            self.watcher.note_changed(self.folder_id, event.dest_path)
+
+
+class FolderWatcher:
+    """Watches the monitored folders and ingests the files that change."""
+
+    def __init__(self, image_scanner, db_manager, debounce_seconds=DEFAULT_DEBOUNCE_SECONDS,
+                 max_delay_seconds=MAX_DELAY_SECONDS):
+        """Initialize the folder watcher.
+
+        Args:
+            image_scanner: Image scanner that processes the changed files
+            db_manager: Database manager instance
+            debounce_seconds (float): Quiet time before changes are applied
+            max_delay_seconds (float): Longest time changes wait during a burst
+        """
+        self.image_scanner = image_scanner
+        self.db_manager = db_manager
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.signals = FolderWatcherSignals()
+
+        self.condition = threading.Condition()
+        self.pending = {}  # folder_id -> PendingChanges
+        self.folders = {}  # folder_id -> (folder_path, watch)
+        self.observer = None
+        self.thread = None
+        self.running = False
+        self.last_refresh = 0
+
+        # Thumbnails written into a monitored folder must not be ingested as images
+        self.ignored_dirs = []
+        thumbnail_dir = getattr(getattr(image_scanner, "thumbnail_generator", None), "thumbnail_dir", None)
+        if thumbnail_dir:
+            self.ignored_dirs.append(os.path.normcase(os.path.abspath(thumbnail_dir)))
+
+    def start(self):
+        """Start watching the enabled folders."""
+        if self.running:
+            logger.warning("Folder watcher is already running")
+            return
+
+        self.running = True
+        self.observer = Observer()
+        self.refresh_folders()
+        self.observer.start()
+
+        self.thread = threading.Thread(target=self._run, name="FolderWatcher", daemon=True)
+        self.thread.start()
+        logger.info(f"Folder watcher started for {len(self.folders)} folders")
+
+    def stop(self):
+        """Stop watching and apply the changes still pending."""
+        if not self.running:
+            return
+
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+        self.observer.stop()
+        self.observer.join(timeout=2.0)
+        if self.thread:
+            self.thread.join(timeout=5.0)
+        self.folders = {}
+        logger.info("Folder watcher stopped")
+
+    def refresh_folders(self):
+        """Watch folders that were added and stop watching removed or disabled ones."""
+        if self.observer is None:
+            return
+
+        try:
+            folders = {folder["folder_id"]: folder["path"] for folder in self.db_manager.get_folders(enabled_only=True)}
+        except Exception as e:
+            logger.error(f"Error getting folders to watch: {e}")
+            return
+
+        for folder_id in list(self.folders):
+            folder_path, watch = self.folders[folder_id]
+            if folders.get(folder_id) != folder_path:
+                self.observer.unschedule(watch)
+                del self.folders[folder_id]
+                logger.debug(f"Stopped watching folder: {folder_path}")
+
+        for folder_id, folder_path in folders.items():
+            if folder_id in self.folders or not os.path.isdir(folder_path):
+                continue
+            try:
+                watch = self.observer.schedule(_FolderEventHandler(self, folder_id), folder_path, recursive=True)
+                self.folders[folder_id] = (folder_path, watch)
+                logger.debug(f"Watching folder: {folder_path}")
+            except OSError as e:
+                logger.error(f"Error watching folder {folder_path}: {e}")
+                self.signals.watch_error.emit(folder_path, str(e))
+
+        self.last_refresh = time.monotonic()
+
+    def _is_ignored(self, path):
+        """Check whether a path is in a directory the watcher ignores."""
+        path = os.path.normcase(os.path.abspath(path))
+        return any(path.startswith(ignored + os.sep) for ignored in self.ignored_dirs)
+
+    def _is_relevant(self, path):
+        """Check whether a file event may concern an image."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext and ext not in SUPPORTED_EXTENSIONS:
+            return False
+        return not self._is_ignored(path)
+
+    def _note(self, folder_id):
+        """Get the pending changes of a folder and record an event; called holding the condition."""
+        changes = self.pending.get(folder_id)
+        if changes is None:
+            changes = self.pending[folder_id] = PendingChanges()
+            self.condition.notify()
+        changes.last_event = time.monotonic()
+        return changes
+
+    def note_changed(self, folder_id, path):
+        """Record that a file was created or modified.
+
+        Args:
+            folder_id (int): Folder the file is in
+            path (str): Path of the file
+        """
+        if not self._is_relevant(path):
+            return
+        with self.condition:
+            changes = self._note(folder_id)
+            changes.changed.add(path)
+            changes.deleted.discard(path)
+
+    def note_deleted(self, folder_id, path):
+        """Record that a file was deleted or moved away.
+
+        Args:
+            folder_id (int): Folder the file was in
+            path (str): Path of the file
+        """
+        if not self._is_relevant(path):
+            return
+        with self.condition:
+            changes = self._note(folder_id)
+            changes.deleted.add(path)
+            changes.changed.discard(path)
+
+    def note_rescan(self, folder_id, path):
+        """Record that a directory changed and the folder needs an incremental scan.
+
+        Args:
+            folder_id (int): Folder to scan
+            path (str): Path of the directory that changed
+        """
+        if self._is_ignored(path):
+            return
+        with self.condition:
+            self._note(folder_id).rescan = True
+
+    def _take(self):
+        """Wait until the changes of a folder are due and take them.
+
+        Returns:
+            tuple: (folder_id, PendingChanges), or None when the watcher is
+                stopped with nothing pending or the folders should be refreshed
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                due = None
+                wait = FOLDER_REFRESH_SECONDS - (now - self.last_refresh)
+                for folder_id, changes in self.pending.items():
+                    ready_at = min(changes.last_event + self.debounce_seconds,
+                                   changes.first_event + self.max_delay_seconds)
+                    if not self.running or ready_at <= now:
+                        due = folder_id
+                        break
+                    wait = min(wait, ready_at - now)
+
+                if due is not None:
+                    return due, self.pending.pop(due)
+                if not self.running or wait <= 0:
+                    return None
+                self.condition.wait(wait)
+
+    def _run(self):
+        """Watcher thread main loop."""
+        while True:
+            taken = self._take()
+            if taken is None:
+                if not self.running:
+                    break
+                self.refresh_folders()
+                continue
+
+            folder_id, changes = taken
+            try:
+                self._apply(folder_id, changes)
+            except Exception as e:
+                logger.error(f"Error applying changes in folder {folder_id}: {e}")
+
+    def _apply(self, folder_id, changes):
+        """Bring the database up to date with the changes of one folder.
+
+        Args:
+            folder_id (int): Folder the changes are in
+            changes (PendingChanges): Changes to apply
+        """
+        folder = self.folders.get(folder_id)
+        if folder is None:
+            return
+        folder_path = folder[0]
+
+        if changes.rescan:
+            logger.info(f"Directories changed in {folder_path}, scanning for changes")
+            results = self.image_scanner.scan_folder(folder_id, folder_path, incremental=True)
+        else:
+            logger.info(f"Applying {len(changes.changed)} changed and {len(changes.deleted)} "
+                        f"deleted files in {folder_path}")
+            results = self.image_scanner.ingest_changes(folder_id, changes.changed, changes.deleted)
+
+        if "error" in results:
+            self.signals.watch_error.emit(folder_path, results["error"])
+        elif results.get("processed") or results.get("deleted"):
+            self.signals.changes_applied.emit(folder_id, results)
@@ -15,7 +15,9 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize
 
-from src.database.db_sharding import ShardManager, FolderBasedSharding, DateBasedSharding
+from src.database.db_sharding import (
+    ShardManager, FolderBasedSharding, DateBasedSharding, SizeBasedSharding, DEFAULT_TARGET_SHARD_IMAGES
+)
 from src.image_processing.format_optimizer import FormatOptimizer
 from src.memory.resource_manager import ResourceManager
 from src.optimize_phase4 import Phase4Optimizer
@@ -130,8 +132,10 @@ class AdvancedOptimizationDialog(QDialog):
         self.sharding_strategy_combo = QComboBox()
         self.sharding_strategy_combo.addItem("Folder-based Sharding", "folder")
         self.sharding_strategy_combo.addItem("Date-based Sharding", "date")
+        self.sharding_strategy_combo.addItem("Size-based Sharding", "size")
         self.sharding_strategy_combo.setToolTip(
-            "Folder-based: Split database by folders. Date-based: Split database by image date ranges."
+            "Folder-based: Split database by folders. Date-based: Split database by image date ranges. "
+            "Size-based: Keep every shard near a target size, moving folders out of shards that grow past it."
         )
         sharding_form.addRow("Sharding Strategy:", self.sharding_strategy_combo)
         
@@ -153,6 +157,16 @@ class AdvancedOptimizationDialog(QDialog):
         )
         sharding_form.addRow("Months per Shard:", self.months_per_shard_spin)
         
+        # Size-based settings
+        self.images_per_shard_spin = QSpinBox()
+        self.images_per_shard_spin.setRange(1000, 1000000)
+        self.images_per_shard_spin.setSingleStep(5000)
+        self.images_per_shard_spin.setValue(DEFAULT_TARGET_SHARD_IMAGES)
+        self.images_per_shard_spin.setToolTip(
+            "Number of images each shard database is kept near."
+        )
+        sharding_form.addRow("Target Images per Shard:", self.images_per_shard_spin)
+        
         sharding_layout.addLayout(sharding_form)
         
         # Migration button
@@ -340,6 +354,10 @@ class AdvancedOptimizationDialog(QDialog):
             self.config_manager.get("database", "shard_interval_months", 6)
         )
         
+        self.images_per_shard_spin.setValue(
+            self.config_manager.get("database", "shard_target_images", DEFAULT_TARGET_SHARD_IMAGES)
+        )
+        
         # Image format optimization
         self.enable_format_checkbox.setChecked(
             self.config_manager.get("thumbnails", "format_optimization", True)
@@ -394,6 +412,10 @@ class AdvancedOptimizationDialog(QDialog):
         is_date_based = strategy == "date"
         self.months_per_shard_spin.setVisible(is_date_based)
         self.months_per_shard_spin.setEnabled(is_enabled and is_date_based)
+        
+        is_size_based = strategy == "size"
+        self.images_per_shard_spin.setVisible(is_size_based)
+        self.images_per_shard_spin.setEnabled(is_enabled and is_size_based)
     
     def start_migration(self):
         """Start the database sharding migration process."""
@@ -419,6 +441,8 @@ class AdvancedOptimizationDialog(QDialog):
             if self.sharding_strategy_combo.currentData() == "date":
                 interval_months = self.months_per_shard_spin.value()
                 strategy = DateBasedSharding(interval_months=interval_months)
+            elif self.sharding_strategy_combo.currentData() == "size":
+                strategy = SizeBasedSharding(target_images=self.images_per_shard_spin.value())
             else:
                 max_folders = self.folders_per_shard_spin.value()
                 strategy = FolderBasedSharding(max_folders_per_shard=max_folders)
@@ -521,6 +545,9 @@ class AdvancedOptimizationDialog(QDialog):
         self.config_manager.set("database", "shard_interval_months", 
                                self.months_per_shard_spin.value())
         
+        self.config_manager.set("database", "shard_target_images", 
+                               self.images_per_shard_spin.value())
+        
         # Image format optimization
         self.config_manager.set("thumbnails", "format_optimization", 
                                self.enable_format_checkbox.isChecked())
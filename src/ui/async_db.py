@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Asynchronous database access for StarImageBrowse
+Runs DatabaseManager calls on a dedicated pool of database threads so the GUI
+thread keeps painting while a query waits for a writer. Each call returns a
+DatabaseFuture whose signals are delivered on the GUI thread.
+
+Calls are submitted on a channel naming what the result is for, such as the
+thumbnail grid. A new call on a channel cancels the one before it, so a
+folder clicked before the previous one has loaded never overwrites the grid
+with stale results.
+"""
+
+import logging
+import traceback
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+logger = logging.getLogger("StarImageBrowse.ui.async_db")
+
+# SQLite readers run concurrently in WAL mode, but writers are serialized, so
+# a couple of threads keep reads flowing without queueing behind each other
+DEFAULT_DB_THREADS = 2
+
+# Channels used by the UI; a newer request on a channel replaces the older one
+THUMBNAILS_CHANNEL = "thumbnails"
+METADATA_CHANNEL = "metadata"
+FOLDERS_CHANNEL = "folders"
+FOLDER_SELECTION_CHANNEL = "folder_selection"
+CATALOGS_CHANNEL = "catalogs"
+
+
+class DatabaseFuture(QObject):
+    """Result of a database call running on a database thread.
+
+    The signals are emitted on the thread the future was created on, which
+    is the GUI thread for calls submitted by widgets. Nothing is emitted for
+    a cancelled call. The future deletes itself once it has delivered the
+    outcome or been cancelled, so it must not be used after that.
+    """
+    result = pyqtSignal(object)
+    error = pyqtSignal(tuple)  # (message, traceback)
+    finished = pyqtSignal()
+
+    def __init__(self, channel=None, parent=None):
+        """Initialize the future.
+
+        Args:
+            channel (str, optional): Channel the call was submitted on
+            parent (QObject, optional): Parent object
+        """
+        super().__init__(parent)
+        self.channel = channel
+        self.cancelled = False
+        self.done = False
+
+    def cancel(self):
+        """Cancel the call; a call that already ran has its result dropped.
+
+        Returns:
+            bool: True if the future was still pending, False otherwise
+        """
+        if self.done or self.cancelled:
+            return False
+        self.cancelled = True
+        # A call still running delivers nothing once the future is gone
+        self.deleteLater()
+        return True
+
+    def then(self, on_result, on_error=None):
+        """Connect handlers for the outcome of the call.
+
+        Args:
+            on_result (callable): Called with the return value
+            on_error (callable, optional): Called with (message, traceback)
+
+        Returns:
+            DatabaseFuture: This future, for chaining
+        """
+        self.result.connect(on_result)
+        if on_error:
+            self.error.connect(on_error)
+        return self
+
+    @pyqtSlot(object)
+    def _deliver_result(self, value):
+        """Emit the result on the future's thread unless the call was cancelled."""
+        if self.cancelled:
+            return
+        self.done = True
+        self.result.emit(value)
+        self.finished.emit()
+        self.deleteLater()
+
+    @pyqtSlot(tuple)
+    def _deliver_error(self, error_info):
+        """Emit the error on the future's thread unless the call was cancelled."""
+        if self.cancelled:
+            return
+        self.done = True
+        self.error.emit(error_info)
+        self.finished.emit()
+        self.deleteLater()
+
+
+class DatabaseCallSignals(QObject):
+    """Signals emitted from the database thread running a call."""
+    result = pyqtSignal(object)
+    error = pyqtSignal(tuple)
+
+
+class DatabaseCall(QRunnable):
+    """Runs one database call for a DatabaseFuture."""
+
+    def __init__(self, future, fn, args, kwargs):
+        """Initialize the call.
+
+        Args:
+            future (DatabaseFuture): Future to deliver the outcome to
+            fn (callable): Function to run
+            args (tuple): Positional arguments for fn
+            kwargs (dict): Keyword arguments for fn
+        """
+        super().__init__()
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+        # The signals object lives on the future's thread, so the connections
+        # to the future are queued and its slots run there
+        self.signals = DatabaseCallSignals()
+        self.signals.result.connect(future._deliver_result)
+        self.signals.error.connect(future._deliver_error)
+
+    @pyqtSlot()
+    def run(self):
+        """Run the call unless it was cancelled while queued."""
+        if self.future.cancelled:
+            return
+
+        try:
+            value = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            error_info = (str(e), traceback.format_exc())
+            logger.error(f"Error in database call: {error_info[1]}")
+            self.signals.error.emit(error_info)
+        else:
+            self.signals.result.emit(value)
+
+
+class AsyncDatabase(QObject):
+    """Runs DatabaseManager calls off the GUI thread."""
+
+    def __init__(self, db_manager, max_threads=DEFAULT_DB_THREADS, parent=None):
+        """Initialize the asynchronous database facade.
+
+        Args:
+            db_manager: Database manager instance
+            max_threads (int): Number of database threads
+            parent (QObject, optional): Parent object
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+
+        # A pool of its own, so database calls never wait behind thumbnail
+        # loading or AI processing in the shared pools
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_threads)
+
+        # Channel -> (future, call) of the latest request on that channel
+        self.pending = {}
+        # Calls without a channel are kept here until they finish
+        self.unchanneled = set()
+
+    def submit(self, channel, fn, *args, **kwargs):
+        """Run a function on a database thread.
+
+        Args:
+            channel (str): Channel of the request; a pending request on the
+                same channel is cancelled. None never cancels anything.
+            fn (callable): Function to run, typically doing database queries
+            *args: Arguments to pass to the function
+            **kwargs: Keywords to pass to the function
+
+        Returns:
+            DatabaseFuture: Future delivering the return value of fn
+        """
+        if channel is not None:
+            self.cancel(channel)
+
+        future = DatabaseFuture(channel, self)
+        call = DatabaseCall(future, fn, args, kwargs)
+        call.setAutoDelete(False)  # Kept alive by the references below
+
+        if channel is not None:
+            self.pending[channel] = (future, call)
+        else:
+            self.unchanneled.add((future, call))
+        future.finished.connect(lambda: self._forget(future, call))
+
+        self.thread_pool.start(call)
+        return future
+
+    def call(self, channel, method_name, *args, **kwargs):
+        """Run a DatabaseManager method on a database thread.
+
+        Args:
+            channel (str): Channel of the request, see submit()
+            method_name (str): Name of the DatabaseManager method
+            *args: Arguments to pass to the method
+            **kwargs: Keywords to pass to the method
+
+        Returns:
+            DatabaseFuture: Future delivering the return value of the method
+        """
+        return self.submit(channel, getattr(self.db_manager, method_name), *args, **kwargs)
+
+    def cancel(self, channel):
+        """Cancel the pending request on a channel.
+
+        A request still queued is taken off the pool; one already running
+        finishes on its thread, but its result is dropped.
+
+        Args:
+            channel (str): Channel to cancel
+
+        Returns:
+            bool: True if a pending request was cancelled, False otherwise
+        """
+        entry = self.pending.pop(channel, None)
+        if entry is None:
+            return False
+
+        future, call = entry
+        if not future.cancel():
+            return False
+
+        self.thread_pool.tryTake(call)
+        logger.debug(f"Cancelled stale database request on channel: {channel}")
+        return True
+
+    def cancel_all(self):
+        """Cancel every pending request.
+
+        Returns:
+            int: Number of requests cancelled
+        """
+        count = 0
+        for channel in list(self.pending.keys()):
+            if self.cancel(channel):
+                count += 1
+        for future, call in list(self.unchanneled):
+            if future.cancel():
+                self.thread_pool.tryTake(call)
+                count += 1
+        self.unchanneled.clear()
+        return count
+
+    def shutdown(self, timeout_ms=5000):
+        """Cancel pending requests and wait for running ones to finish.
+
+        Args:
+            timeout_ms (int): How long to wait for running calls
+
+        Returns:
+            bool: True if every call finished, False on timeout
+        """
+        self.cancel_all()
+        return self.thread_pool.waitForDone(timeout_ms)
+
+    def _forget(self, future, call):
+        """Drop the references to a finished request."""
+        if self.pending.get(future.channel, (None, None))[0] is future:
+            del self.pending[future.channel]
+        self.unchanneled.discard((future, call))
+
+
+# One facade per database manager, shared by every widget using it
+_async_databases = {}
+
+
+def get_async_database(db_manager):
+    """Get the shared asynchronous facade for a database manager.
+
+    Args:
+        db_manager: Database manager instance
+
+    Returns:
+        AsyncDatabase: The facade, created on first use
+    """
+    key = id(db_manager)
+    async_db = _async_databases.get(key)
+    if async_db is None or async_db.db_manager is not db_manager:
+        async_db = AsyncDatabase(db_manager)
+        _async_databases[key] = async_db
+    return async_db
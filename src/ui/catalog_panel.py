@@ -15,6 +15,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QIcon, QAction
 from PyQt6.QtCore import Qt, pyqtSignal
 
+from .async_db import get_async_database, CATALOGS_CHANNEL
+
 logger = logging.getLogger("StarImageBrowse.ui.catalog_panel")
 
 class CatalogPanel(QWidget):
@@ -50,6 +52,7 @@ class CatalogPanel(QWidget):
         super().__init__(parent)
         
         self.db_manager = db_manager
+        self.async_db = get_async_database(db_manager)
         
         # Try to get language manager from parent window
         self.language_manager = None
@@ -137,14 +140,11 @@ class CatalogPanel(QWidget):
             catalog_id = self.db_manager.create_catalog(name)
             
             if catalog_id:
-                # Refresh the catalog list
-                self.refresh_catalogs()
+                # Refresh the catalog list and select the new catalog
+                self.refresh_catalogs(select_catalog_id=catalog_id)
                 
                 # Emit signal that a catalog was added
                 self.catalog_added.emit(catalog_id, name)
-                
-                # Select the new catalog
-                self.select_catalog_by_id(catalog_id)
             else:
                 QMessageBox.critical(
                     self, 
@@ -153,19 +153,40 @@ class CatalogPanel(QWidget):
                     QMessageBox.StandardButton.Ok
                 )
         
-    def refresh_catalogs(self):
-        """Refresh the catalog list from the database."""
-        self.catalog_tree.clear()
+    def refresh_catalogs(self, select_catalog_id=None):
+        """Refresh the catalog list from the database.
+        
+        The catalogs are loaded off the GUI thread; the list is rebuilt when
+        they arrive.
+        
+        Args:
+            select_catalog_id (int, optional): Catalog to select once loaded,
+                instead of the first one
+        """
+        def load_catalogs():
+            # Get all catalogs and their image counts
+            return self.db_manager.get_catalogs(), self.db_manager.get_image_counts()["catalogs"]
+        
+        self.async_db.submit(CATALOGS_CHANNEL, load_catalogs).then(
+            lambda loaded: self.show_catalogs(*loaded, select_catalog_id=select_catalog_id)
+        )
+    
+    def show_catalogs(self, catalogs, catalog_counts, select_catalog_id=None):
+        """Rebuild the catalog list.
         
-        # Get all catalogs
-        catalogs = self.db_manager.get_catalogs()
+        Args:
+            catalogs (list): Catalogs from the database
+            catalog_counts (dict): Image count of each catalog by ID
+            select_catalog_id (int, optional): Catalog to select instead of the first one
+        """
+        self.catalog_tree.clear()
         
         # Add each catalog to the tree
         for catalog in catalogs:
             catalog_id = catalog["catalog_id"]
             
             # Get image count for this catalog
-            image_count = self.db_manager.get_image_count_for_catalog(catalog_id)
+            image_count = catalog_counts.get(catalog_id, 0)
             
             # Format the display text with image count
             display_text = f"{catalog['name']} ({image_count})"
@@ -175,6 +196,10 @@ class CatalogPanel(QWidget):
             catalog_item.setToolTip(0, f"{catalog['name']} - {image_count} images")
             self.catalog_tree.addTopLevelItem(catalog_item)
         
+        if select_catalog_id is not None:
+            self.select_catalog_by_id(select_catalog_id)
+            return
+        
         # Automatically select the first catalog if available
         if self.catalog_tree.topLevelItemCount() > 0:
             self.catalog_tree.setCurrentItem(self.catalog_tree.topLevelItem(0))
@@ -263,11 +288,8 @@ class CatalogPanel(QWidget):
                 # Delete the old catalog
                 self.db_manager.delete_catalog(catalog_id)
                 
-                # Refresh the catalog list
-                self.refresh_catalogs()
-                
-                # Select the new catalog
-                self.select_catalog_by_id(new_catalog_id)
+                # Refresh the catalog list and select the new catalog
+                self.refresh_catalogs(select_catalog_id=new_catalog_id)
             else:
                 QMessageBox.critical(
                     self, 
@@ -5,17 +5,17 @@ Database maintenance dialog for StarImageBrowse
 Provides a single interface for all database maintenance and upgrade tasks.
 """
 
-import os
 import logging
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QProgressBar, QMessageBox, QDialogButtonBox, QGroupBox,
-    QCheckBox, QFrame, QScrollArea, QWidget
+    QCheckBox, QFrame, QScrollArea, QWidget, QTextEdit
 )
-from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot, QThread
+from PyQt6.QtCore import pyqtSignal, pyqtSlot, QThread
 
 from src.utils.image_dimensions_updater import ImageDimensionsUpdater
 from src.database.db_upgrade import upgrade_database_schema
+from src.database.db_fts import create_fts_schema, rebuild_fts_index
 
 logger = logging.getLogger("StarImageBrowse.ui.database_maintenance_dialog")
 
@@ -118,12 +118,6 @@ class DatabaseMaintenanceDialog(QDialog):
         self.info_label = QLabel("")
         self.info_label.setWordWrap(True)
         main_layout.addWidget(self.info_label)
-            "This tool performs comprehensive database maintenance to ensure optimal performance "
-            "and compatibility with the latest features. Select the tasks you want to perform:"
-        )
-        info_label = QLabel(info_text)
-        info_label.setWordWrap(True)
-        main_layout.addWidget(info_label)
         
         # Task selection area
         self.task_area = QScrollArea()
@@ -195,6 +189,14 @@ class DatabaseMaintenanceDialog(QDialog):
         
         main_layout.addWidget(progress_group)
         
+        # Query statistics
+        stats_layout = QHBoxLayout()
+        stats_layout.addStretch(1)
+        self.query_stats_button = QPushButton("")
+        self.query_stats_button.clicked.connect(self.show_query_stats)
+        stats_layout.addWidget(self.query_stats_button)
+        main_layout.addLayout(stats_layout)
+        
         # Buttons
         button_box = QDialogButtonBox(
             QDialogButtonBox.StandardButton.Ok | 
@@ -213,6 +215,19 @@ class DatabaseMaintenanceDialog(QDialog):
         self.start_button = button_box.button(QDialogButtonBox.StandardButton.Ok)
         self.close_button = button_box.button(QDialogButtonBox.StandardButton.Cancel)
     
+    def retranslateUi(self):
+        """Update all UI texts based on the current language manager."""
+        self.setWindowTitle(self.get_translation('dialog_title', 'Database Maintenance'))
+        self.info_label.setText(self.get_translation('info_text',
+            "This tool performs comprehensive database maintenance to ensure optimal performance "
+            "and compatibility with the latest features. Select the tasks you want to perform:"))
+        self.query_stats_button.setText(self.get_translation('query_stats_button', 'Query Statistics...'))
+    
+    def show_query_stats(self):
+        """Show the query statistics and the slow query log."""
+        dialog = QueryStatsDialog(self, self.db_manager, self.get_translation)
+        dialog.exec()
+    
     def start_maintenance(self):
         """Start the maintenance process."""
         # Disable start button and checkboxes during maintenance
@@ -327,7 +342,7 @@ class DatabaseMaintenanceDialog(QDialog):
             self.get_translation('maintenance_complete_message', 'Database maintenance completed with {success} tasks successful and {failed} failed.').format(
                 success=completed_count,
                 failed=failed_count
-            ),
+            ) + (f"\n\n{details}" if details else ""),
             QMessageBox.StandardButton.Ok
         )
     
@@ -354,6 +369,69 @@ class DatabaseMaintenanceDialog(QDialog):
         )
 
 
+class QueryStatsDialog(QDialog):
+    """Shows the busiest database statements and the slow query log."""
+    
+    def __init__(self, parent, db_manager, get_translation):
+        """Initialize the dialog.
+        
+        Args:
+            parent: Parent widget
+            db_manager: Database manager instance
+            get_translation (callable): Translation lookup of the parent dialog
+        """
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.get_translation = get_translation
+        
+        self.setWindowTitle(self.get_translation('query_stats_title', 'Query Statistics'))
+        self.setMinimumWidth(800)
+        self.setMinimumHeight(500)
+        
+        layout = QVBoxLayout(self)
+        
+        self.report_text = QTextEdit()
+        self.report_text.setReadOnly(True)
+        self.report_text.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        self.report_text.setStyleSheet("font-family: monospace;")
+        layout.addWidget(self.report_text)
+        
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton(self.get_translation('query_stats_refresh', 'Refresh'))
+        refresh_button.clicked.connect(self.refresh)
+        button_layout.addWidget(refresh_button)
+        
+        reset_button = QPushButton(self.get_translation('query_stats_reset', 'Reset'))
+        reset_button.clicked.connect(self.reset)
+        button_layout.addWidget(reset_button)
+        
+        advice_button = QPushButton(self.get_translation('query_stats_index_advice', 'Index Advice'))
+        advice_button.clicked.connect(self.show_index_advice)
+        button_layout.addWidget(advice_button)
+        
+        button_layout.addStretch(1)
+        
+        close_button = QPushButton(self.get_translation('close', 'Close'))
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        
+        self.refresh()
+    
+    def refresh(self):
+        """Show the current statistics."""
+        self.report_text.setPlainText(self.db_manager.get_query_report())
+    
+    def reset(self):
+        """Clear the statistics and show the empty report."""
+        self.db_manager.reset_query_stats()
+        self.refresh()
+    
+    def show_index_advice(self):
+        """Show the index advisor's report for the recorded statements."""
+        self.report_text.setPlainText(self.db_manager.get_index_report())
+
+
 class MaintenanceThread(QThread):
     """Thread for performing database maintenance tasks."""
     
@@ -638,125 +716,21 @@ class MaintenanceThread(QThread):
                     
                     # Create fresh connection
                     conn = sqlite3.connect(self.db_manager.db_path)
-                    cursor = conn.cursor()
-                    
-                    # Get count of images to process
-                    image_count = cursor.execute(
-                        "SELECT COUNT(*) FROM images"
-                    ).fetchone()[0]
-                    
-                    # Set up batch parameters
-                    batch_size = 5000
-                    total_processed = 0
-                    error_count = 0
-                    
-                    # Always drop and recreate the FTS table to avoid structure issues
                     try:
-                        # Drop existing table if it exists
-                        cursor.execute("DROP TABLE IF EXISTS image_fts")
-                        conn.commit()
-                        logger.info("Dropped existing FTS table")
-                    except Exception as drop_error:
-                        logger.warning(f"Error dropping FTS table: {drop_error}")
-                        # Continue anyway - we'll create a new one
-                    
-                    # Create fresh FTS table
-                    try:
-                        cursor.execute("""
-                            CREATE VIRTUAL TABLE image_fts USING fts5(
-                                image_id UNINDEXED,
-                                filename,
-                                user_description,
-                                ai_description,
-                                full_path UNINDEXED,
-                                content='images',
-                                content_rowid='image_id'
-                            )
-                        """)
-                        conn.commit()
-                        logger.info("Created new FTS table with proper schema")
-                    except Exception as create_error:
-                        # Try without content/content_rowid if that failed
-                        logger.warning(f"Error creating external content FTS table: {create_error}")
-                        try:
-                            cursor.execute("""
-                                CREATE VIRTUAL TABLE image_fts USING fts5(
-                                    image_id,
-                                    filename,
-                                    user_description,
-                                    ai_description,
-                                    full_path
-                                )
-                            """)
-                            conn.commit()
-                            logger.info("Created new standalone FTS table")
-                        except Exception as alt_create_error:
-                            raise Exception(f"Failed to create FTS table: {alt_create_error}")
-                    
-                    # Process in batches
-                    while total_processed < image_count:
-                        try:
-                            # Get batch of images
-                            cursor.execute("""
-                                SELECT image_id, ai_description, user_description, filename
-                                FROM images
-                                ORDER BY image_id
-                                LIMIT ? OFFSET ?
-                            """, (batch_size, total_processed))
-                            
-                            # Fetch all rows
-                            batch = cursor.fetchall()
-                            if not batch:
-                                break
-                            
-                            # Insert batch into FTS
-                            cursor.executemany("""
-                                INSERT INTO image_fts(image_id, ai_description, user_description, filename)
-                                VALUES (?, ?, ?, ?)
-                            """, batch)
-                            
-                            # Commit each batch
-                            conn.commit()
-                            
-                            # Update progress
-                            total_processed += len(batch)
-                            self.update_progress.emit(
-                                completed_tasks, total_tasks,
-                                f"Rebuilding FTS index: {total_processed}/{image_count} images processed"
-                            )
-                                
-                        except Exception as batch_error:
-                            logger.error(f"Error processing FTS batch at offset {total_processed}: {batch_error}")
-                            error_count += 1
-                            total_processed += batch_size  # Skip problematic batch
-                            
-                            if error_count >= 3:
-                                raise Exception(f"Too many errors ({error_count}) during FTS rebuild")
-                        
-                        status_msg = f"Successfully rebuilt FTS index with {total_processed} images"
-                        if error_count > 0:
-                            status_msg += f" ({error_count} errors encountered)"
-                            
-                        results["fts_rebuild"] = {"success": True, "message": status_msg}
-                        
-                        self.update_task_status.emit(
-                            "fts_rebuild",
-                            True,
-                            status_msg
-                        )
-                    else:
-                        # Handle case where table doesn't exist
-                        success, message = upgrade_database_schema(self.db_manager.db_path)
-                        status_msg = "Created and populated FTS table"
-                        
-                        results["fts_rebuild"] = {"success": True, "message": status_msg}
-                        self.update_task_status.emit(
-                            "fts_rebuild",
-                            True,
-                            status_msg
-                        )
+                        # Recreate the FTS table and triggers, then re-index every image in one pass
+                        create_fts_schema(conn)
+                        rebuild_fts_index(conn)
+                        image_count = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+                    finally:
+                        conn.close()
                     
-                    conn.close()
+                    status_msg = f"Successfully rebuilt FTS index with {image_count} images"
+                    results["fts_rebuild"] = {"success": True, "message": status_msg}
+                    self.update_task_status.emit(
+                        "fts_rebuild",
+                        True,
+                        status_msg
+                    )
                     
                 except Exception as e:
                     logger.error(f"Error rebuilding FTS: {e}")
@@ -16,12 +16,19 @@ from PyQt6.QtGui import QIcon, QAction, QPixmap
 from PyQt6.QtCore import Qt, pyqtSignal, QSize
 import webbrowser
 
+from .async_db import get_async_database, FOLDERS_CHANNEL, FOLDER_SELECTION_CHANNEL
+
 logger = logging.getLogger("StarImageBrowse.ui.folder_panel")
 
+# Item data role holding the directory_id of subdirectory items; their
+# UserRole data is the folder they belong to
+DIRECTORY_ROLE = Qt.ItemDataRole.UserRole + 1
+
 class FolderPanel(QWidget):
     """Panel for displaying and managing monitored folders."""
     
     folder_selected = pyqtSignal(int, str)  # Signal emitted when a folder is selected (folder_id, path)
+    directory_selected = pyqtSignal(int, int, str)  # Signal emitted when a subdirectory is selected (folder_id, directory_id, path)
     folder_added = pyqtSignal(int, str)  # Signal emitted when a folder is added (folder_id, path)
     folder_removed = pyqtSignal(int)  # Signal emitted when a folder is removed (folder_id)
     add_folder_requested = pyqtSignal()  # Signal to request adding a new folder
@@ -51,6 +58,7 @@ class FolderPanel(QWidget):
         super().__init__(parent)
         
         self.db_manager = db_manager
+        self.async_db = get_async_database(db_manager)
         
         # Try to get language manager from parent window
         self.language_manager = None
@@ -155,6 +163,7 @@ class FolderPanel(QWidget):
         self.folder_tree.setHeaderHidden(True)
         self.folder_tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.folder_tree.itemClicked.connect(self.on_folder_clicked)
+        self.folder_tree.itemExpanded.connect(self.on_item_expanded)
         self.folder_tree.customContextMenuRequested.connect(self.on_context_menu)
         layout.addWidget(self.folder_tree)
     
@@ -165,11 +174,29 @@ class FolderPanel(QWidget):
         self.add_folder_requested.emit()
         
     def refresh_folders(self):
-        """Refresh the folder list from the database."""
+        """Refresh the folder list from the database.
+        
+        The folders are loaded off the GUI thread; the tree is rebuilt when
+        they arrive.
+        """
+        def load_folders():
+            # Get all image counts in one query
+            return self.db_manager.get_image_counts(), self.db_manager.get_folders(enabled_only=False)
+        
+        self.async_db.submit(FOLDERS_CHANNEL, load_folders).then(
+            lambda loaded: self.show_folders(*loaded)
+        )
+    
+    def show_folders(self, counts, folders):
+        """Rebuild the folder tree.
+        
+        Args:
+            counts (dict): Image counts as returned by get_image_counts()
+            folders (list): Folders from the database
+        """
         self.folder_tree.clear()
         
-        # Get total image count
-        total_image_count = self.db_manager.get_image_count()
+        total_image_count = counts["library"]
         
         # Add "All Images" option at the top
         all_images_item = QTreeWidgetItem([f"All Images ({total_image_count})"])
@@ -177,8 +204,6 @@ class FolderPanel(QWidget):
         all_images_item.setToolTip(0, f"View all images across all folders - {total_image_count} total images")
         self.folder_tree.addTopLevelItem(all_images_item)
         
-        folders = self.db_manager.get_folders(enabled_only=False)
-        
         if not folders:
             # No folders added yet
             no_folders_item = QTreeWidgetItem(["No folders added"])
@@ -193,7 +218,7 @@ class FolderPanel(QWidget):
             enabled = folder["enabled"]
             
             # Get image count for this folder
-            image_count = self.db_manager.get_image_count_for_folder(folder_id)
+            image_count = counts["folders"].get(folder_id, 0)
             
             # Create folder item with image count
             item = QTreeWidgetItem([f"{os.path.basename(path)} ({image_count})"])
@@ -205,10 +230,88 @@ class FolderPanel(QWidget):
                 item.setForeground(0, Qt.GlobalColor.gray)
                 item.setToolTip(0, f"{path} (disabled) - {image_count} images")
             
+            # Subdirectories are loaded when the folder is expanded
+            if image_count:
+                self._add_placeholder(item)
+            
             self.folder_tree.addTopLevelItem(item)
+    
+    def _add_placeholder(self, item):
+        """Give an item an expander before its subdirectories are loaded.
+        
+        Args:
+            item: Folder or directory tree item
+        """
+        placeholder = QTreeWidgetItem([self.get_translation('folder_panel', 'loading', 'Loading...')])
+        placeholder.setFlags(Qt.ItemFlag.NoItemFlags)
+        item.addChild(placeholder)
+    
+    def on_item_expanded(self, item):
+        """Load the subdirectories of a folder or directory the first time it is expanded.
+        
+        The subdirectories are loaded off the GUI thread; the placeholder
+        stays until they arrive.
         
-        # Expand all items
-        self.folder_tree.expandAll()
+        Args:
+            item: The expanded tree item
+        """
+        if item.childCount() != 1 or item.child(0).data(0, Qt.ItemDataRole.UserRole) is not None:
+            return  # Already loaded
+        
+        folder_id = item.data(0, Qt.ItemDataRole.UserRole)
+        directory_id = item.data(0, DIRECTORY_ROLE)
+        
+        # Each item loads on its own channel so expanding one item never
+        # cancels another item's load or a pending refresh of the tree
+        channel = f"{FOLDERS_CHANNEL}:{folder_id}:{directory_id}"
+        self.async_db.submit(
+            channel, self.db_manager.get_subdirectories, folder_id, directory_id
+        ).then(lambda subdirectories: self.show_subdirectories(folder_id, directory_id, subdirectories))
+    
+    def show_subdirectories(self, folder_id, directory_id, subdirectories):
+        """Replace the placeholder of an expanded item with its subdirectories.
+        
+        Args:
+            folder_id (int): Folder the expanded item belongs to
+            directory_id (int): Directory of the expanded item, None for a folder
+            subdirectories (list): Subdirectories as returned by get_subdirectories()
+        """
+        # The tree may have been rebuilt while the subdirectories loaded
+        item = self._find_item(folder_id, directory_id)
+        if item is None or item.childCount() != 1 or item.child(0).data(0, Qt.ItemDataRole.UserRole) is not None:
+            return
+        
+        item.takeChildren()
+        
+        # Counts are computed for this level only
+        for directory in subdirectories:
+            child = QTreeWidgetItem([f"{directory['name']} ({directory['image_count']})"])
+            child.setData(0, Qt.ItemDataRole.UserRole, folder_id)
+            child.setData(0, DIRECTORY_ROLE, directory['directory_id'])
+            child.setToolTip(0, f"{directory['path']} - {directory['image_count']} images")
+            if directory['has_children']:
+                self._add_placeholder(child)
+            item.addChild(child)
+    
+    def _find_item(self, folder_id, directory_id):
+        """Find the loaded tree item of a folder or directory.
+        
+        Args:
+            folder_id (int): Folder of the item
+            directory_id (int): Directory of the item, None for the folder itself
+            
+        Returns:
+            QTreeWidgetItem: The item, or None if it is not in the tree
+        """
+        items = [self.folder_tree.topLevelItem(i) for i in range(self.folder_tree.topLevelItemCount())]
+        while items:
+            item = items.pop()
+            if item.data(0, Qt.ItemDataRole.UserRole) != folder_id:
+                continue
+            if item.data(0, DIRECTORY_ROLE) == directory_id:
+                return item
+            items.extend(item.child(i) for i in range(item.childCount()))
+        return None
     
     def on_folder_clicked(self, item, column):
         """Handle folder item click.
@@ -226,13 +329,41 @@ class FolderPanel(QWidget):
                 self.folder_selected.emit(-1, "All Images")
                 return
                 
+            # Subdirectory of a folder
+            directory_id = item.data(0, DIRECTORY_ROLE)
+            if directory_id is not None:
+                self.async_db.submit(
+                    FOLDER_SELECTION_CHANNEL, self.db_manager.get_directory, directory_id
+                ).then(lambda directory: self._emit_directory_selected(folder_id, directory))
+                return
+                
             # Get folder path
-            folders = self.db_manager.get_folders(enabled_only=False)
-            folder_info = next((f for f in folders if f["folder_id"] == folder_id), None)
-            
-            if folder_info:
-                # Emit folder selected signal
-                self.folder_selected.emit(folder_id, folder_info["path"])
+            self.async_db.submit(
+                FOLDER_SELECTION_CHANNEL, self.db_manager.get_folders, enabled_only=False
+            ).then(lambda folders: self._emit_folder_selected(folder_id, folders))
+    
+    def _emit_directory_selected(self, folder_id, directory):
+        """Emit directory_selected once the clicked directory has loaded.
+        
+        Args:
+            folder_id (int): Folder the directory belongs to
+            directory (dict): Directory from the database, None if it is gone
+        """
+        if directory:
+            self.directory_selected.emit(folder_id, directory["directory_id"], directory["path"])
+    
+    def _emit_folder_selected(self, folder_id, folders):
+        """Emit folder_selected once the folders have loaded.
+        
+        Args:
+            folder_id (int): Clicked folder
+            folders (list): Folders from the database
+        """
+        folder_info = next((f for f in folders if f["folder_id"] == folder_id), None)
+        
+        if folder_info:
+            # Emit folder selected signal
+            self.folder_selected.emit(folder_id, folder_info["path"])
     
     def on_context_menu(self, position):
         """Show context menu for folder items.
@@ -247,7 +378,8 @@ class FolderPanel(QWidget):
         
         folder_id = item.data(0, Qt.ItemDataRole.UserRole)
         
-        if folder_id is None:
+        # Folder actions apply to the monitored folders, not their subdirectories
+        if folder_id is None or item.data(0, DIRECTORY_ROLE) is not None:
             return
         
         # Get folder info
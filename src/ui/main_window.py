@@ -17,7 +17,7 @@ from PyQt6.QtWidgets import (
     QLabel, QLineEdit, QPushButton, QToolBar, QStatusBar,
     QFileDialog, QMenu, QMessageBox, QApplication, QDialog,
     QInputDialog, QListView, QTreeView, QAbstractItemView,
-    QListWidget, QListWidgetItem, QDialogButtonBox, QProgressDialog
+    QListWidget, QListWidgetItem, QDialogButtonBox, QProgressDialog, QCheckBox
 )
 from PyQt6.QtGui import QAction, QIcon, QPixmap
 from PyQt6.QtCore import Qt, QSize, QDir, pyqtSignal, QThreadPool, QTimer
@@ -37,8 +37,10 @@ from .date_search_worker import DateSearchWorker
 
 from src.image_processing.thumbnail_generator import ThumbnailGenerator
 from src.image_processing.image_scanner import ImageScanner
+from src.image_processing.fingerprint import DEFAULT_HASH_MODE, algorithm_for_mode
 from src.ai.image_processor import AIImageProcessor
 from src.scanner.background_scanner import BackgroundScanner
+from src.scanner.folder_watcher import FolderWatcher
 from src.config.config_manager import ConfigManager
 from src.database.db_optimization_utils import check_and_optimize_if_needed
 from src.config.theme_manager import ThemeManager
@@ -51,7 +53,6 @@ from src.database.performance_optimizer import DatabasePerformanceOptimizer
 from src.database.enhanced_search import EnhancedSearch
 from src.ui.main_window_search_integration import integrate_enhanced_search
 from src.ui.main_window_language import apply_language_to_main_window, on_language_changed
-from src.database.db_upgrade import upgrade_database_schema
 
 logger = logging.getLogger("STARNODESImageManager.ui")
 
@@ -143,9 +144,6 @@ class MainWindow(QMainWindow):
         QApplication.processEvents()  # Process events to ensure UI is displayed
         self.check_database_optimization()
         
-        # Upgrade database schema if needed to support enhanced search
-        self.upgrade_database_for_enhanced_search()
-        
         # Make sure window is displayed properly
         self.ensure_window_visible()
         
@@ -237,7 +235,10 @@ class MainWindow(QMainWindow):
             self.image_scanner = ImageScanner(
                 db_manager=self.db_manager,
                 thumbnail_generator=self.thumbnail_generator,
-                ai_processor=self.ai_processor
+                ai_processor=self.ai_processor,
+                hash_algorithm=algorithm_for_mode(
+                    self.config_manager.get("scanner", "hash_algorithm", DEFAULT_HASH_MODE)
+                )
             )
             
             # Initialize background scanner
@@ -255,34 +256,21 @@ class MainWindow(QMainWindow):
             # Start the background scanner if enabled in settings
             if self.config_manager.get("scanning", "enable_background_scanning", False):
                 self.background_scanner.start()
+            
+            # Pick up changes in the monitored folders as they happen; the
+            # background scanner remains as a safety net for missed events
+            self.folder_watcher = FolderWatcher(self.image_scanner, self.db_manager)
+            self.folder_watcher.signals.changes_applied.connect(self._on_watched_changes_applied)
+            QApplication.instance().aboutToQuit.connect(self.folder_watcher.stop)
+            if self.config_manager.get("monitoring", "watch_folders", True):
+                self.folder_watcher.start()
         except Exception as e:
             logger.error(f"Error initializing image scanner: {e}")
             # Create placeholders to prevent attribute errors
             self.image_scanner = None
             self.background_scanner = None
+            self.folder_watcher = None
     
-    def upgrade_database_for_enhanced_search(self):
-        """Upgrade the database schema to support enhanced search functionality."""
-        try:
-            # Show status in status bar
-            if hasattr(self, 'status_bar'):
-                self.status_bar.showMessage("Upgrading database schema for enhanced search...")
-            
-            # Upgrade the database schema
-            success, message = upgrade_database_schema(self.db_manager.db_path)
-            
-            if success:
-                logger.info(f"Database schema upgrade: {message}")
-                if hasattr(self, 'status_bar'):
-                    self.status_bar.showMessage(f"Database schema upgrade: {message}", 5000)
-            else:
-                logger.error(f"Database schema upgrade failed: {message}")
-                if hasattr(self, 'status_bar'):
-                    self.status_bar.showMessage(f"Database schema upgrade failed: {message}", 5000)
-        except Exception as e:
-            logger.error(f"Error upgrading database schema: {e}")
-            # Non-critical, so continue
-            
     def initialize_enhanced_search(self):
         """Initialize the enhanced search functionality."""
         try:
@@ -523,19 +511,17 @@ class MainWindow(QMainWindow):
                     conn.row_factory = sqlite3.Row
                     cursor = conn.cursor()
                     
-                    # Get all images with absolute thumbnail paths
-                    cursor.execute("SELECT image_id, thumbnail_path FROM images WHERE thumbnail_path IS NOT NULL")
-                    images = cursor.fetchall()
+                    # Stream the thumbnail paths in chunks instead of loading them all
+                    images = self.db_manager.iter_images(columns=("image_id", "thumbnail_path"))
                     
                     success_count = 0
                     unchanged_count = 0
                     error_count = 0
                     
-                    for image in images:
+                    for image_id, thumbnail_path in images:
+                        if thumbnail_path is None:
+                            continue
                         try:
-                            image_id = image['image_id']
-                            thumbnail_path = image['thumbnail_path']
-                            
                             # Skip if already relative (no directory path)
                             if thumbnail_path and not os.path.dirname(thumbnail_path):
                                 unchanged_count += 1
@@ -892,6 +878,7 @@ class MainWindow(QMainWindow):
         
         # Connect signals
         self.folder_panel.folder_selected.connect(self.on_folder_selected)
+        self.folder_panel.directory_selected.connect(self.on_directory_selected)
         self.folder_panel.folder_removed.connect(self.on_folder_removed)
         self.folder_panel.add_folder_requested.connect(self.on_add_folder)
         
@@ -1225,7 +1212,9 @@ class MainWindow(QMainWindow):
                             self.progress_dialog.update_progress(current, total)
                     
                     # Scan the folder using the existing image_scanner instance
-                    folder_result = self.image_scanner.scan_folder(folder_id, folder_path, folder_progress_callback)
+                    folder_result = self.image_scanner.scan_folder(
+                        folder_id, folder_path, folder_progress_callback, incremental=process_new_only
+                    )
                     
                     # Update totals
                     if folder_result:
@@ -1651,6 +1640,9 @@ class MainWindow(QMainWindow):
             
             # Update the image scanner to use the new AI processor
             self.image_scanner.ai_processor = self.ai_processor
+            self.image_scanner.hash_algorithm = algorithm_for_mode(
+                self.config_manager.get("scanner", "hash_algorithm", DEFAULT_HASH_MODE)
+            )
             
             # Update background scanner settings
             self.update_background_scanner_settings()
@@ -1706,6 +1698,23 @@ class MainWindow(QMainWindow):
         # Store the current folder ID for search context
         self.current_folder_id = folder_id
     
+    def on_directory_selected(self, folder_id, directory_id, directory_path):
+        """Handle selection of a subdirectory in the folder panel.
+        
+        Args:
+            folder_id (int): ID of the monitored folder containing the directory
+            directory_id (int): ID of the selected directory
+            directory_path (str): Path of the selected directory
+        """
+        # Update status bar
+        self.status_bar.showMessage(f"Selected folder: {directory_path}")
+        
+        # Show the images in the directory and its subdirectories
+        self.thumbnail_browser.set_directory(directory_id)
+        
+        # Searches scoped to the folder still cover the whole monitored folder
+        self.current_folder_id = folder_id
+    
     def on_folder_removed(self, folder_id):
         """Handle folder removal from the folder panel.
         
@@ -1874,10 +1883,22 @@ class MainWindow(QMainWindow):
             if not folders:
                 return []
             
-            # Use the optimized database query to get all images in one go
-            # This is much more efficient than loading from each folder separately
-            # With virtualized grid, we can safely load many more images at once
-            all_images = self.db_manager.get_all_images(limit=1000000)
+            total = self.db_manager.get_image_count()
+
+            # Walk the collection page by page with continuation tokens; each
+            # page resumes where the last one ended instead of re-skipping rows
+            all_images = []
+            page_token = None
+            while True:
+                images, page_token = self.db_manager.get_all_images_page(page_token, page_size=1000, grid=True)
+                all_images.extend(images)
+
+                if progress_callback:
+                    progress_callback(len(all_images), max(total, len(all_images)))
+
+                if page_token is None:
+                    break
+
             return all_images
             
         except Exception as e:
@@ -3658,10 +3679,33 @@ class MainWindow(QMainWindow):
         # Reset status bar
         self.status_bar.showMessage("Ready")
     
+    def _on_watched_changes_applied(self, folder_id, results):
+        """Handle changes the folder watcher applied to the database.
+        
+        Args:
+            folder_id (int): ID of the folder the changes were in
+            results (dict): Counts of processed and deleted images
+        """
+        logger.info(f"Folder watcher updated folder {folder_id}: {results.get('processed', 0)} added or changed, "
+                    f"{results.get('deleted', 0)} removed")
+        self._update_counts_after_background_scan()
+        
+        # The all images view is refreshed with the counts
+        if getattr(self, 'current_folder_id', None) == folder_id:
+            self.refresh_current_view()
+    
     def update_background_scanner_settings(self):
         """Update background scanner settings when configuration changes."""
         if hasattr(self, 'background_scanner'):
             self.background_scanner.update_settings()
+        
+        # Start or stop watching folders to match the setting
+        if getattr(self, 'folder_watcher', None):
+            if self.config_manager.get("monitoring", "watch_folders", True):
+                if not self.folder_watcher.running:
+                    self.folder_watcher.start()
+            else:
+                self.folder_watcher.stop()
             
     def on_empty_database(self):
         """Handle the Empty Database action.
@@ -3720,53 +3764,10 @@ class MainWindow(QMainWindow):
             try:
                 # Create an in-memory database
                 temp_conn = sqlite3.connect(':memory:')
-                temp_cursor = temp_conn.cursor()
-                
-                # Create empty tables with the same schema
-                temp_cursor.execute('''
-                CREATE TABLE IF NOT EXISTS folders (
-                    folder_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    path TEXT NOT NULL UNIQUE,
-                    enabled INTEGER DEFAULT 1,
-                    last_scan_time TEXT
-                )''')
-                
-                temp_cursor.execute('''
-                CREATE TABLE IF NOT EXISTS images (
-                    image_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    folder_id INTEGER,
-                    filename TEXT NOT NULL,
-                    full_path TEXT NOT NULL UNIQUE,
-                    thumbnail_path TEXT,
-                    ai_description TEXT,
-                    user_description TEXT,
-                    file_size INTEGER,
-                    file_hash TEXT,
-                    date_added TEXT,
-                    date_modified TEXT,
-                    width INTEGER,
-                    height INTEGER,
-                    image_format TEXT,
-                    FOREIGN KEY (folder_id) REFERENCES folders(folder_id)
-                )''')
-                
-                temp_cursor.execute('''
-                CREATE TABLE IF NOT EXISTS catalogs (
-                    catalog_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE,
-                    description TEXT,
-                    created_date TEXT
-                )''')
                 
-                temp_cursor.execute('''
-                CREATE TABLE IF NOT EXISTS catalog_images (
-                    catalog_id INTEGER,
-                    image_id INTEGER,
-                    added_date TEXT,
-                    PRIMARY KEY (catalog_id, image_id),
-                    FOREIGN KEY (catalog_id) REFERENCES catalogs(catalog_id),
-                    FOREIGN KEY (image_id) REFERENCES images(image_id)
-                )''')
+                # Create empty tables with the current schema
+                from src.database.db_migrations import create_schema
+                create_schema(temp_conn)
                 
                 # Disconnect from existing database
                 self.db_manager.disconnect()
@@ -3897,7 +3898,13 @@ class MainWindow(QMainWindow):
         )
         
         include_thumbnails_msg.setDefaultButton(QMessageBox.StandardButton.Yes)
+        
+        # VACUUM INTO writes a smaller copy without free pages, but reports no progress
+        compact_checkbox = QCheckBox("Compact the exported database")
+        include_thumbnails_msg.setCheckBox(compact_checkbox)
+        
         include_thumbnails = include_thumbnails_msg.exec() == QMessageBox.StandardButton.Yes
+        compact = compact_checkbox.isChecked()
         
         # Show file dialog to select export location
         file_path, _ = QFileDialog.getSaveFileName(
@@ -3922,20 +3929,30 @@ class MainWindow(QMainWindow):
         
         try:
             # Update progress
-            progress_dialog.update_progress(20, 100, "Preparing database for export...")
+            progress_dialog.update_progress(20, 100, "Copying database file...")
             QApplication.processEvents()
             
-            # Get database size
-            source_size = os.path.getsize(self.db_manager.db_path)
-            size_formatted = self._format_file_size(source_size)
+            # Copy the database on the backup thread; the scanner may keep writing
+            from concurrent.futures import wait
+            copy_progress = [0, 0]
             
-            # Update progress
-            progress_dialog.update_progress(40, 100, "Copying database file...")
-            QApplication.processEvents()
+            def on_copy_progress(copied, total):
+                copy_progress[0], copy_progress[1] = copied, total
             
-            # Copy the database file
-            import shutil
-            shutil.copy2(self.db_manager.db_path, file_path)
+            future = self.db_manager.export_database(file_path, compact=compact, progress_callback=on_copy_progress)
+            while not wait([future], timeout=0.05).done:
+                copied, total = copy_progress
+                if total:
+                    progress_dialog.update_progress(
+                        20 + int(copied / total * 40), 100,
+                        f"Copying database ({copied}/{total} pages)..."
+                    )
+                QApplication.processEvents()
+            
+            if not future.result():
+                raise Exception("The database could not be copied, see the log for details")
+            
+            size_formatted = self._format_file_size(os.path.getsize(file_path))
             
             # Export thumbnails if requested
             thumbnails_exported = False
@@ -4060,10 +4077,11 @@ class MainWindow(QMainWindow):
             if not os.path.exists(file_path):
                 raise Exception("Export file not found after export operation")
             
-            # Get exported file size
-            dest_size = os.path.getsize(file_path)
-            if dest_size != source_size:
-                raise Exception(f"Export file size mismatch: {dest_size} != {source_size}")
+            # Check the copy opens as a sound database
+            from src.database.db_health import run_integrity_check
+            ok, message = run_integrity_check(file_path)
+            if not ok:
+                raise Exception(f"Exported database failed its integrity check: {message}")
             
             # Update progress
             progress_dialog.update_progress(100, 100, "Export completed successfully")
@@ -4480,137 +4498,36 @@ class MainWindow(QMainWindow):
                 progress_dialog.update_progress(20, 100, f"Preparing to merge {folder_count} folders and {image_count} images...")
                 QApplication.processEvents()
                 
-                # Connect to both databases
-                source_conn = sqlite3.connect(file_path)
-                source_conn.row_factory = sqlite3.Row
-                source_cursor = source_conn.cursor()
-                
-                # Get existing folders from target database
-                existing_folders = {folder['path']: folder for folder in self.db_manager.get_folders(enabled_only=False)}
-                
-                # Import folders
-                progress_dialog.update_progress(30, 100, "Importing folders...")
-                QApplication.processEvents()
-                
-                added_folders = 0
-                folder_id_mapping = {}
-                
-                for row in source_cursor.execute("SELECT * FROM folders").fetchall():
-                    folder = dict(row)
-                    
-                    # Skip if folder already exists
-                    if folder['path'] in existing_folders:
-                        # Map the source folder_id to the existing folder_id for image import
-                        folder_id_mapping[folder['folder_id']] = existing_folders[folder['path']]['folder_id']
-                        continue
-                    
-                    # Add folder to target database
-                    try:
-                        new_folder_id = self.db_manager.add_folder(folder['path'])
-                        if new_folder_id:
-                            # Map the source folder_id to the new folder_id for image import
-                            folder_id_mapping[folder['folder_id']] = new_folder_id
-                            added_folders += 1
-                    except Exception as e:
-                        logger.error(f"Error importing folder {folder['path']}: {e}")
-                
-                # Get existing images from target database
-                progress_dialog.update_progress(40, 100, "Preparing to import images...")
-                QApplication.processEvents()
-                
-                # Build a mapping of existing images: full_path -> set of file_hashes
-                existing_hashes = dict()  # full_path -> set of hashes
-                for folder_id in folder_id_mapping.values():
-                    images = self.db_manager.get_images_for_folder(folder_id, limit=1000000)
-                    for img in images:
-                        if img['full_path'] not in existing_hashes:
-                            existing_hashes[img['full_path']] = set()
-                        if img.get('file_hash'):
-                            existing_hashes[img['full_path']].add(img['file_hash'])
+                # Thumbnails that are neither present nor in the ZIP are not linked
+                if getattr(sys, 'frozen', False):
+                    exe_dir = os.path.dirname(sys.executable)
+                    thumbnails_dir = os.path.join(exe_dir, "data", "thumbnails")
+                else:
+                    app_dir = os.path.dirname(os.path.dirname(self.db_manager.db_path))
+                    thumbnails_dir = os.path.join(app_dir, "data", "thumbnails")
                 
-                # Import images
-                progress_dialog.update_progress(50, 100, "Importing images...")
-                QApplication.processEvents()
+                # Merge on the writer thread in one transaction
+                from concurrent.futures import wait
+                merge_progress = [0, 1, "Importing folders..."]
                 
-                added_images = 0
-                skipped_images = 0
-                total_images = source_cursor.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+                def on_merge_progress(step, steps, message):
+                    merge_progress[0], merge_progress[1], merge_progress[2] = step, steps, message
                 
-                for i, row in enumerate(source_cursor.execute("SELECT * FROM images").fetchall()):
-                    image = dict(row)
-                    
-                    # Update progress periodically
-                    if i % 100 == 0:
-                        progress_percent = 50 + min(40, int((i / total_images) * 40))
-                        progress_dialog.update_progress(progress_percent, 100, f"Imported {added_images} of {total_images} images...")
-                        QApplication.processEvents()
-                    
-                    # Skip if image with same full_path AND file_hash already exists in target
-                    if image['full_path'] in existing_hashes and image.get('file_hash') in existing_hashes[image['full_path']]:
-                        skipped_images += 1
-                        continue
-                    
-                    # Get the new folder ID if the folder was mapped
-                    if image['folder_id'] not in folder_id_mapping:
-                        # Skip images for folders that weren't imported/mapped
-                        skipped_images += 1
-                        continue
-                    
-                    new_folder_id = folder_id_mapping[image['folder_id']]
-                    
-                    # Add image to target database
-                    try:
-                        # Only import images if the file exists
-                        if not os.path.exists(image['full_path']):
-                            continue
-                        
-                        # Determine thumbnail_path for merge:
-                        thumbnail_path = image.get('thumbnail_path')
-                        if thumbnail_path:
-                            # Check if thumbnail file exists (either already present or will be imported from ZIP)
-                            if getattr(sys, 'frozen', False):
-                                exe_dir = os.path.dirname(sys.executable)
-                                thumbnails_dir = os.path.join(exe_dir, "data", "thumbnails")
-                            else:
-                                app_dir = os.path.dirname(os.path.dirname(self.db_manager.db_path))
-                                thumbnails_dir = os.path.join(app_dir, "data", "thumbnails")
-                            thumbnail_file_path = os.path.join(thumbnails_dir, thumbnail_path)
-                            if not os.path.exists(thumbnail_file_path):
-                                # If the file does not exist now but will be imported from ZIP, allow it
-                                if not import_thumbnails:
-                                    thumbnail_path = None
-                        else:
-                            thumbnail_path = None
-
-                        self.db_manager.add_image(
-                            folder_id=new_folder_id,
-                            filename=image['filename'],
-                            full_path=image['full_path'],
-                            file_size=image['file_size'],
-                            file_hash=image.get('file_hash'),
-                            thumbnail_path=thumbnail_path,
-                            ai_description=image.get('ai_description')
-                        )
-
-                        # Update user description if present
-                        if image.get('user_description'):
-                            new_images = self.db_manager.get_images_for_folder(new_folder_id, limit=1)
-                            for new_img in new_images:
-                                if new_img['full_path'] == image['full_path']:
-                                    self.db_manager.update_image_description(
-                                        new_img['image_id'],
-                                        user_description=image.get('user_description')
-                                    )
-                                    break
-                        
-                        added_images += 1
-                            
-                    except Exception as e:
-                        logger.error(f"Error importing image {image['full_path']}: {e}")
-                        skipped_images += 1
+                future = self.db_manager.merge_database(
+                    file_path,
+                    check_files=True,
+                    thumbnails_dir=None if import_thumbnails else thumbnails_dir,
+                    progress_callback=on_merge_progress
+                )
+                while not wait([future], timeout=0.05).done:
+                    step, steps, message = merge_progress
+                    progress_dialog.update_progress(30 + int(step / steps * 60), 100, message)
+                    QApplication.processEvents()
                 
-                # Close source connection
-                source_conn.close()
+                merge_stats = future.result()
+                added_folders = merge_stats["folders"]
+                added_images = merge_stats["images"]
+                skipped_images = merge_stats["skipped_images"]
                 
                 # Import thumbnails if requested
                 thumbnails_imported = False
@@ -5043,9 +4960,6 @@ class MainWindow(QMainWindow):
             # Set flag to indicate this is the "All Images" view
             self.thumbnail_browser.all_images_view = True
             
-            # Reset pagination to first page
-            self.thumbnail_browser.current_page = 0
-            
             # Get the page size from pagination if available
             page_size = 200  # Default
             if hasattr(self.thumbnail_browser, 'page_size'):
@@ -5053,15 +4967,22 @@ class MainWindow(QMainWindow):
             
             # Enable pagination
             self.thumbnail_browser.is_paginated = True
-            self.thumbnail_browser.total_items = total_count
-            self.thumbnail_browser.total_pages = (total_count + page_size - 1) // page_size
-            
-            # Get first page of images
-            images = self.db_manager.get_all_images(limit=page_size, offset=0)
-            
-            # Clear thumbnails and add the first page
-            self.thumbnail_browser.clear_thumbnails()
-            self.thumbnail_browser.add_thumbnails(images)
+            pagination = getattr(self.thumbnail_browser, 'thumbnail_pagination', None)
+            if pagination is not None:
+                # Reset pagination to the first page and load it with a continuation token
+                pagination.reset_pages(total_count)
+                images = pagination.load_page(0)
+            else:
+                self.thumbnail_browser.current_page = 0
+                self.thumbnail_browser.total_items = total_count
+                self.thumbnail_browser.total_pages = (total_count + page_size - 1) // page_size
+                
+                # Get first page of images
+                images, _ = self.db_manager.get_all_images_page(page_size=page_size, grid=True)
+                
+                # Clear thumbnails and add the first page
+                self.thumbnail_browser.clear_thumbnails()
+                self.thumbnail_browser.add_thumbnails(images)
             
             # Update header with count
             if hasattr(self.thumbnail_browser, 'header_label'):
@@ -5076,11 +4997,6 @@ class MainWindow(QMainWindow):
             else:
                 self.status_bar.showMessage(f"Showing all {len(images)} images")
                 
-            # Update pagination controls if available
-            if hasattr(self.thumbnail_browser, 'thumbnail_pagination') and \
-               hasattr(self.thumbnail_browser.thumbnail_pagination, 'update_pagination_controls'):
-                self.thumbnail_browser.thumbnail_pagination.update_pagination_controls()
-                
             # Update window title
             if hasattr(self, 'setWindowTitle'):
                 self.setWindowTitle("STARNODES Image Manager - All Images")
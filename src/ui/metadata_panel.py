@@ -16,6 +16,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QPixmap, QFont
 from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot
 
+from .async_db import get_async_database, METADATA_CHANNEL
+
 logger = logging.getLogger("StarImageBrowse.ui.metadata_panel")
 
 class MetadataPanel(QWidget):
@@ -61,6 +63,7 @@ class MetadataPanel(QWidget):
         super().__init__(parent)
         
         self.db_manager = db_manager
+        self.async_db = get_async_database(db_manager)
         self.language_manager = language_manager
         self.current_image_id = None
         self.current_image_info = None
@@ -191,11 +194,23 @@ class MetadataPanel(QWidget):
                 self.all_metadata_layout.removeRow(0)
 
         if not image_id:
+            self.async_db.cancel(METADATA_CHANNEL)
             self.clear_metadata()
             return
         
-        # Get image info from database
-        image_info = self.db_manager.get_image_by_id(image_id)
+        # Get image info from database off the GUI thread; selecting another
+        # image before it arrives cancels this request
+        self.async_db.call(METADATA_CHANNEL, "get_image_by_id", image_id).then(
+            lambda image_info: self.show_metadata(image_id, image_info)
+        )
+    
+    def show_metadata(self, image_id, image_info):
+        """Show the metadata of an image loaded from the database.
+        
+        Args:
+            image_id (int): ID of the image
+            image_info (dict): Image information, None if the image was not found
+        """
         if not image_info:
             self.clear_metadata()
             return
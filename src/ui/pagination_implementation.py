@@ -136,7 +136,9 @@ class PaginationMixin:
             self.status_message.emit(f"Showing page {self.current_page + 1} of {self.total_pages} for search results")
         elif self.current_folder_id is not None:
             # Folder context
-            images = self.db_manager.get_images_for_folder(self.current_folder_id, limit=self.page_size, offset=offset)
+            images = self.db_manager.get_images_for_folder(
+                self.current_folder_id, limit=self.page_size, offset=offset, grid=True
+            )
             self.all_images = images
             self.grid.set_item_count(len(images))
             folder_info = self.db_manager.get_folder_by_id(self.current_folder_id)
@@ -192,7 +194,9 @@ class PaginationMixin:
             self.status_message.emit(f"Showing page {self.current_page + 1} of {self.total_pages} for search results")
         elif self.current_folder_id is not None:
             # Folder context
-            images = self.db_manager.get_images_for_folder(self.current_folder_id, limit=self.page_size, offset=offset)
+            images = self.db_manager.get_images_for_folder(
+                self.current_folder_id, limit=self.page_size, offset=offset, grid=True
+            )
             self.all_images = images
             self.grid.set_item_count(len(images))
             folder_info = self.db_manager.get_folder_by_id(self.current_folder_id)
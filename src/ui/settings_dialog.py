@@ -374,6 +374,17 @@ class SettingsDialog(QDialog):
         
         db_layout.addRow(self.get_translation('settings', 'database_path', 'Database Path:'), self.db_path_layout)
         
+        # File fingerprint used for new images
+        self.hash_algorithm_combo = QComboBox()
+        self.hash_algorithm_combo.addItem(self.get_translation('settings', 'hash_sampled', 'Fast (sampled BLAKE2)'), "sampled")
+        self.hash_algorithm_combo.addItem(self.get_translation('settings', 'hash_blake2b', 'Full BLAKE2'), "blake2b")
+        self.hash_algorithm_combo.addItem(self.get_translation('settings', 'hash_md5', 'Full MD5'), "md5")
+        self.hash_algorithm_combo.setToolTip(self.get_translation(
+            'settings', 'hash_algorithm_tooltip',
+            'Fast hashes only the size and three samples of each file. Full hashes read every byte.'
+        ))
+        db_layout.addRow(self.get_translation('settings', 'hash_algorithm', 'File hashing:'), self.hash_algorithm_combo)
+        
         layout.addWidget(db_group)
         
         # Reset button
@@ -464,6 +475,12 @@ class SettingsDialog(QDialog):
             self.config_manager.get("database", "path", "")
         )
         
+        hash_mode = self.config_manager.get("scanner", "hash_algorithm", "sampled")
+        for i in range(self.hash_algorithm_combo.count()):
+            if self.hash_algorithm_combo.itemData(i) == hash_mode:
+                self.hash_algorithm_combo.setCurrentIndex(i)
+                break
+        
         # Description generation settings
         process_all = self.config_manager.get("ai", "process_all_images", False)
         self.processing_mode_combo.setCurrentIndex(1 if process_all else 0)
@@ -516,6 +533,7 @@ class SettingsDialog(QDialog):
         
         # Advanced tab
         self.config_manager.set("database", "path", self.db_path_edit.text())
+        self.config_manager.set("scanner", "hash_algorithm", self.hash_algorithm_combo.currentData())
         
         # Description generation settings
         process_all = (self.processing_mode_combo.currentIndex() == 1)  # 1 = All Images
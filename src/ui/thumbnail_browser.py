@@ -19,6 +19,7 @@ from PyQt6.QtCore import Qt, QSize, pyqtSignal, QThread, QThreadPool, QRunnable,
 
 from .lazy_thumbnail_loader import LazyThumbnailLoader
 from .thumbnail_widget import ThumbnailWidget
+from .async_db import get_async_database, THUMBNAILS_CHANNEL
 
 logger = logging.getLogger("StarImageBrowse.ui.thumbnail_browser")
 
@@ -58,11 +59,14 @@ class ThumbnailBrowser(QWidget):
         super().__init__(parent)
         
         self.db_manager = db_manager
+        self.async_db = get_async_database(db_manager)
         self.current_folder_id = None
+        self.current_directory_id = None  # Subdirectory of the current folder being displayed
         self.current_search_query = None
         self.current_catalog_id = None  # Current catalog being displayed
         self.thumbnails = {}  # Dictionary of thumbnail widgets by image_id
         self.selected_thumbnails = set()  # Set of selected thumbnail image_ids
+        self.page_size = 200  # Images read per query; the pagination settings replace it
         
         # Try to get language manager from parent window
         self.language_manager = None
@@ -136,28 +140,41 @@ class ThumbnailBrowser(QWidget):
     def set_folder(self, folder_id):
         """Display thumbnails for the specified folder.
         
+        The images are loaded off the GUI thread; selecting another folder
+        before they arrive cancels the load.
+        
         Args:
             folder_id (int): ID of the folder to display
         """
         self.current_folder_id = folder_id
+        self.current_directory_id = None
         self.current_search_query = None
-        self.selected_thumbnails.clear()
         
-        # Get folder info
-        folders = self.db_manager.get_folders()
-        folder_info = next((f for f in folders if f["folder_id"] == folder_id), None)
+        # Clear existing thumbnails
+        self.clear_thumbnails()
+        
+        def load_folder():
+            # Get folder info and the images for this folder
+            folder_info = self.db_manager.get_folder_by_id(folder_id)
+            images = self.db_manager.get_images_for_folder(folder_id, limit=1000000, grid=True)
+            return folder_info, images
         
+        self.async_db.submit(THUMBNAILS_CHANNEL, load_folder).then(
+            lambda loaded: self.show_folder(*loaded)
+        )
+    
+    def show_folder(self, folder_info, images):
+        """Show the images of a folder loaded from the database.
+        
+        Args:
+            folder_info (dict): Folder information, None if the folder was not found
+            images (list): Images in the folder
+        """
         if folder_info:
             self.header_label.setText(f"Folder: {folder_info['path']}")
         else:
             self.header_label.setText("Unknown Folder")
         
-        # Clear existing thumbnails
-        self.clear_thumbnails()
-        
-        # Get images for this folder
-        images = self.db_manager.get_images_for_folder(folder_id, limit=1000000)
-        
         if not images:
             # No images found
             empty_label = QLabel("No images found in this folder")
@@ -168,6 +185,53 @@ class ThumbnailBrowser(QWidget):
         # Create and add thumbnail widgets
         self.add_thumbnails(images)
     
+    def set_directory(self, directory_id):
+        """Display thumbnails for a subdirectory of a folder and everything below it.
+        
+        The images are loaded off the GUI thread like set_folder().
+        
+        Args:
+            directory_id (int): ID of the directory to display
+        """
+        self.current_directory_id = directory_id
+        self.current_search_query = None
+        
+        # Clear existing thumbnails
+        self.clear_thumbnails()
+        
+        def load_directory():
+            directory = self.db_manager.get_directory(directory_id)
+            if not directory:
+                return None, []
+            
+            # Get images for this directory tree a page at a time
+            images, page_token = [], None
+            while True:
+                page, page_token = self.db_manager.get_images_for_directory_page(
+                    directory_id, page_token, self.page_size, grid=True
+                )
+                images.extend(page)
+                if page_token is None:
+                    return directory, images
+        
+        self.async_db.submit(THUMBNAILS_CHANNEL, load_directory).then(
+            lambda loaded: self.show_directory(*loaded)
+        )
+    
+    def show_directory(self, directory, images):
+        """Show the images of a directory tree loaded from the database.
+        
+        Args:
+            directory (dict): Directory information, None if the directory was not found
+            images (list): Images in the directory and its subdirectories
+        """
+        if not directory:
+            return
+            
+        # The folder stays current so folder scoped actions still apply
+        self.current_folder_id = directory['folder_id']
+        self.show_folder(directory, images)
+    
     def search(self, query):
         """Display thumbnails for search results.
         
@@ -181,6 +245,7 @@ class ThumbnailBrowser(QWidget):
             return
         
         self.current_folder_id = None
+        self.current_directory_id = None
         self.current_search_query = query
         self.selected_thumbnails.clear()
         
@@ -266,6 +331,9 @@ class ThumbnailBrowser(QWidget):
     
     def clear_thumbnails(self):
         """Clear all thumbnails from the browser."""
+        # Whatever is shown next replaces a listing still being loaded
+        self.async_db.cancel(THUMBNAILS_CHANNEL)
+        
         # Cancel any pending thumbnail loading tasks
         self.thumbnail_loader.cancel_pending()
         
@@ -1249,6 +1317,7 @@ class ThumbnailBrowser(QWidget):
         """
         # Store current catalog ID
         self.current_folder_id = None
+        self.current_directory_id = None
         self.current_search_query = None
         self.current_catalog_id = catalog_id
         
@@ -1432,7 +1501,9 @@ class ThumbnailBrowser(QWidget):
     
     def refresh(self):
         """Refresh the thumbnail display."""
-        if self.current_folder_id is not None:
+        if self.current_folder_id is not None and self.current_directory_id is not None:
+            self.set_directory(self.current_directory_id)
+        elif self.current_folder_id is not None:
             self.set_folder(self.current_folder_id)
         elif self.current_catalog_id is not None:
             self.set_catalog(self.current_catalog_id)
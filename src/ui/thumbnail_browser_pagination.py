@@ -9,6 +9,8 @@ import logging
 from PyQt6.QtWidgets import QPushButton, QLabel, QHBoxLayout, QWidget
 from PyQt6.QtCore import Qt
 
+from .async_db import THUMBNAILS_CHANNEL
+
 logger = logging.getLogger("StarImageBrowse.ui.thumbnail_browser_pagination")
 
 class ThumbnailBrowserPagination:
@@ -43,6 +45,7 @@ class ThumbnailBrowserPagination:
         self.browser.current_page = 0
         self.browser.total_items = 0
         self.browser.total_pages = 0
+        self.browser.page_tokens = [None]
         self.browser.is_paginated = False
         
         # Create and add pagination controls
@@ -144,80 +147,144 @@ class ThumbnailBrowserPagination:
             # Always show the page size combo
             self.browser.page_size_combo.setVisible(True)
     
-    def load_next_page(self):
-        """Load the next page of thumbnails"""
-        if not self.browser.is_paginated or self.browser.current_page >= self.browser.total_pages - 1:
-            return
+    def reset_pages(self, total_items):
+        """Start a new paginated listing at its first page
         
-        # Increment page number
-        self.browser.current_page += 1
+        Args:
+            total_items (int): Number of items in the listing
+        """
+        self.browser.current_page = 0
+        self.browser.total_items = total_items
+        self.browser.total_pages = (total_items + self.browser.page_size - 1) // self.browser.page_size
         
-        # Calculate offset
-        offset = self.browser.current_page * self.browser.page_size
+        # page_tokens[n] is the continuation token that loads page n. Pages
+        # are reached one step at a time, so the token for the next page is
+        # always known once the current page has been loaded.
+        self.browser.page_tokens = [None]
+    
+    def _fetch_page(self, page_token):
+        """Fetch one page for whatever the browser is currently showing
         
-        # Clear existing thumbnails
-        self.browser.clear_thumbnails()
+        Args:
+            page_token (str): Continuation token for the page, None for the first page
+            
+        Returns:
+            tuple: (images, next_token, description) where description names the listing
+        """
+        db_manager = self.browser.db_manager
+        page_size = self.browser.page_size
         
-        # Load the appropriate next page based on context
         if hasattr(self.browser, 'current_search_query') and self.browser.current_search_query is not None:
-            # Search context
-            images = self.browser.db_manager.search_images(
-                self.browser.current_search_query, 
-                limit=self.browser.page_size, 
+            # Simple search results are ranked by relevance and paged by offset
+            offset = self.browser.current_page * page_size
+            images = db_manager.search_images(
+                self.browser.current_search_query,
+                limit=page_size,
                 offset=offset
             )
-            self.browser.add_thumbnails(images)
-            self.browser.status_message.emit(
-                f"Showing page {self.browser.current_page + 1} of {self.browser.total_pages} "
-                f"for search '{self.browser.current_search_query}'"
-            )
-        elif hasattr(self.browser, 'last_search_params') and self.browser.last_search_params:
+            return images, None, f"for search '{self.browser.current_search_query}'"
+        
+        if hasattr(self.browser, 'last_search_params') and self.browser.last_search_params:
             # Enhanced search context
-            params = self.browser.last_search_params
-            folder_id = getattr(self.browser, 'last_search_folder_id', None)
-            catalog_id = getattr(self.browser, 'last_search_catalog_id', None)
-            
-            results = self.browser.db_manager.enhanced_search.search(
-                params, folder_id=folder_id, catalog_id=catalog_id, 
-                limit=self.browser.page_size, offset=offset
+            images, next_token = db_manager.enhanced_search.search_page(
+                self.browser.last_search_params,
+                folder_id=getattr(self.browser, 'last_search_folder_id', None),
+                catalog_id=getattr(self.browser, 'last_search_catalog_id', None),
+                page_token=page_token,
+                page_size=page_size
             )
-            
-            self.browser.add_thumbnails(results)
-            self.browser.status_message.emit(
-                f"Showing page {self.browser.current_page + 1} of {self.browser.total_pages} "
-                f"for search results"
+            return images, next_token, "for search results"
+        
+        if hasattr(self.browser, 'all_images_view') and self.browser.all_images_view:
+            # All Images view
+            images, next_token = db_manager.get_all_images_page(page_token, page_size, grid=True)
+            return images, next_token, "for all images"
+        
+        directory_id = getattr(self.browser, 'current_directory_id', None)
+        if self.browser.current_folder_id is not None and directory_id is not None:
+            # Subdirectory context, including everything below it
+            images, next_token = db_manager.get_images_for_directory_page(
+                directory_id, page_token, page_size, grid=True
             )
-        elif self.browser.current_folder_id is not None:
+            directory_info = db_manager.get_directory(directory_id)
+            directory_path = directory_info.get('path', 'Unknown') if directory_info else 'Unknown'
+            return images, next_token, f"for folder '{directory_path}'"
+        
+        if self.browser.current_folder_id is not None:
             # Folder context
-            images = self.browser.db_manager.get_images_for_folder(
-                self.browser.current_folder_id,
-                limit=self.browser.page_size, 
-                offset=offset
+            images, next_token = db_manager.get_images_for_folder_page(
+                self.browser.current_folder_id, page_token, page_size, grid=True
             )
-            self.browser.add_thumbnails(images)
-            folder_info = self.browser.db_manager.get_folder_by_id(self.browser.current_folder_id)
+            folder_info = db_manager.get_folder_by_id(self.browser.current_folder_id)
             folder_path = folder_info.get('path', 'Unknown') if folder_info else 'Unknown'
-            self.browser.status_message.emit(
-                f"Showing page {self.browser.current_page + 1} of {self.browser.total_pages} "
-                f"for folder '{folder_path}'"
-            )
-        elif self.browser.current_catalog_id is not None:
+            return images, next_token, f"for folder '{folder_path}'"
+        
+        if self.browser.current_catalog_id is not None:
             # Catalog context
-            images = self.browser.db_manager.get_images_for_catalog(
-                self.browser.current_catalog_id,
-                limit=self.browser.page_size, 
-                offset=offset
+            images, next_token = db_manager.get_images_for_catalog_page(
+                self.browser.current_catalog_id, page_token, page_size, grid=True
             )
-            self.browser.add_thumbnails(images)
-            catalog_info = self.browser.db_manager.get_catalog_by_id(self.browser.current_catalog_id)
+            catalog_info = db_manager.get_catalog_by_id(self.browser.current_catalog_id)
             catalog_name = catalog_info.get('name', 'Unknown') if catalog_info else 'Unknown'
+            return images, next_token, f"for catalog '{catalog_name}'"
+        
+        return [], None, ""
+    
+    def load_page(self, page):
+        """Load a page of thumbnails for the current view
+        
+        Args:
+            page (int): Zero-based page number; must be at most one past the last loaded page
+            
+        Returns:
+            list: Images shown on the page
+        """
+        page_tokens = getattr(self.browser, 'page_tokens', [None])
+        if page >= len(page_tokens):
+            logger.warning(f"No continuation token for page {page + 1}")
+            return []
+        
+        self.browser.current_page = page
+        images, next_token, description = self._fetch_page(page_tokens[page])
+        self.show_page(page, images, next_token, description)
+        return images
+    
+    def show_page(self, page, images, next_token, description):
+        """Show a fetched page of thumbnails
+        
+        Args:
+            page (int): Zero-based page number
+            images (list): Images on the page
+            next_token (str): Continuation token for the following page, None on the last page
+            description (str): Names the listing in the status message
+        """
+        self.browser.current_page = page
+        page_tokens = getattr(self.browser, 'page_tokens', [None])
+        
+        # Remember how to reach the following page
+        del page_tokens[page + 1:]
+        if next_token is not None:
+            page_tokens.append(next_token)
+        self.browser.page_tokens = page_tokens
+        
+        # Clear existing thumbnails and show the page
+        self.browser.clear_thumbnails()
+        self.browser.add_thumbnails(images)
+        
+        if description:
             self.browser.status_message.emit(
-                f"Showing page {self.browser.current_page + 1} of {self.browser.total_pages} "
-                f"for catalog '{catalog_name}'"
+                f"Showing page {page + 1} of {self.browser.total_pages} {description}"
             )
-            
+        
         # Update pagination controls
         self.update_pagination_controls()
+    
+    def load_next_page(self):
+        """Load the next page of thumbnails"""
+        if not self.browser.is_paginated or self.browser.current_page >= self.browser.total_pages - 1:
+            return
+        
+        self.load_page(self.browser.current_page + 1)
         
     def on_page_size_changed(self, index):
         """Handle change in page size
@@ -234,7 +301,6 @@ class ThumbnailBrowserPagination:
             return
         
         # Store the new page size
-        old_page_size = self.browser.page_size
         self.browser.page_size = new_page_size
         
         # Save to config if available
@@ -243,163 +309,18 @@ class ThumbnailBrowserPagination:
             if config_manager:
                 config_manager.set_setting('thumbnails_per_page', new_page_size)
         
-        # Recalculate pagination
+        # Continuation tokens describe page boundaries for the old page size,
+        # so restart the listing from its first page
         if self.browser.is_paginated and self.browser.total_items > 0:
-            # Calculate new total pages
-            self.browser.total_pages = (self.browser.total_items + new_page_size - 1) // new_page_size
-            
-            # Adjust current page to show approximately the same items
-            if old_page_size > 0:  # Avoid division by zero
-                # Calculate the first item index in the old view
-                first_item_index = self.browser.current_page * old_page_size
-                # Calculate new page number to show that item
-                self.browser.current_page = first_item_index // new_page_size
-            
-            # Make sure current page is valid
-            self.browser.current_page = min(self.browser.current_page, self.browser.total_pages - 1)
-            self.browser.current_page = max(0, self.browser.current_page)
-            
-            # Refresh the current view
-            if hasattr(self.browser, 'refresh'):
-                self.browser.refresh()
-            else:
-                # Manually reload based on context
-                offset = self.browser.current_page * new_page_size
-                
-                # Clear current thumbnails
-                self.browser.clear_thumbnails()
-                
-                # Load appropriate data based on context
-                self._reload_current_view(offset)
-            
-            # Update pagination controls
-            self.update_pagination_controls()
-    
-    def _reload_current_view(self, offset):
-        """Reload the current view with the current page size and offset
-        
-        Args:
-            offset (int): Offset to use for loading data
-        """
-        # Determine what we're currently viewing and reload it
-        if hasattr(self.browser, 'current_search_query') and self.browser.current_search_query is not None:
-            # Search context
-            images = self.browser.db_manager.search_images(
-                self.browser.current_search_query, 
-                limit=self.browser.page_size, 
-                offset=offset
-            )
-            self.browser.add_thumbnails(images)
-        elif hasattr(self.browser, 'last_search_params') and self.browser.last_search_params:
-            # Enhanced search context
-            params = self.browser.last_search_params
-            folder_id = getattr(self.browser, 'last_search_folder_id', None)
-            catalog_id = getattr(self.browser, 'last_search_catalog_id', None)
-            
-            results = self.browser.db_manager.enhanced_search.search(
-                params, folder_id=folder_id, catalog_id=catalog_id, 
-                limit=self.browser.page_size, offset=offset
-            )
-            
-            self.browser.add_thumbnails(results)
-        elif hasattr(self.browser, 'all_images_view') and self.browser.all_images_view:
-            # All Images view
-            images = self.browser.db_manager.get_all_images(
-                limit=self.browser.page_size,
-                offset=offset
-            )
-            self.browser.add_thumbnails(images)
-        elif self.browser.current_folder_id is not None:
-            # Folder context
-            images = self.browser.db_manager.get_images_for_folder(
-                self.browser.current_folder_id,
-                limit=self.browser.page_size, 
-                offset=offset
-            )
-            self.browser.add_thumbnails(images)
-        elif self.browser.current_catalog_id is not None:
-            # Catalog context
-            images = self.browser.db_manager.get_images_for_catalog(
-                self.browser.current_catalog_id,
-                limit=self.browser.page_size, 
-                offset=offset
-            )
-            self.browser.add_thumbnails(images)
+            self.reset_pages(self.browser.total_items)
+            self.load_page(0)
     
     def load_previous_page(self):
         """Load the previous page of thumbnails"""
         if not self.browser.is_paginated or self.browser.current_page <= 0:
             return
         
-        # Decrement page number
-        self.browser.current_page -= 1
-        
-        # Calculate offset
-        offset = self.browser.current_page * self.browser.page_size
-        
-        # Clear existing thumbnails
-        self.browser.clear_thumbnails()
-        
-        # Load the appropriate previous page based on context
-        if hasattr(self.browser, 'current_search_query') and self.browser.current_search_query is not None:
-            # Search context
-            images = self.browser.db_manager.search_images(
-                self.browser.current_search_query,
-                limit=self.browser.page_size, 
-                offset=offset
-            )
-            self.browser.add_thumbnails(images)
-            self.browser.status_message.emit(
-                f"Showing page {self.browser.current_page + 1} of {self.browser.total_pages} "
-                f"for search '{self.browser.current_search_query}'"
-            )
-        elif hasattr(self.browser, 'last_search_params') and self.browser.last_search_params:
-            # Enhanced search context
-            params = self.browser.last_search_params
-            folder_id = getattr(self.browser, 'last_search_folder_id', None)
-            catalog_id = getattr(self.browser, 'last_search_catalog_id', None)
-            
-            results = self.browser.db_manager.enhanced_search.search(
-                params, folder_id=folder_id, catalog_id=catalog_id, 
-                limit=self.browser.page_size, offset=offset
-            )
-            
-            self.browser.add_thumbnails(results)
-            self.browser.status_message.emit(
-                f"Showing page {self.browser.current_page + 1} of {self.browser.total_pages} "
-                f"for search results"
-            )
-        elif self.browser.current_folder_id is not None:
-            # Folder context
-            images = self.browser.db_manager.get_images_for_folder(
-                self.browser.current_folder_id,
-                limit=self.browser.page_size, 
-                offset=offset
-            )
-            self.browser.add_thumbnails(images)
-            folder_info = self.browser.db_manager.get_folder_by_id(self.browser.current_folder_id)
-            folder_path = folder_info.get('path', 'Unknown') if folder_info else 'Unknown'
-            self.browser.status_message.emit(
-                f"Showing page {self.browser.current_page + 1} of {self.browser.total_pages} "
-                f"for folder '{folder_path}'"
-            )
-        elif self.browser.current_catalog_id is not None:
-            # Catalog context
-            images = self.browser.db_manager.get_images_for_catalog(
-                self.browser.current_catalog_id,
-                limit=self.browser.page_size, 
-                offset=offset
-            )
-            self.browser.add_thumbnails(images)
-            catalog_info = self.browser.db_manager.get_catalog_by_id(self.browser.current_catalog_id)
-            catalog_name = catalog_info.get('name', 'Unknown') if catalog_info else 'Unknown'
-            self.browser.status_message.emit(
-                f"Showing page {self.browser.current_page + 1} of {self.browser.total_pages} "
-                f"for catalog '{catalog_name}'"
-            )
-        
-        # Update pagination controls
-        self.update_pagination_controls()
+        self.load_page(self.browser.current_page - 1)
 
 
 # Helper function to apply pagination to the standard ThumbnailBrowser
@@ -413,70 +334,129 @@ def enable_pagination_for_browser(thumbnail_browser):
         The pagination controller instance
     """
     pagination = ThumbnailBrowserPagination(thumbnail_browser)
+    thumbnail_browser.thumbnail_pagination = pagination
     
-    # Enhance the set_folder method with pagination
-    original_set_folder = thumbnail_browser.set_folder
+    def clear_other_contexts():
+        """Forget the catalog, search and All Images listings"""
+        if hasattr(thumbnail_browser, 'current_catalog_id'):
+            thumbnail_browser.current_catalog_id = None
+        if hasattr(thumbnail_browser, 'current_search_query'):
+            thumbnail_browser.current_search_query = None
+        if hasattr(thumbnail_browser, 'last_search_params'):
+            thumbnail_browser.last_search_params = None
+        if hasattr(thumbnail_browser, 'all_images_view'):
+            thumbnail_browser.all_images_view = False
     
+    def show_first_page(loaded):
+        """Show the first page of a folder or directory loaded off the GUI thread
+        
+        Args:
+            loaded (tuple): (info, total_count, images, next_token) where info has the path
+        """
+        info, total_count, images, next_token = loaded
+        folder_path = info.get('path', 'Unknown')
+        thumbnail_browser.is_paginated = True
+        pagination.reset_pages(total_count)
+        pagination.show_page(0, images, next_token, f"for folder '{folder_path}'")
+        
+        if hasattr(thumbnail_browser, 'header_label'):
+            thumbnail_browser.header_label.setText(f"Folder: {folder_path} ({total_count} images)")
+        
+        # Update status
+        thumbnail_browser.status_message.emit(
+            f"Showing page 1 of {thumbnail_browser.total_pages} "
+            f"({len(images)} of {total_count} images) from folder '{folder_path}'"
+        )
+    
+    # Enhance the set_folder method with pagination
     def set_folder_with_pagination(folder_id):
         """Enhanced set_folder method with pagination support"""
         # Reset pagination state
         thumbnail_browser.current_page = 0
         
-        # Get folder info
-        folder_info = thumbnail_browser.db_manager.get_folder_by_id(folder_id)
-        if not folder_info:
-            return
-            
         # Store folder ID and clear search query
         thumbnail_browser.current_folder_id = folder_id
-        if hasattr(thumbnail_browser, 'current_catalog_id'):
-            thumbnail_browser.current_catalog_id = None
-        if hasattr(thumbnail_browser, 'current_search_query'):
-            thumbnail_browser.current_search_query = None
+        thumbnail_browser.current_directory_id = None
+        clear_other_contexts()
         
-        # Get total image count for the folder
-        total_count = thumbnail_browser.db_manager.get_image_count_for_folder(folder_id)
+        # Clearing also cancels a folder still being loaded
+        thumbnail_browser.clear_thumbnails()
         
-        # Determine if pagination is needed
-        if total_count > thumbnail_browser.page_size:
-            # Enable pagination
-            thumbnail_browser.is_paginated = True
-            thumbnail_browser.total_items = total_count
-            thumbnail_browser.total_pages = (total_count + thumbnail_browser.page_size - 1) // thumbnail_browser.page_size
-            
-            # Get first page only
-            images = thumbnail_browser.db_manager.get_images_for_folder(
-                folder_id, 
-                limit=thumbnail_browser.page_size, 
-                offset=0
-            )
+        db_manager = thumbnail_browser.db_manager
+        page_size = thumbnail_browser.page_size
+        
+        def load_folder():
+            # Get folder info and its total image count
+            folder_info = db_manager.get_folder_by_id(folder_id)
+            if not folder_info:
+                return None
+            total_count = db_manager.get_image_count_for_folder(folder_id)
             
-            # Clear thumbnails and add first page
-            thumbnail_browser.clear_thumbnails()
-            thumbnail_browser.add_thumbnails(images)
+            # Small folders are shown in full, large ones a page at a time
+            if total_count <= page_size:
+                images = db_manager.get_images_for_folder(folder_id, limit=1000000, grid=True)
+                return folder_info, total_count, images, None
+            images, next_token = db_manager.get_images_for_folder_page(folder_id, None, page_size, grid=True)
+            return folder_info, total_count, images, next_token
+        
+        def show_folder(loaded):
+            if loaded is None:
+                return
             
-            # Update folder info display
-            folder_path = folder_info.get('path', 'Unknown')
-            if hasattr(thumbnail_browser, 'header_label'):
-                thumbnail_browser.header_label.setText(f"Folder: {folder_path} ({total_count} images)")
+            folder_info, total_count, images, _ = loaded
+            if total_count > page_size:
+                show_first_page(loaded)
+            else:
+                # No pagination needed for small folders
+                thumbnail_browser.is_paginated = False
+                thumbnail_browser.show_folder(folder_info, images)
+        
+        thumbnail_browser.async_db.submit(THUMBNAILS_CHANNEL, load_folder).then(show_folder)
+    
+    # Replace the original method with our enhanced version
+    thumbnail_browser.set_folder = set_folder_with_pagination
+    
+    # Subdirectories are paged the same way as folders
+    def set_directory_with_pagination(directory_id):
+        """Enhanced set_directory method with pagination support"""
+        # Reset pagination state
+        thumbnail_browser.current_page = 0
+        thumbnail_browser.current_directory_id = directory_id
+        clear_other_contexts()
+        thumbnail_browser.clear_thumbnails()
+        
+        db_manager = thumbnail_browser.db_manager
+        page_size = thumbnail_browser.page_size
+        
+        def load_directory():
+            directory_info = db_manager.get_directory(directory_id)
+            if not directory_info:
+                return None
+            total_count = db_manager.get_image_count_for_directory(directory_id)
             
-            # Update status
-            thumbnail_browser.status_message.emit(
-                f"Showing page 1 of {thumbnail_browser.total_pages} "
-                f"({len(images)} of {total_count} images) from folder '{folder_path}'"
+            # A small directory fits in the first page
+            images, next_token = db_manager.get_images_for_directory_page(
+                directory_id, None, page_size, grid=True
             )
+            return directory_info, total_count, images, next_token
+        
+        def show_directory(loaded):
+            if loaded is None:
+                return
             
-            # Update pagination controls
-            pagination.update_pagination_controls()
-        else:
-            # No pagination needed for small folders
-            thumbnail_browser.is_paginated = False
-            
-            # Use the original method for small folders
-            original_set_folder(folder_id)
+            # Store the directory's folder so folder scoped actions still apply
+            directory_info, total_count, images, _ = loaded
+            thumbnail_browser.current_folder_id = directory_info['folder_id']
+            if total_count > page_size:
+                show_first_page(loaded)
+            else:
+                # No pagination needed for small directories
+                thumbnail_browser.is_paginated = False
+                thumbnail_browser.show_directory(directory_info, images)
+        
+        thumbnail_browser.async_db.submit(THUMBNAILS_CHANNEL, load_directory).then(show_directory)
     
-    # Replace the original method with our enhanced version
-    thumbnail_browser.set_folder = set_folder_with_pagination
+    thumbnail_browser.set_directory = set_directory_with_pagination
     
     # Now enhance the add_thumbnails method for enhanced search
     original_handle_enhanced_search = None
@@ -506,21 +486,11 @@ def enable_pagination_for_browser(thumbnail_browser):
                 params, folder_id=folder_id, catalog_id=catalog_id
             )
             
-            # Reset pagination state
-            thumbnail_browser.current_page = 0
-            
             # Determine if pagination is needed
             if total_count > thumbnail_browser.page_size:
                 # Enable pagination
                 thumbnail_browser.is_paginated = True
-                thumbnail_browser.total_items = total_count
-                thumbnail_browser.total_pages = (total_count + thumbnail_browser.page_size - 1) // thumbnail_browser.page_size
-                
-                # Get first page only
-                results = main_window.db_manager.enhanced_search.search(
-                    params, folder_id=folder_id, catalog_id=catalog_id,
-                    limit=thumbnail_browser.page_size, offset=0
-                )
+                pagination.reset_pages(total_count)
                 
                 # Update the thumbnail browser with results
                 if hasattr(main_window, 'thumbnail_browser'):
@@ -529,10 +499,11 @@ def enable_pagination_for_browser(thumbnail_browser):
                     main_window.thumbnail_browser.last_search_params = params
                     main_window.thumbnail_browser.last_search_folder_id = folder_id
                     main_window.thumbnail_browser.last_search_catalog_id = catalog_id
+                    if hasattr(main_window.thumbnail_browser, 'current_search_query'):
+                        main_window.thumbnail_browser.current_search_query = None
                     
-                    # Clear and add new thumbnails
-                    main_window.thumbnail_browser.clear_thumbnails()
-                    main_window.thumbnail_browser.add_thumbnails(results)
+                    # Load first page only
+                    results = pagination.load_page(0)
                     
                     # Update status message
                     criteria_parts = []
@@ -549,9 +520,6 @@ def enable_pagination_for_browser(thumbnail_browser):
                     status_msg = f"Showing page 1 of {thumbnail_browser.total_pages} ({len(results)} of {total_count} images) matching {criteria_text} in {scope_text}"
                     if hasattr(main_window, 'status_bar'):
                         main_window.status_bar.showMessage(status_msg)
-                    
-                    # Update pagination controls
-                    pagination.update_pagination_controls()
             else:
                 # No pagination needed for small result sets
                 thumbnail_browser.is_paginated = False
@@ -46,9 +46,6 @@ def add_view_all_images_to_main_window(main_window):
             # Set flag to indicate this is the "All Images" view
             self.thumbnail_browser.all_images_view = True
             
-            # Reset pagination to first page
-            self.thumbnail_browser.current_page = 0
-            
             # Get the page size from pagination if available
             page_size = 200  # Default
             if hasattr(self.thumbnail_browser, 'page_size'):
@@ -56,15 +53,22 @@ def add_view_all_images_to_main_window(main_window):
             
             # Enable pagination
             self.thumbnail_browser.is_paginated = True
-            self.thumbnail_browser.total_items = total_count
-            self.thumbnail_browser.total_pages = (total_count + page_size - 1) // page_size
-            
-            # Get first page of images
-            images = self.db_manager.get_all_images(limit=page_size, offset=0)
-            
-            # Clear thumbnails and add the first page
-            self.thumbnail_browser.clear_thumbnails()
-            self.thumbnail_browser.add_thumbnails(images)
+            pagination = getattr(self.thumbnail_browser, 'thumbnail_pagination', None)
+            if pagination is not None:
+                # Reset pagination to the first page and load it with a continuation token
+                pagination.reset_pages(total_count)
+                images = pagination.load_page(0)
+            else:
+                self.thumbnail_browser.current_page = 0
+                self.thumbnail_browser.total_items = total_count
+                self.thumbnail_browser.total_pages = (total_count + page_size - 1) // page_size
+                
+                # Get first page of images
+                images, _ = self.db_manager.get_all_images_page(page_size=page_size, grid=True)
+                
+                # Clear thumbnails and add the first page
+                self.thumbnail_browser.clear_thumbnails()
+                self.thumbnail_browser.add_thumbnails(images)
             
             # Update header with count
             if hasattr(self.thumbnail_browser, 'header_label'):
@@ -79,11 +83,6 @@ def add_view_all_images_to_main_window(main_window):
             else:
                 self.status_bar.showMessage(f"Showing all {len(images)} images")
                 
-            # Update pagination controls if available
-            if hasattr(self.thumbnail_browser, 'thumbnail_pagination') and \
-               hasattr(self.thumbnail_browser.thumbnail_pagination, 'update_pagination_controls'):
-                self.thumbnail_browser.thumbnail_pagination.update_pagination_controls()
-                
             # Update window title
             if hasattr(self, 'setWindowTitle'):
                 self.setWindowTitle("STARNODES Image Manager - All Images")
@@ -20,6 +20,7 @@ sys.path.insert(0, project_root)
 # Import database related modules
 from src.database.db_manager import DatabaseManager
 from src.database.db_connection import DatabaseConnection
+from src.database.db_operations import DatabaseOperations
 
 # Set up logging
 logger = logging.getLogger("STARNODESImageManager.utilities.convert_thumbnail_paths")
@@ -101,10 +102,8 @@ def convert_to_relative_paths(db_path=None, dry_run=False, db_manager=None, prog
             logger.debug("Using provided database manager")
             using_external_connection = True
             
-            # Get all images with absolute thumbnail paths through db_manager
-            images = db_manager.execute_query(
-                "SELECT image_id, thumbnail_path FROM images WHERE thumbnail_path IS NOT NULL"
-            )
+            # Stream the thumbnail paths through db_manager
+            images = db_manager.iter_images(columns=("image_id", "thumbnail_path"))
         else:
             # Create a new connection if no db_manager provided
             logger.debug(f"Creating new database connection to {db_path}")
@@ -112,17 +111,17 @@ def convert_to_relative_paths(db_path=None, dry_run=False, db_manager=None, prog
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            # Get all images with absolute thumbnail paths
-            cursor.execute("SELECT image_id, thumbnail_path FROM images WHERE thumbnail_path IS NOT NULL")
-            images = cursor.fetchall()
+            # Stream the thumbnail paths in chunks; updates go through our own connection
+            images = DatabaseOperations(db_path).iter_images(columns=("image_id", "thumbnail_path"))
         
         success_count = 0
         unchanged_count = 0
         error_count = 0
         
-        for image in images:
-            image_id = image['image_id']
-            thumbnail_path = image['thumbnail_path']
+        for image_id, thumbnail_path in images:
+            if thumbnail_path is None:
+                continue
+            
             
             # Skip if already relative (no directory path)
             if thumbnail_path and not os.path.dirname(thumbnail_path):
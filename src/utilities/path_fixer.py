@@ -14,6 +14,8 @@ from pathlib import Path
 # Add the parent directory to the path so we can import our modules
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
+from src.database.db_operations import DatabaseOperations
+
 logger = logging.getLogger("StarImageBrowse.utilities.path_fixer")
 
 class PathFixer:
@@ -74,25 +76,21 @@ class PathFixer:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            # Get all images from the database
-            cursor.execute("SELECT image_id, filename, full_path FROM images")
-            images = cursor.fetchall()
-            stats["processed"] = len(images)
-            
-            logger.info(f"Found {len(images)} images in database")
-            # Show a sample of paths for debugging
-            if len(images) > 0:
-                sample_size = min(5, len(images))
-                logger.info("Sample paths from database:")
-                for i in range(sample_size):
-                    logger.info(f"  Image {images[i]['image_id']}: {images[i]['full_path']}")
+            # Stream the images in chunks instead of loading them all at once
+            db_ops = DatabaseOperations(self.db_path)
+            logger.info(f"Found {db_ops.get_image_count()} images in database")
             
-            for image in images:
+            for image in db_ops.iter_images(columns=("image_id", "filename", "full_path")):
+                stats["processed"] += 1
+                image_id, filename, current_path = image
+                
+                # Show a sample of paths for debugging
+                if stats["processed"] == 1:
+                    logger.info("Sample paths from database:")
+                if stats["processed"] <= 5:
+                    logger.info(f"  Image {image_id}: {current_path}")
+                
                 try:
-                    image_id = image["image_id"]
-                    filename = image["filename"]
-                    current_path = image["full_path"]
-                    
                     # Normalize the path
                     normalized_path = self.normalize_path(current_path)
                     
@@ -17,6 +17,8 @@ from PIL import Image, UnidentifiedImageError
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 from src.database.db_manager import DatabaseManager
+from src.database.db_migrations import migrate
+from src.database.db_operations import DatabaseOperations
 from src.config.config_manager import ConfigManager
 
 # Set up logging
@@ -50,34 +52,16 @@ def update_image_metadata(db_path, progress_callback=None):
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        # Check if the required columns exist, add them if they don't
-        logger.info("Checking if required columns exist...")
-        cursor.execute("PRAGMA table_info(images)")
-        columns = {row[1] for row in cursor.fetchall()}
+        # Apply any schema migrations, which add the format and date_added columns
+        stats["columns_added"] = bool(migrate(conn))
         
-        # Add format column if it doesn't exist
-        if "format" not in columns:
-            logger.info("Adding format column to images table")
-            cursor.execute("ALTER TABLE images ADD COLUMN format TEXT")
-            stats["columns_added"] = True
+        # Stream the images in chunks, fetching only the columns we need
+        db_ops = DatabaseOperations(db_path)
+        total_images = db_ops.get_image_count()
+        images = db_ops.iter_images(
+            columns=("image_id", "full_path", "format", "date_added", "last_modified_date")
+        )
         
-        # Add date_added column if it doesn't exist
-        if "date_added" not in columns:
-            logger.info("Adding date_added column to images table")
-            # First add the column without a default value
-            cursor.execute("ALTER TABLE images ADD COLUMN date_added TIMESTAMP")
-            # Then update all existing records with current timestamp
-            cursor.execute("UPDATE images SET date_added = CURRENT_TIMESTAMP WHERE date_added IS NULL")
-            stats["columns_added"] = True
-        
-        # Commit these schema changes before proceeding
-        conn.commit()
-        
-        # Get all images - use a more efficient query that only fetches what we need
-        cursor.execute("SELECT image_id, full_path, format, date_added, last_modified_date FROM images")
-        images = cursor.fetchall()
-        
-        total_images = len(images)
         stats["total"] = total_images
         logger.info(f"Found {stats['total']} images in database")
         
@@ -92,11 +76,7 @@ def update_image_metadata(db_path, progress_callback=None):
         # Process each image
         for i, image in enumerate(images):
             try:
-                image_id = image["image_id"]
-                full_path = image["full_path"]
-                current_format = image["format"]
-                date_added = image["date_added"]
-                last_modified = image["last_modified_date"]
+                image_id, full_path, current_format, date_added, last_modified = image
                 
                 # Skip processing if this image already has all metadata
                 if current_format and date_added and last_modified:
@@ -166,7 +146,7 @@ def update_image_metadata(db_path, progress_callback=None):
                     progress_callback(i + 1, total_images)
                     
             except Exception as e:
-                logger.error(f"Error updating metadata for image {image.get('image_id')}: {e}")
+                logger.error(f"Error updating metadata for image {image.image_id}: {e}")
                 stats["failed"] += 1
         
         # Process any remaining images in the batch
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures for the StarImageBrowse tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """A database manager on a new, fully migrated database with one folder."""
+    manager = DatabaseManager(str(tmp_path / "images.db"))
+    assert manager.initialize_database()
+    manager.folder_id = manager.add_folder(str(tmp_path))
+    yield manager
+    manager.close()
+
+
+def add_images(db_manager, filenames, **values):
+    """Add images with the given file names to the fixture folder.
+
+    Returns:
+        list: image_id of each image
+    """
+    folder = os.path.dirname(db_manager.db_path)
+    return db_manager.add_images_bulk([
+        dict(values, folder_id=db_manager.folder_id, filename=filename,
+             full_path=os.path.join(folder, filename), file_size=1)
+        for filename in filenames
+    ])
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for database backups
+"""
+
+import logging
+import re
+import sqlite3
+
+from conftest import add_images
+from src.database.db_backup import incremental_backup
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _pages_written(caplog):
+    message = caplog.records[-1].getMessage()
+    written, total = re.search(r"(\d+) of (\d+) pages written", message).groups()
+    return int(written), int(total)
+
+
+def test_incremental_backup_round_trip(db_manager, tmp_path, caplog):
+    caplog.set_level(logging.INFO, logger="StarImageBrowse.database.db_backup")
+    backup_path = str(tmp_path / "images.db.backup")
+    add_images(db_manager, [f"{i}.jpg" for i in range(200)], ai_description="a red car")
+
+    assert incremental_backup(db_manager.db_path, backup_path)
+    written, total = _pages_written(caplog)
+    assert written == total
+
+    image_id, = add_images(db_manager, ["new.jpg"], ai_description="a blue boat")
+    db_manager.update_image_description(image_id, user_description="mine")
+
+    assert incremental_backup(db_manager.db_path, backup_path)
+    written, total = _pages_written(caplog)
+    assert 0 < written < total
+    assert _read(backup_path) == _read(db_manager.db_path)
+
+    backup = sqlite3.connect(backup_path)
+    try:
+        assert backup.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert backup.execute("SELECT COUNT(*) FROM images").fetchone()[0] == 201
+        assert backup.execute(
+            "SELECT user_description FROM images WHERE image_id = ?", (image_id,)
+        ).fetchone()[0] == "mine"
+    finally:
+        backup.close()
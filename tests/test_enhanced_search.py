@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for EnhancedSearch
+"""
+
+from conftest import add_images
+from src.database.enhanced_search import EnhancedSearch
+
+
+def test_update_image_dimensions_on_migrated_database(db_manager):
+    image_id, = add_images(db_manager, ["a.jpg"])
+    search = EnhancedSearch(db_manager.db_ops)
+
+    assert search.update_image_dimensions(image_id, 640, 480)
+
+    image = db_manager.get_image_by_id(image_id)
+    assert (image["width"], image["height"]) == (640, 480)
+
+
+def test_update_image_dimensions_of_missing_image(db_manager):
+    search = EnhancedSearch(db_manager.db_ops)
+
+    assert not search.update_image_dimensions(12345, 640, 480)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for parallel file discovery
+"""
+
+import os
+
+from src.image_processing import file_discovery
+from src.image_processing.file_discovery import FileDiscovery
+
+
+def _make_tree(root, paths):
+    for path in paths:
+        path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb"):
+            pass
+
+
+def test_finds_images_in_the_whole_tree(tmp_path):
+    root = str(tmp_path)
+    _make_tree(root, ["a.jpg", "notes.txt", "sub/b.PNG", "sub/deep/c.webp"])
+
+    found = {path for path, _ in FileDiscovery(root, threads=2)}
+
+    assert found == {os.path.join(root, path) for path in ("a.jpg", "sub/b.PNG", "sub/deep/c.webp")}
+
+
+def test_unlistable_directory_is_reported_incomplete(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    _make_tree(root, ["a.jpg", "good/b.jpg", "bad/c.jpg", "bad/deep/d.jpg"])
+    bad = os.path.join(root, "bad")
+    scandir = os.scandir
+
+    # Permissions do not stop root, so the listing is refused here instead
+    def refuse_bad(path):
+        if os.path.normpath(path) == bad:
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(file_discovery.os, "scandir", refuse_bad)
+    discovery = FileDiscovery(root, threads=2)
+
+    found = {path for path, _ in discovery}
+
+    assert found == {os.path.join(root, "a.jpg"), os.path.join(root, "good", "b.jpg")}
+    assert discovery.failed_dirs == [os.path.normcase(bad)]
+    assert not discovery.is_complete(os.path.join(bad, "c.jpg"))
+    assert not discovery.is_complete(os.path.join(bad, "deep", "d.jpg"))
+    assert discovery.is_complete(os.path.join(root, "good", "b.jpg"))
+    assert discovery.is_complete(os.path.join(root, "bad.jpg"))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for collecting and applying folder watcher events
+"""
+
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PyQt6")
+pytest.importorskip("watchdog")
+
+from src.scanner.folder_watcher import FolderWatcher
+
+FOLDER_ID = 1
+
+
+class RecordingScanner:
+    """Image scanner stand-in recording what the watcher asks of it."""
+
+    def __init__(self, thumbnail_dir):
+        self.thumbnail_generator = SimpleNamespace(thumbnail_dir=thumbnail_dir)
+        self.calls = []
+
+    def ingest_changes(self, folder_id, changed, deleted):
+        self.calls.append(("ingest", folder_id, set(changed), set(deleted)))
+        return {"processed": len(changed), "deleted": len(deleted)}
+
+    def scan_folder(self, folder_id, folder_path, incremental=False):
+        self.calls.append(("scan", folder_id, folder_path, incremental))
+        return {"processed": 0}
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    scanner = RecordingScanner(str(tmp_path / "thumbnails"))
+    watcher = FolderWatcher(scanner, db_manager=None, debounce_seconds=0.05, max_delay_seconds=1.0)
+    # Events are fed in directly, so nothing is scheduled with an observer
+    watcher.folders = {FOLDER_ID: (str(tmp_path), None)}
+    watcher.running = True
+    watcher.last_refresh = time.monotonic()
+    return watcher
+
+
+def test_burst_of_events_is_applied_once(watcher, tmp_path):
+    a, b = str(tmp_path / "a.jpg"), str(tmp_path / "b.png")
+    watcher.note_changed(FOLDER_ID, a)
+    watcher.note_changed(FOLDER_ID, str(tmp_path / "notes.txt"))
+    watcher.note_changed(FOLDER_ID, str(tmp_path / "thumbnails" / "a_thumb.jpg"))
+    watcher.note_deleted(FOLDER_ID, a)
+    watcher.note_changed(FOLDER_ID, a)
+    watcher.note_changed(FOLDER_ID, b)
+    watcher.note_deleted(FOLDER_ID, b)
+
+    folder_id, changes = watcher._take()
+    watcher._apply(folder_id, changes)
+
+    assert watcher.image_scanner.calls == [("ingest", FOLDER_ID, {a}, {b})]
+    assert watcher.pending == {}
+
+
+def test_directory_change_scans_the_folder(watcher, tmp_path):
+    watcher.note_changed(FOLDER_ID, str(tmp_path / "a.jpg"))
+    watcher.note_rescan(FOLDER_ID, str(tmp_path / "moved"))
+
+    watcher._apply(*watcher._take())
+
+    assert watcher.image_scanner.calls == [("scan", FOLDER_ID, str(tmp_path), True)]
+
+
+def test_changes_wait_for_the_folder_to_be_quiet(watcher, tmp_path):
+    watcher.debounce_seconds = 0.3
+    started = time.monotonic()
+    watcher.note_changed(FOLDER_ID, str(tmp_path / "a.jpg"))
+    time.sleep(0.15)
+    watcher.note_changed(FOLDER_ID, str(tmp_path / "b.jpg"))
+
+    folder_id, changes = watcher._take()
+
+    assert time.monotonic() - started >= 0.45
+    assert len(changes.changed) == 2
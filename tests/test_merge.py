@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for merging another database into the library
+"""
+
+import os
+
+import pytest
+
+from conftest import add_images
+from src.database.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def source_path(db_manager, tmp_path):
+    """A second database whose folder, image and catalog IDs differ from the fixture's."""
+    path = str(tmp_path / "source" / "images.db")
+    os.makedirs(os.path.dirname(path))
+    source = DatabaseManager(path)
+    assert source.initialize_database()
+
+    # The fixture folder gets another ID here, and one more folder is new
+    source.add_folder(str(tmp_path / "elsewhere"))
+    source.folder_id = source.add_folder(str(tmp_path))
+    shared, new, other = source.add_images_bulk([
+        dict(folder_id=source.folder_id, filename=filename, full_path=str(tmp_path / filename),
+             file_size=1, ai_description="source")
+        for filename in ("shared.jpg", "new.jpg", "other.jpg")
+    ])
+
+    source.create_catalog("Unused")
+    favourites = source.create_catalog("Favourites")
+    source.add_image_to_catalog(shared, favourites)
+    source.add_image_to_catalog(new, favourites)
+    source.close()
+    return path
+
+
+def _catalog_names(db_manager, image_id):
+    return {catalog["name"] for catalog in db_manager.get_catalogs_for_image(image_id)}
+
+
+def test_merge_remaps_ids_and_is_idempotent(db_manager, source_path):
+    db_manager.create_catalog("Favourites")
+    shared, = add_images(db_manager, ["shared.jpg"], ai_description="target")
+
+    stats = db_manager.merge_database(source_path).result(30)
+
+    assert stats["folders"] == 1
+    assert stats["images"] == 2
+    assert stats["catalogs"] == 1
+    assert stats["catalog_mappings"] == 2
+    images = {image["filename"]: image for image in db_manager.get_images_for_folder(db_manager.folder_id)}
+    assert set(images) == {"shared.jpg", "new.jpg", "other.jpg"}
+    assert images["shared.jpg"]["image_id"] == shared
+    assert images["shared.jpg"]["ai_description"] == "target"
+    assert _catalog_names(db_manager, shared) == {"Favourites"}
+    assert _catalog_names(db_manager, images["new.jpg"]["image_id"]) == {"Favourites"}
+    assert _catalog_names(db_manager, images["other.jpg"]["image_id"]) == set()
+    assert {image["filename"] for image in db_manager.search_images("source")} == {"new.jpg", "other.jpg"}
+
+    stats = db_manager.merge_database(source_path).result(30)
+
+    assert stats == {"folders": 0, "images": 0, "catalogs": 0, "catalog_mappings": 0, "skipped_images": 3}
+    assert len(db_manager.get_images_for_folder(db_manager.folder_id)) == 3
+    assert len(db_manager.get_folders(enabled_only=False)) == 2
+    assert len(db_manager.get_catalogs()) == 2
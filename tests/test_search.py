@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for description and file name search
+"""
+
+import pytest
+
+from conftest import add_images
+from src.database.db_fts import TRIGRAM_SUPPORTED
+
+
+def _filenames(images):
+    return sorted(image["filename"] for image in images)
+
+
+@pytest.mark.skipif(not TRIGRAM_SUPPORTED, reason="SQLite has no trigram tokenizer")
+def test_digit_fragment_matches_file_names(db_manager):
+    add_images(db_manager, ["IMG_20230042.jpg", "IMG_20230043.jpg", "render_0042_final.png"])
+
+    assert _filenames(db_manager.search_images("0042")) == ["IMG_20230042.jpg", "render_0042_final.png"]
+
+
+@pytest.mark.skipif(not TRIGRAM_SUPPORTED, reason="SQLite has no trigram tokenizer")
+def test_fragment_is_not_hidden_by_word_matches(db_manager):
+    # "0042" is a whole word of the first name but only a substring of the second
+    add_images(db_manager, ["IMG_0042.jpg", "IMG_20230042.jpg"], ai_description="a red car")
+
+    assert _filenames(db_manager.search_images("0042")) == ["IMG_0042.jpg", "IMG_20230042.jpg"]
+    assert _filenames(db_manager.search_images("car 0042")) == ["IMG_0042.jpg", "IMG_20230042.jpg"]
+
+
+def test_words_are_found_through_the_word_index(db_manager):
+    add_images(db_manager, ["a.jpg"], ai_description="a red car at night")
+    add_images(db_manager, ["b.jpg"], ai_description="a blue boat")
+
+    assert _filenames(db_manager.search_images("car")) == ["a.jpg"]
+    assert _filenames(db_manager.search_images("boat -red")) == ["b.jpg"]
+
+
+def test_pages_after_the_last_word_hit_do_not_fall_back(db_manager):
+    add_images(db_manager, [f"car{i}.jpg" for i in range(5)], ai_description="a red car")
+    add_images(db_manager, [f"oscar{i}.jpg" for i in range(20)], ai_description="an oscar statue")
+
+    assert len(db_manager.search_images("car", limit=5)) == 5
+    assert db_manager.search_images("car", limit=5, offset=5) == []
+
+
+def test_substring_fallback_pages_through_all_matches(db_manager):
+    add_images(db_manager, [f"oscar{i}.jpg" for i in range(20)], ai_description="an oscar statue")
+
+    pages = [db_manager.search_images("osca", limit=8, offset=offset) for offset in (0, 8, 16, 24)]
+
+    assert [len(page) for page in pages] == [8, 8, 4, 0]
+    assert len({image["image_id"] for page in pages for image in page}) == 20
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for moving folders between shards
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.database import db_sharding
+from src.database.db_core import Database
+from src.database.db_sharding import ShardManager, SizeBasedSharding
+
+FOLDER_ID = 1
+
+
+def _insert_image(db, image_id):
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute(
+            "INSERT INTO images (image_id, folder_id, filename, full_path) VALUES (?, ?, ?, ?)",
+            (image_id, FOLDER_ID, f"{image_id}.jpg", f"/images/{image_id}.jpg")
+        )
+
+
+def _image_ids(db):
+    with sqlite3.connect(db.db_path) as conn:
+        return sorted(row[0] for row in conn.execute(
+            "SELECT image_id FROM images WHERE folder_id = ?", (FOLDER_ID,)
+        ))
+
+
+def _moving_to(shard_manager):
+    with sqlite3.connect(shard_manager.base_db_path) as conn:
+        return conn.execute(
+            "SELECT moving_to FROM folder_shard_mapping WHERE folder_id = ?", (FOLDER_ID,)
+        ).fetchone()[0]
+
+
+@pytest.fixture
+def shard_manager(tmp_path):
+    Database(str(tmp_path / "images.db"))
+    manager = ShardManager(str(tmp_path / "images.db"), SizeBasedSharding(), enable_sharding=True)
+    with manager.folder_write(FOLDER_ID) as db:
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("INSERT INTO folders (folder_id, path) VALUES (?, ?)", (FOLDER_ID, "/images"))
+        _insert_image(db, 1)
+    yield manager
+    manager.cleanup()
+
+
+def test_move_folder(shard_manager):
+    source = shard_manager.get_db_for_folder(FOLDER_ID)
+
+    assert shard_manager.move_folder(FOLDER_ID, "shard_9")
+
+    target = shard_manager.get_db_for_folder(FOLDER_ID)
+    assert target is not source
+    assert _image_ids(target) == [1]
+    assert _image_ids(source) == []
+    assert _moving_to(shard_manager) is None
+
+
+def test_insert_during_move_is_not_lost(shard_manager, monkeypatch):
+    writer_done = threading.Event()
+
+    def write():
+        with shard_manager.folder_write(FOLDER_ID) as db:
+            _insert_image(db, 2)
+        writer_done.set()
+
+    sync_folder = db_sharding._sync_folder
+
+    def sync_then_write(conn, folder_id):
+        changed = sync_folder(conn, folder_id)
+        # A write arriving after the catch-up has to wait for the move
+        threading.Thread(target=write, daemon=True).start()
+        assert not writer_done.wait(0.2)
+        assert shard_manager.is_folder_moving(FOLDER_ID)
+        return changed
+
+    monkeypatch.setattr(db_sharding, "_sync_folder", sync_then_write)
+
+    assert shard_manager.move_folder(FOLDER_ID, "shard_9")
+    assert writer_done.wait(5)
+    assert _image_ids(shard_manager.get_db_for_folder(FOLDER_ID)) == [1, 2]
+
+
+def test_failed_move_leaves_no_duplicate(shard_manager, monkeypatch):
+    for image_id in range(2, 6):
+        _insert_image(shard_manager.get_db_for_folder(FOLDER_ID), image_id)
+
+    def fail(conn, folder_id):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(db_sharding, "_sync_folder", fail)
+
+    assert not shard_manager.move_folder(FOLDER_ID, "shard_9")
+    assert _image_ids(shard_manager.get_db_for_shard("shard_9")) == []
+    assert _moving_to(shard_manager) is None
+    assert shard_manager.get_query_executor().get_image_count() == 5
+    assert len(shard_manager.get_query_executor().get_all_images(limit=100)) == 5
+
+
+def test_interrupted_move_is_cleaned_up_on_load(shard_manager, tmp_path):
+    # A move that copied the folder to shard_9 and stopped before the switch
+    target = shard_manager.get_db_for_shard("shard_9")
+    _insert_image(target, 1)
+    shard_manager._set_folder_moving(FOLDER_ID, "shard_9")
+
+    reloaded = ShardManager(str(tmp_path / "images.db"), SizeBasedSharding(), enable_sharding=True)
+    try:
+        assert _image_ids(target) == []
+        assert _image_ids(reloaded.get_db_for_folder(FOLDER_ID)) == [1]
+    finally:
+        reloaded.cleanup()
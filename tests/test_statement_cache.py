@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for canonical statement text
+"""
+
+import sqlite3
+
+from src.database.db_statement_cache import canonical_sql
+
+
+def test_whitespace_is_collapsed_outside_quotes():
+    assert canonical_sql("SELECT  'a  b',\n\t\"c  d\"\n  FROM t ") == "SELECT 'a  b', \"c  d\" FROM t"
+
+
+def test_line_comment_keeps_its_newline():
+    sql = canonical_sql("SELECT 1 -- note\n    AS value")
+
+    assert sql == "SELECT 1 -- note\nAS value"
+    assert sqlite3.connect(":memory:").execute(sql).fetchall() == [(1,)]
+
+
+def test_comments_are_kept_whole():
+    assert canonical_sql("SELECT /* a  -- b\n c */  1 -- it's\n") == "SELECT /* a  -- b\n c */ 1 -- it's"
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the write-behind buffer
+"""
+
+import os
+import sqlite3
+
+from conftest import add_images
+from src.database import db_write_buffer
+
+
+def test_flush_writes_coalesced_updates(db_manager):
+    image_id, = add_images(db_manager, ["a.jpg"])
+
+    db_manager.queue_image_description(image_id, ai_description="a red car")
+    db_manager.queue_image_description(image_id, user_description="mine")
+    future = db_manager.queue_image_dimensions(image_id, 640, 480)
+
+    assert db_manager.flush_writes()
+    assert future.result()["descriptions"] == 1
+    image = db_manager.get_image_by_id(image_id)
+    assert (image["ai_description"], image["user_description"]) == ("a red car", "mine")
+    assert (image["width"], image["height"]) == (640, 480)
+
+
+def test_conflicting_path_does_not_lose_other_updates(db_manager):
+    a, b, c = add_images(db_manager, ["a.jpg", "b.jpg", "c.jpg"])
+    folder = os.path.dirname(db_manager.db_path)
+
+    future = db_manager.queue_image_description(a, ai_description="a red car")
+    db_manager.queue_image_path(b, "c.jpg", os.path.join(folder, "c.jpg"))
+    db_manager.queue_image_path(c, "d.jpg", os.path.join(folder, "d.jpg"))
+
+    assert db_manager.flush_writes()
+    counts = future.result()
+    assert counts["conflicts"] == [b]
+    assert db_manager.get_image_by_id(a)["ai_description"] == "a red car"
+    assert db_manager.get_image_by_id(b)["filename"] == "b.jpg"
+    assert db_manager.get_image_by_id(c)["filename"] == "d.jpg"
+
+
+def test_failed_kind_is_requeued(db_manager, monkeypatch):
+    image_id, = add_images(db_manager, ["a.jpg"])
+    write_dimensions = db_write_buffer._write_dimensions
+    failures = []
+
+    def fail_once(raw, dimensions):
+        if not failures:
+            failures.append(dimensions)
+            raise sqlite3.OperationalError("database is locked")
+        return write_dimensions(raw, dimensions)
+
+    monkeypatch.setattr(db_write_buffer, "_write_dimensions", fail_once)
+
+    db_manager.queue_image_description(image_id, ai_description="a red car")
+    future = db_manager.queue_image_dimensions(image_id, 640, 480)
+    db_manager.flush_writes()
+
+    assert future.result(timeout=10)["failed"] == {}
+    assert failures
+    image = db_manager.get_image_by_id(image_id)
+    assert image["ai_description"] == "a red car"
+    assert (image["width"], image["height"]) == (640, 480)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the group-committing database writer
+"""
+
+import threading
+
+import pytest
+
+
+def _add_folder(conn, path):
+    conn.execute("INSERT INTO folders (path) VALUES (?)", (path,))
+
+
+def _folder_paths(db_manager):
+    return {folder["path"] for folder in db_manager.get_folders(enabled_only=False)}
+
+
+def test_failed_operation_is_rolled_back_alone(db_manager):
+    writer = db_manager.db_ops.db.writer
+    started, release = threading.Event(), threading.Event()
+
+    def block(conn):
+        started.set()
+        release.wait(10)
+
+    def fail(conn):
+        _add_folder(conn, "/failed")
+        raise ValueError("failed")
+
+    def roll_back_part(conn):
+        conn.begin_transaction()
+        _add_folder(conn, "/rolled-back")
+        conn.rollback()
+        _add_folder(conn, "/kept")
+
+    # Hold the writer so the next operations are committed as one batch
+    blocker = writer.submit(block)
+    assert started.wait(10)
+    batches = writer.batches
+    futures = [
+        writer.submit(_add_folder, "/first"),
+        writer.submit(fail),
+        writer.submit(roll_back_part),
+        writer.submit(_add_folder, "/last"),
+    ]
+    release.set()
+    blocker.result(10)
+
+    with pytest.raises(ValueError):
+        futures[1].result(10)
+    for future in futures[0], futures[2], futures[3]:
+        future.result(10)
+    assert writer.batches == batches + 2
+
+    paths = _folder_paths(db_manager)
+    assert {"/first", "/kept", "/last"} <= paths
+    assert not {"/failed", "/rolled-back"} & paths